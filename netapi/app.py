@@ -1,26 +1,30 @@
 from __future__ import annotations
-# Ensure database schema is present early
-try:
-    from .db import init_db, ensure_columns, ensure_knowledge_indexes
-    init_db()
-    ensure_columns()
-    ensure_knowledge_indexes()
-    print("✅ Database initialized (tables ensured)")
-    # Seed default users (idempotent)
-    try:
-        from .db_seed import seed_users as _seed_users
-        _seed_users()
-        print("✅ Seed users ensured")
-    except Exception as _e_seed:
+import os as _os
+# Ensure database schema is present early (skipped when only import time is profiled)
+if _os.getenv("KI_IMPORT_PROFILE", "0").strip() != "1":
+    try:
+        from .db import init_db, ensure_columns, ensure_knowledge_indexes, ensure_job_lease_schema, ensure_plan_step_schema
+        init_db()
+        ensure_columns()
+        ensure_knowledge_indexes()
+        ensure_job_lease_schema()
+        ensure_plan_step_schema()
+        print("✅ Database initialized (tables ensured)")
+        # Seed default users (idempotent)
+        try:
+            from .db_seed import seed_users as _seed_users
+            _seed_users()
+            print("✅ Seed users ensured")
+        except Exception as _e_seed:
+            try:
+                print(f"⚠️  Seed users skipped: {_e_seed}")
+            except Exception:
+                pass
+    except Exception as _e_db_init:
         try:
-            print(f"⚠️  Seed users skipped: {_e_seed}")
+            print(f"❌ Database init failed: {_e_db_init}")
         except Exception:
             pass
-except Exception as _e_db_init:
-    try:
-        print(f"❌ Database init failed: {_e_db_init}")
-    except Exception:
-        pass
 # netapi/app.py
 from fastapi import FastAPI, Request, Depends, HTTPException, Response, Query
 import os
@@ -58,6 +62,9 @@ except Exception:
 
 # Routers are imported lazily and guarded, so a missing optional
 # dependency (e.g., sse_starlette) doesn't crash the whole app.
+# Optional routers registered via _lazy_router() are only imported on the
+# first request below their prefix (see netapi/lazy_routers.py).
+from .lazy_routers import lazy_router as _lazy_router, include as _include_router, preload_for_openapi as _preload_for_openapi
 try:
     from netapi.modules.auth.router import router as auth_router
 except Exception:
@@ -152,26 +159,11 @@ try:
     from netapi.modules.security.router import router as security_router
 except Exception:
     security_router = None  # type: ignore
-try:
-    from netapi.modules.viewer.router import router as viewer_router
-except Exception:
-    viewer_router = None  # type: ignore
-try:
-    from netapi.modules.os.router import router as os_router
-except Exception:
-    os_router = None  # type: ignore
-try:
-    from netapi.modules.kernel.router import router as kernel_router
-except Exception:
-    kernel_router = None  # type: ignore
-try:
-    from netapi.modules.subminds.router import router as subminds_router
-except Exception:
-    subminds_router = None  # type: ignore
-try:
-    from netapi.modules.guardian.router import router as guardian_router
-except Exception:
-    guardian_router = None  # type: ignore
+viewer_router = _lazy_router("viewer", "netapi.modules.viewer.router", "/viewer")
+os_router = _lazy_router("os", "netapi.modules.os.router", "/os")
+kernel_router = _lazy_router("kernel", "netapi.modules.kernel.router", "/api/kernel")
+subminds_router = _lazy_router("subminds", "netapi.modules.subminds.router", "/api/subminds")
+guardian_router = _lazy_router("guardian", "netapi.modules.guardian.router", "/api/guardian")
 try:
     from netapi.modules.account.router import router as account_router
 except Exception:
@@ -192,38 +184,20 @@ except Exception as _e_billing_router:
         print("⚠️  Billing router disabled:", _e_billing_router)
     except Exception:
         pass
-try:
-    from netapi.modules.media.router import router as media_router
-except Exception:
-    media_router = None  # type: ignore
+media_router = _lazy_router("media", "netapi.modules.media.router", "/api/media")
 try:
     from netapi.modules.voice.router import router as voice_router
 except Exception:
     voice_router = None  # type: ignore
-try:
-    from netapi.modules.stt.router import router as stt_router
-except Exception:
-    stt_router = None  # type: ignore
-try:
-    from netapi.modules.ingest.router import router as ingest_router
-except Exception:
-    ingest_router = None  # type: ignore
-try:
-    from netapi.modules.agent.router import router as agent_router
-except Exception:
-    agent_router = None  # type: ignore
-try:
-    from netapi.modules.devices.router import router as devices_router
-except Exception:
-    devices_router = None  # type: ignore
+stt_router = _lazy_router("stt", "netapi.modules.stt.router", "/api/stt")
+ingest_router = _lazy_router("ingest", "netapi.modules.ingest.router", "/ingest")
+agent_router = _lazy_router("agent", "netapi.modules.agent.router", "/api/agent")
+devices_router = _lazy_router("devices", "netapi.modules.devices.router", "/api/devices")
 try:
     from netapi.modules.stats.router import router as stats_router
 except Exception:
     stats_router = None  # type: ignore
-try:
-    from netapi.modules.ops.router import router as ops_router
-except Exception:
-    ops_router = None  # type: ignore
+ops_router = _lazy_router("ops", "netapi.modules.ops.router", "/api/ops")
 try:
     from netapi.modules.gdpr.dsar_router import router as gdpr_router
 except Exception:
@@ -232,26 +206,14 @@ try:
     from netapi.modules.privacy.router import router as privacy_router
 except Exception:
     privacy_router = None  # type: ignore
-try:
-    from netapi.modules.colearn.router import router as colearn_router
-except Exception:
-    colearn_router = None  # type: ignore
-try:
-    from netapi.modules.genesis.router import router as genesis_router
-except Exception:
-    genesis_router = None  # type: ignore
+colearn_router = _lazy_router("colearn", "netapi.modules.colearn.router", "/colearn")
+genesis_router = _lazy_router("genesis", "netapi.modules.genesis.router", "/genesis")
 try:
     from netapi.modules.feedback.router import router as feedback_router
 except Exception:
     feedback_router = None  # type: ignore
-try:
-    from netapi.modules.subki.router import router as subki_router
-except Exception:
-    subki_router = None  # type: ignore
-try:
-    from netapi.modules.self.router import router as self_router
-except Exception:
-    self_router = None  # type: ignore
+subki_router = _lazy_router("subki", "netapi.modules.subki.router", "/api/subki")
+self_router = _lazy_router("self", "netapi.modules.self.router", "/self")
 try:
     from netapi.modules.dashboard_mock.router import router as dashboard_mock_router
 except Exception:
@@ -264,26 +226,17 @@ try:
     from netapi.modules.events.router import router as events_router
 except Exception:
     events_router = None  # type: ignore
-try:
-    from netapi.modules.reflection.router import router as reflection_router
-except Exception:
-    reflection_router = None  # type: ignore
+reflection_router = _lazy_router("reflection", "netapi.modules.reflection.router", "/api/reflection")
 try:
     from netapi.modules.plan.router import router as plan_router
 except Exception:
     plan_router = None  # type: ignore
-try:
-    from netapi.modules.persona.router import router as persona_router
-except Exception:
-    persona_router = None  # type: ignore
+persona_router = _lazy_router("persona", "netapi.modules.persona.router", "/persona")
 try:
     from netapi.modules.knowledge.router import router as knowledge_router
 except Exception:
     knowledge_router = None  # type: ignore
-try:
-    from netapi.modules.ethics.router import router as ethics_router
-except Exception:
-    ethics_router = None  # type: ignore
+ethics_router = _lazy_router("ethics", "netapi.modules.ethics.router", "/evaluate_ethics")
 try:
     from netapi.modules.crawler.router import router as crawler_router
 except Exception as _e_crawler_router:
@@ -310,14 +263,8 @@ except Exception as _e_crawler_api_router:
         print(f"❌ Import crawler_api_router failed: {_e_crawler_api_router}")
     except Exception:
         pass
-try:
-    from netapi.modules.export.router import router as export_router
-except Exception:
-    export_router = None  # type: ignore
-try:
-    from netapi.modules.explain.router import router as explain_router
-except Exception:
-    explain_router = None  # type: ignore
+export_router = _lazy_router("export", "netapi.modules.export.router", "/api/export")
+explain_router = _lazy_router("explain", "netapi.modules.explain.router", "/api/explain")
 try:
     from netapi.modules.settings.router import router as settings_router
 except Exception as _e_settings_router:
@@ -346,18 +293,9 @@ try:
     from netapi.modules.jobs.router import router as jobs_router
 except Exception:
     jobs_router = None  # type: ignore
-try:
-    from netapi.modules.autonomy.router import router as autonomy_router
-except Exception:
-    autonomy_router = None  # type: ignore
-try:
-    from netapi.modules.insight.router import router as insight_router
-except Exception:
-    insight_router = None  # type: ignore
-try:
-    from netapi.modules.goals.router import router as goals_router
-except Exception:
-    goals_router = None  # type: ignore
+autonomy_router = _lazy_router("autonomy", "netapi.modules.autonomy.router", "/api/autonomy")
+insight_router = _lazy_router("insight", "netapi.modules.insight.router", "/api/insight")
+goals_router = _lazy_router("goals", "netapi.modules.goals.router", "/api/goals")
 AutonomyManager = None
 if os.getenv("KI_ENABLE_AUTONOMY", "0").strip() in {"1", "true", "True"}:
     try:
@@ -388,6 +326,7 @@ if ROOT_PATH == "/":
     ROOT_PATH = ""
 
 app = FastAPI(title="KI_ana API", version="1.0", debug=settings.DEBUG, root_path=ROOT_PATH)
+_preload_for_openapi(app)  # /openapi.json and /docs list lazy routes too
 
 
 @app.get("/healthz", include_in_schema=False)
@@ -536,6 +475,14 @@ async def _kernel_boot() -> None:
     except Exception:
         pass
 
+    # Event loop lag monitor: reports stalls from blocking calls on the loop
+    if os.getenv("KI_LOOP_MONITOR", "1").strip().lower() not in {"0", "false", "no"}:
+        try:
+            from .core.blocking_io import start_loop_monitor
+            start_loop_monitor()
+        except Exception:
+            pass
+
     # Install logging broadcaster so /api/logs endpoints work
     try:
         from .logging_bridge import BROADCASTER
@@ -607,6 +554,13 @@ async def _kernel_down() -> None:
             await TIMEFLOW.stop()  # type: ignore[func-returns-value]
     except Exception:
         pass
+
+    try:
+        from .core import blocking_io as _bio
+        if _bio.LOOP_MONITOR is not None:
+            await _bio.LOOP_MONITOR.stop()
+    except Exception:
+        pass
     
     crawler_task = getattr(app.state, "crawler_task", None)
     if crawler_task:
@@ -621,6 +575,13 @@ async def _kernel_down() -> None:
         except Exception:
             pass
     
+    # Close pooled Ollama client (best-effort)
+    try:
+        from .core import llm_local as _llm_pool  # type: ignore
+        await _llm_pool.aclose()
+    except Exception:
+        pass
+
     # Stop advanced features services
     try:
         from .core.system_integration import get_system_integration
@@ -802,7 +763,19 @@ def api_metrics(request: Request):
         }
     except Exception:
         pass
-    return {"ok": True, "ollama": ollama}
+    latency = {}
+    try:
+        from netapi.modules.observability.metrics import latency_snapshot
+        latency = latency_snapshot()
+    except Exception:
+        pass
+    io = {}
+    try:
+        from .core.blocking_io import stats as _io_stats
+        io = _io_stats()
+    except Exception:
+        pass
+    return {"ok": True, "ollama": ollama, "latency": latency, "io": io}
 
 # Unified system status for UI (resources + metrics)
 @app.get("/api/system/status", include_in_schema=False)
@@ -1625,8 +1598,7 @@ router_list = [
 
 for r in router_list:
     try:
-        if r is not None:
-            app.include_router(r)
+        _include_router(app, r)
     except Exception as e:
         print(f"❌ Fehler beim Einbinden eines Routers: {e}")
 
@@ -799,10 +799,19 @@ def respond_to(user: str, system: str = "", lang: str = "de-DE", persona: str =
         return f"Okay. Zu „{msg}“: Ich kann es kurz erklären oder eine kompakte Zusammenfassung geben – was hättest du lieber?"
 
 
+async def _llm_available_async() -> bool:
+    if llm_local is None:
+        return False
+    probe = getattr(llm_local, "aavailable", None)
+    if probe is not None:
+        return bool(await probe())
+    return bool(getattr(llm_local, "available", lambda: False)())
+
+
 async def stream_response(user: str, system: str = "", lang: str = "de-DE", persona: str = "friendly"):
     """Streaming via local LLM if available; else chunk the fallback text."""
     # Try local LLM streaming
-    if llm_local is not None and getattr(llm_local, "available", lambda: False)():
+    if await _llm_available_async():
         # reuse memory note from respond_to path
         try:
             _lazy_wire_memory()
@@ -827,6 +836,11 @@ async def stream_response(user: str, system: str = "", lang: str = "de-DE", pers
         except Exception:
             mem_note = ""
         content = (user or "").strip() + (mem_note or "")
+        if hasattr(llm_local, "achat_stream"):
+            async for chunk in llm_local.achat_stream(content, system=(system or "")):
+                if chunk:
+                    yield chunk
+            return
         for chunk in llm_local.chat_stream(content, system=(system or "")):
             if chunk:
                 yield chunk
@@ -0,0 +1,300 @@
+"""
+Blocking I/O offloading for async request handlers.
+
+run_blocking() runs a sync callable (file reads/rewrites, sqlite3, memory
+store writes) on a dedicated, bounded thread pool instead of the event loop,
+so one slow disk no longer stalls every concurrent chat stream. Calls are
+grouped in categories with their own concurrency limit; callers beyond the
+limit wait (without holding a pool thread) and are counted as queue depth.
+
+Config:
+  KI_IO_THREADS   pool size (default 16)
+  KI_IO_LIMITS    per-category limits, e.g. "file=4,sqlite=4,memory=1"
+
+LoopLagMonitor samples event-loop scheduling lag and reports stalls above
+KI_LOOP_STALL_MS (default 100 ms), including the loop thread's stack while
+it is blocked, so the offending sync call can be found.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
+
+try:
+    from netapi.modules.observability import metrics as _metrics
+except Exception:  # pragma: no cover
+    _metrics = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# memory=1: memory_store rewrites its JSON indexes, so chat-path saves stay
+# serialized as they were on the loop
+DEFAULT_LIMITS: Dict[str, int] = {"file": 4, "sqlite": 4, "memory": 1, "default": 8}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    limits = dict(DEFAULT_LIMITS)
+    for part in (raw or "").split(","):
+        name, _, value = part.partition("=")
+        try:
+            if name.strip() and int(value) > 0:
+                limits[name.strip()] = int(value)
+        except ValueError:
+            continue
+    return limits
+
+
+@dataclass
+class CategoryStats:
+    submitted: int = 0
+    completed: int = 0
+    errors: int = 0
+    waiting: int = 0
+    running: int = 0
+    max_waiting: int = 0
+    wait_s: float = 0.0
+    run_s: float = 0.0
+    max_run_ms: float = 0.0
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_limits: Dict[str, int] = _parse_limits(os.getenv("KI_IO_LIMITS", ""))
+_stats: Dict[str, CategoryStats] = {}
+# asyncio semaphores belong to one loop (TestClient portals, worker loops)
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_env_int("KI_IO_THREADS", 16), thread_name_prefix="ki-io")
+    return _executor
+
+
+def _semaphore(category: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    per_loop = _semaphores.get(loop)
+    if per_loop is None:
+        per_loop = _semaphores[loop] = {}
+    sem = per_loop.get(category)
+    if sem is None:
+        sem = per_loop[category] = asyncio.Semaphore(_limits.get(category, _limits["default"]))
+    return sem
+
+
+def _stat(category: str) -> CategoryStats:
+    st = _stats.get(category)
+    if st is None:
+        with _lock:
+            st = _stats.setdefault(category, CategoryStats())
+    return st
+
+
+def configure(*, threads: Optional[int] = None, limits: Optional[Dict[str, int]] = None) -> None:
+    """Resize the pool and/or category limits (startup and tests)."""
+    global _executor
+    with _lock:
+        if threads is not None:
+            old, _executor = _executor, ThreadPoolExecutor(max_workers=max(1, int(threads)), thread_name_prefix="ki-io")
+            if old is not None:
+                old.shutdown(wait=False)
+        if limits:
+            _limits.update({k: max(1, int(v)) for k, v in limits.items()})
+        _semaphores.clear()
+
+
+def _release(loop: asyncio.AbstractEventLoop, sem: asyncio.Semaphore) -> None:
+    try:
+        loop.call_soon_threadsafe(sem.release)
+    except RuntimeError:
+        pass  # loop already closed
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, category: str = "default", **kwargs: Any) -> T:
+    """Run `fn(*args, **kwargs)` on the I/O pool, at most limit(category) at a time."""
+    st = _stat(category)
+    sem = _semaphore(category)
+    t0 = time.perf_counter()
+    st.submitted += 1
+    st.waiting += 1
+    st.max_waiting = max(st.max_waiting, st.waiting)
+    if _metrics is not None:
+        _metrics.set_io_queue_depth(category, st.waiting)
+    try:
+        await sem.acquire()
+    finally:
+        st.waiting -= 1
+        if _metrics is not None:
+            _metrics.set_io_queue_depth(category, st.waiting)
+    t1 = time.perf_counter()
+    st.running += 1
+    loop = asyncio.get_running_loop()
+    try:
+        ctx = contextvars.copy_context()
+        cf = _pool().submit(functools.partial(ctx.run, fn, *args, **kwargs))
+    except BaseException:
+        sem.release()
+        st.running -= 1
+        raise
+    # The slot is freed when the thread finishes, even if the awaiting task
+    # is cancelled first (a running thread cannot be interrupted)
+    cf.add_done_callback(lambda _f: _release(loop, sem))
+    try:
+        return await asyncio.wrap_future(cf)
+    except BaseException:
+        st.errors += 1
+        raise
+    finally:
+        st.running -= 1
+        st.completed += 1
+        t2 = time.perf_counter()
+        st.wait_s += t1 - t0
+        st.run_s += t2 - t1
+        st.max_run_ms = max(st.max_run_ms, (t2 - t1) * 1000)
+        if _metrics is not None:
+            _metrics.record_blocking_io(category, t1 - t0, t2 - t1)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        cats = {k: dict(asdict(v), limit=_limits.get(k, _limits["default"])) for k, v in _stats.items()}
+    for c in cats.values():
+        n = max(1, c["completed"])
+        c["avg_wait_ms"] = round(c.pop("wait_s") * 1000 / n, 3)
+        c["avg_run_ms"] = round(c.pop("run_s") * 1000 / n, 3)
+        c["max_run_ms"] = round(c["max_run_ms"], 3)
+    pool = _executor
+    return {
+        "threads": pool._max_workers if pool is not None else _env_int("KI_IO_THREADS", 16),  # type: ignore[attr-defined]
+        "categories": cats,
+        "loop_lag": LOOP_MONITOR.stats() if LOOP_MONITOR is not None else None,
+    }
+
+
+# --------------------------------------------------------------------------
+# Event loop lag monitor
+# --------------------------------------------------------------------------
+class LoopLagMonitor:
+    """Samples loop lag every `interval` s; lag above `threshold_ms` is a stall.
+
+    A watchdog thread notices a loop that has not ticked for threshold_ms and
+    captures the loop thread's current stack (the call that blocks it).
+    """
+
+    def __init__(self, interval: float = 0.25, threshold_ms: Optional[float] = None, keep: int = 50):
+        self.interval = float(interval)
+        if threshold_ms is None:
+            threshold_ms = float(os.getenv("KI_LOOP_STALL_MS", "100"))
+        self.threshold = float(threshold_ms) / 1000.0
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.samples = 0
+        self.max_lag_ms = 0.0
+        self._beat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._stack: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._stop.set()  # retire a watchdog left from a previous loop
+        self._stop = threading.Event()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="ki-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - t0 - self.interval)
+            self._beat = time.monotonic()
+            self._sample(lag)
+
+    def _sample(self, lag: float) -> None:
+        self.samples += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+        stalled = lag > self.threshold
+        if _metrics is not None:
+            _metrics.record_loop_lag(lag, stalled=stalled)
+        if stalled:
+            stack, self._stack = self._stack, None
+            self.stalls.append({"ts": time.time(), "lag_ms": round(lag * 1000, 1), "stack": stack or []})
+            where = (stack or ["?"])[-1].strip().splitlines()[0]
+            logger.warning("event loop stalled for %.0f ms (%s)", lag * 1000, where)
+        else:
+            self._stack = None
+
+    def _watch(self, stop: threading.Event) -> None:
+        # Poll faster than the threshold; grab the stack once per stall
+        period = max(0.01, min(self.interval, self.threshold) / 2)
+        while not stop.wait(period):
+            if self._task is None or self._task.done():
+                return  # loop gone
+            beat = self._beat
+            if self._stack is None and time.monotonic() - beat > self.interval + self.threshold:
+                frame = sys._current_frames().get(self._loop_thread or 0)
+                if frame is not None and self._beat == beat:
+                    self._stack = traceback.format_stack(frame, limit=12)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stalls": len(self.stalls),
+            "recent_stalls": list(self.stalls)[-10:],
+        }
+
+
+LOOP_MONITOR: Optional[LoopLagMonitor] = None
+
+
+def start_loop_monitor(interval: Optional[float] = None) -> LoopLagMonitor:
+    """Start (once per process) the lag monitor on the running loop."""
+    global LOOP_MONITOR
+    if LOOP_MONITOR is None:
+        if interval is None:
+            interval = float(os.getenv("KI_LOOP_LAG_INTERVAL", "0.25"))
+        LOOP_MONITOR = LoopLagMonitor(interval=interval)
+    LOOP_MONITOR.start()
+    return LOOP_MONITOR
@@ -77,7 +77,15 @@ async def stream_response(message: str, user_context=None, system: str | None =
     """Asynchrones Streaming über lokales LLM, sonst einmalige Antwort."""
     user_context = user_context or {}
     sys_prompt = system or _default_system_prompt(persona)
-    if llm_local and llm_local.available():
+    if llm_local and hasattr(llm_local, "achat_stream"):
+        # Pooled async client: does not block the event loop, and cancellation
+        # of this generator closes the upstream Ollama response.
+        if await llm_local.aavailable():
+            async for chunk in llm_local.achat_stream(message, system=sys_prompt):
+                if chunk:
+                    yield chunk
+            return
+    elif llm_local and llm_local.available():
         try:
             for chunk in llm_local.chat_stream(message, system=sys_prompt):
                 if not chunk:
@@ -5,15 +5,31 @@ Environment:
   OLLAMA_HOST  default: http://127.0.0.1:11434
   OLLAMA_MODEL default: llama3.1:8b
 
+  OLLAMA_MAX_INFLIGHT  default: 4 (concurrent generations per process)
+  OLLAMA_POOL_SIZE     default: 8 (keep-alive connections)
+
 Provides simple non-streaming and streaming helpers. All functions
 soft‑fail and return None if unreachable so callers can fall back.
+
+The ``a*`` variants (``achat_once``/``achat_stream``/``aavailable``) are
+meant for async handlers: they share one pooled ``httpx.AsyncClient``,
+bound in-flight generations with a semaphore and iterate the NDJSON
+stream without blocking the event loop. Cancelling the consuming task
+(e.g. when the SSE/WebSocket client disconnects) closes the upstream
+response so Ollama stops generating.
 """
 import os
 import json
-from typing import Dict, Iterator, Optional
+import asyncio
+from typing import AsyncIterator, Dict, Iterator, Optional
 
 import requests
 
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
 # Prefer app settings (from .env) and fall back to process env
 try:
     from netapi.config import settings  # type: ignore
@@ -52,16 +68,103 @@ def _resolve_model() -> str:
 
 OLLAMA_MODEL = _resolve_model()
 DEFAULT_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "30"))
+MAX_INFLIGHT = max(1, int(os.getenv("OLLAMA_MAX_INFLIGHT", "4") or 4))
+POOL_SIZE = max(1, int(os.getenv("OLLAMA_POOL_SIZE", "8") or 8))
+
+# Shared sync session so repeated calls reuse the TCP connection
+_SESSION: Optional[requests.Session] = None
+
+# Async client + semaphore are bound to the loop they were created on
+_ACLIENT = None
+_ASEM: Optional[asyncio.Semaphore] = None
+_ALOOP: Optional[asyncio.AbstractEventLoop] = None
+_CLOSING: set = set()
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        _SESSION = s
+    return _SESSION
+
+
+def _async_client():
+    """Return the pooled AsyncClient and in-flight semaphore for the running loop."""
+    global _ACLIENT, _ASEM, _ALOOP
+    if httpx is None:
+        raise RuntimeError("httpx not installed")
+    loop = asyncio.get_running_loop()
+    if _ACLIENT is None or _ALOOP is not loop or getattr(_ACLIENT, "is_closed", False):
+        _close_stale(_ACLIENT, _ALOOP)
+        _ACLIENT = httpx.AsyncClient(
+            base_url=OLLAMA_HOST,
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+        _ASEM = asyncio.Semaphore(MAX_INFLIGHT)
+        _ALOOP = loop
+    return _ACLIENT, _ASEM
+
+
+def _close_stale(client, loop) -> None:
+    """Close the client left over from a previous event loop.
+
+    Runs on that loop if it is still alive (its connections live there),
+    otherwise as a task on the current one; failures are ignored.
+    """
+    if client is None or getattr(client, "is_closed", False):
+        return
+
+    async def close():
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        try:
+            asyncio.run_coroutine_threadsafe(close(), loop)
+            return
+        except RuntimeError:
+            pass
+    task = asyncio.get_running_loop().create_task(close())
+    _CLOSING.add(task)
+    task.add_done_callback(_CLOSING.discard)
+
+
+async def aclose() -> None:
+    """Close the pooled async client (e.g. on app shutdown)."""
+    global _ACLIENT, _ASEM, _ALOOP
+    client = _ACLIENT
+    _ACLIENT, _ASEM, _ALOOP = None, None, None
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
 
 
 def available() -> bool:
     try:
-        r = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=3)
+        r = _session().get(f"{OLLAMA_HOST}/api/tags", timeout=3)
         return r.ok
     except Exception:
         return False
 
 
+async def aavailable() -> bool:
+    try:
+        client, _sem = _async_client()
+        r = await client.get("/api/tags", timeout=3)
+        return r.status_code < 400
+    except Exception:
+        return False
+
+
 def _messages(system: str, user: str) -> list[dict]:
     msgs = []
     if system:
@@ -70,6 +173,15 @@ def _messages(system: str, user: str) -> list[dict]:
     return msgs
 
 
+def _parse_chat_line(line: str) -> tuple[Optional[str], bool]:
+    """Parse one NDJSON line of /api/chat. Returns (content, done)."""
+    obj = json.loads(line)
+    if obj.get("done"):
+        return None, True
+    msg = (obj.get("message") or {}).get("content")
+    return (str(msg) if msg else None), False
+
+
 def chat_once(user: str, system: str = "", *, model: Optional[str] = None, json_response: bool = False) -> Optional[str]:
     """Calls Ollama /api/chat once and returns the assistant text or None on failure."""
     try:
@@ -81,7 +193,7 @@ def chat_once(user: str, system: str = "", *, model: Optional[str] = None, json_
         }
         if json_response:
             payload["format"] = "json"
-        r = requests.post(f"{OLLAMA_HOST}/api/chat", json=payload, timeout=DEFAULT_TIMEOUT)
+        r = _session().post(f"{OLLAMA_HOST}/api/chat", json=payload, timeout=DEFAULT_TIMEOUT)
         if not r.ok:
             return None
         data = r.json()
@@ -101,20 +213,88 @@ def chat_stream(user: str, system: str = "", *, model: Optional[str] = None) ->
             "messages": _messages(system, user),
             "stream": True,
         }
-        with requests.post(f"{OLLAMA_HOST}/api/chat", json=payload, timeout=DEFAULT_TIMEOUT, stream=True) as r:
+        with _session().post(f"{OLLAMA_HOST}/api/chat", json=payload, timeout=DEFAULT_TIMEOUT, stream=True) as r:
             r.raise_for_status()
             for line in r.iter_lines(decode_unicode=True):
                 if not line:
                     continue
                 try:
-                    obj = json.loads(line)
-                    if obj.get("done"):
-                        break
-                    msg = (obj.get("message") or {}).get("content")
-                    if msg:
-                        yield str(msg)
+                    msg, done = _parse_chat_line(line)
                 except Exception:
                     # ignore parse errors, keep stream going
                     continue
+                if done:
+                    break
+                if msg:
+                    yield msg
+    except Exception:
+        return
+
+
+async def achat_once(user: str, system: str = "", *, model: Optional[str] = None, json_response: bool = False) -> Optional[str]:
+    """Async variant of chat_once on the pooled client. Returns None on failure."""
+    try:
+        client, sem = _async_client()
+        payload: Dict = {
+            "model": OLLAMA_MODEL,
+            "messages": _messages(system, user),
+            "stream": False,
+        }
+        if json_response:
+            payload["format"] = "json"
+        async with sem:
+            r = await client.post("/api/chat", json=payload)
+        if r.status_code >= 400:
+            return None
+        data = r.json()
+        msg = (data or {}).get("message") or {}
+        content = (msg or {}).get("content")
+        return str(content) if content else None
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        return None
+
+
+async def achat_stream(
+    user: str,
+    system: str = "",
+    *,
+    model: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Async variant of chat_stream with true NDJSON iteration.
+
+    The in-flight slot is held for the lifetime of the stream. When the
+    consumer stops iterating (aclose) or is cancelled, as Starlette does with
+    a streaming response whose client disconnected, the upstream response is
+    closed immediately.
+    """
+    try:
+        client, sem = _async_client()
+    except Exception:
+        return
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": _messages(system, user),
+        "stream": True,
+    }
+    try:
+        async with sem:
+            async with client.stream("POST", "/api/chat", json=payload) as r:
+                if r.status_code >= 400:
+                    return
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        msg, done = _parse_chat_line(line)
+                    except Exception:
+                        continue
+                    if done:
+                        return
+                    if msg:
+                        yield msg
+    except (asyncio.CancelledError, GeneratorExit):
+        raise
     except Exception:
         return
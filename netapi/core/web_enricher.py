@@ -15,10 +15,6 @@ from datetime import datetime
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 from urllib.parse import quote_plus, urlparse
 from zoneinfo import ZoneInfo
-try:
-    from bs4 import BeautifulSoup
-except Exception:  # pragma: no cover
-    BeautifulSoup = None  # type: ignore
 try:
     from system.conflict_resolver import get_trust_score_from_url
 except Exception:  # pragma: no cover
@@ -65,6 +61,21 @@ except Exception:  # pragma: no cover
     SessionLocal = None  # type: ignore
     get_ranked_sources_for_locale = None  # type: ignore
     NewsSource = None  # type: ignore
+
+
+def BeautifulSoup(markup: str, features: str):  # noqa: N802
+    """bs4.BeautifulSoup, imported on first parse (bs4 + soupsieve add ~90 ms to API startup)."""
+    from bs4 import BeautifulSoup as _BeautifulSoup
+
+    return _BeautifulSoup(markup, features)
+
+
+def _bs4_available() -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec("bs4") is not None
+
+
 @contextmanager
 def _news_source_session():
     if SessionLocal is None:
@@ -912,7 +923,7 @@ class WebEnricher:
         http_client: Optional[Callable[..., Any]] = None,
         enable_snapshots: Optional[bool] = None,
     ) -> None:
-        if BeautifulSoup is None:
+        if not _bs4_available():
             raise RuntimeError("WebEnricher requires beautifulsoup4 (bs4)")
         # Search endpoint: Env > argument > default
         endpoint_cfg = search_endpoint or _cfg("KIANA_WEB_SEARCH_ENDPOINT", "") or None
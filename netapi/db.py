@@ -336,6 +336,58 @@ def ensure_knowledge_indexes() -> None:
         pass
 
 
+def ensure_job_lease_schema(bind=None) -> None:
+    """
+    Ensure the jobs table supports atomic leasing (SQLite and Postgres):
+    - lease_token column (stale lease holders cannot complete/fail a job)
+    - composite index (type, status, priority DESC, id) matching the lease query
+    Idempotent; safe if the table is absent.
+    """
+    try:
+        if bind is None:
+            ensure_engine_current()
+            bind = engine
+        from sqlalchemy import inspect
+        inspector = inspect(bind)
+        if 'jobs' not in inspector.get_table_names():
+            return
+        have = {c['name'] for c in inspector.get_columns('jobs')}
+        with bind.begin() as conn:
+            if 'lease_token' not in have:
+                conn.execute(text("ALTER TABLE jobs ADD COLUMN lease_token VARCHAR(64)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(type, status, priority DESC, id)"))
+    except Exception:
+        # never crash app on index ensure
+        pass
+
+
+def ensure_plan_step_schema(bind=None) -> None:
+    """
+    Ensure plan_steps supports batch leasing with server-side retries:
+    - attempts / not_before columns (delayed steps instead of worker sleeps)
+    - index (status, not_before) for the lease query
+    Idempotent; safe if the table is absent.
+    """
+    try:
+        if bind is None:
+            ensure_engine_current()
+            bind = engine
+        from sqlalchemy import inspect
+        inspector = inspect(bind)
+        if 'plan_steps' not in inspector.get_table_names():
+            return
+        have = {c['name'] for c in inspector.get_columns('plan_steps')}
+        with bind.begin() as conn:
+            if 'attempts' not in have:
+                conn.execute(text("ALTER TABLE plan_steps ADD COLUMN attempts INTEGER DEFAULT 0"))
+            if 'not_before' not in have:
+                conn.execute(text("ALTER TABLE plan_steps ADD COLUMN not_before INTEGER DEFAULT 0"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_plan_steps_lease ON plan_steps(status, not_before)"))
+    except Exception:
+        # never crash app on index ensure
+        pass
+
+
 def query_db(sql: str, params: tuple | list = ()):
     """Execute a SQL statement against the configured engine.
     - For SELECT: returns list[dict]
@@ -4,6 +4,7 @@ Distributed Module - Sub-KI Network
 Provides distributed processing across specialized AI instances.
 """
 from .submind_network import SubMindNetwork, SubMind, SubMindRole, DistributedTask, get_submind_network
+from .scheduler import TaskScheduler
 
 __all__ = [
     "SubMindNetwork",
@@ -11,4 +12,5 @@ __all__ = [
     "SubMindRole",
     "DistributedTask",
     "get_submind_network",
+    "TaskScheduler",
 ]
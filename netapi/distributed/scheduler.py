@@ -0,0 +1,309 @@
+"""
+Task Scheduler - load-aware dispatch for the SubMind Network
+
+- Per-role priority queues (overflow when every sub-mind is backlogged)
+- Per-submind local queues and concurrency slots
+- Least-loaded / EWMA-latency placement
+- Work stealing between sub-minds of the same role
+"""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Any, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .submind_network import SubMindNetwork, SubMind, DistributedTask
+
+ANY_ROLE = "*"
+
+_Entry = Tuple[int, int, "DistributedTask"]
+
+
+class TaskScheduler:
+    """
+    Dispatches DistributedTasks onto sub-mind slots.
+
+    A submitted task is placed on the local queue of the sub-mind with the
+    lowest expected completion time ``(active + queued + 1) / slots * ewma``.
+    If every candidate already has ``local_depth * slots`` tasks queued, it
+    waits in the role queue instead. Each sub-mind runs one worker per slot;
+    an idle worker takes from its local queue, then the role queue, then
+    steals from the most backlogged same-role sibling.
+    """
+
+    def __init__(self, network: "SubMindNetwork", local_depth: int = 2,
+                 ewma_alpha: float = 0.2, default_latency: float = 0.1):
+        self.network = network
+        self.local_depth = max(1, int(local_depth))
+        self.ewma_alpha = float(ewma_alpha)
+        self.default_latency = float(default_latency)
+
+        self.role_queues: Dict[str, List[_Entry]] = {}
+        self.local_queues: Dict[str, List[_Entry]] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._workers: Dict[str, List[asyncio.Task]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count()
+
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "placed_local": 0,
+            "queued_role": 0,
+            "stolen": 0,
+        }
+
+    # -- lifecycle --------------------------------------------------------
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            # Event loop changed (e.g. a new asyncio.run): old workers and futures are gone
+            self._reset("scheduler restarted")
+        self._loop = loop
+        for submind in list(self.network.subminds.values()):
+            self.attach(submind)
+
+    def _reset(self, reason: str):
+        for tasks in self._workers.values():
+            for t in tasks:
+                t.cancel()
+        for heap in itertools.chain(self.local_queues.values(), self.role_queues.values()):
+            for _, _, task in heap:
+                task.status = "failed"
+                task.error = reason
+        self._workers.clear()
+        self._wake.clear()
+        self._futures.clear()
+        self.local_queues.clear()
+        self.role_queues.clear()
+        self._loop = None
+
+    def attach(self, submind: "SubMind"):
+        """Start slot workers for a (newly registered) sub-mind."""
+        if self._loop is None:
+            return
+        self.local_queues.setdefault(submind.id, [])
+        self._wake.setdefault(submind.id, asyncio.Event())
+        workers = self._workers.setdefault(submind.id, [])
+        workers[:] = [w for w in workers if not w.done()]
+        while len(workers) < max(1, submind.max_concurrency):
+            workers.append(self._loop.create_task(self._worker(submind.id)))
+
+    def detach(self, submind_id: str):
+        """Stop a sub-mind's workers and hand its queued tasks back to the role queue."""
+        for t in self._workers.pop(submind_id, []):
+            t.cancel()
+        self._wake.pop(submind_id, None)
+        self.evacuate(submind_id)
+        self.local_queues.pop(submind_id, None)
+
+    def evacuate(self, submind_id: str):
+        """Move queued (not running) tasks of a sub-mind back to the role queues."""
+        heap = self.local_queues.get(submind_id)
+        if not heap:
+            return
+        roles = set()
+        while heap:
+            entry = heapq.heappop(heap)
+            entry[2].assigned_to = None
+            role_key = self._role_key(entry[2])
+            heapq.heappush(self.role_queues.setdefault(role_key, []), entry)
+            roles.add(role_key)
+        for role_key in roles:
+            self._wake_role(role_key)
+
+    def shutdown(self):
+        self._reset("scheduler stopped")
+
+    # -- submission -------------------------------------------------------
+    def submit(self, task: "DistributedTask") -> asyncio.Future:
+        """Queue a task; the returned future resolves to the execute_task result dict."""
+        self._ensure_started()
+        fut = self._loop.create_future()
+        self.counters["submitted"] += 1
+
+        if not self._candidates(task):
+            task.status = "failed"
+            task.error = "No available sub-mind for this task"
+            self.counters["rejected"] += 1
+            fut.set_result({"success": False, "error": task.error})
+            return fut
+
+        self._futures[task.id] = fut
+        self.network.tasks[task.id] = task
+        task.status = "pending"
+        entry = (-int(task.priority), next(self._seq), task)
+
+        target = self.place(task)
+        if target is not None:
+            task.assigned_to = target.id
+            heapq.heappush(self.local_queues.setdefault(target.id, []), entry)
+            self.counters["placed_local"] += 1
+            self._wake_one(target.id)
+            if target.active_tasks >= target.max_concurrency:
+                self._wake_role(self._role_key(task), idle_only=True)
+        else:
+            heapq.heappush(self.role_queues.setdefault(self._role_key(task), []), entry)
+            self.counters["queued_role"] += 1
+            self._wake_role(self._role_key(task))
+        return fut
+
+    def place(self, task: "DistributedTask") -> Optional["SubMind"]:
+        """Least expected completion time among sub-minds with local queue room."""
+        best = None
+        best_key = None
+        for sm in self._candidates(task):
+            slots = max(1, sm.max_concurrency)
+            queued = len(self.local_queues.get(sm.id, ()))
+            if queued >= self.local_depth * slots:
+                continue
+            latency = sm.ewma_latency or self.default_latency
+            key = ((sm.active_tasks + queued + 1) / slots * latency, -sm.success_rate())
+            if best_key is None or key < best_key:
+                best, best_key = sm, key
+        return best
+
+    # -- workers ----------------------------------------------------------
+    def _candidates(self, task: "DistributedTask") -> List["SubMind"]:
+        return self.network.online_subminds(task.required_role)
+
+    @staticmethod
+    def _role_key(task: "DistributedTask") -> str:
+        return task.required_role.value if task.required_role else ANY_ROLE
+
+    def _wake_one(self, submind_id: str):
+        ev = self._wake.get(submind_id)
+        if ev:
+            ev.set()
+
+    def _wake_role(self, role_key: str, idle_only: bool = False):
+        for sm in self.network.subminds.values():
+            if role_key != ANY_ROLE and sm.role.value != role_key:
+                continue
+            if idle_only and sm.active_tasks >= sm.max_concurrency:
+                continue
+            self._wake_one(sm.id)
+
+    def _next_for(self, sm: "SubMind") -> Optional["DistributedTask"]:
+        from .submind_network import SubMindStatus
+
+        if sm.status not in (SubMindStatus.ONLINE, SubMindStatus.BUSY):
+            return None
+
+        local = self.local_queues.get(sm.id)
+        if local:
+            return heapq.heappop(local)[2]
+
+        # Role queue (own role or "any"), higher priority first
+        own = self.role_queues.get(sm.role.value)
+        anyq = self.role_queues.get(ANY_ROLE)
+        src = None
+        if own and anyq:
+            src = own if own[0] <= anyq[0] else anyq
+        else:
+            src = own or anyq
+        if src:
+            task = heapq.heappop(src)[2]
+            task.assigned_to = sm.id
+            return task
+
+        # Steal from the most backlogged same-role sibling
+        victim = None
+        victim_len = 0
+        for other_id in self.network.role_members(sm.role):
+            if other_id == sm.id:
+                continue
+            n = len(self.local_queues.get(other_id, ()))
+            if n > victim_len:
+                victim, victim_len = other_id, n
+        if victim:
+            task = heapq.heappop(self.local_queues[victim])[2]
+            task.assigned_to = sm.id
+            self.counters["stolen"] += 1
+            return task
+        return None
+
+    async def _worker(self, submind_id: str):
+        ev = self._wake[submind_id]
+        while True:
+            sm = self.network.subminds.get(submind_id)
+            if sm is None:
+                return
+            task = self._next_for(sm)
+            if task is None:
+                ev.clear()
+                task = self._next_for(sm)
+                if task is None:
+                    await ev.wait()
+                    continue
+            await self._run(sm, task)
+
+    async def _run(self, sm: "SubMind", task: "DistributedTask"):
+        from .submind_network import SubMindStatus
+
+        fut = self._futures.pop(task.id, None)
+        sm.active_tasks += 1
+        sm.current_task = task.id
+        if sm.status == SubMindStatus.ONLINE and sm.active_tasks >= sm.max_concurrency:
+            sm.status = SubMindStatus.BUSY
+
+        task.assigned_to = sm.id
+        task.status = "running"
+        task.started_at = time.time()
+        try:
+            result = await self.network._execute_on_submind(sm, task)
+            task.status = "completed"
+            task.completed_at = time.time()
+            task.result = result
+            sm.total_tasks += 1
+            sm.successful_tasks += 1
+            self.counters["completed"] += 1
+            outcome: Dict[str, Any] = {
+                "success": True,
+                "result": result,
+                "submind_id": sm.id,
+                "duration": task.completed_at - task.started_at,
+                "queue_wait": task.started_at - task.created_at,
+            }
+        except asyncio.CancelledError:
+            task.status = "failed"
+            task.error = "cancelled"
+            if fut and not fut.done():
+                fut.cancel()
+            raise
+        except Exception as e:
+            task.status = "failed"
+            task.error = str(e)
+            task.completed_at = time.time()
+            sm.total_tasks += 1
+            self.counters["failed"] += 1
+            outcome = {"success": False, "error": str(e), "submind_id": sm.id}
+        finally:
+            sm.active_tasks = max(0, sm.active_tasks - 1)
+            duration = time.time() - task.started_at
+            a = self.ewma_alpha
+            sm.ewma_latency = duration if not sm.ewma_latency else a * duration + (1 - a) * sm.ewma_latency
+            if sm.active_tasks == 0:
+                sm.current_task = None
+            if sm.status == SubMindStatus.BUSY and sm.active_tasks < sm.max_concurrency:
+                sm.status = SubMindStatus.ONLINE
+            self.network._save_state()
+
+        if fut and not fut.done():
+            fut.set_result(outcome)
+
+    # -- stats ------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "role_queued": {k: len(v) for k, v in self.role_queues.items() if v},
+            "local_queued": sum(len(v) for v in self.local_queues.values()),
+            "running": sum(sm.active_tasks for sm in self.network.subminds.values()),
+        }
@@ -6,9 +6,11 @@ Enables coordination between multiple specialized AI instances (sub-minds):
 - Knowledge sharing
 - Specialized processing
 - Redundancy and failover
+- Load-aware scheduling (priority queues, concurrency slots, work stealing)
 """
 from __future__ import annotations
 import asyncio
+import os
 import time
 import json
 from typing import Dict, List, Optional, Any, Callable
@@ -17,6 +19,11 @@ from enum import Enum
 from pathlib import Path
 import hashlib
 
+from .scheduler import TaskScheduler
+
+# Network state is written at most every PERSIST_INTERVAL seconds
+PERSIST_INTERVAL = float(os.getenv("KI_SUBMIND_PERSIST_SEC", "2.0"))
+
 
 class SubMindRole(Enum):
     """Specialized roles for sub-minds"""
@@ -50,6 +57,13 @@ class SubMind:
     total_tasks: int = 0
     successful_tasks: int = 0
     endpoint: Optional[str] = None  # For remote subminds
+    max_concurrency: int = 1  # Parallel task slots
+    active_tasks: int = 0
+    ewma_latency: float = 0.0  # Seconds, exponentially weighted
+    
+    def load(self) -> float:
+        """Occupied fraction of the concurrency slots"""
+        return self.active_tasks / max(1, self.max_concurrency)
     
     def success_rate(self) -> float:
         """Calculate task success rate"""
@@ -68,7 +82,10 @@ class SubMind:
             "last_heartbeat": self.last_heartbeat,
             "total_tasks": self.total_tasks,
             "successful_tasks": self.successful_tasks,
-            "success_rate": self.success_rate()
+            "success_rate": self.success_rate(),
+            "max_concurrency": self.max_concurrency,
+            "active_tasks": self.active_tasks,
+            "ewma_latency": round(self.ewma_latency, 4)
         }
 
 
@@ -80,6 +97,7 @@ class DistributedTask:
     description: str
     payload: Dict[str, Any]
     required_role: Optional[SubMindRole] = None
+    priority: int = 0  # Higher runs first
     assigned_to: Optional[str] = None  # SubMind ID
     status: str = "pending"  # pending, assigned, running, completed, failed
     result: Optional[Any] = None
@@ -96,6 +114,7 @@ class DistributedTask:
             "required_role": self.required_role.value if self.required_role else None,
             "assigned_to": self.assigned_to,
             "status": self.status,
+            "priority": self.priority,
             "error": self.error,
             "duration": (self.completed_at - self.started_at) if self.started_at and self.completed_at else None
         }
@@ -139,14 +158,23 @@ class SubMindNetwork:
         self.tasks: Dict[str, DistributedTask] = {}
         self.task_queue: List[DistributedTask] = []
         
+        # role -> submind ids (placement never scans the whole network)
+        self._by_role: Dict[SubMindRole, List[str]] = {}
+        
         # Storage
         self.network_dir = Path.home() / "ki_ana" / "distributed"
         self.network_dir.mkdir(parents=True, exist_ok=True)
         self.network_file = self.network_dir / "network_state.json"
+        self.persist_interval = PERSIST_INTERVAL
+        self._state_dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self.state_writes = 0
         
         self._running = False
         self._coordinator_task: Optional[asyncio.Task] = None
         
+        self.scheduler = TaskScheduler(self)
+        
         # Load state
         self._load_state()
         
@@ -188,22 +216,48 @@ class SubMindNetwork:
         
         for submind in defaults:
             if submind.id not in self.subminds:
+                submind.last_heartbeat = time.time()
                 self.subminds[submind.id] = submind
+        self._reindex()
+    
+    def _reindex(self):
+        by_role: Dict[SubMindRole, List[str]] = {}
+        for sm in self.subminds.values():
+            by_role.setdefault(sm.role, []).append(sm.id)
+        self._by_role = by_role
+    
+    def role_members(self, role: SubMindRole) -> List[str]:
+        """IDs of all sub-minds with a role"""
+        return self._by_role.get(role, [])
+    
+    def online_subminds(self, role: Optional[SubMindRole] = None) -> List[SubMind]:
+        """Sub-minds that accept work (ONLINE or BUSY), optionally filtered by role"""
+        ids = self.subminds.keys() if role is None else self._by_role.get(role, [])
+        return [
+            sm for sm in (self.subminds[i] for i in ids)
+            if sm.status in (SubMindStatus.ONLINE, SubMindStatus.BUSY)
+        ]
     
     def register_submind(self, submind: SubMind) -> bool:
         """Register a sub-mind in the network"""
         try:
             submind.last_heartbeat = time.time()
+            if submind.id in self.subminds:
+                self.scheduler.detach(submind.id)
             self.subminds[submind.id] = submind
+            self._reindex()
+            self.scheduler.attach(submind)
             self._save_state()
             return True
         except Exception:
             return False
     
     def unregister_submind(self, submind_id: str) -> bool:
-        """Remove a sub-mind from the network"""
+        """Remove a sub-mind from the network (its queued tasks are re-queued)"""
         if submind_id in self.subminds:
             del self.subminds[submind_id]
+            self._reindex()
+            self.scheduler.detach(submind_id)
             self._save_state()
             return True
         return False
@@ -216,98 +270,40 @@ class SubMindNetwork:
         """
         Find the best sub-mind for a task.
         
+        Least expected completion time (load × EWMA latency) among sub-minds
+        of the required role that still have queue room.
+        
         Args:
             task: Task to assign
             
         Returns:
             Best-fit SubMind or None
         """
-        # Filter by role if specified
-        candidates = [
-            sm for sm in self.subminds.values()
-            if sm.status == SubMindStatus.ONLINE
-            and (task.required_role is None or sm.role == task.required_role)
-            and sm.current_task is None
-        ]
-        
-        if not candidates:
-            return None
+        return self.scheduler.place(task)
+    
+    def submit_task(self, task: DistributedTask) -> "asyncio.Future":
+        """
+        Queue a task without waiting for it.
         
-        # Select by success rate
-        candidates.sort(key=lambda sm: sm.success_rate(), reverse=True)
-        return candidates[0]
+        Returns:
+            Future resolving to the same result dict as execute_task()
+        """
+        return self.scheduler.submit(task)
     
     async def execute_task(self, task: DistributedTask) -> Dict[str, Any]:
         """
         Execute a distributed task.
         
+        The task is queued (by priority) until a sub-mind slot is free; it
+        only fails immediately if no online sub-mind has the required role.
+        
         Args:
             task: Task to execute
             
         Returns:
             Result dict
         """
-        # Find suitable sub-mind
-        submind = self.find_submind_for_task(task)
-        
-        if not submind:
-            task.status = "failed"
-            task.error = "No available sub-mind for this task"
-            return {
-                "success": False,
-                "error": task.error
-            }
-        
-        # Assign task
-        task.assigned_to = submind.id
-        task.status = "assigned"
-        submind.current_task = task.id
-        submind.status = SubMindStatus.BUSY
-        
-        # Store task
-        self.tasks[task.id] = task
-        
-        try:
-            # Execute task (delegate to submind)
-            task.status = "running"
-            task.started_at = time.time()
-            
-            result = await self._execute_on_submind(submind, task)
-            
-            # Mark complete
-            task.status = "completed"
-            task.completed_at = time.time()
-            task.result = result
-            
-            submind.total_tasks += 1
-            submind.successful_tasks += 1
-            
-            return {
-                "success": True,
-                "result": result,
-                "submind_id": submind.id,
-                "duration": task.completed_at - task.started_at
-            }
-            
-        except Exception as e:
-            # Mark failed
-            task.status = "failed"
-            task.error = str(e)
-            task.completed_at = time.time()
-            
-            submind.total_tasks += 1
-            
-            return {
-                "success": False,
-                "error": str(e),
-                "submind_id": submind.id
-            }
-        
-        finally:
-            # Release submind
-            submind.current_task = None
-            submind.status = SubMindStatus.ONLINE
-            self._save_state()
+        return await self.scheduler.submit(task)
     
     async def _execute_on_submind(self, submind: SubMind, task: DistributedTask) -> Any:
         """
@@ -362,6 +358,8 @@ class SubMindNetwork:
             if now - submind.last_heartbeat > timeout:
                 if submind.status != SubMindStatus.OFFLINE:
                     submind.status = SubMindStatus.OFFLINE
+                    # Let same-role siblings pick up what was queued here
+                    self.scheduler.evacuate(submind.id)
     
     async def coordinator_loop(self, check_interval: int = 30):
         """
@@ -377,10 +375,9 @@ class SubMindNetwork:
                 # Check health
                 self.check_health()
                 
-                # Process task queue
+                # Hand queued tasks to the scheduler (they run concurrently)
                 while self.task_queue:
-                    task = self.task_queue.pop(0)
-                    await self.execute_task(task)
+                    self.submit_task(self.task_queue.pop(0))
                 
                 await asyncio.sleep(check_interval)
                 
@@ -401,15 +398,37 @@ class SubMindNetwork:
         self._running = False
         if self._coordinator_task:
             self._coordinator_task.cancel()
+        self.scheduler.shutdown()
+        self.flush_state()
     
     def _save_state(self):
-        """Save network state"""
+        """Mark state dirty; written at most every persist_interval seconds"""
+        self._state_dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_state()
+            return
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(self.persist_interval, self.flush_state)
+    
+    def flush_state(self):
+        """Write network state now (if changed)"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if not self._state_dirty:
+            return
+        self._state_dirty = False
         try:
             data = {
                 "subminds": [sm.to_dict() for sm in self.subminds.values()],
                 "updated_at": time.time()
             }
-            self.network_file.write_text(json.dumps(data, indent=2))
+            tmp = self.network_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, indent=2))
+            tmp.replace(self.network_file)
+            self.state_writes += 1
         except Exception:
             pass
     
@@ -433,6 +452,7 @@ class SubMindNetwork:
             "busy": busy,
             "offline": len(self.subminds) - online - busy,
             "total_tasks": len(self.tasks),
+            "scheduler": self.scheduler.stats(),
             "by_role": {
                 role.value: sum(1 for sm in self.subminds.values() if sm.role == role)
                 for role in SubMindRole
@@ -0,0 +1,192 @@
+"""
+Lazy router mounting for netapi/app.py.
+
+Optional module routers are registered as a cheap placeholder route that
+owns the router's path prefix. The first request below that prefix imports
+the module (in a worker thread), splices its routes into the app at the
+placeholder's position and re-dispatches the request, so routing order and
+behaviour are the same as with an eager include_router().
+
+KI_LAZY_ROUTERS controls which routers are deferred:
+  unset / "1" / "auto"  -> every router registered with lazy_router()
+  "0" / "off"           -> all eager (previous behaviour)
+  "media,stt,..."       -> only the listed names
+
+Only routers whose routes all live under one static prefix and that do not
+register startup/shutdown handlers are suitable.
+
+Until a router is loaded its routes are unknown to the app: url_path_for()
+raises NoMatchFound for their names. Call load_all() (or run with
+KI_LAZY_ROUTERS=0) where every route must be resolvable; preload_for_openapi()
+makes schema generation (/openapi.json, /docs) load them first.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+try:
+    from starlette._utils import get_route_path  # type: ignore
+except Exception:  # pragma: no cover - older Starlette
+    def get_route_path(scope) -> str:  # type: ignore
+        return scope.get("path", "")
+
+
+class LazyRouter(BaseRoute):
+    """Placeholder route that imports and mounts `module.attr` on first use."""
+
+    def __init__(self, name: str, module: str, prefix: str, attr: str = "router"):
+        self.name = name
+        self.module = module
+        self.prefix = prefix.rstrip("/")
+        self.attr = attr
+        self.app: Any = None
+        self.include_kwargs: Dict[str, Any] = {}
+        self.state = "pending"  # pending | loaded | failed
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self._router: Any = None
+        self._imported = False
+        self._lock = threading.Lock()
+
+    # --- BaseRoute ---------------------------------------------------------
+    def matches(self, scope) -> tuple:
+        if scope.get("type") not in ("http", "websocket"):
+            return Match.NONE, {}
+        path = get_route_path(scope)
+        if path == self.prefix or path.startswith(self.prefix + "/"):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope, receive, send) -> None:
+        if self.state == "pending":
+            await asyncio.to_thread(self._import)
+            self._splice()
+        # Placeholder is gone now: route through the real routes (or 404)
+        await self.app.router(scope, receive, send)
+
+    # --- loading -----------------------------------------------------------
+    def mount(self, app, **include_kwargs: Any) -> "LazyRouter":
+        """Register the placeholder on `app`; kwargs go to include_router() later."""
+        self.app = app
+        self.include_kwargs = include_kwargs
+        app.router.routes.append(self)
+        return self
+
+    def _import(self) -> None:
+        with self._lock:
+            if self._imported:
+                return
+            t0 = time.perf_counter()
+            try:
+                self._router = getattr(importlib.import_module(self.module), self.attr)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"❌ Lazy router {self.name} failed to load: {self.error}")
+            self._imported = True
+            self.load_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    def _splice(self) -> None:
+        """Replace the placeholder with the router's routes (runs on the loop thread)."""
+        if self.state != "pending":
+            return
+        routes = self.app.router.routes
+        new: List[BaseRoute] = []
+        if self._router is not None:
+            n = len(routes)
+            try:
+                self.app.include_router(self._router, **self.include_kwargs)
+                new = routes[n:]
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"❌ Lazy router {self.name} mount failed: {self.error}")
+            del routes[n:]
+        try:
+            idx = routes.index(self)
+            routes[idx:idx + 1] = new
+        except ValueError:
+            routes.extend(new)
+        self.state = "loaded" if new else "failed"
+        self.app.openapi_schema = None
+        if new:
+            print(f"✅ Lazy router {self.name} mounted ({self.load_ms} ms)")
+
+    def load(self) -> bool:
+        """Synchronously import and mount (preloading, tests)."""
+        self._import()
+        self._splice()
+        return self.state == "loaded"
+
+    def info(self) -> Dict[str, Any]:
+        return {"name": self.name, "module": self.module, "prefix": self.prefix,
+                "state": self.state, "load_ms": self.load_ms, "error": self.error}
+
+
+REGISTRY: Dict[str, LazyRouter] = {}
+
+
+def _lazy_names() -> Optional[set]:
+    """None = all registered routers are lazy; otherwise the enabled names."""
+    raw = os.getenv("KI_LAZY_ROUTERS", "1").strip().lower()
+    if raw in ("", "1", "true", "yes", "auto", "all"):
+        return None
+    if raw in ("0", "false", "no", "off"):
+        return set()
+    return {p.strip() for p in raw.split(",") if p.strip()}
+
+
+def lazy_router(name: str, module: str, prefix: str, attr: str = "router") -> Any:
+    """A LazyRouter placeholder, or the imported router when `name` is not lazy.
+
+    Like the guarded imports in app.py, an eager import failure yields None.
+    """
+    names = _lazy_names()
+    if names is None or name in names:
+        lr = LazyRouter(name, module, prefix, attr)
+        REGISTRY[name] = lr
+        return lr
+    try:
+        return getattr(importlib.import_module(module), attr)
+    except Exception:
+        return None
+
+
+def include(app, router: Any, **kwargs: Any) -> None:
+    """app.include_router() that also accepts LazyRouter placeholders."""
+    if router is None:
+        return
+    if isinstance(router, LazyRouter):
+        router.mount(app, **kwargs)
+    else:
+        app.include_router(router, **kwargs)
+
+
+def load_all() -> Dict[str, bool]:
+    return {name: lr.load() for name, lr in REGISTRY.items() if lr.app is not None}
+
+
+def preload_for_openapi(app) -> None:
+    """Load the app's lazy routers before its OpenAPI schema is built."""
+    build = app.openapi
+
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema is None:
+            for route in list(app.router.routes):
+                if isinstance(route, LazyRouter):
+                    route.load()
+        return build()
+
+    app.openapi = openapi
+
+
+def status() -> List[Dict[str, Any]]:
+    return [lr.info() for lr in REGISTRY.values()]
@@ -2,24 +2,70 @@
 from __future__ import annotations
 import asyncio
 import logging
+import threading
 from collections import deque
-from typing import Deque, Optional, AsyncIterator
+from itertools import islice
+from typing import Deque, Dict, Optional, AsyncIterator, Tuple
 
-# A small in-memory ring buffer for recent log lines
+# A small in-memory ring buffer for recent log lines.
+# Every append bumps a monotonic sequence number (and a per-level counter), so
+# readers can compute exact event rates and fetch deltas via since(seq)
+# without copying the whole buffer.
 class RingBuffer:
     def __init__(self, maxlen: int = 5000):
         self._buf: Deque[str] = deque(maxlen=maxlen)
-        self._lock = asyncio.Lock()
+        self._mutex = threading.Lock()
+        self._seq = 0
+        self._levels: Dict[str, int] = {}
 
-    async def append(self, line: str) -> None:
-        async with self._lock:
+    @property
+    def seq(self) -> int:
+        """Total number of lines ever appended (sequence of the newest line)."""
+        return self._seq
+
+    def level_counts(self) -> Dict[str, int]:
+        """Monotonic per-level append counters (e.g. {"INFO": 120, "ERROR": 3})."""
+        with self._mutex:
+            return dict(self._levels)
+
+    def append_nowait(self, line: str, level: Optional[str] = None) -> int:
+        """Append from any thread; returns the new sequence number."""
+        with self._mutex:
             self._buf.append(line)
+            self._seq += 1
+            if level:
+                self._levels[level] = self._levels.get(level, 0) + 1
+            return self._seq
+
+    async def append(self, line: str, level: Optional[str] = None) -> None:
+        self.append_nowait(line, level)
+
+    def since(self, seq: int, limit: Optional[int] = None) -> Tuple[list[str], int, int]:
+        """Lines appended after ``seq``.
+
+        Returns (lines, next_seq, dropped) where ``dropped`` counts lines that
+        were already evicted from the ring. Walks only the pending (newest)
+        lines and copies only the returned ones.
+        """
+        with self._mutex:
+            cur = self._seq
+            pending = max(0, cur - max(0, int(seq)))
+            avail = min(pending, len(self._buf))
+            dropped = pending - avail
+            take = avail if limit is None else min(avail, max(0, int(limit)))
+            # Walk from the newest end so we never touch older entries; with a
+            # limit the oldest `take` pending lines are returned, so skip the
+            # `avail - take` newest ones without copying them
+            lines = list(islice(reversed(self._buf), avail - take, avail))
+            lines.reverse()
+            return lines, cur - avail + take, dropped
 
     async def snapshot(self, n: int = 1000) -> list[str]:
-        async with self._lock:
+        with self._mutex:
             if n <= 0 or n >= len(self._buf):
                 return list(self._buf)
-            return list(self._buf)[-n:]
+            lines = list(islice(reversed(self._buf), n))
+        return lines[::-1]
 
 # Global ring buffer and broadcaster queue
 RING = RingBuffer(maxlen=8000)
@@ -34,23 +80,18 @@ class AsyncLogHandler(logging.Handler):
     def emit(self, record: logging.LogRecord) -> None:
         try:
             line = self.format(record)
-            # Non-async context here; use create_task to not block
+            RING.append_nowait(line, record.levelname)
+            # Non-async context here; never block
             try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(RING.append(line))
+                asyncio.get_running_loop()
                 # Try non-blocking put; if it fails, drop line to avoid backpressure
                 try:
                     self.queue.put_nowait(line)
                 except asyncio.QueueFull:
                     pass
             except RuntimeError:
-                # No running loop; best-effort append only
-                try:
-                    import threading
-                    # Fallback buffer append without lock if no loop
-                    RING._buf.append(line)  # type: ignore[attr-defined]
-                except Exception:
-                    pass
+                # No running loop; ring buffer append only
+                pass
         except Exception:
             # Never raise from emit
             pass
@@ -77,4 +118,25 @@ class LogBroadcaster:
             line = await self.queue.get()
             yield line
 
+    async def follow(self, seq: Optional[int] = None, poll_sec: float = 0.25) -> AsyncIterator[Tuple[int, str]]:
+        """Yield (seq, line) pairs from the ring buffer after ``seq``.
+
+        Unlike stream(), every follower keeps its own cursor, so concurrent
+        viewers each see all lines and can resume from a known sequence.
+        A cursor ahead of the buffer (from before a server restart) restarts
+        from the oldest buffered line.
+        """
+        cursor = RING.seq if seq is None else int(seq)
+        if cursor > RING.seq:
+            cursor = 0
+        while True:
+            lines, nxt, _dropped = RING.since(cursor, limit=500)
+            if not lines:
+                await asyncio.sleep(poll_sec)
+                continue
+            first = nxt - len(lines) + 1
+            for i, line in enumerate(lines):
+                yield first + i, line
+            cursor = nxt
+
 BROADCASTER = LogBroadcaster()
@@ -2,9 +2,14 @@ from __future__ import annotations
 import logging
 logger = logging.getLogger(__name__)
 # memory_store.py – einfache Wissensblöcke + Index + semantische (Keyword) Suche
-import os, json, time, math, re, random, string, hashlib, sqlite3
+import os, json, time, math, re, random, string, hashlib, sqlite3, threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Any
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
 
 ROOT = Path(__file__).resolve().parent.parent
 MEM_DIR = ROOT / "memory" / "long_term" / "blocks"
@@ -14,6 +19,7 @@ INV_PATH = ROOT / "memory" / "index" / "inverted.json"       # inverted (token -
 TOPIC_IDX_PATH = ROOT / "memory" / "index" / "topics.json"     # topic_path -> [ids]
 VEC_PATH = IDX_DIR / "vector" / "index.json"          # vectors (id -> token:weight)
 META_PATH = IDX_DIR / "vector" / "meta.json"          # meta (id -> title,tags,ts,url)
+URL_IDX_PATH = IDX_DIR / "vector" / "urls.json"       # url -> [[id, tags], ...] (derived from meta)
 RATINGS_PATH = IDX_DIR / "ratings.json"               # ratings (id -> {avg,count,log:[...]})
 EMB_DIR  = IDX_DIR / "emb"
 EMB_INDEX = EMB_DIR / "index.npy"
@@ -25,6 +31,14 @@ der die das ein eine einer einem einen den und oder aber nicht ist sind war ware
 
 TOKEN_RE = re.compile(r"[a-zA-ZäöüÄÖÜß0-9]{2,}")
 
+# Parsed URL index, keyed by the (urls.json, meta.json) mtimes it was read at
+_URL_CACHE: Dict[str, Any] = {"key": None, "urls": {}}
+
+# Index read-modify-write guard: RLock for threads, flock on IDX_DIR/.write.lock
+# for other processes (media workers, crawler); see _index_lock()
+_INDEX_RLOCK = threading.RLock()
+_INDEX_DEPTH = 0
+
 def ensure_dirs():
     (IDX_DIR / "vector").mkdir(parents=True, exist_ok=True)
     MEM_DIR.mkdir(parents=True, exist_ok=True)
@@ -45,8 +59,37 @@ def _read_json(p: Path) -> dict:
         return {}
 
 def _write_json(p: Path, data: dict) -> None:
+    """Write via temp file + os.replace: readers never see a half-written index."""
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, p)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+@contextmanager
+def _index_lock() -> Iterator[None]:
+    """Serialize index updates across threads and processes (reentrant)."""
+    global _INDEX_DEPTH
+    with _INDEX_RLOCK:
+        if _INDEX_DEPTH or fcntl is None:
+            _INDEX_DEPTH += 1
+            try:
+                yield
+            finally:
+                _INDEX_DEPTH -= 1
+            return
+        IDX_DIR.mkdir(parents=True, exist_ok=True)
+        with open(IDX_DIR / ".write.lock", "a+b") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            _INDEX_DEPTH += 1
+            try:
+                yield
+            finally:
+                _INDEX_DEPTH -= 1
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
 
 def _canonical_for_hash(data: Dict[str, Any]) -> Dict[str, Any]:
     """Return a canonical dict for hashing: exclude transient hash fields."""
@@ -126,12 +169,13 @@ def increment_use(block_id: str) -> None:
 def index_topic(topic_path: str, block_id: str) -> None:
     try:
         ensure_dirs()
-        idx = _read_json(TOPIC_IDX_PATH)
-        lst = list(idx.get(topic_path, []))
-        if block_id not in lst:
-            lst.append(block_id)
-        idx[topic_path] = lst[-50:]
-        _write_json(TOPIC_IDX_PATH, idx)
+        with _index_lock():
+            idx = _read_json(TOPIC_IDX_PATH)
+            lst = list(idx.get(topic_path, []))
+            if block_id not in lst:
+                lst.append(block_id)
+            idx[topic_path] = lst[-50:]
+            _write_json(TOPIC_IDX_PATH, idx)
     except Exception:
         return
 
@@ -201,7 +245,26 @@ def add_block(title: str, content: str, tags: Optional[List[str]] = None, url: O
         pass
     return bid
 
+def block_generation(ids: Iterable[str]) -> str:
+    """Token that changes when any of the given blocks is rewritten or removed.
+
+    Caches derived from specific blocks (the chat answer cache) stay valid
+    while unrelated blocks are added.
+    """
+    parts = []
+    for bid in ids:
+        try:
+            parts.append(f"{bid}:{(MEM_DIR / f'{bid}.json').stat().st_mtime_ns}")
+        except OSError:
+            parts.append(f"{bid}:-")
+    return "|".join(parts)
+
 def _update_indexes(bid: str, data: dict) -> None:
+    # OCR and Whisper workers add blocks from separate processes
+    with _index_lock():
+        _update_indexes_locked(bid, data)
+
+def _update_indexes_locked(bid: str, data: dict) -> None:
     # inverted
     inv = _read_json(INV_PATH)
     toks = set(_tok(data.get("title","") + " " + data.get("content","") + " " + " ".join(data.get("tags",[]))))
@@ -220,10 +283,74 @@ def _update_indexes(bid: str, data: dict) -> None:
         "url": data.get("url","")
     }
     _write_json(META_PATH, meta)
+    _write_url_index(meta)
 
     # vector (TF-IDF light)
     _rebuild_vectors()
 
+def _urls_from_meta(meta: dict) -> Dict[str, List[list]]:
+    urls: Dict[str, List[list]] = {}
+    for bid, info in meta.items():
+        url = str((info or {}).get("url") or "")
+        if url:
+            urls.setdefault(url, []).append([bid, list(info.get("tags") or [])])
+    return urls
+
+def _write_url_index(meta: dict, meta_mt: Optional[int] = None) -> Dict[str, List[list]]:
+    """Write urls.json for `meta`; `meta_mt` is the meta.json mtime seen before reading it."""
+    urls = _urls_from_meta(meta)
+    if meta_mt is None:
+        try:
+            meta_mt = META_PATH.stat().st_mtime_ns
+        except OSError:
+            meta_mt = 0
+    # Remember which meta.json it was derived from: if meta is rewritten by a
+    # path that does not maintain this index, readers rebuild it once.
+    _write_json(URL_IDX_PATH, {"meta_mtime": meta_mt, "urls": urls})
+    return urls
+
+def _url_index() -> Dict[str, List[list]]:
+    try:
+        meta_mt = META_PATH.stat().st_mtime_ns
+    except OSError:
+        return {}
+    try:
+        url_mt = URL_IDX_PATH.stat().st_mtime_ns
+    except OSError:
+        url_mt = None
+    key = (url_mt, meta_mt)
+    if url_mt is not None and _URL_CACHE["key"] == key:
+        return _URL_CACHE["urls"]
+    data = _read_json(URL_IDX_PATH) if url_mt is not None else {}
+    urls = data.get("urls") if data.get("meta_mtime") == meta_mt else None
+    if not isinstance(urls, dict):
+        with _index_lock():
+            urls, key = _rebuild_url_index()
+    _URL_CACHE["key"], _URL_CACHE["urls"] = key, urls
+    return urls
+
+def _rebuild_url_index() -> Tuple[Dict[str, List[list]], Optional[tuple]]:
+    # Under _index_lock(): another process may have rebuilt it meanwhile
+    try:
+        meta_mt = META_PATH.stat().st_mtime_ns
+    except OSError:
+        return {}, None
+    data = _read_json(URL_IDX_PATH)
+    urls = data.get("urls") if data.get("meta_mtime") == meta_mt else None
+    if not isinstance(urls, dict):
+        # Stamped with the mtime seen before the read: a meta.json rewritten
+        # after it (by a writer outside the lock) still triggers a rebuild
+        urls = _write_url_index(_read_json(META_PATH), meta_mt)
+    try:
+        return urls, (URL_IDX_PATH.stat().st_mtime_ns, meta_mt)
+    except OSError:
+        return urls, None
+
+def find_blocks_by_url(url: str, tag: Optional[str] = None) -> List[str]:
+    """Block ids stored for `url` (optionally only those tagged `tag`), via the URL index."""
+    hits = _url_index().get(str(url or ""), [])
+    return [bid for bid, tags in hits if tag is None or tag in (tags or [])]
+
 def _rebuild_vectors():
     inv = _read_json(INV_PATH)   # token -> [ids]
     meta = _read_json(META_PATH) # id -> meta
@@ -265,17 +392,24 @@ def _rebuild_vectors():
 # Semantic embeddings (optional)
 # -----------------------
 def _embed_available() -> bool:
+    # find_spec only: importing sentence_transformers pulls in torch (seconds)
     try:
-        import numpy  # noqa: F401
-        from sentence_transformers import SentenceTransformer  # type: ignore
-        return True
+        import importlib.util
+        return all(importlib.util.find_spec(m) is not None for m in ("numpy", "sentence_transformers"))
     except Exception:
         return False
 
+_EMBED_MODEL: Any = None
+
+
 def _load_embed_model():
-    from sentence_transformers import SentenceTransformer  # type: ignore
-    model_name = os.getenv('KI_EMB_MODEL', 'sentence-transformers/paraphrase-MiniLM-L6-v2')
-    return SentenceTransformer(model_name)
+    # Imported and loaded on first use, then kept for the process lifetime
+    global _EMBED_MODEL
+    if _EMBED_MODEL is None:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+        model_name = os.getenv('KI_EMB_MODEL', 'sentence-transformers/paraphrase-MiniLM-L6-v2')
+        _EMBED_MODEL = SentenceTransformer(model_name)
+    return _EMBED_MODEL
 
 def build_embeddings_index(limit: Optional[int] = None) -> bool:
     """Builds an embedding index for memory blocks if sentence_transformers is available.
@@ -399,25 +533,26 @@ def rate_block(bid: str, score: float, *, proof_url: Optional[str] = None, revie
     meta = _read_json(META_PATH)
     if bid not in meta:
         raise KeyError("unknown block id")
-    ratings = _read_json(RATINGS_PATH)
-    rec = ratings.get(bid) or {"avg": 0.0, "count": 0, "log": []}
-    entry = {
-        "ts": int(time.time()),
-        "score": float(score),
-        "proof_url": proof_url or "",
-        "reviewer": reviewer or "",
-        "comment": comment or "",
-    }
-    rec["log"].append(entry)
-    # update avg
-    n = int(rec.get("count", 0)) + 1
-    old_sum = float(rec.get("avg", 0.0)) * float(rec.get("count", 0))
-    new_avg = (old_sum + float(score)) / n
-    rec["count"] = n
-    rec["avg"] = round(new_avg, 4)
-    ratings[bid] = rec
-    _write_json(RATINGS_PATH, ratings)
-    return {"id": bid, **rec}
+    with _index_lock():
+        ratings = _read_json(RATINGS_PATH)
+        rec = ratings.get(bid) or {"avg": 0.0, "count": 0, "log": []}
+        entry = {
+            "ts": int(time.time()),
+            "score": float(score),
+            "proof_url": proof_url or "",
+            "reviewer": reviewer or "",
+            "comment": comment or "",
+        }
+        rec["log"].append(entry)
+        # update avg
+        n = int(rec.get("count", 0)) + 1
+        old_sum = float(rec.get("avg", 0.0)) * float(rec.get("count", 0))
+        new_avg = (old_sum + float(score)) / n
+        rec["count"] = n
+        rec["avg"] = round(new_avg, 4)
+        ratings[bid] = rec
+        _write_json(RATINGS_PATH, ratings)
+        return {"id": bid, **rec}
 
 def get_rating(bid: str) -> Optional[dict]:
     ratings = _read_json(RATINGS_PATH)
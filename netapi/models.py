@@ -1,6 +1,6 @@
 # models.py – SQLAlchemy Modelle
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint, ForeignKey, Index
 from .db import Base
 from sqlalchemy.orm import relationship
 from sqlalchemy import Boolean
@@ -71,6 +71,8 @@ class PlanStep(Base):
     updated_at = Column(Integer, default=0)
     started_at = Column(Integer, default=0)
     finished_at = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)      # leases so far (server-side retries)
+    not_before = Column(Integer, default=0)    # delayed (retry backoff) until this ts
 
 # Admin Audit Log
 class AdminAudit(Base):
@@ -124,6 +126,12 @@ class Job(Base):
     error = Column(Text, default="")
     created_at = Column(Integer, default=0)
     updated_at = Column(Integer, default=0)
+    lease_token = Column(String(64), nullable=True)  # set per lease; done/fail must present it
+
+    __table_args__ = (
+        # Covers the lease query: WHERE type=? AND status=? ORDER BY priority DESC, id
+        Index("idx_jobs_lease", "type", "status", priority.desc(), "id"),
+    )
 
 # NEU: Password-/Email-Token
 class EmailToken(Base):
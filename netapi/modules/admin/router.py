@@ -243,3 +243,50 @@ def delete_user(user_id: int, user = Depends(get_current_user_required)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profiles")
+def list_profiles(limit: int = 20, name: str = "chat_once", trace_id: str = "", format: str = "json", since: float = 0.0, user = Depends(get_current_user_required)):
+    """Slowest profiled requests (see observability.profiling).
+
+    format=json returns span trees; format=folded returns collapsed stacks of
+    self time in microseconds (flamegraph.pl / speedscope input).
+    """
+    require_role(user, {"admin", "creator"})
+    from fastapi.responses import PlainTextResponse
+    from ..observability import profiling
+
+    if trace_id:
+        trace = profiling.get_trace(trace_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail="trace not found")
+        traces = [trace]
+    else:
+        limit = max(1, min(500, int(limit or 20)))
+        traces = profiling.slowest(limit, name=name or None, since=since or None)
+
+    if (format or "").lower() == "folded":
+        return PlainTextResponse(profiling.folded_stacks(traces), media_type="text/plain")
+    return {
+        "ok": True,
+        "sample_rate": profiling.config.sample_rate,
+        "count": len(traces),
+        "items": traces,
+    }
+
+
+@router.get("/startup")
+async def startup_profile(profile: bool = False, top: int = 20, user = Depends(get_current_user_required)):
+    """Lazy router states; profile=1 also runs an import-time profile of netapi.app
+    in a fresh interpreter (takes a few seconds, awaited off the event loop)."""
+    require_role(user, {"admin", "creator"})
+    import asyncio
+    from ... import lazy_routers
+
+    out: Dict[str, Any] = {"ok": True, "lazy_routers": lazy_routers.status()}
+    if profile:
+        from ... import startup_profile as sp
+        res = await asyncio.to_thread(sp.profile_import, "netapi.app", max(1, min(100, int(top or 20))))
+        res.pop("imported", None)
+        out["import_profile"] = res
+    return out
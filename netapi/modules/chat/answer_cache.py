@@ -0,0 +1,263 @@
+"""
+Answer Cache
+Caches final knowledge answers so repeated questions skip web enrichment and the LLM.
+
+Key: normalised question + persona + lang + answer mode. Only answers grounded
+in shared knowledge blocks are stored (never ones built from per-user state);
+each entry is bound to the ids and generation of the blocks it was built from
+(netapi.memory_store.block_generation), so rewriting one of them invalidates it.
+Near-identical phrasings are matched by vector similarity inside the same bucket:
+sentence embeddings when system/local_embeddings is enabled
+(KI_ANSWER_CACHE_EMBED=1), otherwise a token-weight vector like memory_store uses.
+
+Environment:
+  KI_ANSWER_CACHE           default: 1 (0 disables)
+  KI_ANSWER_CACHE_TTL       default: 21600 seconds
+  KI_ANSWER_CACHE_TTL_NEWS  default: 600 seconds (current/news questions)
+  KI_ANSWER_CACHE_MAX       default: 512 entries (LRU)
+  KI_ANSWER_CACHE_SIM       default: 0.9 similarity threshold
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-zäöüß0-9]{2,}")
+_STOP = set(
+    "der die das ein eine einer einem einen den und oder aber ist sind war wie was wer "
+    "mir mich du dir bitte mal kurz erkläre erklär über zum zur von im am an für "
+    "the a an is are what who how please tell me about of".split()
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    t = unicodedata.normalize("NFKC", str(text or "")).lower()
+    t = re.sub(r"[^\wäöüß\s]", " ", t)
+    return " ".join(t.split())
+
+
+def _token_vector(text: str) -> Dict[str, float]:
+    toks = [t for t in _TOKEN_RE.findall(normalize_question(text)) if t not in _STOP]
+    vec: Dict[str, float] = {}
+    for t in toks:
+        vec[t] = vec.get(t, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {k: v / norm for k, v in vec.items()}
+
+
+def _cosine(a: Any, b: Any) -> float:
+    if isinstance(a, dict) and isinstance(b, dict):
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(k, 0.0) for k, v in a.items())
+    try:
+        dot = sum(x * y for x, y in zip(a, b))
+        na = math.sqrt(sum(x * x for x in a)) or 1.0
+        nb = math.sqrt(sum(y * y for y in b)) or 1.0
+        return dot / (na * nb)
+    except Exception:
+        return 0.0
+
+
+def _default_embedder() -> Callable[[str], Any]:
+    if os.getenv("KI_ANSWER_CACHE_EMBED", "0") == "1":
+        try:
+            import sys
+            from pathlib import Path
+            sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "system"))
+            from local_embeddings import embed as _embed  # type: ignore
+            return lambda text: _embed(normalize_question(text))
+        except Exception:
+            pass
+    return _token_vector
+
+
+def _blocks_generation(ids: Sequence[str]) -> str:
+    try:
+        from netapi import memory_store as _mem
+        return _mem.block_generation(ids)
+    except Exception:
+        return "0"
+
+
+@dataclass
+class CachedAnswer:
+    reply: str
+    pipeline: str
+    created: float
+    expires: float
+    generation: str
+    sources: Tuple[str, ...] = ()
+    vector: Any = None
+    hits: int = 0
+
+
+class AnswerCache:
+    """Thread-safe LRU answer cache with TTL, source-block binding and fuzzy lookup."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        ttl_current: Optional[float] = None,
+        similarity: Optional[float] = None,
+        embedder: Optional[Callable[[str], Any]] = None,
+        generation_fn: Optional[Callable[[Sequence[str]], str]] = None,
+    ):
+        self.max_entries = int(max_entries or _env_float("KI_ANSWER_CACHE_MAX", 512))
+        self.ttl = float(ttl if ttl is not None else _env_float("KI_ANSWER_CACHE_TTL", 6 * 3600))
+        self.ttl_current = float(ttl_current if ttl_current is not None else _env_float("KI_ANSWER_CACHE_TTL_NEWS", 600))
+        self.similarity = float(similarity if similarity is not None else _env_float("KI_ANSWER_CACHE_SIM", 0.9))
+        self._embed = embedder or _default_embedder()
+        self._generation = generation_fn or _blocks_generation
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def bucket(persona: str, lang: str, mode: Iterable[Any] = ()) -> str:
+        return "|".join([str(persona or ""), str(lang or "")] + [str(m) for m in mode])
+
+    def _live(self, entry: CachedAnswer, now: float) -> bool:
+        return entry.expires > now and entry.generation == self._generation(entry.sources)
+
+    def get(self, question: str, *, persona: str, lang: str, mode: Iterable[Any] = ()) -> Optional[Tuple[str, str, str]]:
+        """Return (reply, pipeline, "exact"|"near") or None."""
+        norm = normalize_question(question)
+        if not norm:
+            return None
+        bucket = self.bucket(persona, lang, mode)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((bucket, norm))
+            if entry is not None:
+                if self._live(entry, now):
+                    self._entries.move_to_end((bucket, norm))
+                    entry.hits += 1
+                    self.stats["hits"] += 1
+                    return entry.reply, entry.pipeline, "exact"
+                self._entries.pop((bucket, norm), None)
+            candidates = [(k, e) for k, e in self._entries.items() if k[0] == bucket and e.expires > now]
+        if not candidates:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        try:
+            qvec = self._embed(question)
+        except Exception:
+            qvec = _token_vector(question)
+        best_key, best_entry, best_score = None, None, 0.0
+        for key, entry in candidates:
+            if entry.vector is None:
+                continue
+            score = _cosine(qvec, entry.vector)
+            if score > best_score:
+                best_key, best_entry, best_score = key, entry, score
+        # Source blocks are only checked for the winner (one stat per block)
+        if best_entry is not None and best_score >= self.similarity and not self._live(best_entry, now):
+            with self._lock:
+                self._entries.pop(best_key, None)
+            best_entry = None
+        with self._lock:
+            if best_entry is not None and best_score >= self.similarity and best_key in self._entries:
+                self._entries.move_to_end(best_key)
+                best_entry.hits += 1
+                self.stats["near_hits"] += 1
+                return best_entry.reply, best_entry.pipeline, "near"
+            self.stats["misses"] += 1
+        return None
+
+    def put(
+        self,
+        question: str,
+        reply: str,
+        *,
+        persona: str,
+        lang: str,
+        mode: Iterable[Any] = (),
+        pipeline: str = "",
+        current: bool = False,
+        sources: Iterable[str] = (),
+    ) -> None:
+        """Store `reply`; `sources` are the ids of the memory blocks it was built from."""
+        norm = normalize_question(question)
+        if not norm or not (reply or "").strip():
+            return
+        try:
+            vec = self._embed(question)
+        except Exception:
+            vec = _token_vector(question)
+        now = time.time()
+        ids = tuple(str(s) for s in sources)
+        entry = CachedAnswer(
+            reply=reply,
+            pipeline=pipeline,
+            created=now,
+            expires=now + (self.ttl_current if current else self.ttl),
+            generation=self._generation(ids),
+            sources=ids,
+            vector=vec,
+        )
+        key = (self.bucket(persona, lang, mode), norm)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats["stores"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "max": self.max_entries, **self.stats}
+
+
+_CACHE: Optional[AnswerCache] = None
+
+
+def enabled() -> bool:
+    return os.getenv("KI_ANSWER_CACHE", "1") not in {"0", "false", "False"}
+
+
+def get_answer_cache() -> AnswerCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = AnswerCache()
+    return _CACHE
+
+
+def is_current_question(question: str) -> bool:
+    """True for time-sensitive questions that get the short TTL."""
+    try:
+        from netapi.core.web_enricher import is_news_query
+        if is_news_query(question):
+            return True
+    except Exception:
+        pass
+    try:
+        from .current_detection import needs_current_info
+        return bool(needs_current_info(question)[0])
+    except Exception:
+        return False
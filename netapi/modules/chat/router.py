@@ -168,12 +168,65 @@ async def _answer_with_web_digest(
     db,
     risk_flag: bool,
 ):
-    web_ctx_digest = ""
+    # Answer cache: a hit skips web enrichment and the LLM entirely
+    cache_mode = (
+        _sanitize_style(body.style),
+        _sanitize_bullets(body.bullets),
+        _sanitize_logic(getattr(body, 'logic', 'balanced')),
+        _sanitize_format(getattr(body, 'format', 'plain')),
+    )
+    cache_hit = None
+    if _answer_cache.enabled():
+        try:
+            cache_hit = _answer_cache.get_answer_cache().get(
+                user_msg, persona=(body.persona or "friendly"), lang=(body.lang or "de-DE"), mode=cache_mode,
+            )
+        except Exception:
+            cache_hit = None
+    if cache_hit:
+        reply_llm, pipeline_label, cache_kind = cache_hit
+    else:
+        cache_kind = "miss"
+        web_blocks = []
+        try:
+            web_blocks = lookup_web_blocks(user_msg)
+        except Exception:
+            web_blocks = []
+        web_ctx_digest = blocks_to_prompt(web_blocks) if web_blocks else ""
+        pipeline_label = "web+llm" if web_ctx_digest else "llm"
+        source_ids = [str(b.get("id")) for b in web_blocks if b.get("id")]
+        reply_llm = await _answer_knowledge_uncached(user_msg, body, state, current, web_ctx_digest, pipeline_label, cache_mode, source_ids)
+    reply_llm = postprocess_and_style(reply_llm, persona, state, profile_used, style_prompt)
+    reply_llm = make_user_friendly_text(reply_llm, state)
+    conv_id_llm = None
+    try:
+        if current and current.get("id"):
+            uid = int(current["id"])  # type: ignore
+            conv = _ensure_conversation(db, uid, body.conv_id)
+            conv_id_llm = conv.id
+            _save_msg(db, conv.id, "user", user_msg)
+            _save_msg(db, conv.id, "ai", reply_llm)
+            asyncio.create_task(_retitle_if_needed(conv.id, user_msg, reply_llm, body.lang or "de-DE"))
+    except Exception:
+        conv_id_llm = None
+    conv_out_llm = conv_id_llm if conv_id_llm is not None else (body.conv_id or None)
     try:
-        web_ctx_digest = lookup_web_context(user_msg)
+        if state is not None:
+            state.last_pipeline = pipeline_label  # type: ignore[attr-defined]
     except Exception:
-        web_ctx_digest = ""
-    pipeline_label = "web+llm" if web_ctx_digest else "llm"
+        pass
+    return _finalize_reply(
+        reply_llm,
+        state=state, conv_id=conv_out_llm, intent="knowledge", topic=extract_topic(user_msg), pipeline=pipeline_label,
+        extras={"ok": True, "auto_modes": [], "role_used": "LLM", "memory_ids": [], "quick_replies": _quick_replies_for_topic(extract_topic(user_msg), user_msg), "topic": extract_topic(user_msg), "risk_flag": risk_flag, "style_used": style_used_meta, "style_prompt": style_prompt, "backend_log": {"pipeline": pipeline_label, "topic": extract_topic(user_msg), "answer_cache": cache_kind}}
+    )
+
+async def _answer_knowledge_uncached(user_msg: str, body, state, current, web_ctx_digest: str, pipeline_label: str, cache_mode: tuple, source_ids: Optional[List[str]] = None) -> str:
+    """Run reasoner/LLM for a knowledge question and store LLM answers in the answer cache.
+
+    Only answers grounded in the web digest blocks (`source_ids`) are cached; without
+    them the prompt carries the user's state (mood, recent topics) and is per-user.
+    """
     if pipeline_label == "web+llm":
         try:
             logger.info("knowledge_pipeline selected=web+llm topic=%s user=%s", extract_topic(user_msg), (int(current["id"]) if (current and current.get("id")) else None))
@@ -210,6 +263,17 @@ async def _answer_with_web_digest(
         except Exception:
             fallback_txt = ""
         reply_llm = clean(fallback_txt or "")
+    if reply_llm and str(reply_llm).strip() and web_ctx_digest and source_ids and _answer_cache.enabled():
+        try:
+            _answer_cache.get_answer_cache().put(
+                user_msg, reply_llm,
+                persona=(body.persona or "friendly"), lang=(body.lang or "de-DE"), mode=cache_mode,
+                pipeline=pipeline_label,
+                current=(_looks_like_current_query(user_msg) or _answer_cache.is_current_question(user_msg)),
+                sources=source_ids,
+            )
+        except Exception:
+            pass
     if not reply_llm or not str(reply_llm).strip():
         if web_ctx_digest:
             reply_llm = (
@@ -225,30 +289,7 @@ async def _answer_with_web_digest(
                 "Magst du präzisieren, ob es dir eher um Handel, Politik oder Sicherheit geht? "
                 "Dann versuche ich es erneut mit einer gezielten Web-Recherche."
             )
-    reply_llm = postprocess_and_style(reply_llm, persona, state, profile_used, style_prompt)
-    reply_llm = make_user_friendly_text(reply_llm, state)
-    conv_id_llm = None
-    try:
-        if current and current.get("id"):
-            uid = int(current["id"])  # type: ignore
-            conv = _ensure_conversation(db, uid, body.conv_id)
-            conv_id_llm = conv.id
-            _save_msg(db, conv.id, "user", user_msg)
-            _save_msg(db, conv.id, "ai", reply_llm)
-            asyncio.create_task(_retitle_if_needed(conv.id, user_msg, reply_llm, body.lang or "de-DE"))
-    except Exception:
-        conv_id_llm = None
-    conv_out_llm = conv_id_llm if conv_id_llm is not None else (body.conv_id or None)
-    try:
-        if state is not None:
-            state.last_pipeline = pipeline_label  # type: ignore[attr-defined]
-    except Exception:
-        pass
-    return _finalize_reply(
-        reply_llm,
-        state=state, conv_id=conv_out_llm, intent="knowledge", topic=extract_topic(user_msg), pipeline=pipeline_label,
-        extras={"ok": True, "auto_modes": [], "role_used": "LLM", "memory_ids": [], "quick_replies": _quick_replies_for_topic(extract_topic(user_msg), user_msg), "topic": extract_topic(user_msg), "risk_flag": risk_flag, "style_used": style_used_meta, "style_prompt": style_prompt, "backend_log": {"pipeline": pipeline_label, "topic": extract_topic(user_msg)}}
-    )
+    return reply_llm
 
 @router.get("")
 def chat_ping():
@@ -321,7 +362,7 @@ async def _chat_audit_startup():
 @router.get("/conv_state")
 async def get_conv_state(request: Request, conv_id: Optional[str] = None):
     try:
-        data = _load_conv_state()
+        data = await run_blocking(_load_conv_state, category="file")
         key = str(conv_id) if conv_id else session_id(request)
         rec = data.get(str(key)) or {}
         last_topic = rec.get("last_topic") or _LAST_TOPIC.get(key)
@@ -355,7 +396,7 @@ from zoneinfo import ZoneInfo
 from types import SimpleNamespace
 import asyncio
 from pathlib import Path
-import re, json, time, os, datetime
+import re, json, time, os, datetime, threading
 import logging
 from netapi.core.reasoner import call_llm, compose_reasoner_prompt
 from netapi.db import count_memory_per_day, top_sources, total_blocks
@@ -377,6 +418,7 @@ from netapi.core.knowledge_manager import (
 )
 from netapi.core.nlu import perceive, extract_topic_path
 from netapi.core.state import add_learning_item
+from . import answer_cache as _answer_cache
 from netapi.core.knowledge import process_user_teaching
 from netapi.core.nlu import detect_intent
 from netapi.core.expression import express_state_human
@@ -384,11 +426,18 @@ from netapi.core.reasoner import reason_about, is_low_confidence_answer  # type:
 from netapi.core.learner import decide_ask_or_search, build_childlike_question, record_user_teaching  # type: ignore
 from netapi.deps import get_current_user_opt
 from netapi.modules.timeflow.events import record_timeflow_event
+from netapi.modules.observability.metrics import timed_stage, timed_stream
+from netapi.modules.observability.profiling import profiled, traced
+from netapi.core.blocking_io import run_blocking
 try:
-    from netapi.modules.knowledge.lookup import lookup_web_context
+    from netapi.modules.knowledge.lookup import blocks_to_prompt, lookup_web_blocks, lookup_web_context
 except Exception:  # pragma: no cover
     def lookup_web_context(*args, **kwargs):  # type: ignore
         return ""
+    def lookup_web_blocks(*args, **kwargs):  # type: ignore
+        return []
+    def blocks_to_prompt(*args, **kwargs):  # type: ignore
+        return ""
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -618,6 +667,7 @@ def make_user_friendly_text(raw, state=None) -> str:
             return "Es gibt gerade ein technisches Ruckeln – magst du es noch einmal kurz versuchen?"
 
 # ---- Central finalizer for responses ----
+@traced()
 def _finalize_reply(
     raw_text,
     *,
@@ -943,6 +993,9 @@ _LAST_TOPIC: Dict[str, str] = {}
 # -------------------------
 _RUNTIME_SETTINGS_PATH = (Path(__file__).resolve().parents[3] / "runtime" / "settings.json").resolve()
 _CONV_STATE_PATH = (Path(__file__).resolve().parents[3] / "runtime" / "conv_state.json").resolve()
+# conv_state.json / addressbook.json are read-modify-written from I/O pool threads
+_CONV_STATE_LOCK = threading.RLock()
+_ADDRBOOK_LOCK = threading.Lock()
 
 def _read_runtime_settings() -> dict:
     try:
@@ -1046,7 +1099,6 @@ def _inc_safety_valve(topic: str, request: Optional[Request] = None) -> None:
             pass
         # Persist last safety-valve topic in conv_state.json
         try:
-            cs = _load_conv_state()
             sid = None
             try:
                 if request is not None:
@@ -1054,11 +1106,13 @@ def _inc_safety_valve(topic: str, request: Optional[Request] = None) -> None:
             except Exception:
                 sid = None
             key = sid or "_global"
-            rec = cs.get(key) or {}
-            rec["last_safety_valve_topic"] = (topic or "").strip()
-            rec["ts"] = int(time.time())
-            cs[key] = rec
-            _save_conv_state(cs)
+            with _CONV_STATE_LOCK:
+                cs = _load_conv_state()
+                rec = cs.get(key) or {}
+                rec["last_safety_valve_topic"] = (topic or "").strip()
+                rec["ts"] = int(time.time())
+                cs[key] = rec
+                _save_conv_state(cs)
         except Exception:
             pass
         # Optional: write a knowledge event
@@ -1127,7 +1181,9 @@ def _load_conv_state() -> dict:
 def _save_conv_state(data: dict) -> None:
     try:
         _CONV_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        _CONV_STATE_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp = _CONV_STATE_PATH.with_name(f"{_CONV_STATE_PATH.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, _CONV_STATE_PATH)
     except Exception:
         pass
 
@@ -1135,9 +1191,10 @@ def persist_last_topic(key: str, topic: str) -> None:
     try:
         if not key or not topic:
             return
-        data = _load_conv_state()
-        data[str(key)] = {"last_topic": topic, "ts": int(time.time())}
-        _save_conv_state(data)
+        with _CONV_STATE_LOCK:
+            data = _load_conv_state()
+            data[str(key)] = {"last_topic": topic, "ts": int(time.time())}
+            _save_conv_state(data)
     except Exception:
         pass
 
@@ -1276,6 +1333,7 @@ except Exception:
     recall_mem = lambda q, top_k=3: []  # type: ignore
     store_mem = lambda *a, **k: None    # type: ignore
     add_open_question = lambda *a, **k: None  # type: ignore
+recall_mem = timed_stage("retrieval")(traced("recall_mem")(recall_mem))
 
 # ---- Style analysis & application (soft imports) ----------------------------
 try:
@@ -1583,6 +1641,7 @@ def _finalize_payload(answer: str, memory_ids: Optional[List[str]] = None, web_l
     }
 
 # -------- Safety valve for planner branch ------------------------------------
+@traced()
 async def _safety_valve_answer(message: str, *, web_ok: bool, bullets: int, lang: str) -> tuple[str, List[dict], str, str]:
     """Try to produce a quick, real answer without the planner.
     Strategy:
@@ -1966,6 +2025,10 @@ def upsert_addressbook(topic: str, *, block_file: str = "", url: str = "") -> No
     Legacy schema (compat): {"<topic>": {block_file, url, updated_at}}
     This writer will upgrade legacy data in-place to the new schema while preserving info.
     """
+    with _ADDRBOOK_LOCK:
+        _upsert_addressbook(topic, block_file=block_file, url=url)
+
+def _upsert_addressbook(topic: str, *, block_file: str = "", url: str = "") -> None:
     try:
         data: Any = {"blocks": []}
         if ADDRBOOK_PATH.exists():
@@ -2151,6 +2214,8 @@ def strip_meta_all(text: str, persona) -> str:
         pass
     return t.strip()
 
+@timed_stage("postprocess")
+@traced()
 def postprocess_and_style(text: str, persona, state, profile_used, style_prompt: Optional[str]) -> str:
     # Never let cleaning fully erase content; prefer original text if cleaning yields empty
     if not text:
@@ -2303,6 +2368,7 @@ def _text_has_sources_section(text: str) -> bool:
     except Exception:
         return False
 
+@traced()
 def retrieve_context_for_prompt(user_message: str) -> Dict[str, Any]:
     """Return snippet and block IDs from long-term memory to enrich LLM prompts.
     Uses the lightweight inverted index in system/knowledge_access.py.
@@ -2362,6 +2428,7 @@ try:
 except Exception:
     _PLN_DELIB = None  # type: ignore
 
+@traced()
 async def deliberate_pipeline(user_msg: str, *, persona: str, lang: str, style: str, bullets: int, logic: str, fmt: str, retrieval_snippet: str = "", retrieval_ids: Optional[List[str]] = None) -> Tuple[str, List[dict], str, str]:
     if _PLN_DELIB is not None:
         try:
@@ -2630,20 +2697,25 @@ async def execute_choice(choice: str, topic: str, user: str, persona: str, lang:
 # -------------------------------------------------
 # Brain/LLM Aufrufe (weich)
 # -------------------------------------------------
+@timed_stage("llm_total")
+@traced()
 async def call_llm_once(user: str, system: str, lang: str = "de-DE", persona: str = "friendly") -> str:
+    # respond_to() is synchronous (memory lookup + LLM round-trip); run it off
+    # the event loop so one generation does not stall concurrent streams.
     try:
         if _has_brain_sync():
             from ..brain import respond_to  # type: ignore
-            return respond_to(user, system=system, lang=lang, persona=persona)
+            return await asyncio.to_thread(respond_to, user, system=system, lang=lang, persona=persona)
     except Exception:
         pass
     try:
         from ...core.dialog import respond_to  # type: ignore
-        return respond_to(user, system=system, lang=lang, persona=persona)
+        return await asyncio.to_thread(respond_to, user, system=system, lang=lang, persona=persona)
     except Exception:
         pass
     return _fallback_reply(user)
 
+@timed_stream("llm_first_token", "llm_total")
 async def stream_llm(user: str, system: str, lang: str = "de-DE", persona: str = "friendly") -> AsyncGenerator[str, None]:
     """Unified LLM streaming with diagnostics and safe fallbacks.
 
@@ -2748,7 +2820,8 @@ async def stream_llm(user: str, system: str, lang: str = "de-DE", persona: str =
         logger.info("stream_llm: using one-shot fallback call_llm_once")
     except Exception:
         pass
-    yield await call_llm_once(user, system, lang, persona)
+    # Unwrapped: the stream itself is already timed as llm_total
+    yield await call_llm_once.__wrapped__(user, system, lang, persona)
 
 # -------------------------------------------------
 # Simple LLM path (robust fallback without planner)
@@ -2838,6 +2911,8 @@ def _fallback_reply(user: str) -> str:
 # Web-Antwort / Suche
 # -------------------------------------------------
 
+@timed_stage("web_enrichment")
+@traced()
 def try_web_answer(q: str, limit: int = 5) -> Tuple[Optional[str], List[dict]]:
     """Portable Web-Antwort basierend auf web_qa.web_search_and_summarize.
 
@@ -2875,6 +2950,8 @@ def try_web_answer(q: str, limit: int = 5) -> Tuple[Optional[str], List[dict]]:
     except Exception:
         return None, []
 
+@timed_stage("web_enrichment")
+@traced()
 def _force_web_answer(q: str, limit: int = 3) -> Tuple[Optional[str], List[dict]]:
     """Minimaler Web‑Fallback, auch wenn globales Netz deaktiviert ist.
     Nutzt Wikipedia OpenSearch + Seitenabruf und baut eine kurze Antwort.
@@ -3425,6 +3502,7 @@ def handle_special_cases(intent: str, user_msg: str, lang: str, state, persona):
     return None
 
 @router.post("")
+@profiled("chat_once")
 async def chat_once(body: dict, request: Request, db=Depends(get_db), current=Depends(get_current_user_opt)):
     # Coerce dict payload into an attribute-access object with sane defaults
     try:
@@ -3530,7 +3608,7 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
     try:
         if _is_risky_prompt(user_msg):
             risk_flag = True
-            _audit_risky_prompt(current, sid, user_msg)
+            await run_blocking(_audit_risky_prompt, current, sid, user_msg, category="memory")
     except Exception:
         risk_flag = False
     m = CMD_RX.match(user_msg)
@@ -5161,9 +5239,9 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
             try:
                 if autonomy >= 1 and srcs_pl:
                     learned_text = out_text
-                    save_memory(title=(extract_topic(user_msg) or user_msg)[:120], content=learned_text, tags=["web","learned"], url=(srcs_pl[0].get('url') if srcs_pl else None))
+                    await run_blocking(save_memory, title=(extract_topic(user_msg) or user_msg)[:120], content=learned_text, tags=["web","learned"], url=(srcs_pl[0].get('url') if srcs_pl else None), category="memory")
                 elif autonomy >= 2 and out_text and len(out_text)>160 and not srcs_pl:
-                    save_memory(title=(extract_topic(user_msg) or user_msg)[:120], content=out_text, tags=["learned"], url=None)
+                    await run_blocking(save_memory, title=(extract_topic(user_msg) or user_msg)[:120], content=out_text, tags=["learned"], url=None, category="memory")
             except Exception:
                 pass
             # Prepare backend-only log; do not expose plan/kritik in UI
@@ -5191,9 +5269,9 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
                     _LAST_TOPIC[sid] = t_det
                     # Persist for this conversation if known
                     if conv_id:
-                        persist_last_topic(str(conv_id), t_det)
+                        await run_blocking(persist_last_topic, str(conv_id), t_det, category="file")
                     else:
-                        persist_last_topic(sid, t_det)
+                        await run_blocking(persist_last_topic, sid, t_det, category="file")
             except Exception:
                 pass
             # Append retrieval notice if we used long‑term blocks
@@ -5356,9 +5434,9 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
                 _LAST_TOPIC[sid] = t_det
                 # Persist for this conversation if known
                 if conv_id:
-                    persist_last_topic(str(conv_id), t_det)
+                    await run_blocking(persist_last_topic, str(conv_id), t_det, category="file")
                 else:
-                    persist_last_topic(sid, t_det)
+                    await run_blocking(persist_last_topic, sid, t_det, category="file")
         except Exception:
             pass
         # Append retrieval notice if we used long‑term blocks
@@ -5588,7 +5666,7 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
                 if src_block:
                     reply += "\n\n" + src_block
                 learned_text = ans2.strip(); learned_url = sources2[0].get("url") if (sources2 and sources2[0].get("url")) else None
-                block_info = save_memory(title=(topic or user_msg)[:120], content=learned_text, tags=["web","learned"], url=learned_url)
+                block_info = await run_blocking(save_memory, title=(topic or user_msg)[:120], content=learned_text, tags=["web","learned"], url=learned_url, category="memory")
             else:
                 reply += "\n\nLeider habe ich dazu aktuell keine verlässlichen Quellen gefunden."
         else:
@@ -5619,7 +5697,7 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
                 if src_block:
                     reply = (reply + "\n\n" + src_block).strip()
                 learned_text = ans.strip(); learned_url = sources[0].get("url") if (sources and sources[0].get("url")) else None
-                block_info = save_memory(title=(topic or user_msg)[:120], content=learned_text, tags=["web","learned"], url=learned_url)
+                block_info = await run_blocking(save_memory, title=(topic or user_msg)[:120], content=learned_text, tags=["web","learned"], url=learned_url, category="memory")
 
         # Gewünschter Stil: zuerst Kurzfassung, dann offene Nachfrage
         if fmt_mode == 'structured' or logic_mode == 'strict':
@@ -5753,11 +5831,13 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
             reply = (reply + "\n\n" + format_sources(sources, limit=2)).strip()
         learned_text = ans.strip()
         learned_url  = sources[0].get("url") if (sources and sources[0].get("url")) else None
-        block_info = save_memory(
+        block_info = await run_blocking(
+            save_memory,
             title=(topic or user_msg)[:120],
             content=learned_text,
             tags=["web", "learned"],
             url=learned_url,
+            category="memory",
         )
     else:
         if mem_hits and (not structured):
@@ -5766,16 +5846,18 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
         # Nur auto-learn, wenn keine Memory‑Notizen angehängt wurden und kein Gruß
         if reply and len(reply) > 120 and "Quellen:" not in reply and not mem_hits and not _GREETING.search(user_msg.lower()):
             learned_text = reply
-            block_info = save_memory(
+            block_info = await run_blocking(
+                save_memory,
                 title=(topic or user_msg)[:120],
                 content=learned_text,
                 tags=["learned"],
                 url=None,
+                category="memory",
             )
 
     # Addressbook updaten + Enrichment
     if topic and (block_info.get("file") or learned_url):
-        upsert_addressbook(topic, block_file=block_info.get("file", ""), url=learned_url or "")
+        await run_blocking(upsert_addressbook, topic, block_file=block_info.get("file", ""), url=learned_url or "", category="file")
         enqueue_enrichment(topic)
 
     # Gegenbeweis: alternative/konträre Quellen ergänzen
@@ -5829,7 +5911,9 @@ async def chat_once(body: dict, request: Request, db=Depends(get_db), current=De
                 ev_text = (ans2 or "").strip()
                 if src_block:
                     ev_text = (ev_text + "\n\n" + src_block).strip()
-                save_memory(
+                await run_blocking(
+                    save_memory,
+                    category="memory",
                     title=((topic or user_msg)[:96] + " – Faktencheck"),
                     content=(ev_text or reply[:800]),
                     tags=["evidence", "factcheck", f"evid:{h}"],
@@ -6205,7 +6289,9 @@ async def chat_stream(message: str, request: Request, persona: str = "friendly",
                     saved_ids: List[str] = []
                     try:
                         if int(autonomy or 0) >= 2 and out:
-                            blk = save_memory(
+                            blk = await run_blocking(
+                                save_memory,
+                                category="memory",
                                 title=str(ctx_topic)[:120],
                                 content=out,
                                 tags=["comparison", "learned"],
@@ -6222,8 +6308,10 @@ async def chat_stream(message: str, request: Request, persona: str = "friendly",
                                 pass
 
                             try:
-                                upsert_addressbook(
+                                await run_blocking(
+                                    upsert_addressbook,
                                     ctx_topic or "",
+                                    category="file",
                                     block_file=str((blk or {}).get("file") or ""),
                                     url=(cmp_sources[0].get("url") if cmp_sources else ""),
                                 )
@@ -6479,6 +6567,7 @@ def _kb_snippets(topic: str, top_k: int = 5) -> List[Dict[str, Any]]:
             })
     return out
 
+@traced()
 def _answer_from_web(topic: str, top_k: int = 3) -> (str, List[Dict[str, Any]]):
     try:
         ans, sources = try_web_answer(topic, limit=top_k)
@@ -6594,7 +6683,7 @@ def _origin_label(has_mem: bool, has_web: bool) -> str:
 async def answer_with_memory_check(topic: str, web_ok: bool = True, autonomy: int = 0):
     saved_ids: List[str] = []
     # Memory-first from SQLite
-    mem_snips = _fetch_memory_snippets(topic, limit=3)
+    mem_snips = await run_blocking(_fetch_memory_snippets, topic, limit=3, category="sqlite")
     mem_text = _summarize_memory(mem_snips, max_sentences=5)
     # Web assist
     web_text = ""; web_sources: List[dict] = []
@@ -6623,10 +6712,10 @@ async def answer_with_memory_check(topic: str, web_ok: bool = True, autonomy: in
         try:
             tagset = ["vision", "learned"] + (["web"] if has_web else ["memory"])
             url0 = (web_sources[0].get("url") if web_sources else None)
-            blk = save_memory(title=str(topic)[:120], content=ans_text, tags=tagset, url=url0)
+            blk = await run_blocking(save_memory, title=str(topic)[:120], content=ans_text, tags=tagset, url=url0, category="memory")
             _debug_save("auto_save_initial", blk or {})
             try:
-                upsert_addressbook(topic or "", block_file=str((blk or {}).get("file") or ""), url=(url0 or ""))
+                await run_blocking(upsert_addressbook, topic or "", block_file=str((blk or {}).get("file") or ""), url=(url0 or ""), category="file")
             except Exception:
                 pass
             try:
@@ -6947,11 +7036,11 @@ def compare_memory_with_web(topic: str, web_ok: bool = True):
             acc += out
             yield {"data": json.dumps({"delta": out})}
             if int(autonomy or 0) >= 1:
-                block_info = save_memory(
-                    title=(topic or user_msg)[:120], content=s, tags=["web","learned"], url=learned_url, chain_hint=bool(chain)
+                block_info = await run_blocking(
+                    save_memory, title=(topic or user_msg)[:120], content=s, tags=["web","learned"], url=learned_url, chain_hint=bool(chain), category="memory"
                 )
         if topic and (block_info.get("file") or learned_url):
-            upsert_addressbook(topic, block_file=block_info.get("file",""), url=learned_url or "")
+            await run_blocking(upsert_addressbook, topic, block_file=block_info.get("file",""), url=learned_url or "", category="file")
             enqueue_enrichment(topic)
 
         # Relevante Notizen, falls kein Web-Override
@@ -6965,11 +7054,11 @@ def compare_memory_with_web(topic: str, web_ok: bool = True):
         if (not need_web) and (not mem_hits) and acc and len(acc) > 120 and "Quellen:" not in acc and not _GREETING.search(user_msg.lower()) and int(autonomy or 0) >= 2:
             try:
                 learned_text = acc
-                block_info = save_memory(
-                    title=(topic or user_msg)[:120], content=learned_text, tags=["learned"], url=None, chain_hint=False
+                block_info = await run_blocking(
+                    save_memory, title=(topic or user_msg)[:120], content=learned_text, tags=["learned"], url=None, chain_hint=False, category="memory"
                 )
                 if topic and block_info.get("file"):
-                    upsert_addressbook(topic, block_file=block_info["file"])
+                    await run_blocking(upsert_addressbook, topic, block_file=block_info["file"], category="file")
                     enqueue_enrichment(topic)
             except Exception:
                 pass
@@ -7173,7 +7262,9 @@ async def post_feedback(body: FeedbackIn):
         raise HTTPException(400, "invalid feedback")
 
     # als Lern-Block ablegen
-    save_memory(
+    await run_blocking(
+        save_memory,
+        category="memory",
         title=f"Feedback:{msg[:50]}",
         content=f"Feedback: {status}\nMessage: {msg}",
         tags=["feedback"] + (["correction"] if status == "wrong" else [])
@@ -0,0 +1,201 @@
+"""
+Atomic job leasing shared by the jobs API and the local workers.
+
+lease_jobs() claims up to N jobs in a single statement, so two workers can
+never lease the same job:
+  - SQLite >= 3.35: UPDATE … WHERE id IN (SELECT … LIMIT n) RETURNING …
+  - Postgres:       SELECT … FOR UPDATE SKIP LOCKED inside an UPDATE … RETURNING
+  - otherwise:      select candidates, then a compare-and-set UPDATE per batch
+
+Candidates are selected as one UNION ALL branch per (type, live status), each
+an ordered range of idx_jobs_lease; SQLite merges the branches in index order,
+so a poll neither sorts nor touches done/failed history.
+
+Every lease gets a fresh token; complete_job()/fail_job() only apply while
+the caller still holds it (a holder whose lease expired and was re-leased
+gets False/None back instead of overwriting the new holder's result).
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+from ...db import ensure_job_lease_schema
+
+
+@dataclass
+class LeasedJob:
+    """Snapshot of a leased row; attribute names match netapi.models.Job."""
+    id: int
+    type: str
+    payload: str
+    attempts: int
+    priority: int
+    lease_until: int
+    lease_token: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "type": self.type, "payload": self.payload, "attempts": self.attempts,
+            "priority": self.priority, "lease_until": self.lease_until, "lease_token": self.lease_token,
+        }
+
+
+# queued jobs whose backoff elapsed, or leases that expired without done/fail
+_ELIGIBLE = (
+    "type IN :types AND ("
+    "(status = 'queued' AND lease_until <= :now) OR "
+    "(status = 'leased' AND lease_until < :now))"
+)
+_COLUMNS = "id, type, payload, attempts, priority, lease_until"
+# Per-status branch conditions for _candidates_sql()
+_LIVE = (("queued", "lease_until <= :now"), ("leased", "lease_until < :now"))
+
+_schema_ready: set = set()
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+def _dialect(db) -> str:
+    return str(db.get_bind().dialect.name)
+
+
+def _ensure_schema(db) -> None:
+    bind = db.get_bind()
+    key = id(bind)
+    if key not in _schema_ready:
+        ensure_job_lease_schema(bind)
+        _schema_ready.add(key)
+
+
+def _strategy(db) -> str:
+    name = _dialect(db)
+    if name == "sqlite" and sqlite3.sqlite_version_info >= (3, 35, 0):
+        return "returning"
+    if name == "postgresql":
+        return "skip_locked"
+    return "cas"
+
+
+def _candidates_sql(types: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """SELECT id, priority of eligible jobs, best first, LIMIT :n (needs :now, :n).
+
+    One branch per type and live status: each is an equality prefix of
+    idx_jobs_lease (type, status, priority DESC, id), and the compound
+    ORDER BY merges the already ordered branches instead of sorting.
+    """
+    params = {f"t{i}": t for i, t in enumerate(types)}
+    branches = [
+        f"SELECT id, priority FROM jobs WHERE type = :t{i} AND status = '{status}' AND {cond}"
+        for i in range(len(types)) for status, cond in _LIVE
+    ]
+    return " UNION ALL ".join(branches) + " ORDER BY priority DESC, id ASC LIMIT :n", params
+
+
+def lease_jobs(db, types: Iterable[str], *, n: int = 1, lease_seconds: int = 60, now: Optional[int] = None) -> List[LeasedJob]:
+    """Atomically lease up to n jobs of the given types (priority DESC, id ASC)."""
+    types = [str(t) for t in types if t]
+    if not types:
+        return []
+    _ensure_schema(db)
+    now = _now() if now is None else int(now)
+    token = uuid.uuid4().hex
+    params = {"types": types, "now": now, "until": now + int(lease_seconds), "token": token, "n": max(1, int(n))}
+    assign = "status = 'leased', lease_until = :until, lease_token = :token, updated_at = :now"
+    strategy = _strategy(db)
+
+    if strategy == "returning":
+        candidates, type_params = _candidates_sql(types)
+        sql = f"UPDATE jobs SET {assign} WHERE id IN (SELECT id FROM ({candidates})) RETURNING {_COLUMNS}"
+        rows = db.execute(text(sql), {**params, **type_params}).fetchall()
+    elif strategy == "skip_locked":
+        # FOR UPDATE cannot apply to a UNION; the status IN list keeps the
+        # (type, status) index prefix usable and skips done/failed rows
+        sql = (
+            f"WITH picked AS (SELECT id FROM jobs WHERE status IN ('queued', 'leased') AND {_ELIGIBLE} "
+            f"ORDER BY priority DESC, id ASC LIMIT :n FOR UPDATE SKIP LOCKED) "
+            f"UPDATE jobs SET {assign} FROM picked WHERE jobs.id = picked.id "
+            f"RETURNING jobs.id, jobs.type, jobs.payload, jobs.attempts, jobs.priority, jobs.lease_until"
+        )
+        rows = db.execute(text(sql).bindparams(bindparam("types", expanding=True)), params).fetchall()
+    else:
+        candidates, type_params = _candidates_sql(types)
+        ids = [r[0] for r in db.execute(text(candidates), {**params, **type_params}).fetchall()]
+        rows = []
+        if ids:
+            # Re-check eligibility in the UPDATE: rows taken meanwhile are skipped
+            db.execute(
+                text(f"UPDATE jobs SET {assign} WHERE id IN :ids AND {_ELIGIBLE}")
+                .bindparams(bindparam("types", expanding=True), bindparam("ids", expanding=True)),
+                {**params, "ids": ids},
+            )
+            rows = db.execute(text(f"SELECT {_COLUMNS} FROM jobs WHERE lease_token = :token"), {"token": token}).fetchall()
+    db.commit()
+
+    jobs = [
+        LeasedJob(id=int(r[0]), type=str(r[1]), payload=r[2] or "{}", attempts=int(r[3] or 0),
+                  priority=int(r[4] or 0), lease_until=int(r[5] or 0), lease_token=token)
+        for r in rows
+    ]
+    # RETURNING order is unspecified
+    jobs.sort(key=lambda j: (-j.priority, j.id))
+    return jobs
+
+
+def _token_clause(lease_token: Optional[str]) -> str:
+    return " AND status = 'leased' AND lease_token = :token" if lease_token else ""
+
+
+def complete_job(db, job_id: int, lease_token: Optional[str] = None) -> bool:
+    """Mark a job done. With a token, only while that lease is still held."""
+    _ensure_schema(db)
+    res = db.execute(
+        text("UPDATE jobs SET status = 'done', lease_until = 0, lease_token = NULL, error = '', updated_at = :now "
+             "WHERE id = :id" + _token_clause(lease_token)),
+        {"id": int(job_id), "token": lease_token, "now": _now()},
+    )
+    db.commit()
+    return bool(res.rowcount)
+
+
+def fail_job(db, job_id: int, error: str = "", *, lease_token: Optional[str] = None, max_attempts: int = 5, next_delay: int = 0) -> Optional[Dict[str, Any]]:
+    """Record a failed attempt: requeue with backoff or mark failed.
+
+    Returns {"status", "attempts"}, or None if the job is gone / the lease is stale.
+    """
+    _ensure_schema(db)
+    params: Dict[str, Any] = {"id": int(job_id), "token": lease_token}
+    row = db.execute(text("SELECT attempts FROM jobs WHERE id = :id" + _token_clause(lease_token)), params).fetchone()
+    # End the read transaction so the UPDATE below starts a fresh write
+    # (a SQLite read->write upgrade fails if another writer committed meanwhile)
+    db.rollback()
+    if row is None:
+        return None
+    old = int(row[0] or 0)
+    attempts = old + 1
+    now = _now()
+    if attempts >= int(max_attempts):
+        status, lease_until = "failed", 0
+    else:
+        status = "queued"
+        if next_delay <= 0:
+            next_delay = min(3600, 5 * (2 ** min(6, attempts)))
+        lease_until = now + int(next_delay)
+    # attempts = :old guards against a concurrent fail of the same lease
+    res = db.execute(
+        text("UPDATE jobs SET attempts = :attempts, error = :error, status = :status, lease_until = :lease_until, "
+             "lease_token = NULL, updated_at = :now WHERE id = :id AND COALESCE(attempts, 0) = :old" + _token_clause(lease_token)),
+        {**params, "attempts": attempts, "old": old, "error": (error or "")[:2000], "status": status,
+         "lease_until": lease_until, "now": now},
+    )
+    db.commit()
+    if not res.rowcount:
+        return None
+    return {"status": status, "attempts": attempts}
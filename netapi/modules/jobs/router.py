@@ -6,6 +6,7 @@ import time, json
 
 from ...deps import get_current_user_required, get_db
 from ...models import Job
+from .leasing import complete_job, fail_job, lease_jobs
 try:
     from ..admin.router import write_audit  # type: ignore
 except Exception:
@@ -98,21 +99,10 @@ def lease(body: LeaseIn, user = Depends(get_current_user_required), db: Session
     jtype = str(body.get("type") or "").strip()
     n = int(body.get("n") or 1)
     lease_seconds = int(body.get("lease_seconds") or 60)
-    now = _now()
-    # Select queued or expired leases, highest priority first, FIFO by id
-    jobs = (
-        db.query(Job)
-        .filter(Job.type == jtype, ((Job.status == "queued") | (Job.lease_until < now)))
-        .order_by(Job.priority.desc(), Job.id.asc())
-        .limit(max(1, n))
-        .all()
-    )
+    # Queued or expired leases, highest priority first, FIFO by id; claimed atomically
+    jobs = lease_jobs(db, [jtype], n=max(1, min(100, n)), lease_seconds=lease_seconds)
     out: List[Dict[str, Any]] = []
     for j in jobs:
-        j.status = "leased"
-        j.lease_until = now + lease_seconds
-        j.updated_at = now
-        db.add(j)
         out.append({
             "id": j.id,
             "type": j.type,
@@ -120,24 +110,26 @@ def lease(body: LeaseIn, user = Depends(get_current_user_required), db: Session
             "attempts": j.attempts,
             "lease_until": j.lease_until,
             "priority": j.priority,
+            "lease_token": j.lease_token,
         })
-    db.commit()
     return {"ok": True, "items": out}
 
 
+def _raise_missing_or_stale(db: Session, jid: int) -> None:
+    if db.query(Job.id).filter(Job.id == jid).first() is None:
+        raise HTTPException(404, "job not found")
+    raise HTTPException(409, "lease expired or held by another worker")
+
+
 @router.post("/done")
 def done(body: Dict[str, Any], user = Depends(get_current_user_required), db: Session = Depends(get_db)):
     _require_admin_or_worker(user)
     jid = int(body.get("id") or 0)
+    token = str(body.get("lease_token") or "") or None
     if not jid:
         raise HTTPException(400, "id required")
-    j = db.query(Job).filter(Job.id == jid).first()
-    if not j:
-        raise HTTPException(404, "job not found")
-    j.status = "done"
-    j.lease_until = 0
-    j.updated_at = _now()
-    db.add(j); db.commit()
+    if not complete_job(db, jid, token):
+        _raise_missing_or_stale(db, jid)
     return {"ok": True}
 
 
@@ -148,26 +140,14 @@ def fail(body: Dict[str, Any], user = Depends(get_current_user_required), db: Se
     err = str(body.get("error") or "")
     next_delay = int(body.get("next_delay") or 0)
     max_attempts = int(body.get("max_attempts") or 5)
+    token = str(body.get("lease_token") or "") or None
     if not jid:
         raise HTTPException(400, "id required")
-    j = db.query(Job).filter(Job.id == jid).first()
-    if not j:
-        raise HTTPException(404, "job not found")
-    j.attempts = int(j.attempts or 0) + 1
-    j.error = err[:2000]
-    now = _now()
-    if j.attempts >= max_attempts:
-        j.status = "failed"
-        j.lease_until = 0
-    else:
-        j.status = "queued"
-        # exponential-ish backoff if not provided
-        if next_delay <= 0:
-            next_delay = min(3600, 5 * (2 ** min(6, j.attempts)))
-        j.lease_until = now + next_delay
-    j.updated_at = now
-    db.add(j); db.commit()
-    return {"ok": True, "status": j.status, "attempts": j.attempts}
+    # exponential-ish backoff if next_delay is not provided
+    res = fail_job(db, jid, err, lease_token=token, max_attempts=max_attempts, next_delay=next_delay)
+    if res is None:
+        _raise_missing_or_stale(db, jid)
+    return {"ok": True, "status": res["status"], "attempts": res["attempts"]}
 
 
 @router.get("/status")
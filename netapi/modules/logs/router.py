@@ -1,8 +1,8 @@
 # netapi/modules/logs/router.py
 from __future__ import annotations
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import StreamingResponse, JSONResponse
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
 # SSE optional import
 try:
@@ -15,23 +15,46 @@ from ...logging_bridge import BROADCASTER, RING
 router = APIRouter(prefix="/api/logs", tags=["logs"]) 
 
 @router.get("")
-async def tail_logs(n: int = Query(500, ge=1, le=5000)):
-    """Return the last N log lines from the in-memory ring buffer."""
+async def tail_logs(
+    n: int = Query(500, ge=1, le=5000),
+    since: Optional[int] = Query(None, ge=0, description="Return only lines after this sequence number"),
+):
+    """Return the last N log lines (or the delta after ``since``) from the in-memory ring buffer."""
+    if since is not None:
+        lines, seq, dropped = RING.since(since, limit=n)
+        return {"ok": True, "lines": lines, "seq": seq, "dropped": dropped}
     lines = await RING.snapshot(n)
-    return {"ok": True, "lines": lines}
+    return {"ok": True, "lines": lines, "seq": RING.seq}
+
+@router.get("/stats")
+async def log_stats():
+    """Monotonic append sequence and per-level counters (cheap; no buffer copy)."""
+    return {"ok": True, "seq": RING.seq, "levels": RING.level_counts()}
 
 @router.get("/stream")
-async def stream_logs():
-    """Stream logs via SSE if sse_starlette is available; otherwise, fallback to chunked streaming."""
+async def stream_logs(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """Stream logs via SSE if sse_starlette is available; otherwise, fallback to chunked streaming.
+
+    Each client follows the ring buffer with its own cursor; SSE event ids are
+    sequence numbers, so reconnects resume via ``Last-Event-ID`` or ``since``.
+    """
+    start = since
+    if start is None:
+        try:
+            last_id = request.headers.get("last-event-id")
+            start = int(last_id) if last_id else None
+        except Exception:
+            start = None
+
     async def gen() -> AsyncIterator[dict]:
-        async for line in BROADCASTER.stream():
-            yield {"data": line}
+        async for seq, line in BROADCASTER.follow(start):
+            yield {"id": str(seq), "data": line}
 
     if EventSourceResponse is not None:
         return EventSourceResponse(gen(), ping=15)
 
     # Fallback: chunked transfer (not true SSE)
     async def chunked():
-        async for line in BROADCASTER.stream():
+        async for _seq, line in BROADCASTER.follow(start):
             yield (line + "\n").encode("utf-8")
     return StreamingResponse(chunked(), media_type="text/plain")
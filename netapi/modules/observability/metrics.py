@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import functools
+import inspect
+import os
 import threading
 import time
-from typing import Dict, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 
 _lock = threading.Lock()
@@ -10,19 +15,211 @@ _lock = threading.Lock()
 # Keyed by (route, method, status)
 _http_requests_total: Dict[Tuple[str, str, int], int] = {}
 
-# Sums by (route, method)
-_http_request_duration_seconds_sum: Dict[Tuple[str, str], float] = {}
-
 # Keyed by (feature, scope)
 _limits_exceeded_total: Dict[Tuple[str, str], int] = {}
 
 _started_at = time.time()
 
+# Upper bounds in seconds; +Inf is implicit. Chat turns routinely take several
+# seconds (LLM generation), so the tail reaches further than the usual defaults.
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Chat pipeline stages recorded via record_stage()/stage_timer()
+CHAT_STAGES = ("retrieval", "web_enrichment", "llm_first_token", "llm_total", "postprocess")
+
+
+def _parse_buckets(raw: str | Sequence[float] | None) -> Optional[Tuple[float, ...]]:
+    if raw is None:
+        return None
+    try:
+        items = raw.split(",") if isinstance(raw, str) else list(raw)
+        bounds = sorted({float(x) for x in items if str(x).strip() and float(x) != float("inf")})
+    except Exception:
+        return None
+    return tuple(bounds) or None
+
+
+class _Histogram:
+    """Prometheus-style histogram with per-thread shards.
+
+    observe() only touches the calling thread's shard, so the hot path takes no
+    lock; the global lock is held just once per thread (shard registration) and
+    while collect() copies the shard list at scrape time.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.default_buckets: Tuple[float, ...] = tuple(buckets)
+        # Per-series overrides, matched on a prefix of the label values
+        # (e.g. (route,) or (route, method) for HTTP)
+        self.overrides: Dict[Tuple[str, ...], Tuple[float, ...]] = {}
+        self._bounds_cache: Dict[Tuple[str, ...], Tuple[float, ...]] = {}
+        self._reset_shards()
+
+    def _reset_shards(self) -> None:
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], list]] = []
+
+    def bounds_for(self, labels: Tuple[str, ...]) -> Tuple[float, ...]:
+        bounds = self._bounds_cache.get(labels)
+        if bounds is None:
+            bounds = self.default_buckets
+            for n in range(len(labels), 0, -1):
+                if labels[:n] in self.overrides:
+                    bounds = self.overrides[labels[:n]]
+                    break
+            self._bounds_cache[labels] = bounds
+        return bounds
+
+    def configure(self, buckets: Tuple[float, ...], key: Tuple[str, ...] = ()) -> None:
+        """Set buckets (for all series, or those whose labels start with `key`).
+
+        Meant for startup; recorded data is dropped so every series keeps a
+        single, consistent set of bounds.
+        """
+        with _lock:
+            if key:
+                self.overrides[key] = buckets
+            else:
+                self.default_buckets = buckets
+            self._bounds_cache = {}
+            self._reset_shards()
+
+    def _shard(self) -> Dict[Tuple[str, ...], list]:
+        local = self._local
+        try:
+            return local.shard
+        except AttributeError:
+            shard: Dict[Tuple[str, ...], list] = {}
+            with _lock:
+                if local is self._local:
+                    self._shards.append(shard)
+            local.shard = shard
+            return shard
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            bounds = self.bounds_for(labels)
+            # [bounds, per-bucket counts (last = +Inf), sum]
+            cell = shard[labels] = [bounds, [0] * (len(bounds) + 1), 0.0]
+        cell[1][bisect_left(cell[0], value)] += 1
+        cell[2] += value
+
+    def collect(self) -> Dict[Tuple[str, ...], Tuple[Tuple[float, ...], List[int], float]]:
+        """Merge all shards: labels -> (bounds, non-cumulative counts, sum)."""
+        with _lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, ...], list] = {}
+        for shard in shards:
+            for labels, cell in list(shard.items()):
+                bounds, counts, total = cell[0], list(cell[1]), cell[2]
+                acc = merged.get(labels)
+                if acc is None:
+                    merged[labels] = [bounds, counts, total]
+                else:
+                    acc[1] = [a + b for a, b in zip(acc[1], counts)]
+                    acc[2] += total
+        return {k: (v[0], v[1], v[2]) for k, v in merged.items()}
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, (bounds, counts, total) in sorted(self.collect().items()):
+            base = ",".join(f"{n}=\"{_escape_label(v)}\"" for n, v in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for le, c in zip(bounds, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{{{base}{sep}le=\"{_format_le(le)}\"}} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{{{base}{sep}le=\"+Inf\"}} {cumulative}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{base}}} {float(total):.6f}")
+
+
+_http_request_duration = _Histogram(
+    "ki_ana_http_request_duration_seconds",
+    "HTTP request latency in seconds",
+    ("route", "method"),
+    _parse_buckets(os.getenv("KI_METRICS_BUCKETS")) or DEFAULT_BUCKETS,
+)
+
+_chat_stage_duration = _Histogram(
+    "ki_ana_chat_stage_duration_seconds",
+    "Chat pipeline stage latency in seconds",
+    ("stage",),
+    _parse_buckets(os.getenv("KI_METRICS_STAGE_BUCKETS")) or _parse_buckets(os.getenv("KI_METRICS_BUCKETS")) or DEFAULT_BUCKETS,
+)
+
+# Offloaded blocking I/O (netapi/core/blocking_io.py) and event loop lag
+IO_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_blocking_io_duration = _Histogram(
+    "ki_ana_blocking_io_seconds",
+    "Blocking I/O run via run_blocking: time queued for a slot (phase=wait) and running (phase=run)",
+    ("category", "phase"),
+    IO_BUCKETS,
+)
+
+_event_loop_lag = _Histogram(
+    "ki_ana_event_loop_lag_seconds",
+    "Delay between a scheduled loop wake-up and when it ran",
+    (),
+    IO_BUCKETS,
+)
+
+# category -> calls currently waiting for a slot
+_io_queue_depth: Dict[str, int] = {}
+_event_loop_stalls_total = 0
+
+
+def configure_buckets(buckets: Sequence[float], *, route: str | None = None, method: str | None = None, stage: str | None = None) -> None:
+    """Override histogram buckets (upper bounds in seconds).
+
+    - route (+ method): HTTP latency buckets for that route (and method)
+    - stage: buckets for one chat pipeline stage
+    - neither: default HTTP buckets
+    """
+    bounds = _parse_buckets(buckets)
+    if not bounds:
+        raise ValueError("buckets must contain at least one finite bound")
+    if stage:
+        _chat_stage_duration.configure(bounds, (str(stage),))
+    elif route:
+        key = (str(route), str(method).upper()) if method else (str(route),)
+        _http_request_duration.configure(bounds, key)
+    else:
+        _http_request_duration.configure(bounds)
+
+
+def _load_route_buckets_from_env() -> None:
+    """KI_METRICS_ROUTE_BUCKETS="POST /api/chat=0.25,1,5,15;/api/memory=0.01,0.05,0.2" """
+    raw = os.getenv("KI_METRICS_ROUTE_BUCKETS") or ""
+    for entry in raw.split(";"):
+        if "=" not in entry:
+            continue
+        target, _, spec = entry.partition("=")
+        parts = target.split()
+        try:
+            if len(parts) == 2:
+                configure_buckets(spec.split(","), route=parts[1], method=parts[0])
+            elif len(parts) == 1:
+                configure_buckets(spec.split(","), route=parts[0])
+        except ValueError:
+            continue
+
+
+_load_route_buckets_from_env()
+
 
 def record_http_request(*, route: str, method: str, status: int, duration_seconds: float, latency_ms: float | None = None) -> None:
     """Record a single HTTP request (best-effort).
 
-    This is intentionally minimal: in-process counters only.
+    This is intentionally minimal: in-process counters and a latency histogram.
     """
     try:
         r = str(route or "/")
@@ -34,7 +231,96 @@ def record_http_request(*, route: str, method: str, status: int, duration_second
 
     with _lock:
         _http_requests_total[(r, m, s)] = _http_requests_total.get((r, m, s), 0) + 1
-        _http_request_duration_seconds_sum[(r, m)] = _http_request_duration_seconds_sum.get((r, m), 0.0) + d
+    _http_request_duration.observe((r, m), d)
+
+
+def record_stage(stage: str, duration_seconds: float) -> None:
+    """Record the duration of one chat pipeline stage (best-effort)."""
+    try:
+        _chat_stage_duration.observe((str(stage),), float(duration_seconds))
+    except Exception:
+        return
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - t0)
+
+
+def timed_stage(stage: str):
+    """Decorator recording each call of a sync or async function as `stage`."""
+
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record_stage(stage, time.perf_counter() - t0)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - t0)
+        return wrapper
+
+    return deco
+
+
+def timed_stream(first_stage: str, total_stage: str):
+    """Decorator for async generators: time to first chunk and to exhaustion."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            first = True
+            try:
+                async for chunk in fn(*args, **kwargs):
+                    if first:
+                        record_stage(first_stage, time.perf_counter() - t0)
+                        first = False
+                    yield chunk
+            finally:
+                record_stage(total_stage, time.perf_counter() - t0)
+        return wrapper
+
+    return deco
+
+
+def record_blocking_io(category: str, wait_seconds: float, run_seconds: float) -> None:
+    try:
+        c = str(category or "default")
+        _blocking_io_duration.observe((c, "wait"), float(wait_seconds))
+        _blocking_io_duration.observe((c, "run"), float(run_seconds))
+    except Exception:
+        return
+
+
+def set_io_queue_depth(category: str, depth: int) -> None:
+    with _lock:
+        _io_queue_depth[str(category or "default")] = max(0, int(depth))
+
+
+def record_loop_lag(lag_seconds: float, *, stalled: bool = False) -> None:
+    global _event_loop_stalls_total
+    try:
+        _event_loop_lag.observe((), max(0.0, float(lag_seconds)))
+    except Exception:
+        return
+    if stalled:
+        with _lock:
+            _event_loop_stalls_total += 1
 
 
 def inc_limits_exceeded(*, feature: str, scope: str) -> None:
@@ -47,6 +333,48 @@ def inc_limits_exceeded(*, feature: str, scope: str) -> None:
         _limits_exceeded_total[(f, sc)] = _limits_exceeded_total.get((f, sc), 0) + 1
 
 
+def histogram_quantile(q: float, bounds: Sequence[float], counts: Sequence[int]) -> Optional[float]:
+    """Estimate a quantile from non-cumulative bucket counts (linear interpolation
+    within the bucket, like PromQL histogram_quantile)."""
+    total = sum(counts)
+    if total <= 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, c in enumerate(counts):
+        if i >= len(bounds):
+            # +Inf bucket: the best we can say is "above the largest bound"
+            return float(bounds[-1]) if bounds else None
+        if cumulative + c >= rank and c > 0:
+            return lower + (bounds[i] - lower) * ((rank - cumulative) / c)
+        cumulative += c
+        lower = bounds[i]
+    return float(bounds[-1]) if bounds else None
+
+
+def latency_snapshot(quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, dict]]:
+    """Per-route and per-stage count/avg/percentiles for JSON consumers."""
+
+    def summarize(hist: _Histogram, key_fn) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        for labels, (bounds, counts, total) in sorted(hist.collect().items()):
+            n = sum(counts)
+            entry = {"count": n, "avg_ms": round(1000.0 * total / n, 3) if n else None}
+            for q in quantiles:
+                v = histogram_quantile(q, bounds, counts)
+                entry[f"p{round(q * 100):g}_ms"] = None if v is None else round(v * 1000.0, 3)
+            out[key_fn(labels)] = entry
+        return out
+
+    return {
+        "http": summarize(_http_request_duration, lambda l: f"{l[1]} {l[0]}"),
+        "chat_stages": summarize(_chat_stage_duration, lambda l: l[0]),
+        "blocking_io": summarize(_blocking_io_duration, lambda l: f"{l[0]}.{l[1]}"),
+        "event_loop_lag": summarize(_event_loop_lag, lambda l: "lag"),
+    }
+
+
 def render_prometheus_text() -> str:
     """Render a minimal Prometheus exposition string."""
     lines: list[str] = []
@@ -59,28 +387,44 @@ def render_prometheus_text() -> str:
     lines.append("# HELP ki_ana_http_requests_total Total HTTP requests")
     lines.append("# TYPE ki_ana_http_requests_total counter")
     with _lock:
-        for (route, method, status), count in sorted(_http_requests_total.items()):
-            r = _escape_label(route)
-            m = _escape_label(method)
-            lines.append(f"ki_ana_http_requests_total{{route=\"{r}\",method=\"{m}\",status=\"{status}\"}} {int(count)}")
-
-        lines.append("# HELP ki_ana_http_request_duration_seconds_sum Total time spent handling requests")
-        lines.append("# TYPE ki_ana_http_request_duration_seconds_sum counter")
-        for (route, method), total in sorted(_http_request_duration_seconds_sum.items()):
-            r = _escape_label(route)
-            m = _escape_label(method)
-            lines.append(f"ki_ana_http_request_duration_seconds_sum{{route=\"{r}\",method=\"{m}\"}} {float(total):.6f}")
-
-        lines.append("# HELP ki_ana_limits_exceeded_total Total rate/limit exceed events")
-        lines.append("# TYPE ki_ana_limits_exceeded_total counter")
-        for (feature, scope), count in sorted(_limits_exceeded_total.items()):
-            f = _escape_label(feature)
-            sc = _escape_label(scope)
-            lines.append(f"ki_ana_limits_exceeded_total{{feature=\"{f}\",scope=\"{sc}\"}} {int(count)}")
+        requests_total = sorted(_http_requests_total.items())
+        limits_total = sorted(_limits_exceeded_total.items())
+        io_depth = sorted(_io_queue_depth.items())
+        loop_stalls = _event_loop_stalls_total
+    for (route, method, status), count in requests_total:
+        r = _escape_label(route)
+        m = _escape_label(method)
+        lines.append(f"ki_ana_http_requests_total{{route=\"{r}\",method=\"{m}\",status=\"{status}\"}} {int(count)}")
+
+    # Histogram families; _sum keeps the name/labels of the former sum-only series
+    _http_request_duration.render(lines)
+    _chat_stage_duration.render(lines)
+    _blocking_io_duration.render(lines)
+    _event_loop_lag.render(lines)
+
+    lines.append("# HELP ki_ana_blocking_io_queue_depth Calls waiting for a blocking I/O slot")
+    lines.append("# TYPE ki_ana_blocking_io_queue_depth gauge")
+    for category, depth in io_depth:
+        lines.append(f"ki_ana_blocking_io_queue_depth{{category=\"{_escape_label(category)}\"}} {int(depth)}")
+
+    lines.append("# HELP ki_ana_event_loop_stalls_total Event loop lag samples above the stall threshold")
+    lines.append("# TYPE ki_ana_event_loop_stalls_total counter")
+    lines.append(f"ki_ana_event_loop_stalls_total {int(loop_stalls)}")
+
+    lines.append("# HELP ki_ana_limits_exceeded_total Total rate/limit exceed events")
+    lines.append("# TYPE ki_ana_limits_exceeded_total counter")
+    for (feature, scope), count in limits_total:
+        f = _escape_label(feature)
+        sc = _escape_label(scope)
+        lines.append(f"ki_ana_limits_exceeded_total{{feature=\"{f}\",scope=\"{sc}\"}} {int(count)}")
 
     lines.append("")
     return "\n".join(lines)
 
 
+def _format_le(value: float) -> str:
+    return repr(float(value))
+
+
 def _escape_label(value: str) -> str:
     return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,286 @@
+"""Request-scoped profiling for the chat pipeline.
+
+A trace is opt-in: send ``X-KI-Profile: 1`` or set ``KI_PROFILE_SAMPLE`` (0..1)
+to sample requests. While a trace is active, every ``@traced`` helper adds a
+span (wall + CPU time) to the request's span tree; finished traces are appended
+to a size-rotated JSONL store and can be listed / exported as folded stacks
+(flamegraph.pl, speedscope) via /api/admin/profiles.
+
+Without an active trace a traced call costs one ContextVar lookup.
+
+CPU time is the running thread's CPU time while the span was open; for async
+spans that yield to the event loop it includes whatever else ran meanwhile.
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+PROFILE_HEADER = "x-ki-profile"
+
+_active: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("ki_profile_span", default=None)
+_write_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class _Config:
+    def __init__(self) -> None:
+        self.sample_rate = max(0.0, min(1.0, _env_float("KI_PROFILE_SAMPLE", 0.0)))
+        self.directory = Path(os.getenv("KI_PROFILE_DIR") or (Path(os.getenv("KI_ROOT", str(Path.home() / "ki_ana"))) / "runtime" / "profiles"))
+        self.max_bytes = int(_env_float("KI_PROFILE_MAX_BYTES", 5 * 1024 * 1024))
+        self.keep = max(1, int(_env_float("KI_PROFILE_KEEP", 3)))
+        self.min_ms = _env_float("KI_PROFILE_MIN_MS", 0.0)
+
+
+config = _Config()
+
+
+def configure(**kwargs: Any) -> None:
+    """Override settings at runtime (sample_rate, directory, max_bytes, keep, min_ms)."""
+    for key, value in kwargs.items():
+        if not hasattr(config, key):
+            raise ValueError(f"unknown profiling option: {key}")
+        setattr(config, key, Path(value) if key == "directory" else value)
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "cpu_start", "cpu", "children", "thread")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children: List[Span] = []
+        self.thread = threading.get_ident()
+        self.cpu = 0.0
+        self.end = 0.0
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+
+    def close(self) -> None:
+        self.end = time.perf_counter()
+        self.cpu = time.thread_time() - self.cpu_start
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000.0, 3),
+            "wall_ms": round((self.end - self.start) * 1000.0, 3),
+            "cpu_ms": round(self.cpu * 1000.0, 3),
+            "children": [c.to_dict(origin) for c in self.children],
+        }
+
+
+@contextmanager
+def span(name: str) -> Iterator[Optional[Span]]:
+    """Record a child span of the active trace; no-op without one."""
+    parent = _active.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name)
+    parent.children.append(s)
+    token = _active.set(s)
+    try:
+        yield s
+    finally:
+        s.close()
+        _active.reset(token)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator adding a span per call (sync, async and async-generator functions)."""
+
+    def deco(fn):
+        label = name or fn.__name__
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def agen_wrapper(*args, **kwargs):
+                if _active.get() is None:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                    return
+                # Spans cannot wrap yields (the consumer runs in between), so
+                # time the generator as one span without entering its context.
+                parent = _active.get()
+                s = Span(label)
+                parent.children.append(s)
+                try:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                finally:
+                    s.close()
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _active.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return deco
+
+
+def should_profile(headers: Any = None) -> bool:
+    try:
+        flag = (headers.get(PROFILE_HEADER) if headers is not None else None) or ""
+        if flag.strip().lower() in {"1", "true", "yes", "on"}:
+            return True
+    except Exception:
+        pass
+    rate = config.sample_rate
+    return rate > 0.0 and random.random() < rate
+
+
+def profiled(name: str):
+    """Decorator for async endpoints: open a trace when the request opts in."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get("request")
+            if request is None:
+                request = next((a for a in args if hasattr(a, "headers") and hasattr(a, "url")), None)
+            if _active.get() is not None or not should_profile(getattr(request, "headers", None)):
+                return await fn(*args, **kwargs)
+            meta: Dict[str, Any] = {}
+            try:
+                meta = {"path": str(request.url.path), "method": str(request.method)}
+                request.state.profile_trace_id = trace_id = uuid.uuid4().hex[:16]
+            except Exception:
+                trace_id = uuid.uuid4().hex[:16]
+            root = Span(name)
+            token = _active.set(root)
+            error = None
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                root.close()
+                _active.reset(token)
+                finish_trace(root, trace_id=trace_id, meta=meta, error=error)
+        return wrapper
+
+    return deco
+
+
+def finish_trace(root: Span, *, trace_id: Optional[str] = None, meta: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Serialize a finished span tree and append it to the store (best-effort)."""
+    wall_ms = (root.end - root.start) * 1000.0
+    if wall_ms < config.min_ms:
+        return None
+    record = {
+        "trace_id": trace_id or uuid.uuid4().hex[:16],
+        "ts": time.time(),
+        "name": root.name,
+        "wall_ms": round(wall_ms, 3),
+        "cpu_ms": round(root.cpu * 1000.0, 3),
+        "error": error,
+        "meta": meta or {},
+        "root": root.to_dict(root.start),
+    }
+    try:
+        _append(json.dumps(record, ensure_ascii=False))
+    except Exception:
+        pass
+    return record
+
+
+def _store_files() -> List[Path]:
+    base = config.directory / "traces.jsonl"
+    return [base] + [base.with_name(f"traces.jsonl.{i}") for i in range(1, config.keep + 1)]
+
+
+def _append(line: str) -> None:
+    with _write_lock:
+        config.directory.mkdir(parents=True, exist_ok=True)
+        files = _store_files()
+        current = files[0]
+        try:
+            size = current.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(line) > config.max_bytes:
+            for older, newer in zip(reversed(files[1:]), reversed(files[:-1])):
+                if newer.exists():
+                    os.replace(newer, older)
+        with current.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def load_traces() -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for path in _store_files():
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        out.append(json.loads(line))
+                    except Exception:
+                        continue
+        except FileNotFoundError:
+            continue
+    return out
+
+
+def slowest(limit: int = 20, *, name: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    traces = [t for t in load_traces()
+              if (name is None or t.get("name") == name) and (since is None or float(t.get("ts") or 0) >= since)]
+    traces.sort(key=lambda t: float(t.get("wall_ms") or 0.0), reverse=True)
+    return traces[:max(0, int(limit))]
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    for t in load_traces():
+        if t.get("trace_id") == trace_id:
+            return t
+    return None
+
+
+def folded_stacks(traces: List[Dict[str, Any]], *, metric: str = "wall_ms") -> str:
+    """Collapsed-stack lines ("a;b;c <µs>") of self time, summed over traces."""
+    totals: Dict[str, int] = {}
+
+    def walk(node: Dict[str, Any], prefix: str) -> None:
+        path = f"{prefix};{node.get('name')}" if prefix else str(node.get("name"))
+        children = node.get("children") or []
+        self_ms = float(node.get(metric) or 0.0) - sum(float(c.get(metric) or 0.0) for c in children)
+        us = int(max(0.0, self_ms) * 1000)
+        if us:
+            totals[path] = totals.get(path, 0) + us
+        for c in children:
+            walk(c, path)
+
+    for t in traces:
+        if t.get("root"):
+            walk(t["root"], "")
+    return "".join(f"{path} {us}\n" for path, us in sorted(totals.items()))
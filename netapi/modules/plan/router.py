@@ -1,8 +1,11 @@
 from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
-import time, json
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio, threading, time, json
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
 
 from ...deps import get_current_user_required, require_role
 from ...db import SessionLocal
@@ -81,6 +84,8 @@ def _plan_to_dict(p: Plan, steps: Optional[List[PlanStep]] = None) -> Dict[str,
                 "updated_at": int(s.updated_at or 0),
                 "started_at": int(s.started_at or 0),
                 "finished_at": int(s.finished_at or 0),
+                "attempts": int(getattr(s, "attempts", 0) or 0),
+                "not_before": int(getattr(s, "not_before", 0) or 0),
             }
             for s in (steps if steps is not None else [])
         ] if steps is not None else None,
@@ -116,6 +121,7 @@ def create_plan(body: PlanIn, user = Depends(get_current_user_required)):
             )
             db.add(s)
         db.commit(); db.refresh(p)
+        _step_signal.notify()
         try:
             write_audit("plan_create", actor_id=int(user.get("id") or 0), target_type="plan", target_id=int(p.id or 0), meta={"title": p.title, "steps": len(body.steps or [])})
         except Exception:
@@ -199,6 +205,7 @@ def duplicate_plan(plan_id: int, user = Depends(get_current_user_required)):
             )
             db.add(ns)
         db.commit(); db.refresh(np)
+        _step_signal.notify()
         try:
             write_audit("plan_duplicate", actor_id=int(user.get("id") or 0), target_type="plan", target_id=int(np.id or 0), meta={"from": int(plan_id), "steps": len(steps)})
         except Exception:
@@ -277,7 +284,9 @@ def retry_plan(plan_id: int, user = Depends(get_current_user_required)):
         p.status = "queued"; p.updated_at = now; p.started_at = 0; p.finished_at = 0
         for s in db.query(PlanStep).filter(PlanStep.plan_id == int(plan_id)).all():
             s.status = "queued"; s.updated_at = now; s.started_at = 0; s.finished_at = 0; s.result = ""; s.error = ""
+            s.attempts = 0; s.not_before = 0
         db.add(p); db.commit()
+        _step_signal.notify()
         try:
             write_audit("plan_retry", actor_id=int(user.get("id") or 0), target_type="plan", target_id=int(plan_id or 0))
         except Exception:
@@ -285,44 +294,177 @@ def retry_plan(plan_id: int, user = Depends(get_current_user_required)):
         return {"ok": True}
 
 
+class _StepSignal:
+    """Wakes long-polling lease requests when steps become available.
+
+    In-process only; waiters also re-check on a short interval, so steps
+    added by another API process are picked up within POLL_SLICE seconds.
+    """
+    POLL_SLICE = 2.0
+
+    def __init__(self) -> None:
+        self._waiters: set = set()
+        self._lock = threading.Lock()
+
+    def register(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        return waiter
+
+    def release(self, waiter) -> None:
+        with self._lock:
+            self._waiters.discard(waiter)
+
+    def notify(self) -> None:
+        """Thread-safe; called from sync endpoints after steps were queued."""
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, ev in waiters:
+            try:
+                loop.call_soon_threadsafe(ev.set)
+            except RuntimeError:
+                pass  # loop closed
+
+
+_step_signal = _StepSignal()
+
+
 class LeaseIn(BaseModel):
-    # Lease the next queued step for the earliest queued or running plan
-    pass
+    # Lease the next queued steps (earliest plans first; per plan one at a time, in idx order)
+    max: int = Field(default=1, ge=1, le=100, description="batch size")
+    wait: float = Field(default=0.0, ge=0.0, le=60.0, description="long-poll: seconds to wait for a step")
 
 
-@router.post("/lease-step")
-def lease_step(body: LeaseIn, user = Depends(get_current_user_required)):
-    # Allow worker/admin to lease
-    require_role(user, {"admin", "worker", "creator"})
+_ACTIVE = ["queued", "running"]
+
+
+def _step_lease_sec() -> int:
+    # A running step not completed within this many seconds is assumed lost (worker died)
+    import os
+    try:
+        return max(1, int(os.getenv("PLAN_STEP_LEASE_SEC", "600")))
+    except Exception:
+        return 600
+
+
+def _requeue_expired(db, now: int) -> int:
+    """Requeue running steps whose lease expired, so a crashed worker does not block its plan."""
+    n = (
+        db.query(PlanStep)
+          .filter(PlanStep.status == "running", func.coalesce(PlanStep.started_at, 0) <= now - _step_lease_sec())
+          .update({PlanStep.status: "queued", PlanStep.not_before: 0, PlanStep.error: "lease_expired",
+                   PlanStep.updated_at: now}, synchronize_session=False)
+    )
+    if n:
+        db.commit()
+    return int(n or 0)
+
+
+def _finalize_idle_plans(db, now: int) -> None:
+    # Active plans with nothing queued, delayed or still running are done
+    pending = db.query(PlanStep.id).filter(PlanStep.plan_id == Plan.id, PlanStep.status.in_(["queued", "running"])).exists()
+    for p in db.query(Plan).filter(Plan.status.in_(_ACTIVE), ~pending).limit(100).all():
+        p.status = "done"; p.finished_at = now; p.updated_at = now
+        db.add(p)
+    db.commit()
+
+
+def _head_of_plan():
+    """Steps run in idx order: no earlier step of the plan may be queued (incl. a delayed retry) or running."""
+    earlier = aliased(PlanStep)
+    return ~(
+        select(earlier.id)
+        .where(earlier.plan_id == PlanStep.plan_id, earlier.idx < PlanStep.idx,
+               earlier.status.in_(["queued", "running"]))
+        .exists()
+    )
+
+
+def _lease_steps(n: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Lease up to n due steps; returns (steps, next due ts of a delayed step or 0)."""
     now = _now()
+    out: List[Dict[str, Any]] = []
     with SessionLocal() as db:
-        # find the earliest plan with queued steps
-        p = (
-            db.query(Plan)
-              .filter(Plan.status.in_(["queued", "running"]))
-              .order_by(Plan.created_at.asc())
-              .first()
+        _requeue_expired(db, now)
+        due = func.coalesce(PlanStep.not_before, 0) <= now
+        rows = (
+            db.query(PlanStep, Plan)
+              .join(Plan, Plan.id == PlanStep.plan_id)
+              .filter(Plan.status.in_(_ACTIVE), PlanStep.status == "queued", due, _head_of_plan())
+              .order_by(Plan.created_at.asc(), Plan.id.asc(), PlanStep.idx.asc(), PlanStep.id.asc())
+              .limit(n * 2 + 4)
+              .all()
         )
-        if not p:
-            return {"ok": True, "step": None}
-        # find next queued step by idx
-        s = (
-            db.query(PlanStep)
-              .filter(PlanStep.plan_id == int(p.id), PlanStep.status == "queued")
-              .order_by(PlanStep.idx.asc(), PlanStep.id.asc())
-              .first()
-        )
-        if not s:
-            # no queued steps left → finalize plan if running/queued
-            if p.status in {"queued", "running"}:
-                p.status = "done"; p.finished_at = now; p.updated_at = now
-                db.add(p); db.commit()
-            return {"ok": True, "step": None}
-        # mark plan running and lease step (best-effort lock)
-        p.status = "running"; p.updated_at = now; p.started_at = p.started_at or now
-        s.status = "running"; s.started_at = now; s.updated_at = now
-        db.add(p); db.add(s); db.commit(); db.refresh(s)
-        return {"ok": True, "step": _plan_to_dict(p, [s])["steps"][0], "plan_id": int(p.id)}
+        for s, p in rows:
+            if len(out) >= n:
+                break
+            # compare-and-set: a concurrent lease of the same step loses here
+            won = (
+                db.query(PlanStep)
+                  .filter(PlanStep.id == int(s.id), PlanStep.status == "queued")
+                  .update({
+                      PlanStep.status: "running", PlanStep.started_at: now, PlanStep.updated_at: now,
+                      PlanStep.attempts: func.coalesce(PlanStep.attempts, 0) + 1,
+                  }, synchronize_session=False)
+            )
+            if not won:
+                continue
+            if p.status != "running" or not p.started_at:
+                p.status = "running"; p.started_at = p.started_at or now
+            p.updated_at = now
+            db.add(p)
+            db.commit()
+            db.refresh(s)
+            out.append(_plan_to_dict(p, [s])["steps"][0])
+        if len(out) < n:
+            _finalize_idle_plans(db, now)
+        next_due = 0
+        if not out:
+            next_due = int(
+                db.query(func.min(PlanStep.not_before))
+                  .join(Plan, Plan.id == PlanStep.plan_id)
+                  .filter(Plan.status.in_(_ACTIVE), PlanStep.status == "queued", PlanStep.not_before > now, _head_of_plan())
+                  .scalar() or 0
+            )
+    return out, next_due
+
+
+@router.post("/lease-step")
+async def lease_step(body: LeaseIn, user = Depends(get_current_user_required)):
+    """
+    Lease up to `max` steps. With `wait` > 0 the request is held open until a
+    step is due (new plan, retry, delayed step reaching its time) or the wait
+    expires, so idle workers neither poll nor miss new work.
+    A step not completed within PLAN_STEP_LEASE_SEC (default 600) is requeued.
+    Response keeps `step`/`plan_id` (first step) for single-step clients.
+    """
+    # Allow worker/admin to lease
+    require_role(user, {"admin", "worker", "creator"})
+    deadline = time.monotonic() + float(body.wait or 0.0)
+    while True:
+        waiter = _step_signal.register()
+        try:
+            steps, next_due = await asyncio.to_thread(_lease_steps, int(body.max or 1))
+            left = deadline - time.monotonic()
+            if steps or left <= 0:
+                break
+            pause = min(left, _StepSignal.POLL_SLICE)
+            if next_due:
+                pause = min(pause, max(0.05, next_due - time.time()))
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout=pause)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            _step_signal.release(waiter)
+    first = steps[0] if steps else None
+    return {
+        "ok": True,
+        "step": first,
+        "plan_id": int(first["plan_id"]) if first else None,
+        "steps": steps,
+    }
 
 
 class CompleteIn(BaseModel):
@@ -331,6 +473,20 @@ class CompleteIn(BaseModel):
     ok: bool = True
     result: Optional[str] = None
     error: Optional[str] = None
+    # final=True: no server-side retry (e.g. missed deadline)
+    final: bool = False
+
+
+def _retry_delay(payload: Dict[str, Any], attempts: int) -> Optional[int]:
+    """Backoff seconds if the step may run again, else None (payload max_retries / retry_backoff_sec)."""
+    try:
+        max_retries = int(payload.get("max_retries") or 0)
+        backoff = int(payload.get("retry_backoff_sec") or 2)
+    except Exception:
+        return None
+    if attempts > max_retries:
+        return None
+    return min(60, backoff * (2 ** max(0, attempts - 1)))
 
 
 @router.post("/complete-step")
@@ -342,6 +498,20 @@ def complete_step(body: CompleteIn, user = Depends(get_current_user_required)):
         if not s: raise HTTPException(404, "step_not_found")
         if s.status not in {"running", "queued"}:
             return {"ok": True, "status": s.status}
+        if not body.ok and not body.final:
+            try:
+                payload = json.loads(s.payload or "{}") if isinstance(s.payload, str) else (s.payload or {})
+            except Exception:
+                payload = {}
+            delay = _retry_delay(payload, int(s.attempts or 1))
+            if delay is not None:
+                # Retry as a delayed step instead of a sleeping worker
+                s.status = "queued"; s.not_before = now + delay
+                s.error = (body.error or "")[:2000]
+                s.updated_at = now
+                db.add(s); db.commit()
+                _step_signal.notify()
+                return {"ok": True, "status": "queued", "retry_at": now + delay, "attempts": int(s.attempts or 1)}
         s.status = "done" if bool(body.ok) else "failed"
         s.result = (body.result or "")[:2000]
         s.error = (body.error or "")[:2000]
@@ -355,6 +525,8 @@ def complete_step(body: CompleteIn, user = Depends(get_current_user_required)):
             p.updated_at = now
             db.add(p)
         db.commit()
+        if body.ok:
+            _step_signal.notify()  # the plan's next step is leasable now
         # Audit specialized step completions (best-effort)
         try:
             stype = (s.type or "").lower()
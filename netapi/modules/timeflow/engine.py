@@ -99,7 +99,8 @@ class TimeFlow:
         self.state = TimeFlowState(ts_ms=int(time.time() * 1000))
         self._running = False
         self._task: Optional[asyncio.Task] = None
-        self._prev_log_count: int = 0
+        # Log ring cursor: events per tick = RING.seq delta
+        self._log_seq: int = int(getattr(RING, "seq", 0) or 0) if RING is not None else 0
         self._last_mem_hash: str = ""
         # request counter (incremented from middleware)
         self._req_counter: int = 0
@@ -289,13 +290,16 @@ class TimeFlow:
             return None
 
     async def _sample_events(self) -> int:
+        """Number of log events appended since the previous tick (O(1), exact)."""
         if RING is None:
             return 0
         try:
-            snap = await RING.snapshot(self.log_window)
-            return len(snap or [])
+            seq = int(RING.seq)
         except Exception:
             return 0
+        new_events = max(0, seq - self._log_seq)
+        self._log_seq = seq
+        return new_events
 
     def _circadian(self, now_epoch: float) -> float:
         if not self.circadian_enabled or self._tz is None:
@@ -367,9 +371,7 @@ class TimeFlow:
         self.state.tick += 1
 
         # events window and density (logs)
-        count = await self._sample_events()
-        new_events = max(0, count - self._prev_log_count)
-        self._prev_log_count = count
+        new_events = await self._sample_events()
         self.state.events_total += new_events
         self.state.events_last_window = new_events
         # capture and reset http requests since last tick
@@ -4,14 +4,18 @@ Local Voice API Router
 Provides REST API for local STT (Whisper) and TTS (Piper).
 Fully offline voice processing!
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 import sys
 from pathlib import Path
 import tempfile
 import os
+import json
+from itertools import chain
+
+from netapi.core.blocking_io import run_blocking
 
 # Add system path for imports
 sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
@@ -95,6 +99,48 @@ async def transcribe_audio(
         raise HTTPException(500, f"Transcription error: {e}")
 
 
+@router.post("/stt/transcribe/stream")
+async def transcribe_audio_stream(
+    file: UploadFile = File(...),
+    model: Optional[str] = None,
+    language: Optional[str] = None,
+    task: str = "transcribe",
+    workers: Optional[int] = Query(None, ge=1, description="parallel Whisper instances (capped at KI_STT_WORKERS)")
+):
+    """
+    Transcribe uploaded audio incrementally (NDJSON, one line per utterance).
+    
+    The first line arrives after the first pause instead of after the whole
+    file; the last line is {"done": true, ...}.
+    """
+    if not STT_AVAILABLE:
+        raise HTTPException(503, "Local STT not available")
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename or "audio.wav").suffix) as tmp:
+        tmp.write(await file.read())
+        tmp_path = tmp.name
+    
+    def lines():
+        count, end = 0, 0.0
+        try:
+            service = get_stt_service()
+            for part in service.transcribe_stream(
+                tmp_path, model=model, language=language, task=task, workers=workers
+            ):
+                count, end = count + 1, part["end"]
+                yield json.dumps({"ok": True, "partial": part}, ensure_ascii=False) + "\n"
+            yield json.dumps({"ok": True, "done": True, "segments": count, "duration": end}) + "\n"
+        except Exception as e:
+            yield json.dumps({"ok": False, "error": f"Transcription error: {e}"}) + "\n"
+        finally:
+            try:
+                os.unlink(tmp_path)
+            except:
+                pass
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/stt/models")
 async def list_stt_models():
     """List available Whisper models."""
@@ -168,6 +214,45 @@ async def synthesize_speech(request: SynthesizeRequest):
         raise HTTPException(500, f"Synthesis error: {e}")
 
 
+@router.post("/tts/synthesize/stream")
+async def synthesize_speech_stream(request: SynthesizeRequest):
+    """
+    Synthesize speech sentence by sentence.
+    
+    Streams raw 16-bit mono PCM (sample rate in X-Sample-Rate); playback can
+    start after the first sentence instead of after the whole text.
+    """
+    if not TTS_AVAILABLE:
+        raise HTTPException(503, "Local TTS not available")
+    
+    try:
+        service = get_tts_service()
+        voice_key = request.voice or service.default_voice
+        rate = service._sample_rate(voice_key)
+        chunks = service.synthesize_stream(request.text, voice=voice_key)
+        # The generator only starts synthesizing on next(): pull the first
+        # sentence here so errors (missing voice, piper failure) become a 500
+        first = await run_blocking(next, chunks, None)
+    except Exception as e:
+        raise HTTPException(500, f"Synthesis error: {e}")
+    
+    def pcm():
+        if first is None:
+            return
+        for chunk in chain([first], chunks):
+            yield chunk.pcm
+    
+    return StreamingResponse(
+        pcm(),
+        media_type="audio/L16",
+        headers={
+            "X-Sample-Rate": str(rate),
+            "X-Channels": "1",
+            "X-Voice": voice_key
+        }
+    )
+
+
 @router.post("/tts/synthesize/json")
 async def synthesize_speech_json(request: SynthesizeRequest):
     """
@@ -226,7 +311,8 @@ async def get_tts_stats():
             "default_voice": service.default_voice,
             "loaded_voices": list(service.voices.keys()),
             "voices_dir": str(service.voices_dir),
-            "voices": service.list_voices()
+            "voices": service.list_voices(),
+            "phrase_cache": service.cache.stats()
         }
     except Exception as e:
         raise HTTPException(500, f"Stats error: {e}")
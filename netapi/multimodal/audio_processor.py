@@ -110,18 +110,141 @@ class AudioProcessor:
     async def transcribe_realtime(
         self,
         audio_stream,
-        callback
-    ):
+        callback,
+        language: Optional[str] = None,
+        model_size: Optional[str] = None,
+        sample_rate: int = 16000,
+    ) -> Dict[str, Any]:
         """
         Transcribe audio in real-time.
         
+        The stream is cut into utterances at pauses (energy VAD); each
+        utterance is handed to the warm model instances of the local STT
+        service (up to KI_STT_WORKERS) as soon as it ends, while reading
+        continues. Results reach the callback in utterance order.
+        
         Args:
-            audio_stream: Audio input stream
-            callback: Function to call with transcription results
+            audio_stream: (Async) iterable of 16-bit mono PCM bytes or float32 arrays
+            callback: Function (sync or async) called with each partial result
+                      {"index", "start", "end", "text", "language"}
+            language: Language code, or None to detect once on the first utterance
+            model_size: Whisper model size (default: service default)
+            sample_rate: Sample rate of the incoming audio (resampled to 16 kHz)
+            
+        Returns:
+            Dict with the combined transcription
         """
-        # TODO: Implement real-time transcription
-        # Could use faster-whisper or whisper.cpp
-        pass
+        if not self.stt_available:
+            return {
+                "success": False,
+                "error": "STT not available. Install whisper: pip install openai-whisper"
+            }
+        
+        import asyncio
+        import inspect
+        import sys
+        sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
+        
+        try:
+            from audio_stream import VADSegmenter, _Resampler, pcm16_to_float
+            from local_stt import get_stt_service
+            import numpy as np
+            
+            service = get_stt_service()
+            model_key = model_size or service.default_model
+            workers = service.max_workers()
+            await asyncio.to_thread(service._load_model, model_key)
+            vad = VADSegmenter()
+            resample = _Resampler(sample_rate)
+            state = {"language": language}
+            parts: List[Dict[str, Any]] = []
+            # Decodes in flight, in utterance order; bounded so a slow model caps memory
+            pending: "asyncio.Queue" = asyncio.Queue(maxsize=2 * workers)
+            
+            def run(seg) -> Dict[str, Any]:
+                # Checked out per utterance: other requests share the instances
+                with service.model_instance(model_key, workers) as model:
+                    res = model.transcribe(
+                        seg.audio,
+                        language=state["language"],
+                        fp16=False,
+                        condition_on_previous_text=False,
+                    )
+                state["language"] = state["language"] or res.get("language")
+                return {
+                    "index": seg.index,
+                    "start": seg.start,
+                    "end": seg.end,
+                    "text": (res.get("text") or "").strip(),
+                    "language": res.get("language", state["language"]),
+                }
+            
+            async def submit(segments) -> None:
+                for seg in segments:
+                    await pending.put(asyncio.ensure_future(asyncio.to_thread(run, seg)))
+            
+            def drain() -> None:
+                while not pending.empty():
+                    task = pending.get_nowait()
+                    if task is not None:
+                        task.cancel()
+            
+            async def emit() -> None:
+                # Results reach the callback in order while reading continues
+                try:
+                    while True:
+                        task = await pending.get()
+                        if task is None:
+                            return
+                        part = await task
+                        parts.append(part)
+                        out = callback(part)
+                        if inspect.isawaitable(out):
+                            await out
+                except BaseException:
+                    drain()  # unblock a reader waiting on a full queue
+                    raise
+            
+            async def chunks():
+                if hasattr(audio_stream, "__aiter__"):
+                    async for c in audio_stream:
+                        yield c
+                else:
+                    for c in audio_stream:
+                        yield c
+            
+            emitter = asyncio.ensure_future(emit())
+            try:
+                async for chunk in chunks():
+                    if emitter.done():
+                        break  # decode or callback failed; surfaced below
+                    if isinstance(chunk, (bytes, bytearray, memoryview)):
+                        samples = pcm16_to_float(bytes(chunk))
+                    else:
+                        samples = np.asarray(chunk, dtype=np.float32)
+                    await submit(vad.feed(resample(samples)))
+                if not emitter.done():
+                    await submit(vad.flush())
+                    await pending.put(None)
+                await emitter
+            finally:
+                if not emitter.done():
+                    emitter.cancel()
+                drain()
+            
+            return {
+                "success": True,
+                "text": " ".join(p["text"] for p in parts if p["text"]).strip(),
+                "language": state["language"] or language,
+                "model": model_key,
+                "segments": parts
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
     
     async def synthesize(
         self,
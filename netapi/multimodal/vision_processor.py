@@ -8,11 +8,91 @@ Enables the AI to:
 - Answer questions about images
 """
 from __future__ import annotations
+import asyncio
 import base64
-from typing import Dict, List, Optional, Any, Tuple
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
 import io
 
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+ImageInput = Union[str, Path, bytes]
+
+
+class _LRU:
+    """Small thread-safe LRU map bounded by entry count and (optionally) total size."""
+    
+    def __init__(self, max_entries: int, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.data: "OrderedDict[Any, Tuple[Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # _prepare_image runs in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            item = self.data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+    
+    def put(self, key, value, size: int = 0) -> None:
+        with self._lock:
+            if key in self.data:
+                self.bytes -= self.data.pop(key)[1]
+            self.data[key] = (value, size)
+            self.bytes += size
+            while self.data and (len(self.data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes)):
+                _, (_, old_size) = self.data.popitem(last=False)
+                self.bytes -= old_size
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self.data), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+_CLOSING: set = set()
+
+
+def _retire_client(client, loop) -> None:
+    """Close a pooled AsyncClient created on another event loop (best effort).
+
+    Its connections belong to that loop: close it there while it still runs,
+    otherwise from the current loop.
+    """
+    if client is None or client.is_closed:
+        return
+    
+    async def close():
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+    
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        try:
+            asyncio.run_coroutine_threadsafe(close(), loop)
+            return
+        except RuntimeError:
+            pass
+    task = asyncio.get_running_loop().create_task(close())
+    _CLOSING.add(task)
+    task.add_done_callback(_CLOSING.discard)
+
 
 class VisionProcessor:
     """
@@ -30,10 +110,30 @@ class VisionProcessor:
         answer = await vision.answer_question(image_path, "What's in this image?")
     """
     
-    def __init__(self, ollama_host: str = "http://localhost:11434"):
+    def __init__(self, ollama_host: str = "http://localhost:11434", transport: Any = None):
         self.ollama_host = ollama_host
         self.vision_model = "llava:latest"  # Or "bakllava", "llava-phi3"
         self.available = False
+        
+        # Images are downscaled to the model's input resolution before upload
+        self.max_side = int(os.getenv("KI_VISION_MAX_SIDE", "672"))
+        self.jpeg_quality = int(os.getenv("KI_VISION_JPEG_QUALITY", "85"))
+        self.timeout = float(os.getenv("KI_VISION_TIMEOUT", "60"))
+        max_inflight = int(os.getenv("KI_VISION_MAX_INFLIGHT", "2"))
+        
+        # sha256(original bytes) -> (sha, base64 payload); and answers keyed
+        # by (image sha, prompt, model)
+        self._payloads = _LRU(64, max_bytes=int(os.getenv("KI_VISION_CACHE_MB", "64")) * 1024 * 1024)
+        self._answers = _LRU(int(os.getenv("KI_VISION_ANSWER_CACHE", "512")))
+        self._path_digests: Dict[Tuple[str, float, int], str] = {}
+        self._digest_lock = threading.Lock()
+        
+        self._transport = transport
+        self._max_inflight = max(1, max_inflight)
+        self._client_obj = None
+        self._client_loop = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        
         self._check_availability()
     
     def _check_availability(self):
@@ -47,18 +147,122 @@ class VisionProcessor:
         except Exception:
             self.available = False
     
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64"""
-        try:
-            with open(image_path, "rb") as f:
-                return base64.b64encode(f.read()).decode()
-        except Exception as e:
-            raise Exception(f"Failed to encode image: {e}")
-    
     def _encode_image_bytes(self, image_bytes: bytes) -> str:
         """Encode image bytes to base64"""
         return base64.b64encode(image_bytes).decode()
     
+    def _downscale(self, data: bytes) -> bytes:
+        """Fit the image into max_side x max_side and re-encode compactly (needs Pillow)."""
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            return data
+        try:
+            img = Image.open(io.BytesIO(data))
+            fmt = (img.format or "").upper()
+            if max(img.size) <= self.max_side and fmt in ("JPEG", "PNG") and len(data) <= 512 * 1024:
+                return data
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+            out = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "P") and fmt == "PNG":
+                img.save(out, format="PNG", optimize=True)
+            else:
+                img.convert("RGB").save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            smaller = out.getvalue()
+            return smaller if len(smaller) < len(data) else data
+        except Exception:
+            return data
+    
+    def _prepare_image(self, image: ImageInput) -> Tuple[str, str]:
+        """Return (sha256 of the original, base64 payload), cached per content."""
+        if isinstance(image, (bytes, bytearray)):
+            data: Optional[bytes] = bytes(image)
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            p = Path(image)
+            try:
+                st = p.stat()
+            except Exception as e:
+                raise Exception(f"Failed to encode image: {e}")
+            # Unchanged files skip re-reading entirely
+            path_key = (str(p.resolve()), st.st_mtime, st.st_size)
+            with self._digest_lock:
+                digest = self._path_digests.get(path_key)
+            data = None
+            if digest is None:
+                try:
+                    data = p.read_bytes()
+                except Exception as e:
+                    raise Exception(f"Failed to encode image: {e}")
+                digest = hashlib.sha256(data).hexdigest()
+                with self._digest_lock:
+                    if len(self._path_digests) > 1024:
+                        self._path_digests.clear()
+                    self._path_digests[path_key] = digest
+        
+        cached = self._payloads.get(digest)
+        if cached is not None:
+            return cached
+        if data is None:
+            data = Path(image).read_bytes()
+        payload = (digest, self._encode_image_bytes(self._downscale(data)))
+        self._payloads.put(digest, payload, size=len(payload[1]))
+        return payload
+    
+    def _client(self):
+        """Pooled AsyncClient (one per event loop) and in-flight semaphore."""
+        if httpx is None:
+            raise RuntimeError("httpx not installed")
+        loop = asyncio.get_running_loop()
+        if self._client_obj is None or self._client_loop is not loop or self._client_obj.is_closed:
+            _retire_client(self._client_obj, self._client_loop)
+            self._client_obj = httpx.AsyncClient(
+                base_url=self.ollama_host,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=self._max_inflight, max_keepalive_connections=self._max_inflight),
+                transport=self._transport,
+            )
+            self._sem = asyncio.Semaphore(self._max_inflight)
+            self._client_loop = loop
+        return self._client_obj, self._sem
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        client, self._client_obj, self._client_loop = self._client_obj, None, None
+        if client is not None:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+    
+    async def _generate(self, image: ImageInput, prompt: str) -> Tuple[str, bool]:
+        """Ask the vision model about an image; returns (response, cached)."""
+        digest, image_b64 = await asyncio.to_thread(self._prepare_image, image)
+        key = (digest, prompt, self.vision_model)
+        answer = self._answers.get(key)
+        if answer is not None:
+            return answer, True
+        
+        client, sem = self._client()
+        async with sem:
+            response = await client.post(
+                "/api/generate",
+                json={
+                    "model": self.vision_model,
+                    "prompt": prompt,
+                    "images": [image_b64],
+                    "stream": False
+                }
+            )
+        
+        if response.status_code != 200:
+            raise Exception(f"Ollama API error: {response.status_code}")
+        
+        answer = response.json().get("response", "").strip()
+        self._answers.put(key, answer)
+        return answer, False
+    
     async def describe_image(self, image_path: str, detail_level: str = "normal") -> Dict[str, Any]:
         """
         Generate a description of an image.
@@ -77,11 +281,6 @@ class VisionProcessor:
             }
         
         try:
-            import requests
-            
-            # Encode image
-            image_b64 = self._encode_image(image_path)
-            
             # Craft prompt based on detail level
             prompts = {
                 "brief": "Describe this image in one sentence.",
@@ -91,28 +290,14 @@ class VisionProcessor:
             prompt = prompts.get(detail_level, prompts["normal"])
             
             # Call Ollama vision API
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": self.vision_model,
-                    "prompt": prompt,
-                    "images": [image_b64],
-                    "stream": False
-                },
-                timeout=60
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Ollama API error: {response.status_code}")
-            
-            result = response.json()
-            description = result.get("response", "").strip()
+            description, cached = await self._generate(image_path, prompt)
             
             return {
                 "success": True,
                 "description": description,
                 "detail_level": detail_level,
-                "model": self.vision_model
+                "model": self.vision_model,
+                "cached": cached
             }
             
         except Exception as e:
@@ -139,32 +324,14 @@ class VisionProcessor:
             }
         
         try:
-            import requests
-            
-            image_b64 = self._encode_image(image_path)
-            
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": self.vision_model,
-                    "prompt": question,
-                    "images": [image_b64],
-                    "stream": False
-                },
-                timeout=60
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Ollama API error: {response.status_code}")
-            
-            result = response.json()
-            answer = result.get("response", "").strip()
+            answer, cached = await self._generate(image_path, question)
             
             return {
                 "success": True,
                 "question": question,
                 "answer": answer,
-                "model": self.vision_model
+                "model": self.vision_model,
+                "cached": cached
             }
             
         except Exception as e:
@@ -188,8 +355,12 @@ class VisionProcessor:
             import pytesseract
             from PIL import Image
             
-            img = Image.open(image_path)
-            text = pytesseract.image_to_string(img)
+            def _ocr() -> str:
+                img = Image.open(io.BytesIO(image_path) if isinstance(image_path, (bytes, bytearray)) else image_path)
+                return pytesseract.image_to_string(img)
+            
+            # OCR is CPU-bound: keep it off the event loop
+            text = await asyncio.to_thread(_ocr)
             
             return {
                 "success": True,
@@ -257,7 +428,10 @@ class VisionProcessor:
         return {
             "available": self.available,
             "model": self.vision_model if self.available else None,
-            "ollama_host": self.ollama_host
+            "ollama_host": self.ollama_host,
+            "max_side": self.max_side,
+            "payload_cache": self._payloads.stats(),
+            "answer_cache": self._answers.stats()
         }
 
 
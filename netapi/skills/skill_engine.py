@@ -9,6 +9,7 @@ Enables the AI to:
 - Share tools with other instances
 """
 from __future__ import annotations
+import asyncio
 import time
 import ast
 import sys
@@ -67,6 +68,15 @@ class GeneratedSkill:
         }
 
 
+def _sandbox_pool():
+    """Warm sandbox workers from system/sandbox_pool.py (started on first use)."""
+    system_dir = str(Path(__file__).resolve().parents[2] / "system")
+    if system_dir not in sys.path:
+        sys.path.insert(0, system_dir)
+    from sandbox_pool import get_sandbox_pool
+    return get_sandbox_pool()
+
+
 class SkillEngine:
     """
     Autonomous skill generation and integration engine.
@@ -282,45 +292,16 @@ Function must be self-contained and use only standard library or common packages
                 self._save_skills()
                 return False
             
-            # Create isolated namespace
-            namespace = {
-                '__builtins__': __builtins__,
-                'print': lambda *args, **kwargs: None,  # Suppress prints
-            }
-            
-            # Execute code in namespace
-            exec(skill.code, namespace)
-            
-            # Check function exists
-            if skill.spec.name not in namespace:
+            # Run the examples in a forked, resource-limited sandbox worker
+            res = await asyncio.to_thread(
+                _sandbox_pool().test_code, skill.code, skill.spec.name, skill.spec.examples
+            )
+            if res.get("error") and not res.get("results"):
                 skill.test_passed = False
-                skill.error = f"Function '{skill.spec.name}' not found in generated code"
+                skill.error = res["error"]
                 self._save_skills()
                 return False
-            
-            func = namespace[skill.spec.name]
-            
-            # Run tests with examples
-            test_results = []
-            for example in skill.spec.examples:
-                try:
-                    input_val = eval(example['input'])
-                    expected = eval(example['output'])
-                    result = func(input_val)
-                    
-                    passed = result == expected
-                    test_results.append({
-                        "input": example['input'],
-                        "expected": example['output'],
-                        "actual": str(result),
-                        "passed": passed
-                    })
-                except Exception as e:
-                    test_results.append({
-                        "input": example['input'],
-                        "error": str(e),
-                        "passed": False
-                    })
+            test_results = res.get("results") or []
             
             # Check if all tests passed
             all_passed = all(t.get("passed", False) for t in test_results)
@@ -341,6 +322,10 @@ Function must be self-contained and use only standard library or common packages
             self._save_skills()
             return False
     
+    async def test_skills(self, skills: List[GeneratedSkill]) -> List[bool]:
+        """Test several skills in parallel (one sandbox worker each)."""
+        return list(await asyncio.gather(*(self.test_skill(s) for s in skills)))
+    
     async def integrate_skill(self, skill: GeneratedSkill) -> bool:
         """
         Integrate a tested skill into the system.
@@ -0,0 +1,123 @@
+"""
+Import-time profiling for API startup.
+
+Runs `python -X importtime -c "import netapi.app"` in a fresh interpreter and
+aggregates the per-module report: total import time, the slowest modules by
+cumulative time, self time per package (netapi modules are grouped per
+netapi.modules.<name>), and which known heavy dependencies were pulled in at
+startup. Used by tools/import_profile.py and GET /api/admin/startup.
+
+The child runs with PROFILE_ENV=1, which makes netapi.app skip database
+init and user seeding, and with crawler auto-run and autonomy disabled, so a
+profile never touches the live DB or takes the crawler lock.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Set in the profiled interpreter: import only, no startup side effects
+PROFILE_ENV = "KI_IMPORT_PROFILE"
+
+# Dependencies that must only be imported behind first use
+HEAVY_MODULES = (
+    "torch", "sentence_transformers", "transformers", "whisper", "faster_whisper",
+    "cv2", "chromadb", "qdrant_client", "TTS", "piper", "sklearn", "scipy",
+)
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text: str) -> List[ImportRecord]:
+    """Parse the stderr of `python -X importtime` (header and other lines are skipped)."""
+    records: List[ImportRecord] = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip(" ")
+        depth = (len(name) - len(stripped)) // 2
+        records.append(ImportRecord(stripped, self_us, cum_us, depth))
+    return records
+
+
+def package_of(module: str) -> str:
+    parts = module.split(".")
+    if parts[0] == "netapi" and len(parts) > 2 and parts[1] == "modules":
+        return ".".join(parts[:3])
+    if parts[0] == "netapi" and len(parts) > 1:
+        return ".".join(parts[:2])
+    return parts[0]
+
+
+def summarize(records: Iterable[ImportRecord], top: int = 20) -> Dict[str, Any]:
+    records = list(records)
+    total_us = sum(r.self_us for r in records)
+    by_pkg: Dict[str, int] = {}
+    for r in records:
+        pkg = package_of(r.module)
+        by_pkg[pkg] = by_pkg.get(pkg, 0) + r.self_us
+    loaded = {r.module.split(".")[0] for r in records}
+    slowest = sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:top]
+    return {
+        "modules": len(records),
+        "total_ms": round(total_us / 1000, 1),
+        "slowest": [{"module": r.module, "cumulative_ms": round(r.cumulative_us / 1000, 1),
+                     "self_ms": round(r.self_us / 1000, 1)} for r in slowest],
+        "packages": [{"package": k, "self_ms": round(v / 1000, 1)}
+                     for k, v in sorted(by_pkg.items(), key=lambda kv: kv[1], reverse=True)[:top]],
+        "heavy": sorted(m for m in HEAVY_MODULES if m in loaded),
+    }
+
+
+def profile_import(
+    target: str = "netapi.app",
+    top: int = 20,
+    python: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 180.0,
+) -> Dict[str, Any]:
+    """Import `target` in a fresh interpreter under -X importtime and summarize it."""
+    run_env = dict(os.environ)
+    run_env.pop("TEST_MODE", None)  # profile the production startup path
+    run_env.update(env or {})
+    run_env.update({PROFILE_ENV: "1", "KIANA_CRAWLER_AUTORUN": "0", "KI_ENABLE_AUTONOMY": "0"})
+    run_env["PYTHONDONTWRITEBYTECODE"] = run_env.get("PYTHONDONTWRITEBYTECODE", "1")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=str(REPO_ROOT), env=run_env, capture_output=True, text=True, timeout=timeout,
+    )
+    wall_ms = round((time.perf_counter() - t0) * 1000, 1)
+    records = parse_importtime(proc.stderr)
+    out = summarize(records, top=top)
+    out.update({
+        "target": target,
+        "ok": proc.returncode == 0,
+        "wall_ms": wall_ms,
+        "imported": sorted({r.module for r in records}),
+    })
+    if proc.returncode != 0:
+        tail = [ln for ln in proc.stderr.splitlines() if not ln.startswith("import time:")]
+        out["error"] = "\n".join(tail[-10:])
+    return out
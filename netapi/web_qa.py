@@ -8,7 +8,6 @@ import math
 from typing import Dict, Any, Optional, List
 
 import requests
-from bs4 import BeautifulSoup
 
 # --- Konfiguration -----------------------------------------------------------
 HEADERS = {
@@ -99,6 +98,7 @@ def _ddg_search(q: str, lang: str = "de", max_results: int = 3) -> List[Dict[str
         params = {"q": q, "kl": "de-de" if lang == "de" else "us-en"}
         r = requests.get(url, params=params, headers=HEADERS, timeout=DEFAULT_TIMEOUT)
         r.raise_for_status()
+        from bs4 import BeautifulSoup  # deferred: ~90 ms at API startup
         soup = BeautifulSoup(r.text, "html.parser")
         res = []
         for a in soup.select("a.result__a"):
@@ -217,6 +217,7 @@ def _fetch(url: str) -> Optional[str]:
 
 
 def _extract_candidate_paras(html: str) -> List[str]:
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, "html.parser")
     for bad in soup(["script", "style", "noscript", "header", "footer", "nav", "form", "aside"]):
         bad.extract()
@@ -2,11 +2,26 @@
 Workflow Engine
 
 User-defined automation workflows.
+
+Triggers are compiled into indexes when a workflow is added, so a monitor
+tick only touches workflows that can fire:
+- time:   min-heap of next fire times (late polls still fire, once)
+- event:  event name -> workflows
+- if:     per metric, thresholds sorted for bisect against one shared
+          metrics snapshot per tick
 """
 
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from datetime import datetime, timedelta
 from loguru import logger
 import asyncio
+import bisect
+import heapq
+import itertools
+import time
+
+
+METRICS = ("cpu", "memory", "disk")
 
 
 class Workflow:
@@ -17,6 +32,49 @@ class Workflow:
         self.trigger = trigger
         self.actions = actions
         self.enabled = True
+        self.removed = False
+        self.order = 0
+        self.kind, self.spec = parse_trigger(trigger)
+
+
+def parse_trigger(trigger: str) -> Tuple[Optional[str], Any]:
+    """
+    Compile a trigger string.
+    
+    Returns:
+        ("time", ("hourly",) | ("daily", hour, minute)),
+        ("event", name), ("if", (metric, threshold)) or (None, None)
+    """
+    kind, _, rest = trigger.partition(":")
+    try:
+        if kind == "time":
+            if rest == "hourly":
+                return "time", ("hourly",)
+            if rest.startswith("daily:"):
+                _, hour, minute = rest.split(":")
+                return "time", ("daily", int(hour), int(minute))
+        elif kind == "event":
+            return "event", rest
+        elif kind == "if":
+            metric, sep, threshold = rest.partition(">")
+            if sep and metric in METRICS:
+                return "if", (metric, float(threshold))
+    except ValueError:
+        pass
+    return None, None
+
+
+def next_fire_time(spec: Tuple, after: datetime) -> datetime:
+    """Start of the first matching minute whose window ends after ``after``"""
+    if spec[0] == "hourly":
+        slot = after.replace(minute=0, second=0, microsecond=0)
+        step = timedelta(hours=1)
+    else:
+        slot = after.replace(hour=spec[1], minute=spec[2], second=0, microsecond=0)
+        step = timedelta(days=1)
+    while slot + timedelta(minutes=1) <= after:
+        slot += step
+    return slot
 
 
 class WorkflowEngine:
@@ -30,70 +88,140 @@ class WorkflowEngine:
     - Event-based automation
     """
     
-    def __init__(self):
+    def __init__(self, metrics_ttl: float = 1.0):
         self.workflows: List[Workflow] = []
         self.running = False
         
+        # Trigger indexes
+        self._order = itertools.count()
+        self._time_heap: List[Tuple[float, int, Workflow]] = []
+        self._by_event: Dict[str, List[Workflow]] = {}
+        self._by_metric: Dict[str, Tuple[List[float], List[Workflow]]] = {}
+        
+        # Shared metrics snapshot
+        self.metrics_ttl = metrics_ttl
+        self._metrics: Dict[str, float] = {}
+        self._metrics_at = 0.0
+        
     def add_workflow(self, name: str, trigger: str, actions: List[Dict]):
         """Add new workflow"""
         workflow = Workflow(name, trigger, actions)
+        workflow.order = next(self._order)
         self.workflows.append(workflow)
+        self._index(workflow)
+        if workflow.kind is None:
+            logger.warning(f"⚠️ Unknown trigger for workflow {name}: {trigger}")
         logger.info(f"➕ Added workflow: {name}")
         
     def remove_workflow(self, name: str):
         """Remove workflow"""
+        for w in self.workflows:
+            if w.name == name:
+                w.removed = True  # lazily dropped from the time heap
         self.workflows = [w for w in self.workflows if w.name != name]
+        for event, flows in list(self._by_event.items()):
+            flows[:] = [w for w in flows if not w.removed]
+            if not flows:
+                del self._by_event[event]
+        for metric, (thresholds, flows) in list(self._by_metric.items()):
+            keep = [(t, w) for t, w in zip(thresholds, flows) if not w.removed]
+            if keep:
+                self._by_metric[metric] = ([t for t, _ in keep], [w for _, w in keep])
+            else:
+                del self._by_metric[metric]
         logger.info(f"➖ Removed workflow: {name}")
     
-    async def check_trigger(self, workflow: Workflow, context: Dict[str, Any]) -> bool:
-        """Check if workflow trigger is met"""
-        trigger = workflow.trigger
+    def _index(self, workflow: Workflow):
+        if workflow.kind == "time":
+            slot = next_fire_time(workflow.spec, datetime.now())
+            heapq.heappush(self._time_heap, (slot.timestamp(), workflow.order, workflow))
+        elif workflow.kind == "event":
+            self._by_event.setdefault(workflow.spec, []).append(workflow)
+        elif workflow.kind == "if":
+            metric, threshold = workflow.spec
+            if metric == "cpu" and "cpu" not in self._by_metric:
+                import psutil
+                psutil.cpu_percent(interval=None)  # prime the non-blocking counter
+            thresholds, flows = self._by_metric.setdefault(metric, ([], []))
+            pos = bisect.bisect_right(thresholds, threshold)
+            thresholds.insert(pos, threshold)
+            flows.insert(pos, workflow)
+    
+    def sample_metrics(self, force: bool = False) -> Dict[str, float]:
+        """
+        One shared snapshot of the metrics that have triggers.
         
-        # Time-based triggers (cron-like)
-        if trigger.startswith("time:"):
-            from datetime import datetime
-            time_spec = trigger.split(":", 1)[1]
-            
-            # Simple hourly trigger: time:hourly
-            if time_spec == "hourly":
-                return datetime.now().minute == 0
-            
-            # Daily at specific time: time:daily:14:30
-            if time_spec.startswith("daily:"):
-                _, hour, minute = time_spec.split(":")
-                now = datetime.now()
-                return now.hour == int(hour) and now.minute == int(minute)
-            
-            return False
+        CPU is the non-blocking delta since the previous sample; the
+        snapshot is reused for ``metrics_ttl`` seconds.
+        """
+        now = time.monotonic()
+        if not force and self._metrics and now - self._metrics_at < self.metrics_ttl:
+            return self._metrics
+        
+        import psutil
+        metrics: Dict[str, float] = {}
+        if "cpu" in self._by_metric:
+            metrics["cpu"] = psutil.cpu_percent(interval=None)
+        if "memory" in self._by_metric:
+            metrics["memory"] = psutil.virtual_memory().percent
+        if "disk" in self._by_metric:
+            metrics["disk"] = psutil.disk_usage('/').percent
+        self._metrics = metrics
+        self._metrics_at = now
+        return metrics
+    
+    def due_workflows(self, context: Dict[str, Any], now: Optional[float] = None) -> List[Workflow]:
+        """Workflows whose trigger fires on this tick (registration order)"""
+        now = time.time() if now is None else now
+        due: Dict[int, Workflow] = {}
         
         # Event-based triggers
-        if trigger.startswith("event:"):
-            event_name = trigger.split(":", 1)[1]
-            return context.get("event") == event_name
+        event = context.get("event")
+        if event is not None:
+            for w in self._by_event.get(event, ()):
+                due[w.order] = w
+        
+        # Time-based triggers (cron-like)
+        heap = self._time_heap
+        while heap and heap[0][0] <= now:
+            slot, order, w = heapq.heappop(heap)
+            if w.removed:
+                continue
+            due[order] = w
+            nxt = next_fire_time(w.spec, datetime.fromtimestamp(max(slot, now) + 60))
+            heapq.heappush(heap, (nxt.timestamp(), order, w))
         
         # Condition-based triggers
-        if trigger.startswith("if:"):
-            condition = trigger.split(":", 1)[1]
-            
-            # CPU usage check: if:cpu>80
-            if condition.startswith("cpu>"):
-                import psutil
-                threshold = int(condition.split(">")[1])
-                return psutil.cpu_percent(interval=0.1) > threshold
-            
-            # Memory check: if:memory>80
-            if condition.startswith("memory>"):
-                import psutil
-                threshold = int(condition.split(">")[1])
-                return psutil.virtual_memory().percent > threshold
-            
-            # Disk check: if:disk>80
-            if condition.startswith("disk>"):
+        if self._by_metric:
+            metrics = self.sample_metrics()
+            for metric, (thresholds, flows) in self._by_metric.items():
+                value = metrics.get(metric)
+                if value is None:
+                    continue
+                for w in flows[:bisect.bisect_left(thresholds, value)]:
+                    due[w.order] = w
+        
+        return [due[k] for k in sorted(due) if due[k].enabled]
+    
+    async def check_trigger(self, workflow: Workflow, context: Dict[str, Any]) -> bool:
+        """Check if workflow trigger is met (without consuming time slots)"""
+        if workflow.kind == "time":
+            now = datetime.now()
+            return next_fire_time(workflow.spec, now) <= now
+        
+        if workflow.kind == "event":
+            return context.get("event") == workflow.spec
+        
+        if workflow.kind == "if":
+            metric, threshold = workflow.spec
+            value = self.sample_metrics().get(metric)
+            if value is None:
+                # Metric not indexed (workflow not added to this engine)
                 import psutil
-                threshold = int(condition.split(">")[1])
-                return psutil.disk_usage('/').percent > threshold
-            
-            return False
+                value = {"cpu": lambda: psutil.cpu_percent(interval=None),
+                         "memory": lambda: psutil.virtual_memory().percent,
+                         "disk": lambda: psutil.disk_usage('/').percent}[metric]()
+            return value > threshold
         
         return False
     
@@ -159,14 +287,10 @@ class WorkflowEngine:
         for action in workflow.actions:
             await self.execute_action(action)
     
-    async def monitor(self, context: Dict[str, Any]):
+    async def monitor(self, context: Dict[str, Any], now: Optional[float] = None):
         """Monitor and execute workflows"""
-        for workflow in self.workflows:
-            if not workflow.enabled:
-                continue
-            
-            if await self.check_trigger(workflow, context):
-                await self.run_workflow(workflow)
+        for workflow in self.due_workflows(context, now):
+            await self.run_workflow(workflow)
     
     def get_workflows(self) -> List[Dict[str, Any]]:
         """Get all workflows"""
@@ -6,24 +6,42 @@ Features:
 - User preferences
 - Learned patterns
 - Context recall
-- SQLite storage
+- SQLite storage (WAL, one connection per thread, batched write-behind)
 """
+import asyncio
+import atexit
 import json
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from loguru import logger
 
+_STOP = object()
+
 
 class MemoryManager:
-    """Manages long-term memory storage"""
+    """Manages long-term memory storage
+    
+    Reads run in the default executor on a per-thread connection. Writes are
+    queued to a single writer thread that commits them in batches, so
+    callers on the event loop never block on the disk. store_conversation
+    awaits the commit of its batch, because SQLite assigns the ID there
+    (other managers may write the same file). Reads flush the queue first,
+    so they always see earlier writes.
+    """
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = 256,
+                 queue_size: int = 10000):
         """Initialize memory manager
         
         Args:
             db_path: Path to SQLite database
+            batch_size: Max queued writes per transaction
+            queue_size: Pending writes before callers are slowed down
         """
         if db_path is None:
             db_path = str(Path.home() / ".kiana" / "memory.db")
@@ -31,12 +49,38 @@ class MemoryManager:
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
+        self.batch_size = max(1, batch_size)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._conn_lock = threading.Lock()
+        self._closed = False
+        
         self._init_database()
+        
+        self.counters = {"writes": 0, "commits": 0, "failed_writes": 0}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._writer_loop, name="memory-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        
         logger.info(f"Memory manager initialized: {db_path}")
     
+    # -- connections ------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        """Long-lived connection of the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conn_lock:
+                self._connections.append(conn)
+        return conn
+    
     def _init_database(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn()
         cursor = conn.cursor()
         
         # Conversations table
@@ -71,8 +115,105 @@ class MemoryManager:
             )
         """)
         
+        # Lookup indexes (recent history, pattern upserts, frequency filters)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_patterns_type_data ON patterns(pattern_type, pattern_data)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_patterns_frequency ON patterns(frequency)")
+        
         conn.commit()
-        conn.close()
+    
+    # -- write-behind -----------------------------------------------------
+    def _writer_loop(self):
+        conn = self._conn()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            ops: List[Tuple[Callable, Future]] = []
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                else:
+                    ops.append(item)
+            if ops:
+                self._commit_batch(conn, ops)
+    
+    def _commit_batch(self, conn: sqlite3.Connection, ops: List[Tuple[Callable, Future]]):
+        results: List[Any] = []
+        try:
+            with conn:
+                for op, _ in ops:
+                    results.append(op(conn) if op else None)
+        except Exception as e:
+            if len(ops) == 1:
+                self.counters["failed_writes"] += 1
+                logger.error(f"Memory write failed: {e}")
+                ops[0][1].set_exception(e)
+                return
+            # Isolate the failing write, keep the rest of the batch
+            for single in ops:
+                self._commit_batch(conn, [single])
+            return
+        
+        self.counters["commits"] += 1
+        self.counters["writes"] += sum(1 for op, _ in ops if op)
+        for (_, fut), result in zip(ops, results):
+            fut.set_result(result)
+    
+    def _enqueue(self, op: Optional[Callable[[sqlite3.Connection], Any]]) -> Future:
+        if self._closed:
+            raise RuntimeError("memory manager is closed")
+        fut: Future = Future()
+        self._queue.put((op, fut))
+        return fut
+    
+    async def _submit(self, op: Optional[Callable[[sqlite3.Connection], Any]]) -> Future:
+        """Queue a write without blocking the loop (unless the queue is full)"""
+        try:
+            if self._closed:
+                raise RuntimeError("memory manager is closed")
+            fut: Future = Future()
+            self._queue.put_nowait((op, fut))
+            return fut
+        except queue.Full:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._enqueue, op)
+    
+    async def flush(self):
+        """Wait until every write queued so far is committed"""
+        fut = await self._submit(None)
+        await asyncio.wrap_future(fut)
+    
+    def flush_sync(self, timeout: Optional[float] = None):
+        """Blocking flush for non-async callers"""
+        self._enqueue(None).result(timeout)
+    
+    async def _read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: fn(self._conn()))
+    
+    def close(self):
+        """Commit pending writes and close all connections"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join(timeout=30)
+        with self._conn_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+        atexit.unregister(self.close)
     
     async def store_conversation(
         self,
@@ -90,26 +231,22 @@ class MemoryManager:
             metadata: Optional metadata
             
         Returns:
-            Conversation ID
+            Conversation ID once the row is committed, or -1 on failure
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO conversations (timestamp, user_input, ai_response, context, metadata)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
+            row = (
                 datetime.now().isoformat(),
                 user_input,
                 ai_response,
                 json.dumps(context) if context else None,
                 json.dumps(metadata) if metadata else None
-            ))
+            )
             
-            conv_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            fut = await self._submit(lambda conn: conn.execute("""
+                INSERT INTO conversations (timestamp, user_input, ai_response, context, metadata)
+                VALUES (?, ?, ?, ?, ?)
+            """, row).lastrowid)
+            conv_id = await asyncio.wrap_future(fut)
             
             logger.debug(f"Stored conversation: {conv_id}")
             return conv_id
@@ -128,18 +265,12 @@ class MemoryManager:
             List of conversation dicts
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            rows = await self._read(lambda conn: conn.execute("""
                 SELECT id, timestamp, user_input, ai_response, context, metadata
                 FROM conversations
                 ORDER BY timestamp DESC
                 LIMIT ?
-            """, (limit,))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            """, (limit,)).fetchall())
             
             conversations = []
             for row in rows:
@@ -169,19 +300,13 @@ class MemoryManager:
             List of matching conversations
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            rows = await self._read(lambda conn: conn.execute("""
                 SELECT id, timestamp, user_input, ai_response, context, metadata
                 FROM conversations
                 WHERE user_input LIKE ? OR ai_response LIKE ?
                 ORDER BY timestamp DESC
                 LIMIT ?
-            """, (f"%{query}%", f"%{query}%", limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            """, (f"%{query}%", f"%{query}%", limit)).fetchall())
             
             results = []
             for row in rows:
@@ -211,16 +336,11 @@ class MemoryManager:
             Success status
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = (key, json.dumps(value), datetime.now().isoformat())
+            await self._submit(lambda conn: conn.execute("""
                 INSERT OR REPLACE INTO preferences (key, value, updated_at)
                 VALUES (?, ?, ?)
-            """, (key, json.dumps(value), datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            """, row))
             
             logger.debug(f"Set preference: {key} = {value}")
             return True
@@ -240,15 +360,9 @@ class MemoryManager:
             Preference value or default
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = await self._read(lambda conn: conn.execute("""
                 SELECT value FROM preferences WHERE key = ?
-            """, (key,))
-            
-            row = cursor.fetchone()
-            conn.close()
+            """, (key,)).fetchone())
             
             if row:
                 return json.loads(row[0])
@@ -266,12 +380,7 @@ class MemoryManager:
             Dict of all preferences
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT key, value FROM preferences")
-            rows = cursor.fetchall()
-            conn.close()
+            rows = await self._read(lambda conn: conn.execute("SELECT key, value FROM preferences").fetchall())
             
             prefs = {}
             for row in rows:
@@ -298,34 +407,31 @@ class MemoryManager:
             Success status
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if pattern exists
             data_json = json.dumps(pattern_data)
-            cursor.execute("""
-                SELECT id, frequency FROM patterns
-                WHERE pattern_type = ? AND pattern_data = ?
-            """, (pattern_type, data_json))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update frequency
-                cursor.execute("""
-                    UPDATE patterns
-                    SET frequency = frequency + 1, last_seen = ?
-                    WHERE id = ?
-                """, (datetime.now().isoformat(), existing[0]))
-            else:
-                # Insert new pattern
-                cursor.execute("""
-                    INSERT INTO patterns (pattern_type, pattern_data, last_seen)
-                    VALUES (?, ?, ?)
-                """, (pattern_type, data_json, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            seen = datetime.now().isoformat()
+            
+            def upsert(conn: sqlite3.Connection):
+                # Runs on the writer thread, so check-then-write cannot race
+                existing = conn.execute("""
+                    SELECT id FROM patterns
+                    WHERE pattern_type = ? AND pattern_data = ?
+                """, (pattern_type, data_json)).fetchone()
+                
+                if existing:
+                    # Update frequency
+                    conn.execute("""
+                        UPDATE patterns
+                        SET frequency = frequency + 1, last_seen = ?
+                        WHERE id = ?
+                    """, (seen, existing[0]))
+                else:
+                    # Insert new pattern
+                    conn.execute("""
+                        INSERT INTO patterns (pattern_type, pattern_data, last_seen)
+                        VALUES (?, ?, ?)
+                    """, (pattern_type, data_json, seen))
+            
+            await self._submit(upsert)
             
             logger.debug(f"Learned pattern: {pattern_type}")
             return True
@@ -349,26 +455,20 @@ class MemoryManager:
             List of patterns
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             if pattern_type:
-                cursor.execute("""
+                rows = await self._read(lambda conn: conn.execute("""
                     SELECT pattern_type, pattern_data, frequency, last_seen
                     FROM patterns
                     WHERE pattern_type = ? AND frequency >= ?
                     ORDER BY frequency DESC
-                """, (pattern_type, min_frequency))
+                """, (pattern_type, min_frequency)).fetchall())
             else:
-                cursor.execute("""
+                rows = await self._read(lambda conn: conn.execute("""
                     SELECT pattern_type, pattern_data, frequency, last_seen
                     FROM patterns
                     WHERE frequency >= ?
                     ORDER BY frequency DESC
-                """, (min_frequency,))
-            
-            rows = cursor.fetchall()
-            conn.close()
+                """, (min_frequency,)).fetchall())
             
             patterns = []
             for row in rows:
@@ -425,8 +525,8 @@ class MemoryManager:
             Dict with memory stats
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.flush_sync(timeout=30)
+            cursor = self._conn().cursor()
             
             # Count conversations
             cursor.execute("SELECT COUNT(*) FROM conversations")
@@ -444,14 +544,14 @@ class MemoryManager:
             cursor.execute("SELECT MIN(timestamp) FROM conversations")
             oldest = cursor.fetchone()[0]
             
-            conn.close()
-            
             return {
                 "conversations": conv_count,
                 "preferences": pref_count,
                 "patterns": pattern_count,
                 "oldest_conversation": oldest,
-                "database_size": Path(self.db_path).stat().st_size
+                "database_size": Path(self.db_path).stat().st_size,
+                "pending_writes": self._queue.qsize(),
+                **self.counters
             }
             
         except Exception as e:
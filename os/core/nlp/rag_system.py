@@ -2,13 +2,18 @@
 RAG System (Retrieval Augmented Generation)
 
 Adds knowledge retrieval to LLM responses.
+
+Documents are chunked and indexed on disk (see vector_index.py); search
+ranks chunks by BM25 keyword score and embedding similarity (hybrid).
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 from loguru import logger
 from pathlib import Path
 import json
 
+from .vector_index import VectorIndex, chunk_text, get_default_embedder
+
 
 class Document:
     """A document in the knowledge base"""
@@ -30,89 +35,171 @@ class RAGSystem:
     - Citation support
     """
     
-    def __init__(self, knowledge_base_path: str = "~/.kiana_knowledge"):
+    def __init__(self, knowledge_base_path: str = "~/.kiana_knowledge", embedder: Any = None,
+                 chunk_size: int = 800, chunk_overlap: int = 100):
         self.kb_path = Path(knowledge_base_path).expanduser()
         self.kb_path.mkdir(parents=True, exist_ok=True)
         
         self.documents: List[Document] = []
-        self.embeddings: Optional[Any] = None  # TODO: Use ChromaDB or similar
+        self._docs_by_id: Dict[str, Document] = {}
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        
+        # Chunk index (BM25 + vectors), persisted under <kb>/index
+        self.index = VectorIndex(self.kb_path / "index", embedder or get_default_embedder())
         
         self.load_knowledge_base()
     
+    @property
+    def _docs_file(self) -> Path:
+        return self.kb_path / "documents.jsonl"
+    
     def load_knowledge_base(self):
-        """Load existing knowledge base"""
-        kb_file = self.kb_path / "documents.json"
-        
-        if kb_file.exists():
-            try:
-                with open(kb_file, 'r') as f:
-                    data = json.load(f)
-                    
-                for doc_data in data:
-                    doc = Document(
-                        content=doc_data["content"],
-                        metadata=doc_data["metadata"]
-                    )
-                    self.documents.append(doc)
-                
+        """Load existing knowledge base (and its index, rebuilding if needed)"""
+        legacy_file = self.kb_path / "documents.json"
+        
+        try:
+            if self._docs_file.exists():
+                with open(self._docs_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            doc_data = json.loads(line)
+                            self._register(Document(doc_data["content"], doc_data["metadata"]))
+            elif legacy_file.exists():
+                # One-time migration from the single JSON file
+                with open(legacy_file, 'r') as f:
+                    for doc_data in json.load(f):
+                        self._register(Document(doc_data["content"], doc_data["metadata"]))
+                self.save_knowledge_base()
+                legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+            
+            if self.documents:
                 logger.info(f"📚 Loaded {len(self.documents)} documents")
-            except Exception as e:
-                logger.error(f"Failed to load knowledge base: {e}")
+        except Exception as e:
+            logger.error(f"Failed to load knowledge base: {e}")
+        
+        if not self.index.load() or not self._index_covers_documents():
+            self.rebuild_index()
+    
+    def _index_covers_documents(self) -> bool:
+        indexed = set(self.index.doc_ids)
+        return all(doc.id in indexed for doc in self.documents if doc.content.strip())
+    
+    def _register(self, doc: Document):
+        self.documents.append(doc)
+        self._docs_by_id[doc.id] = doc
     
     def save_knowledge_base(self):
-        """Save knowledge base to disk"""
-        kb_file = self.kb_path / "documents.json"
-        
+        """Rewrite the whole knowledge base file (migration / clear only)"""
         try:
-            data = [
-                {
-                    "content": doc.content,
-                    "metadata": doc.metadata
-                }
-                for doc in self.documents
-            ]
-            
-            with open(kb_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
+            tmp = self._docs_file.with_suffix(".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for doc in self.documents:
+                    f.write(json.dumps({"content": doc.content, "metadata": doc.metadata}, ensure_ascii=False) + "\n")
+            tmp.replace(self._docs_file)
             logger.debug("💾 Knowledge base saved")
         except Exception as e:
             logger.error(f"Failed to save knowledge base: {e}")
     
+    def rebuild_index(self):
+        """Re-chunk and re-embed every document"""
+        self.index.clear()
+        self.index.add(self._chunks_for(self.documents))
+        if self.documents:
+            logger.info(f"🧭 Indexed {len(self.index)} chunks from {len(self.documents)} documents")
+    
+    def _chunks_for(self, docs: Iterable[Document]) -> List[Tuple[str, str]]:
+        return [
+            (doc.id, chunk)
+            for doc in docs
+            for chunk in chunk_text(doc.content, self.chunk_size, self.chunk_overlap)
+        ]
+    
     def add_document(self, content: str, metadata: Dict[str, Any] = None):
         """Add document to knowledge base"""
-        if metadata is None:
-            metadata = {}
+        self.add_documents([(content, metadata)])
+    
+    def add_documents(self, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> List[str]:
+        """
+        Add many documents at once.
         
-        metadata["id"] = f"doc_{len(self.documents)}"
+        Chunks are embedded in batches and the document file and index are
+        appended once for the whole batch.
         
-        doc = Document(content, metadata)
-        self.documents.append(doc)
+        Returns:
+            IDs of the added documents
+        """
+        new_docs: List[Document] = []
+        for content, metadata in items:
+            metadata = dict(metadata or {})
+            metadata["id"] = f"doc_{len(self.documents) + len(new_docs)}"
+            new_docs.append(Document(content, metadata))
+        if not new_docs:
+            return []
         
-        logger.info(f"📄 Added document: {metadata.get('title', 'Untitled')}")
-        self.save_knowledge_base()
+        try:
+            self.index.add(self._chunks_for(new_docs))
+            with open(self._docs_file, 'a', encoding='utf-8') as f:
+                f.write("".join(
+                    json.dumps({"content": d.content, "metadata": d.metadata}, ensure_ascii=False) + "\n"
+                    for d in new_docs
+                ))
+        except Exception as e:
+            logger.error(f"Failed to save knowledge base: {e}")
+        
+        for doc in new_docs:
+            self._register(doc)
+        
+        if len(new_docs) == 1:
+            logger.info(f"📄 Added document: {new_docs[0].metadata.get('title', 'Untitled')}")
+        else:
+            logger.info(f"📄 Added {len(new_docs)} documents")
+        return [d.id for d in new_docs]
     
-    def search(self, query: str, limit: int = 5) -> List[Document]:
+    def search_chunks(self, query: str, limit: int = 5, mode: str = "hybrid") -> List[Dict[str, Any]]:
         """
-        Search knowledge base
+        Rank indexed chunks for a query.
         
         Args:
             query: Search query
-            limit: Max results
+            limit: Max chunks
+            mode: "hybrid", "keyword" or "vector"
             
         Returns:
-            List of relevant documents
+            List of {"document", "text", "score"}
         """
-        # Simple keyword search for now
-        # TODO: Implement semantic search with embeddings
+        if mode == "keyword":
+            hits = self.index.keyword_search(query, limit)
+        elif mode == "vector":
+            hits = self.index.vector_search(query, limit)
+        else:
+            hits = self.index.hybrid_search(query, limit)
         
-        query_lower = query.lower()
-        results = []
+        return [
+            {"document": self._docs_by_id[self.index.doc_ids[row]], "text": self.index.texts[row], "score": score}
+            for row, score in hits
+            if self.index.doc_ids[row] in self._docs_by_id
+        ]
+    
+    def search(self, query: str, limit: int = 5, mode: str = "hybrid") -> List[Document]:
+        """
+        Search knowledge base
         
-        for doc in self.documents:
-            if query_lower in doc.content.lower():
+        Args:
+            query: Search query
+            limit: Max results
+            mode: "hybrid" (BM25 + embeddings), "keyword" or "vector"
+            
+        Returns:
+            List of relevant documents (best chunk first, deduplicated)
+        """
+        results: List[Document] = []
+        seen = set()
+        for hit in self.search_chunks(query, limit * 3, mode=mode):
+            doc = hit["document"]
+            if doc.id not in seen:
+                seen.add(doc.id)
                 results.append(doc)
-                
                 if len(results) >= limit:
                     break
         
@@ -130,35 +217,39 @@ class RAGSystem:
         Returns:
             Augmented prompt with context
         """
-        # Search knowledge base
-        relevant_docs = self.search(user_query, limit=max_context_docs)
+        # Search knowledge base (best chunks, not whole documents)
+        hits = self.search_chunks(user_query, limit=max_context_docs)
         
-        if not relevant_docs:
+        if not hits:
             return user_query
         
         # Build context
         context = "Relevant information from knowledge base:\n\n"
         
-        for i, doc in enumerate(relevant_docs, 1):
-            context += f"[{i}] {doc.content}\n\n"
+        for i, hit in enumerate(hits, 1):
+            context += f"[{i}] {hit['text']}\n\n"
         
         # Augmented prompt
         augmented = f"{context}\nUser query: {user_query}\n\nPlease answer based on the provided context."
         
-        logger.info(f"📚 Augmented prompt with {len(relevant_docs)} documents")
+        logger.info(f"📚 Augmented prompt with {len(hits)} chunks")
         return augmented
     
     def get_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics"""
         return {
             "total_documents": len(self.documents),
+            "total_chunks": len(self.index),
+            "embedder": self.index.embedder.name,
             "kb_path": str(self.kb_path)
         }
     
     def clear_knowledge_base(self):
         """Clear all documents"""
         self.documents = []
+        self._docs_by_id = {}
         self.save_knowledge_base()
+        self.index.clear()
         logger.info("🗑️ Knowledge base cleared")
 
 
@@ -0,0 +1,385 @@
+"""
+Vector Index for the RAG System
+
+Chunking, embeddings and an on-disk hybrid (BM25 + vector) index.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from loguru import logger
+from pathlib import Path
+import json
+import math
+import re
+import sys
+import zlib
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (2+ chars)"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1]
+
+
+def chunk_text(text: str, max_chars: int = 800, overlap: int = 100) -> List[str]:
+    """
+    Split text into chunks of at most ``max_chars``.
+
+    Paragraphs and sentences are kept together where possible; the last
+    ``overlap`` characters of a chunk are repeated at the start of the next.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces: List[str] = []
+    for para in re.split(r"\n\s*\n", text):
+        for sent in _SENTENCE_RE.split(para.strip()):
+            while len(sent) > max_chars:
+                pieces.append(sent[:max_chars])
+                sent = sent[max_chars:]
+            if sent:
+                pieces.append(sent)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            current = f"{tail} {piece}".strip() if len(tail) + 1 + len(piece) <= max_chars else piece
+        else:
+            current = f"{current} {piece}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class HashingEmbedder:
+    """
+    Dependency-free fallback embedder.
+
+    Word unigrams and character trigrams are hashed into ``dim`` signed
+    buckets and L2-normalised. No semantics, but robust to inflection and
+    typos and good enough for the vector half of hybrid ranking.
+    """
+
+    MAX_CACHE = 200_000
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def _features(self, tok: str) -> np.ndarray:
+        """Signed bucket weights of one token (cached; vocabularies are small)"""
+        vec = self._cache.get(tok)
+        if vec is None:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            padded = f"#{tok}#"
+            feats = [(tok, 1.0)] + [(padded[j:j + 3], 0.5) for j in range(len(padded) - 2)]
+            for feat, w in feats:
+                h = zlib.crc32(feat.encode())
+                vec[h % self.dim] += w if h & 0x80000000 else -w
+            if len(self._cache) >= self.MAX_CACHE:
+                self._cache.clear()
+            self._cache[tok] = vec
+        return vec
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for tok in tokenize(text):
+                out[row] += self._features(tok)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class SentenceEmbedder:
+    """Adapter for system/local_embeddings (sentence-transformers)"""
+
+    def __init__(self, service: Any, model: Optional[str] = None):
+        self.service = service
+        self.model = model or service.default_model
+        info = service.MODELS[self.model]
+        self.dim = info["dimension"]
+        self.name = info["name"]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        results = self.service.embed_batch(texts, model=self.model, normalize=True)
+        return np.asarray([r.embedding for r in results], dtype=np.float32).reshape(len(texts), self.dim)
+
+
+def get_default_embedder() -> Any:
+    """local_embeddings if sentence-transformers is installed, else hashing"""
+    try:
+        system_dir = Path(__file__).resolve().parents[3] / "system"
+        if str(system_dir) not in sys.path:
+            sys.path.insert(0, str(system_dir))
+        from local_embeddings import get_embedding_service  # type: ignore
+        return SentenceEmbedder(get_embedding_service())
+    except Exception as e:
+        logger.debug(f"Local embeddings unavailable, using hashing embedder: {e}")
+        return HashingEmbedder()
+
+
+class VectorIndex:
+    """
+    On-disk hybrid index over text chunks.
+
+    Files (in ``index_dir``):
+      vectors.f32   raw float32 rows, appended per batch
+      chunks.jsonl  one {"doc_id", "text"} line per row
+      meta.json     embedder name, dimension, row count
+
+    Vector search is a matrix product over the in-memory matrix; above
+    IVF_MIN_ROWS chunks it only scores the rows of the IVF_PROBE nearest
+    k-means cells, so query cost stays roughly flat as the index grows.
+    Keyword search is BM25 over an inverted index, so neither rescans or
+    re-lowercases documents per query.
+    """
+
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    IVF_MIN_ROWS = 20000
+    IVF_PROBE = 12
+
+    def __init__(self, index_dir: Path, embedder: Any):
+        self.dir = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder
+        self.dim = int(embedder.dim)
+
+        self.doc_ids: List[str] = []
+        self.texts: List[str] = []
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._rows = 0
+
+        # Inverted index: token -> (chunk rows, term freqs)
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: List[int] = []
+        self._length_arr: Optional[np.ndarray] = None
+
+        # Coarse quantiser (in memory, retrained when the index doubles)
+        self._centroids: Optional[np.ndarray] = None
+        self._cells = np.zeros(0, dtype=np.int32)
+        self._ivf_trained_rows = 0
+
+    # -- persistence --------------------------------------------------
+    @property
+    def _vectors_file(self) -> Path:
+        return self.dir / "vectors.f32"
+
+    @property
+    def _chunks_file(self) -> Path:
+        return self.dir / "chunks.jsonl"
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.dir / "meta.json"
+
+    def load(self) -> bool:
+        """Load the index; False if missing or built with another embedder."""
+        if not self._meta_file.exists():
+            return False
+        try:
+            meta = json.loads(self._meta_file.read_text())
+            if meta.get("embedder") != self.embedder.name or int(meta.get("dim", 0)) != self.dim:
+                logger.info(f"🔁 Embedder changed ({meta.get('embedder')} → {self.embedder.name}), index rebuild needed")
+                return False
+            rows = int(meta.get("rows", 0))
+            vectors = np.fromfile(self._vectors_file, dtype=np.float32) if self._vectors_file.exists() else np.zeros(0, np.float32)
+            chunks = []
+            with open(self._chunks_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        chunks.append(json.loads(line))
+            # A crash between appends leaves extra rows: trust meta.json and cut them off
+            rows = min(rows, len(chunks), vectors.size // self.dim)
+            if len(chunks) > rows or vectors.size > rows * self.dim:
+                with open(self._vectors_file, "r+b") as f:
+                    f.truncate(rows * self.dim * 4)
+                self._chunks_file.write_text(
+                    "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in chunks[:rows]), encoding="utf-8")
+            self._reset()
+            self._append(vectors[:rows * self.dim].reshape(rows, self.dim),
+                         [c["doc_id"] for c in chunks[:rows]], [c["text"] for c in chunks[:rows]])
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load vector index: {e}")
+            return False
+
+    def _write_meta(self):
+        tmp = self._meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"embedder": self.embedder.name, "dim": self.dim, "rows": self._rows}))
+        tmp.replace(self._meta_file)
+
+    def clear(self):
+        self._reset()
+        for f in (self._vectors_file, self._chunks_file):
+            if f.exists():
+                f.unlink()
+        self._write_meta()
+
+    def _reset(self):
+        self.doc_ids, self.texts, self._lengths = [], [], []
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._rows = 0
+        self._postings.clear()
+        self._posting_arrays.clear()
+        self._length_arr = None
+        self._centroids = None
+        self._cells = np.zeros(0, dtype=np.int32)
+        self._ivf_trained_rows = 0
+
+    # -- building -----------------------------------------------------
+    def add(self, items: List[Tuple[str, str]], batch_size: int = 256) -> int:
+        """
+        Embed and append (doc_id, chunk_text) pairs; persisted once.
+
+        Returns:
+            Number of chunks added
+        """
+        if not items:
+            return 0
+        vectors = [self.embedder.embed_batch([t for _, t in items[i:i + batch_size]])
+                   for i in range(0, len(items), batch_size)]
+        matrix = np.vstack(vectors).astype(np.float32, copy=False)
+
+        with open(self._vectors_file, "ab") as f:
+            f.write(matrix.tobytes())
+        with open(self._chunks_file, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps({"doc_id": d, "text": t}, ensure_ascii=False) + "\n" for d, t in items))
+        self._append(matrix, [d for d, _ in items], [t for _, t in items])
+        self._write_meta()
+        return len(items)
+
+    def _append(self, matrix: np.ndarray, doc_ids: List[str], texts: List[str]):
+        n = matrix.shape[0]
+        need = self._rows + n
+        if need > self._matrix.shape[0]:
+            grown = np.zeros((max(need, 2 * self._matrix.shape[0], 1024), self.dim), dtype=np.float32)
+            grown[:self._rows] = self._matrix[:self._rows]
+            self._matrix = grown
+        self._matrix[self._rows:need] = matrix
+
+        for offset, text in enumerate(texts):
+            row = self._rows + offset
+            tf: Dict[str, int] = {}
+            toks = tokenize(text)
+            for tok in toks:
+                tf[tok] = tf.get(tok, 0) + 1
+            for tok, c in tf.items():
+                rows, freqs = self._postings.setdefault(tok, ([], []))
+                rows.append(row)
+                freqs.append(c)
+                self._posting_arrays.pop(tok, None)
+            self._lengths.append(len(toks))
+
+        self.doc_ids.extend(doc_ids)
+        self.texts.extend(texts)
+        self._rows = need
+        self._length_arr = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    # -- search -------------------------------------------------------
+    def _train_ivf(self, iterations: int = 8):
+        rng = np.random.default_rng(0)
+        matrix = self._matrix[:self._rows]
+        nlist = int(math.sqrt(self._rows))
+        sample = matrix[rng.choice(self._rows, size=min(self._rows, 40 * nlist), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        self._centroids = centroids
+        self._cells = np.zeros(0, dtype=np.int32)
+        self._ivf_trained_rows = self._rows
+
+    def _ensure_ivf(self) -> bool:
+        if self._rows < self.IVF_MIN_ROWS:
+            return False
+        if self._centroids is None or self._rows >= 2 * self._ivf_trained_rows:
+            self._train_ivf()
+        done = self._cells.shape[0]
+        if done < self._rows:
+            new = [np.argmax(self._matrix[i:min(i + 8192, self._rows)] @ self._centroids.T, axis=1)
+                   for i in range(done, self._rows, 8192)]
+            self._cells = np.concatenate([self._cells] + [a.astype(np.int32) for a in new])
+        return True
+
+    def vector_search(self, query: str, limit: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        if self._rows == 0:
+            return []
+        q = self.embedder.embed_batch([query])[0]
+        if self._ensure_ivf():
+            probe = np.argpartition(-(self._centroids @ q), self.IVF_PROBE - 1)[:self.IVF_PROBE]
+            rows = np.flatnonzero(np.isin(self._cells, probe))
+            scores = self._matrix[rows] @ q
+            return [(int(rows[i]), s) for i, s in self._top(scores, limit) if s >= min_score]
+        scores = self._matrix[:self._rows] @ q
+        return [(i, s) for i, s in self._top(scores, limit) if s >= min_score]
+
+    def keyword_search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        terms = set(tokenize(query))
+        if self._rows == 0 or not terms:
+            return []
+        if self._length_arr is None:
+            self._length_arr = np.asarray(self._lengths, dtype=np.float32)
+        avgdl = float(self._length_arr.mean()) or 1.0
+        scores = np.zeros(self._rows, dtype=np.float32)
+        matched = False
+        for term in terms:
+            post = self._postings.get(term)
+            if not post:
+                continue
+            arrs = self._posting_arrays.get(term)
+            if arrs is None:
+                arrs = (np.asarray(post[0], dtype=np.int64), np.asarray(post[1], dtype=np.float32))
+                self._posting_arrays[term] = arrs
+            rows, tf = arrs
+            idf = math.log(1.0 + (self._rows - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = tf + self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self._length_arr[rows] / avgdl)
+            scores[rows] += idf * tf * (self.BM25_K1 + 1) / norm
+            matched = True
+        if not matched:
+            return []
+        return [(i, s) for i, s in self._top(scores, limit) if s > 0]
+
+    @staticmethod
+    def _top(scores: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        k = min(limit, scores.shape[0])
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(int(i), float(scores[i])) for i in idx]
+
+    def hybrid_search(self, query: str, limit: int, keyword_weight: float = 0.5,
+                      candidates: int = 50, rrf_k: int = 60,
+                      min_similarity: float = 0.2) -> List[Tuple[int, float]]:
+        """
+        Reciprocal-rank fusion of BM25 and vector rankings.
+
+        Vector hits below ``min_similarity`` (cosine) are ignored so an
+        unrelated query returns nothing instead of the nearest noise.
+        """
+        fused: Dict[int, float] = {}
+        for weight, hits in ((keyword_weight, self.keyword_search(query, candidates)),
+                             (1.0 - keyword_weight, self.vector_search(query, candidates, min_similarity))):
+            for rank, (row, _) in enumerate(hits):
+                fused[row] = fused.get(row, 0.0) + weight / (rrf_k + rank + 1)
+        ranked = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:limit]
@@ -0,0 +1,267 @@
+"""
+Incremental Audio Decoding & VAD Segmentation
+
+Building blocks for streaming transcription (see local_stt.transcribe_stream):
+- iter_pcm():     decode a file block by block to 16 kHz mono float32
+                  (WAV via the wave module, everything else via an ffmpeg pipe)
+- VADSegmenter:   energy-based voice activity detection that cuts the stream
+                  into speech segments at pauses (≤ max_segment seconds each)
+
+Memory stays bounded by one decode block plus one open segment, regardless
+of the recording length.
+"""
+from __future__ import annotations
+import shutil
+import subprocess
+import wave
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000  # what Whisper expects
+
+
+@dataclass
+class SpeechSegment:
+    """A contiguous stretch of speech (times in seconds from stream start)."""
+    index: int
+    start: float
+    end: float
+    audio: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _to_float(raw: bytes, sampwidth: int, channels: int) -> np.ndarray:
+    if sampwidth == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sampwidth == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sampwidth == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported sample width: {sampwidth}")
+    if channels > 1:
+        x = x[: len(x) - len(x) % channels].reshape(-1, channels).mean(axis=1)
+    return x
+
+
+class _Resampler:
+    """Streaming linear resampler (keeps phase across blocks)."""
+
+    def __init__(self, src_rate: int, dst_rate: int = SAMPLE_RATE):
+        self.step = src_rate / float(dst_rate)
+        self.pos = 0.0          # next output position, in input samples
+        self.tail = np.zeros(0, dtype=np.float32)
+
+    def __call__(self, block: np.ndarray) -> np.ndarray:
+        if self.step == 1.0:
+            return block
+        x = np.concatenate([self.tail, block])
+        if len(x) < 2:
+            self.tail = x
+            return np.zeros(0, dtype=np.float32)
+        idx = np.arange(self.pos, len(x) - 1, self.step)
+        out = np.interp(idx, np.arange(len(x)), x).astype(np.float32)
+        nxt = self.pos + len(idx) * self.step
+        keep = int(nxt)
+        self.tail = x[keep:]
+        self.pos = nxt - keep
+        return out
+
+
+def iter_pcm(path: str, block_seconds: float = 1.0) -> Iterator[np.ndarray]:
+    """Decode `path` incrementally into 16 kHz mono float32 blocks."""
+    p = Path(path)
+    if p.suffix.lower() == ".wav":
+        try:
+            yield from _iter_wav(p, block_seconds)
+            return
+        except (wave.Error, ValueError):
+            pass  # compressed/odd WAV: let ffmpeg handle it
+    yield from _iter_ffmpeg(p, block_seconds)
+
+
+def _iter_wav(path: Path, block_seconds: float) -> Iterator[np.ndarray]:
+    with wave.open(str(path), "rb") as wf:
+        rate, width, channels = wf.getframerate(), wf.getsampwidth(), wf.getnchannels()
+        frames = max(1, int(rate * block_seconds))
+        resample = _Resampler(rate)
+        while True:
+            raw = wf.readframes(frames)
+            if not raw:
+                break
+            out = resample(_to_float(raw, width, channels))
+            if len(out):
+                yield out
+
+
+def _iter_ffmpeg(path: Path, block_seconds: float) -> Iterator[np.ndarray]:
+    exe = shutil.which("ffmpeg")
+    if not exe:
+        raise RuntimeError("ffmpeg not found (needed to stream non-WAV audio)")
+    cmd = [exe, "-nostdin", "-v", "error", "-i", str(path), "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    nbytes = max(2, int(SAMPLE_RATE * block_seconds)) * 2
+    try:
+        while True:
+            raw = proc.stdout.read(nbytes)
+            if not raw:
+                break
+            yield _to_float(raw[: len(raw) - len(raw) % 2], 2, 1)
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def pcm16_to_float(raw: bytes) -> np.ndarray:
+    """Little-endian 16-bit mono PCM → float32 (for live audio streams)."""
+    return _to_float(raw[: len(raw) - len(raw) % 2], 2, 1)
+
+
+class VADSegmenter:
+    """
+    Energy-based voice activity detection over 30 ms frames.
+
+    A frame counts as speech when its level is `margin_db` above an adaptive
+    noise floor (and above `min_db` absolute). A segment closes after
+    `min_silence` seconds of non-speech, or is force-cut at `max_segment`
+    (Whisper works on ≤30 s windows) at the quietest recent frame.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        margin_db: float = 10.0,
+        min_db: float = -50.0,
+        min_silence: float = 0.5,
+        min_speech: float = 0.25,
+        padding: float = 0.2,
+        max_segment: float = 25.0,
+    ):
+        self.sr = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.silence_frames = max(1, int(min_silence * 1000 / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech * 1000 / frame_ms))
+        self.pad_frames = int(padding * 1000 / frame_ms)
+        self.max_frames = max(self.silence_frames + 1, int(max_segment * 1000 / frame_ms))
+
+        self.calib_frames = int(500 / frame_ms)
+        self.noise_db: Optional[float] = None
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._frame_no = 0                     # frames consumed so far
+        self._preroll: deque = deque(maxlen=self.pad_frames)
+        self._seg: List[np.ndarray] = []       # frames of the open segment
+        self._seg_db: List[float] = []
+        self._seg_start = 0
+        self._speech_frames = 0
+        self._silent_run = 0
+        self._count = 0
+
+    # -- frame classification -------------------------------------------------
+    def _is_speech(self, db: float) -> bool:
+        if self.noise_db is None or self._frame_no < self.calib_frames:
+            # Calibration: the floor is the quietest frame seen so far
+            self.noise_db = db if self.noise_db is None else min(self.noise_db, db)
+            return db > self.min_db and db > self.noise_db + self.margin_db
+        speech = db > self.min_db and db > self.noise_db + self.margin_db
+        # Floor drops fast on quiet frames, rises slowly on noise and only
+        # creeps during speech (so long monologues do not become "silence")
+        alpha = 0.002 if speech else (0.3 if db < self.noise_db else 0.05)
+        self.noise_db += alpha * (db - self.noise_db)
+        return speech
+
+    # -- segment bookkeeping --------------------------------------------------
+    def _emit(self, frames: List[np.ndarray], start_frame: int, speech_frames: int, out: List[SpeechSegment]) -> None:
+        if speech_frames < self.min_speech_frames or not frames:
+            return
+        audio = np.concatenate(frames)
+        start = start_frame * self.frame / self.sr
+        out.append(SpeechSegment(self._count, start, start + len(audio) / self.sr, audio))
+        self._count += 1
+
+    def _close(self, out: List[SpeechSegment]) -> None:
+        # Drop trailing silence beyond the padding
+        keep = len(self._seg) - max(0, self._silent_run - self.pad_frames)
+        self._emit(self._seg[:keep], self._seg_start, self._speech_frames, out)
+        self._preroll.extend(self._seg[keep:])
+        self._seg, self._seg_db = [], []
+        self._speech_frames = self._silent_run = 0
+
+    def _force_cut(self, out: List[SpeechSegment]) -> None:
+        # Cut at the quietest frame of the last ~2 s to avoid splitting words
+        window = min(len(self._seg_db) - 1, int(2 * self.sr / self.frame))
+        lo = len(self._seg_db) - window
+        cut = lo + int(np.argmin(self._seg_db[lo:])) if window > 0 else len(self._seg)
+        head, tail = self._seg[:cut], self._seg[cut:]
+        self._emit(head, self._seg_start, self._speech_frames, out)
+        self._seg_start += len(head)
+        self._seg, self._seg_db = tail, self._seg_db[cut:]
+        self._speech_frames = len(tail)
+        self._silent_run = 0
+
+    def _push(self, frame: np.ndarray, out: List[SpeechSegment]) -> None:
+        rms = float(np.sqrt(np.mean(frame * frame)) + 1e-10)
+        db = 20.0 * np.log10(rms)
+        speech = self._is_speech(db)
+        n = self._frame_no
+        self._frame_no += 1
+
+        if not self._seg:
+            if speech:
+                self._seg = list(self._preroll) + [frame]
+                self._seg_db = [db] * len(self._seg)
+                self._seg_start = n - len(self._preroll)
+                self._preroll.clear()
+                self._speech_frames, self._silent_run = 1, 0
+            else:
+                self._preroll.append(frame)
+            return
+
+        self._seg.append(frame)
+        self._seg_db.append(db)
+        if speech:
+            self._speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+            if self._silent_run >= self.silence_frames:
+                self._close(out)
+                return
+        if len(self._seg) >= self.max_frames:
+            self._force_cut(out)
+
+    def feed(self, samples: np.ndarray) -> List[SpeechSegment]:
+        """Consume audio; returns segments that completed within it."""
+        out: List[SpeechSegment] = []
+        x = np.concatenate([self._rest, np.asarray(samples, dtype=np.float32)]) if len(self._rest) else np.asarray(samples, dtype=np.float32)
+        usable = len(x) - len(x) % self.frame
+        for i in range(0, usable, self.frame):
+            self._push(x[i:i + self.frame], out)
+        self._rest = x[usable:]
+        return out
+
+    def flush(self) -> List[SpeechSegment]:
+        """End of stream: close the open segment, if any."""
+        out: List[SpeechSegment] = []
+        if self._seg:
+            self._silent_run = min(self._silent_run, self.pad_frames)
+            self._close(out)
+        return out
+
+
+def segment_file(path: str, **vad_kwargs) -> Iterator[SpeechSegment]:
+    """Decode and segment `path` lazily."""
+    vad = VADSegmenter(**vad_kwargs)
+    for block in iter_pcm(path):
+        yield from vad.feed(block)
+    yield from vad.flush()
@@ -4,12 +4,13 @@ Audit System für KI_ana
 Features:
 - Block Validation Tracking
 - Validator History
-- Audit Trail
+- Audit Trail (indexed, time-partitioned; see audit_store.py)
 - Compliance Reports
 """
 from __future__ import annotations
 import time
 import json
+import os
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
 from pathlib import Path
@@ -18,6 +19,8 @@ import sys
 # Add system path
 sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
 
+from audit_store import AuditStore
+
 
 @dataclass
 class AuditEntry:
@@ -72,43 +75,26 @@ class AuditSystem:
         from submind_manager import get_submind_manager
         self.device_id = get_submind_manager().this_device_id
         
-        # Audit trail
-        self.audit_trail: List[AuditEntry] = []
-        
         # Validation records
         self.validation_records: Dict[str, List[ValidationRecord]] = {}  # block_id -> records
         
-        # Storage
+        # Storage: time-partitioned segments with secondary indexes; only the
+        # hot window (KI_AUDIT_HOT_ENTRIES) is held in memory.
         self.audit_dir = Path.home() / "ki_ana" / "data" / "audit"
         self.audit_dir.mkdir(parents=True, exist_ok=True)
         
-        self.audit_file = self.audit_dir / "audit_trail.jsonl"
-        
-        # Load existing audit trail
-        self._load_audit_trail()
+        self.store = AuditStore(
+            self.audit_dir,
+            segment_seconds=int(os.getenv("KI_AUDIT_SEGMENT_SECONDS", "86400")),
+        )
+        print(f"📜 Audit store: {len(self.store)} entries")
         
         print(f"✅ Audit System initialized")
     
-    def _load_audit_trail(self):
-        """Load audit trail from file."""
-        if self.audit_file.exists():
-            try:
-                with open(self.audit_file, 'r') as f:
-                    for line in f:
-                        entry_data = json.loads(line.strip())
-                        entry = AuditEntry(**entry_data)
-                        self.audit_trail.append(entry)
-                print(f"📜 Loaded {len(self.audit_trail)} audit entries")
-            except Exception as e:
-                print(f"⚠️  Error loading audit trail: {e}")
-    
-    def _save_audit_entry(self, entry: AuditEntry):
-        """Append audit entry to file."""
-        try:
-            with open(self.audit_file, 'a') as f:
-                f.write(json.dumps(entry.to_dict()) + '\n')
-        except Exception as e:
-            print(f"⚠️  Error saving audit entry: {e}")
+    @property
+    def audit_trail(self) -> List[AuditEntry]:
+        """Recent audit entries (hot window only), oldest first."""
+        return [AuditEntry(**e) for e in self.store.hot()]
     
     def log_event(self, event_type: str, actor_id: str, target_id: str, 
                   action: str, details: Dict, result: str = "success") -> AuditEntry:
@@ -124,7 +110,7 @@ class AuditSystem:
             result: Result of action (success, failure)
         """
         entry = AuditEntry(
-            entry_id=f"audit_{int(time.time())}_{len(self.audit_trail)}",
+            entry_id=f"audit_{int(time.time())}_{len(self.store)}",
             timestamp=time.time(),
             event_type=event_type,
             actor_id=actor_id,
@@ -134,8 +120,7 @@ class AuditSystem:
             result=result
         )
         
-        self.audit_trail.append(entry)
-        self._save_audit_entry(entry)
+        self.store.append(entry.to_dict())
         
         return entry
     
@@ -180,80 +165,72 @@ class AuditSystem:
     
     def get_audit_trail(self, event_type: str = None, actor_id: str = None,
                        start_time: float = None, end_time: float = None,
-                       limit: int = 100) -> List[AuditEntry]:
+                       limit: int = 100, target_id: str = None) -> List[AuditEntry]:
         """
-        Get filtered audit trail.
+        Get filtered audit trail (newest first).
         
         Args:
             event_type: Filter by event type
             actor_id: Filter by actor
             start_time: Filter by start time
             end_time: Filter by end time
-            limit: Maximum number of entries
+            limit: Maximum number of entries (None = all)
+            target_id: Filter by affected block/resource
         """
-        entries = self.audit_trail
-        
-        # Apply filters
-        if event_type:
-            entries = [e for e in entries if e.event_type == event_type]
-        
-        if actor_id:
-            entries = [e for e in entries if e.actor_id == actor_id]
-        
-        if start_time:
-            entries = [e for e in entries if e.timestamp >= start_time]
-        
-        if end_time:
-            entries = [e for e in entries if e.timestamp <= end_time]
-        
-        # Sort by timestamp (newest first)
-        entries = sorted(entries, key=lambda x: x.timestamp, reverse=True)
+        page = self.get_audit_page(event_type=event_type, actor_id=actor_id, target_id=target_id,
+                                   start_time=start_time, end_time=end_time, limit=limit)
+        return page["entries"]
+    
+    def get_audit_page(self, event_type: str = None, actor_id: str = None,
+                       target_id: str = None, start_time: float = None,
+                       end_time: float = None, limit: int = 100,
+                       cursor: str = None) -> Dict:
+        """
+        Get one page of the filtered audit trail (newest first).
         
-        # Apply limit
-        return entries[:limit]
+        Returns {"entries": [...], "next_cursor": str | None}; pass next_cursor
+        back to continue after the last returned entry.
+        """
+        if limit is None:
+            entries = list(self.store.iter_entries(event_type=event_type, actor_id=actor_id,
+                                                   target_id=target_id, start_time=start_time,
+                                                   end_time=end_time))
+            next_cursor = None
+        else:
+            entries, next_cursor = self.store.query(event_type=event_type, actor_id=actor_id,
+                                                    target_id=target_id, start_time=start_time,
+                                                    end_time=end_time, limit=limit, cursor=cursor)
+        return {"entries": [AuditEntry(**e) for e in entries], "next_cursor": next_cursor}
     
     def generate_compliance_report(self, start_time: float = None, 
                                    end_time: float = None) -> Dict:
         """
         Generate compliance report.
         
-        Returns statistics and summary of audit trail.
+        Returns statistics and summary of audit trail. Uses per-segment
+        aggregates; only segments cut by the time range are scanned.
         """
-        # Filter entries by time
-        entries = self.get_audit_trail(start_time=start_time, end_time=end_time, limit=None)
-        
-        # Count by event type
-        event_counts = {}
-        for entry in entries:
-            event_counts[entry.event_type] = event_counts.get(entry.event_type, 0) + 1
-        
-        # Count by actor
-        actor_counts = {}
-        for entry in entries:
-            actor_counts[entry.actor_id] = actor_counts.get(entry.actor_id, 0) + 1
-        
-        # Count by result
-        success_count = sum(1 for e in entries if e.result == "success")
-        failure_count = sum(1 for e in entries if e.result == "failure")
-        
-        # Validation statistics
-        total_validations = len([e for e in entries if e.event_type == "block_validated"])
-        valid_blocks = len([e for e in entries if e.event_type == "block_validated" and e.result == "success"])
+        agg = self.store.aggregate(start_time=start_time, end_time=end_time)
+        total = agg["count"]
+        success_count = agg["results"].get("success", 0)
+        failure_count = agg["results"].get("failure", 0)
+        total_validations = agg["validations"]["total"]
+        valid_blocks = agg["validations"]["valid"]
         invalid_blocks = total_validations - valid_blocks
         
         return {
             "report_generated": time.time(),
             "period": {
-                "start": start_time or min((e.timestamp for e in entries), default=0),
-                "end": end_time or max((e.timestamp for e in entries), default=time.time())
+                "start": start_time or (agg["min_ts"] if agg["min_ts"] is not None else 0),
+                "end": end_time or (agg["max_ts"] if agg["max_ts"] is not None else time.time())
             },
-            "total_events": len(entries),
-            "event_types": event_counts,
-            "actors": actor_counts,
+            "total_events": total,
+            "event_types": agg["event_types"],
+            "actors": agg["actors"],
             "results": {
                 "success": success_count,
                 "failure": failure_count,
-                "success_rate": success_count / len(entries) if entries else 0
+                "success_rate": success_count / total if total else 0
             },
             "validations": {
                 "total": total_validations,
@@ -266,7 +243,8 @@ class AuditSystem:
     def get_stats(self) -> Dict:
         """Get audit system statistics."""
         return {
-            "total_audit_entries": len(self.audit_trail),
+            "total_audit_entries": len(self.store),
+            "hot_audit_entries": len(self.store.hot()),
             "blocks_with_validations": len(self.validation_records),
             "total_validations": sum(len(records) for records in self.validation_records.values()),
             "unique_validators": len(set(
@@ -0,0 +1,431 @@
+"""
+Audit Store für KI_ana
+
+Time-partitioned, indexed storage for the audit trail.
+
+Features:
+- Append-only JSONL segments per time bucket (default: 1 day)
+- Secondary indexes (event_type, actor_id, target_id) as byte offsets
+- Per-segment aggregates for incremental compliance reports
+- Cursor-based pagination (newest first)
+- Bounded in-memory hot window of recent entries
+
+Layout:
+    <audit_dir>/segments/seg_<bucket_start>.jsonl      entries
+    <audit_dir>/segments/seg_<bucket_start>.idx.json   sidecar index (closed segments)
+    <audit_dir>/segments/counts.json                   entry count per closed segment
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+INDEXED_FIELDS = ("event_type", "actor_id", "target_id")
+
+
+def _empty_agg() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "event_types": {},
+        "actors": {},
+        "results": {},
+        "validations": {"total": 0, "valid": 0},
+        "min_ts": None,
+        "max_ts": None,
+    }
+
+
+def _agg_add(agg: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    agg["count"] += 1
+    et = str(entry.get("event_type", ""))
+    actor = str(entry.get("actor_id", ""))
+    result = str(entry.get("result", ""))
+    agg["event_types"][et] = agg["event_types"].get(et, 0) + 1
+    agg["actors"][actor] = agg["actors"].get(actor, 0) + 1
+    agg["results"][result] = agg["results"].get(result, 0) + 1
+    if et == "block_validated":
+        agg["validations"]["total"] += 1
+        if result == "success":
+            agg["validations"]["valid"] += 1
+    ts = float(entry.get("timestamp", 0.0))
+    agg["min_ts"] = ts if agg["min_ts"] is None else min(agg["min_ts"], ts)
+    agg["max_ts"] = ts if agg["max_ts"] is None else max(agg["max_ts"], ts)
+
+
+def _agg_merge(dst: Dict[str, Any], src: Dict[str, Any]) -> None:
+    dst["count"] += src.get("count", 0)
+    for key in ("event_types", "actors", "results"):
+        for k, v in (src.get(key) or {}).items():
+            dst[key][k] = dst[key].get(k, 0) + v
+    dst["validations"]["total"] += (src.get("validations") or {}).get("total", 0)
+    dst["validations"]["valid"] += (src.get("validations") or {}).get("valid", 0)
+    for bound, fn in (("min_ts", min), ("max_ts", max)):
+        if src.get(bound) is not None:
+            dst[bound] = src[bound] if dst[bound] is None else fn(dst[bound], src[bound])
+
+
+@dataclass
+class _Segment:
+    """Index data for one time bucket."""
+    start: int
+    path: Path
+    offsets: List[int] = field(default_factory=list)
+    index: Dict[str, Dict[str, List[int]]] = field(default_factory=lambda: {f: {} for f in INDEXED_FIELDS})
+    agg: Dict[str, Any] = field(default_factory=_empty_agg)
+
+    def add(self, offset: int, entry: Dict[str, Any]) -> None:
+        self.offsets.append(offset)
+        for f in INDEXED_FIELDS:
+            self.index[f].setdefault(str(entry.get(f, "")), []).append(offset)
+        _agg_add(self.agg, entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"start": self.start, "offsets": self.offsets, "index": self.index, "agg": self.agg}
+
+
+class AuditStore:
+    """
+    Indexed, paged audit trail storage.
+
+    Only the current segment's index and the last ``hot_entries`` entries are
+    kept in memory; closed segments are indexed on first use and their
+    sidecar index is cached on disk (and in a small LRU).
+    """
+
+    def __init__(self, audit_dir: Path, *, segment_seconds: int = 86400,
+                 hot_entries: Optional[int] = None, cached_segments: int = 8):
+        self.audit_dir = Path(audit_dir)
+        self.seg_dir = self.audit_dir / "segments"
+        self.seg_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_seconds = max(1, int(segment_seconds))
+        self.hot_entries = int(hot_entries if hot_entries is not None else os.getenv("KI_AUDIT_HOT_ENTRIES", "5000"))
+        self._cached_segments = max(1, int(cached_segments))
+        self._lock = threading.RLock()
+
+        # (segment_start, offset) -> entry dict, newest last
+        self._hot: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+        self._closed: "OrderedDict[int, _Segment]" = OrderedDict()
+        self._current: Optional[_Segment] = None
+        self._counts: Dict[int, int] = {}
+        self._count = 0
+
+        self._migrate_legacy()
+        self._open_latest()
+
+    # ------------------------------------------------------------------
+    # Segment handling
+    # ------------------------------------------------------------------
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.segment_seconds) * self.segment_seconds
+
+    def _seg_path(self, start: int) -> Path:
+        return self.seg_dir / f"seg_{start}.jsonl"
+
+    def _idx_path(self, start: int) -> Path:
+        return self.seg_dir / f"seg_{start}.idx.json"
+
+    def segment_starts(self) -> List[int]:
+        """All segment bucket starts, oldest first."""
+        starts = []
+        for p in self.seg_dir.glob("seg_*.jsonl"):
+            try:
+                starts.append(int(p.stem.split("_", 1)[1]))
+            except ValueError:
+                continue
+        return sorted(starts)
+
+    def _scan(self, start: int) -> _Segment:
+        seg = _Segment(start=start, path=self._seg_path(start))
+        if not seg.path.exists():
+            return seg
+        with open(seg.path, "rb") as f:
+            offset = 0
+            for raw in f:
+                line = raw.strip()
+                if line:
+                    try:
+                        seg.add(offset, json.loads(line))
+                    except Exception:
+                        pass
+                offset += len(raw)
+        return seg
+
+    def _load_closed(self, start: int) -> _Segment:
+        with self._lock:
+            seg = self._closed.get(start)
+            if seg is not None:
+                self._closed.move_to_end(start)
+                return seg
+        idx_path = self._idx_path(start)
+        seg = None
+        if idx_path.exists():
+            try:
+                data = json.loads(idx_path.read_text())
+                seg = _Segment(start=start, path=self._seg_path(start), offsets=data["offsets"],
+                               index=data["index"], agg=data["agg"])
+            except Exception:
+                seg = None
+        if seg is None:
+            seg = self._scan(start)
+            try:
+                idx_path.write_text(json.dumps(seg.to_dict()))
+            except Exception as e:
+                print(f"⚠️  Error writing audit index: {e}")
+        with self._lock:
+            self._closed[start] = seg
+            while len(self._closed) > self._cached_segments:
+                self._closed.popitem(last=False)
+        return seg
+
+    def _segment(self, start: int) -> _Segment:
+        if self._current is not None and start == self._current.start:
+            return self._current
+        return self._load_closed(start)
+
+    def _load_counts(self) -> Dict[int, int]:
+        try:
+            data = json.loads((self.seg_dir / "counts.json").read_text())
+            return {int(k): int(v) for k, v in data.items()}
+        except Exception:
+            return {}
+
+    def _save_counts(self) -> None:
+        try:
+            (self.seg_dir / "counts.json").write_text(json.dumps({str(k): v for k, v in self._counts.items()}))
+        except Exception as e:
+            print(f"⚠️  Error writing audit counts: {e}")
+
+    def _open_latest(self) -> None:
+        starts = self.segment_starts()
+        # Per-segment entry counts of closed segments (avoids touching old indexes at startup)
+        self._counts = self._load_counts()
+        missing = [s for s in starts[:-1] if s not in self._counts]
+        for s in missing:
+            self._counts[s] = int(self._load_closed(s).agg.get("count", 0))
+        if missing:
+            self._save_counts()
+        self._count = sum(v for k, v in self._counts.items() if k in set(starts[:-1]))
+        if starts:
+            self._current = self._scan(starts[-1])
+            self._count += self._current.agg["count"]
+            # Warm the hot window from the newest segment only
+            tail = self._current.offsets[-self.hot_entries:] if self.hot_entries > 0 else []
+            for off in tail:
+                entry = self._read_at(self._current.path, off)
+                if entry is not None:
+                    self._hot[(self._current.start, off)] = entry
+
+    def _migrate_legacy(self) -> None:
+        """Split a legacy single-file audit_trail.jsonl into segments (once)."""
+        legacy = self.audit_dir / "audit_trail.jsonl"
+        if not legacy.exists():
+            return
+        try:
+            handles: Dict[int, Any] = {}
+            try:
+                with open(legacy, "r") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except Exception:
+                            continue
+                        start = self._bucket(float(entry.get("timestamp", 0.0)))
+                        if start not in handles:
+                            handles[start] = open(self._seg_path(start), "a")
+                        handles[start].write(json.dumps(entry) + "\n")
+            finally:
+                for h in handles.values():
+                    h.close()
+            for start in handles:
+                self._idx_path(start).unlink(missing_ok=True)
+            legacy.rename(legacy.with_suffix(".jsonl.migrated"))
+            print(f"📜 Migrated legacy audit trail into {len(handles)} segment(s)")
+        except Exception as e:
+            print(f"⚠️  Error migrating audit trail: {e}")
+
+    @staticmethod
+    def _read_at(path: Path, offset: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def append(self, entry: Dict[str, Any]) -> Tuple[int, int]:
+        """Persist one entry; returns its (segment_start, offset) position."""
+        start = self._bucket(float(entry.get("timestamp", time.time())))
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with self._lock:
+            if self._current is None or start > self._current.start:
+                if self._current is not None:
+                    self._close_current()
+                self._current = self._scan(start)
+            seg = self._current if start == self._current.start else self._load_closed(start)
+            with open(seg.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            seg.add(offset, entry)
+            if seg is not self._current:
+                # Late entry for an older bucket: refresh its sidecar
+                try:
+                    self._idx_path(start).write_text(json.dumps(seg.to_dict()))
+                except Exception:
+                    pass
+                self._counts[start] = int(seg.agg.get("count", 0))
+                self._save_counts()
+            self._count += 1
+            if self.hot_entries > 0:
+                self._hot[(start, offset)] = entry
+                while len(self._hot) > self.hot_entries:
+                    self._hot.popitem(last=False)
+            return start, offset
+
+    def _close_current(self) -> None:
+        seg = self._current
+        if seg is None:
+            return
+        try:
+            self._idx_path(seg.start).write_text(json.dumps(seg.to_dict()))
+        except Exception as e:
+            print(f"⚠️  Error writing audit index: {e}")
+        self._closed[seg.start] = seg
+        while len(self._closed) > self._cached_segments:
+            self._closed.popitem(last=False)
+        self._counts[seg.start] = int(seg.agg.get("count", 0))
+        self._save_counts()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._count
+
+    def hot(self) -> List[Dict[str, Any]]:
+        """Recent entries held in memory, oldest first."""
+        with self._lock:
+            return list(self._hot.values())
+
+    def _get(self, seg: _Segment, offset: int) -> Optional[Dict[str, Any]]:
+        entry = self._hot.get((seg.start, offset))
+        if entry is not None:
+            return entry
+        return self._read_at(seg.path, offset)
+
+    @staticmethod
+    def _candidates(seg: _Segment, filters: Dict[str, str]) -> List[int]:
+        if not filters:
+            return seg.offsets
+        lists = []
+        for f, v in filters.items():
+            lst = seg.index.get(f, {}).get(str(v))
+            if not lst:
+                return []
+            lists.append(lst)
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return lists[0]
+        rest = [set(l) for l in lists[1:]]
+        return [o for o in lists[0] if all(o in s for s in rest)]
+
+    def query(self, *, event_type: Optional[str] = None, actor_id: Optional[str] = None,
+              target_id: Optional[str] = None, start_time: Optional[float] = None,
+              end_time: Optional[float] = None, limit: Optional[int] = 100,
+              cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Filtered entries, newest first.
+
+        Returns (entries, next_cursor); pass next_cursor back to get the
+        following page. next_cursor is None when there are no more entries.
+        """
+        if limit is not None and limit <= 0:
+            return [], None
+        filters = {k: v for k, v in (("event_type", event_type), ("actor_id", actor_id),
+                                     ("target_id", target_id)) if v}
+        cur_seg, cur_off = None, None
+        if cursor:
+            try:
+                a, b = cursor.split(":", 1)
+                cur_seg, cur_off = int(a), int(b)
+            except ValueError:
+                cur_seg, cur_off = None, None
+
+        out: List[Dict[str, Any]] = []
+        last: Tuple[int, int] = (0, 0)
+        for start in reversed(self.segment_starts()):
+            if cur_seg is not None and start > cur_seg:
+                continue
+            if end_time is not None and start > end_time:
+                continue
+            if start_time is not None and start + self.segment_seconds <= start_time:
+                break
+            seg = self._segment(start)
+            for off in reversed(self._candidates(seg, filters)):
+                if cur_seg == start and cur_off is not None and off >= cur_off:
+                    continue
+                entry = self._get(seg, off)
+                if entry is None:
+                    continue
+                ts = float(entry.get("timestamp", 0.0))
+                if start_time is not None and ts < start_time:
+                    continue
+                if end_time is not None and ts > end_time:
+                    continue
+                if limit is not None and len(out) >= limit:
+                    return out, f"{last[0]}:{last[1]}"
+                out.append(entry)
+                last = (start, off)
+        return out, None
+
+    def iter_entries(self, **kw: Any) -> Iterator[Dict[str, Any]]:
+        """Iterate all matching entries page by page (newest first)."""
+        cursor = None
+        while True:
+            page, cursor = self.query(cursor=cursor, limit=500, **kw)
+            yield from page
+            if not cursor:
+                return
+
+    def aggregate(self, start_time: Optional[float] = None,
+                  end_time: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Report aggregates for a time range.
+
+        Segments fully inside the range contribute their stored aggregates;
+        only the boundary segments are scanned.
+        """
+        total = _empty_agg()
+        for start in self.segment_starts():
+            seg_end = start + self.segment_seconds
+            if end_time is not None and start > end_time:
+                break
+            if start_time is not None and seg_end <= start_time:
+                continue
+            seg = self._segment(start)
+            inside = (start_time is None or start >= start_time) and \
+                     (end_time is None or seg_end <= end_time)
+            if inside:
+                _agg_merge(total, seg.agg)
+                continue
+            for off in seg.offsets:
+                entry = self._get(seg, off)
+                if entry is None:
+                    continue
+                ts = float(entry.get("timestamp", 0.0))
+                if start_time is not None and ts < start_time:
+                    continue
+                if end_time is not None and ts > end_time:
+                    continue
+                _agg_add(total, entry)
+        return total
@@ -13,13 +13,14 @@ Environment:
   KI_WORKER_MAX_ATTEMPTS (default 5)
   KI_WORKER_LEASE_SECONDS (default 60)
   KI_WORKER_IDLE_SLEEP (default 2)
+  KI_WORKER_BATCH (default 1) – jobs claimed per lease
 """
 from __future__ import annotations
 import os, time, json, traceback
 from typing import Dict, Any
 
 from ..netapi.db import SessionLocal
-from ..netapi.models import Job
+from ..netapi.modules.jobs.leasing import LeasedJob, complete_job, fail_job, lease_jobs
 from pathlib import Path
 import socket
 
@@ -38,6 +39,7 @@ except Exception:
 MAX_ATTEMPTS = int(os.getenv("KI_WORKER_MAX_ATTEMPTS", "5"))
 LEASE_SECONDS = int(os.getenv("KI_WORKER_LEASE_SECONDS", "60"))
 IDLE_SLEEP = float(os.getenv("KI_WORKER_IDLE_SLEEP", "2"))
+BATCH = max(1, int(os.getenv("KI_WORKER_BATCH", "1")))
 ALLOWED = {"crawler.run", "crawler.promote"}
 
 
@@ -50,38 +52,21 @@ def _backoff(attempts: int) -> int:
     return min(3600, 5 * (2 ** min(7, attempts)))
 
 
-def _lease_one(db) -> Job | None:
-    now = _now()
-    j = (
-        db.query(Job)
-        .filter(Job.type.in_(list(ALLOWED)), ((Job.status == "queued") | (Job.lease_until < now)))
-        .order_by(Job.priority.desc(), Job.id.asc())
-        .first()
-    )
-    if not j:
-        return None
-    j.status = "leased"
-    j.lease_until = now + LEASE_SECONDS
-    j.updated_at = now
-    db.add(j); db.commit(); db.refresh(j)
-    return j
-
-
-def _update_done(db, j: Job):
-    j.status = "done"; j.lease_until = 0; j.updated_at = _now(); j.error = ""
-    db.add(j); db.commit()
-
-
-def _update_fail(db, j: Job, err: str):
-    j.attempts = int(j.attempts or 0) + 1
-    j.error = (err or "")[:2000]
-    now = _now()
-    if j.attempts >= MAX_ATTEMPTS:
-        j.status = "failed"; j.lease_until = 0
-    else:
-        j.status = "queued"; j.lease_until = now + _backoff(j.attempts)
-    j.updated_at = now
-    db.add(j); db.commit()
+def _lease_batch(db) -> list[LeasedJob]:
+    # The batch shares one lease, so give it time for every job in it
+    return lease_jobs(db, sorted(ALLOWED), n=BATCH, lease_seconds=LEASE_SECONDS * BATCH)
+
+
+def _update_done(db, j: LeasedJob):
+    if not complete_job(db, j.id, j.lease_token):
+        print(f"[crawler_worker] lease of job {j.id} expired; result dropped")
+
+
+def _update_fail(db, j: LeasedJob, err: str):
+    res = fail_job(db, j.id, err, lease_token=j.lease_token, max_attempts=MAX_ATTEMPTS,
+                   next_delay=_backoff(int(j.attempts or 0) + 1))
+    if res is None:
+        print(f"[crawler_worker] lease of job {j.id} expired; failure not recorded")
 
 
 def _write_heartbeat(last: dict | None = None) -> None:
@@ -118,7 +103,7 @@ def _write_heartbeat(last: dict | None = None) -> None:
         pass
 
 
-def _exec(j: Job) -> None:
+def _exec(j: LeasedJob) -> None:
     payload: Dict[str, Any] = {}
     try:
         payload = json.loads(j.payload or "{}")
@@ -141,27 +126,28 @@ def main():
                 now = _now()
                 if now - last_hb >= 10:
                     _write_heartbeat(None); last_hb = now
-                j = _lease_one(db)
-                if not j:
+                jobs = _lease_batch(db)
+                if not jobs:
                     time.sleep(IDLE_SLEEP)
                     # ensure periodic heartbeat even if idle for long
                     now = _now()
                     if now - last_hb >= 10:
                         _write_heartbeat(None); last_hb = now
                     continue
-                print(f"[crawler_worker] leased job {j.id} type={j.type} attempts={j.attempts}")
-                try:
-                    _exec(j)
-                    _update_done(db, j)
-                    print(f"[crawler_worker] done job {j.id}")
-                    _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "done"})
-                    last_hb = _now()
-                except Exception as e:
-                    tb = traceback.format_exc()[-1000:]
-                    print(f"[crawler_worker] fail job {j.id}: {e}\n{tb}")
-                    _update_fail(db, j, f"{type(e).__name__}: {e}")
-                    _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "failed"})
-                    last_hb = _now()
+                for j in jobs:
+                    print(f"[crawler_worker] leased job {j.id} type={j.type} attempts={j.attempts}")
+                    try:
+                        _exec(j)
+                        _update_done(db, j)
+                        print(f"[crawler_worker] done job {j.id}")
+                        _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "done"})
+                        last_hb = _now()
+                    except Exception as e:
+                        tb = traceback.format_exc()[-1000:]
+                        print(f"[crawler_worker] fail job {j.id}: {e}\n{tb}")
+                        _update_fail(db, j, f"{type(e).__name__}: {e}")
+                        _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "failed"})
+                        last_hb = _now()
         except KeyboardInterrupt:
             print("[crawler_worker] exiting (KeyboardInterrupt)")
             break
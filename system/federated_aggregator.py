@@ -0,0 +1,280 @@
+"""
+Streaming FedAvg Aggregator für KI_ana
+
+Folds model updates into running weighted sums as they arrive, so memory
+stays O(model) instead of O(peers × model).
+
+Features:
+- Round IDs with per-round deadlines (stragglers are counted, not waited for)
+- Bounded receive queue, aggregation on a background worker thread
+- Sparse/float16 payloads scattered directly into the sums (no dense copies)
+- Duplicate / late / overflow accounting
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+import sys
+
+import numpy as np
+
+# Add system path
+sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
+
+import federated_codec as codec
+
+
+@dataclass
+class RoundState:
+    """Running sums of one aggregation round."""
+    round_id: str
+    started_at: float
+    deadline: float
+    sums: Dict[str, np.ndarray] = field(default_factory=dict)
+    weight_sum: float = 0.0
+    metric_sums: Dict[str, float] = field(default_factory=dict)
+    metric_counts: Dict[str, int] = field(default_factory=dict)
+    contributors: List[str] = field(default_factory=list)
+    extensions: int = 0
+
+
+@dataclass
+class RoundResult:
+    """Outcome of a closed round (weights = sample-weighted mean of the deltas)."""
+    round_id: str
+    weights: Dict[str, np.ndarray]
+    contributors: List[str]
+    total_samples: int
+    avg_metrics: Dict[str, float]
+    started_at: float
+    closed_at: float
+    reason: str  # "target" | "deadline" | "manual"
+
+
+class StreamingAggregator:
+    """
+    Streaming FedAvg.
+
+    ``submit()`` is safe to call from the P2P receive thread: it only puts the
+    raw message data on a bounded queue. A worker thread decodes each update,
+    adds ``samples_count * delta`` into the round's running sums and closes the
+    round when ``target_updates`` arrived or the deadline passed.
+    """
+
+    def __init__(self, on_complete: Optional[Callable[[RoundResult], None]] = None,
+                 deadline_seconds: float = 60.0, min_updates: int = 1,
+                 target_updates: int = 3, queue_size: int = 256, history_size: int = 64):
+        self.on_complete = on_complete
+        self.deadline_seconds = float(deadline_seconds)
+        self.min_updates = max(1, int(min_updates))
+        self.target_updates = max(self.min_updates, int(target_updates))
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()  # counters touched by receive threads
+        self._round: Optional[RoundState] = None
+        self._closed_rounds: deque = deque(maxlen=history_size)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.counters = {
+            "received": 0,
+            "folded": 0,
+            "late": 0,
+            "duplicate": 0,
+            "overflow": 0,
+            "invalid": 0,
+            "rounds": 0,
+        }
+
+    # -- lifecycle --------------------------------------------------------
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, name="fedavg-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # -- rounds -----------------------------------------------------------
+    def open_round(self, round_id: Optional[str] = None, deadline_seconds: Optional[float] = None) -> str:
+        """Open a new round (an open round with updates is closed first)."""
+        with self._lock:
+            prev = self._finish_locked("manual") if self._round and self._round.contributors else None
+            self._round = self._new_round(round_id, deadline_seconds)
+            rid = self._round.round_id
+        if prev:
+            self._emit(prev)
+        return rid
+
+    def current_round(self) -> Optional[str]:
+        with self._lock:
+            return self._round.round_id if self._round else None
+
+    def close_round(self, min_updates: Optional[int] = None) -> Optional[RoundResult]:
+        """
+        Close the open round now (queued updates are folded first).
+
+        Returns:
+            RoundResult or None if fewer than ``min_updates`` contributed
+        """
+        need = self.min_updates if min_updates is None else max(1, int(min_updates))
+        with self._lock:
+            self._drain_locked()
+            if not self._round or len(self._round.contributors) < need:
+                return None
+            result = self._finish_locked("manual")
+        self._emit(result)
+        return result
+
+    def submit(self, data: Dict[str, Any]) -> bool:
+        """Queue a model update (message data dict). Never blocks."""
+        try:
+            self._queue.put_nowait(data)
+            accepted = True
+        except queue.Full:
+            accepted = False
+        with self._submit_lock:
+            self.counters["received"] += 1
+            if not accepted:
+                self.counters["overflow"] += 1
+        return accepted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            r = self._round
+            return {
+                **self.counters,
+                "queued": self._queue.qsize(),
+                "round_id": r.round_id if r else None,
+                "round_contributors": len(r.contributors) if r else 0,
+                "round_deadline_in": round(r.deadline - time.time(), 3) if r else None,
+                "pending": self._queue.qsize() + (len(r.contributors) if r else 0),
+            }
+
+    # -- internals --------------------------------------------------------
+    def _new_round(self, round_id: Optional[str], deadline_seconds: Optional[float]) -> RoundState:
+        now = time.time()
+        ttl = self.deadline_seconds if deadline_seconds is None else float(deadline_seconds)
+        return RoundState(round_id=round_id or str(uuid.uuid4()), started_at=now, deadline=now + ttl)
+
+    def _worker(self):
+        while self._running:
+            with self._lock:
+                wait = (self._round.deadline - time.time()) if self._round else 0.5
+            try:
+                item = self._queue.get(timeout=min(0.5, max(0.01, wait)))
+            except queue.Empty:
+                item = None
+            result = None
+            with self._lock:
+                if item is not None:
+                    self._fold_locked(item)
+                result = self._check_locked()
+            if result:
+                self._emit(result)
+
+    def _drain_locked(self):
+        while True:
+            try:
+                self._fold_locked(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _fold_locked(self, data: Dict[str, Any]):
+        rid = data.get("round_id")
+        if rid and rid in self._closed_rounds:
+            self.counters["late"] += 1
+            return
+        if self._round is None:
+            self._round = self._new_round(rid, None)
+        elif rid and rid != self._round.round_id:
+            # Update for a round we never opened while another is running
+            self.counters["late"] += 1
+            return
+
+        r = self._round
+        device_id = data.get("device_id", "")
+        if device_id in r.contributors:
+            self.counters["duplicate"] += 1
+            return
+
+        n = int(data.get("samples_count") or 0)
+        try:
+            if n <= 0:
+                raise ValueError("samples_count must be positive")
+            if "payload" in data:
+                codec.accumulate(codec.from_b64(data["payload"]), r.sums, scale=n)
+            else:
+                # Legacy JSON float lists
+                for name, values in (data.get("weights") or {}).items():
+                    arr = np.asarray(values, dtype=np.float32)
+                    acc = r.sums.get(name)
+                    if acc is None:
+                        r.sums[name] = np.float32(n) * arr
+                    elif acc.shape == arr.shape:
+                        acc += np.float32(n) * arr
+                    else:
+                        raise ValueError(f"shape mismatch for {name}")
+        except Exception as e:
+            self.counters["invalid"] += 1
+            print(f"⚠️  Dropping invalid model update from {device_id}: {e}")
+            return
+
+        r.weight_sum += n
+        r.contributors.append(device_id)
+        for k, v in (data.get("metrics") or {}).items():
+            r.metric_sums[k] = r.metric_sums.get(k, 0.0) + float(v)
+            r.metric_counts[k] = r.metric_counts.get(k, 0) + 1
+        self.counters["folded"] += 1
+
+    def _check_locked(self) -> Optional[RoundResult]:
+        r = self._round
+        if r is None:
+            return None
+        if len(r.contributors) >= self.target_updates:
+            return self._finish_locked("target")
+        if time.time() >= r.deadline:
+            if len(r.contributors) >= self.min_updates:
+                return self._finish_locked("deadline")
+            # Not enough updates yet: give stragglers another window
+            r.deadline = time.time() + self.deadline_seconds
+            r.extensions += 1
+        return None
+
+    def _finish_locked(self, reason: str) -> RoundResult:
+        r = self._round
+        self._round = None
+        self._closed_rounds.append(r.round_id)
+        self.counters["rounds"] += 1
+        inv = np.float32(1.0 / r.weight_sum) if r.weight_sum else np.float32(0.0)
+        for arr in r.sums.values():
+            arr *= inv
+        return RoundResult(
+            round_id=r.round_id,
+            weights=r.sums,
+            contributors=list(r.contributors),
+            total_samples=int(r.weight_sum),
+            avg_metrics={k: r.metric_sums[k] / r.metric_counts[k] for k in r.metric_sums},
+            started_at=r.started_at,
+            closed_at=time.time(),
+            reason=reason,
+        )
+
+    def _emit(self, result: RoundResult):
+        if not self.on_complete:
+            return
+        try:
+            self.on_complete(result)
+        except Exception as e:
+            print(f"⚠️  Error in round completion handler: {e}")
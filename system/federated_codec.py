@@ -0,0 +1,200 @@
+"""
+Federated Update Codec für KI_ana
+
+Compact binary encoding for model weight deltas shared between Subminds.
+
+Features:
+- float16 dense encoding (2 bytes / parameter instead of ~20 in JSON)
+- Top-k sparsification (uint32 index + float16 value per kept entry)
+- Error feedback: dropped / rounded mass is carried into the next round
+- Self-describing header (layer names, shapes, encoding)
+
+Wire format:
+    b"KFU1" | uint32 header_len | header JSON | layer payloads...
+"""
+from __future__ import annotations
+import base64
+import json
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"KFU1"
+ENCODINGS = ("f16", "topk", "f32")
+
+
+def _topk_indices(flat: np.ndarray, k: int) -> np.ndarray:
+    if k >= flat.size:
+        return np.arange(flat.size, dtype=np.uint32)
+    idx = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]
+    idx.sort()
+    return idx.astype(np.uint32)
+
+
+def encode(layers: Dict[str, np.ndarray], encoding: str = "f16",
+           topk_ratio: float = 0.01) -> bytes:
+    """
+    Encode a dict of float arrays.
+
+    Args:
+        layers: layer_name -> array (any shape)
+        encoding: "f16" (dense half precision), "topk" (sparse) or "f32"
+        topk_ratio: Fraction of entries kept per layer for "topk"
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"unknown encoding: {encoding}")
+
+    meta = []
+    chunks = []
+    for name, arr in layers.items():
+        a = np.asarray(arr, dtype=np.float32)
+        flat = a.ravel()
+        entry = {"name": name, "shape": list(a.shape)}
+        if encoding == "topk":
+            k = max(1, int(round(flat.size * topk_ratio))) if flat.size else 0
+            idx = _topk_indices(flat, k)
+            chunks.append(idx.tobytes())
+            chunks.append(flat[idx].astype(np.float16).tobytes())
+            entry["k"] = int(idx.size)
+        elif encoding == "f16":
+            chunks.append(flat.astype(np.float16).tobytes())
+        else:
+            chunks.append(flat.tobytes())
+        meta.append(entry)
+
+    header = json.dumps({"encoding": encoding, "layers": meta}, separators=(",", ":")).encode()
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header, *chunks])
+
+
+def decode(blob: bytes) -> Dict[str, np.ndarray]:
+    """Decode bytes produced by encode() into dense float32 arrays."""
+    if blob[:4] != MAGIC:
+        raise ValueError("not a federated update payload")
+    (hlen,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + hlen])
+    encoding = header["encoding"]
+    pos = 8 + hlen
+    out: Dict[str, np.ndarray] = {}
+    for entry in header["layers"]:
+        shape = tuple(entry["shape"])
+        size = int(np.prod(shape)) if shape else 1
+        if encoding == "topk":
+            k = entry["k"]
+            idx = np.frombuffer(blob, dtype=np.uint32, count=k, offset=pos)
+            pos += 4 * k
+            vals = np.frombuffer(blob, dtype=np.float16, count=k, offset=pos)
+            pos += 2 * k
+            dense = np.zeros(size, dtype=np.float32)
+            dense[idx] = vals
+        elif encoding == "f16":
+            dense = np.frombuffer(blob, dtype=np.float16, count=size, offset=pos).astype(np.float32)
+            pos += 2 * size
+        else:
+            dense = np.frombuffer(blob, dtype=np.float32, count=size, offset=pos).copy()
+            pos += 4 * size
+        out[entry["name"]] = dense.reshape(shape)
+    return out
+
+
+def encoding_of(blob: bytes) -> str:
+    (hlen,) = struct.unpack_from("<I", blob, 4)
+    return json.loads(blob[8:8 + hlen])["encoding"]
+
+
+def to_b64(blob: bytes) -> str:
+    return base64.b64encode(blob).decode("ascii")
+
+
+def from_b64(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"))
+
+
+class ErrorFeedback:
+    """
+    Residual accumulator for lossy update compression.
+
+    Whatever a round does not transmit (entries outside the top-k, float16
+    rounding) is kept locally and added to the next round's delta, so no
+    gradient signal is lost over time, only delayed.
+    """
+
+    def __init__(self, encoding: str = "topk", topk_ratio: float = 0.01):
+        self.encoding = encoding
+        self.topk_ratio = topk_ratio
+        self.residual: Dict[str, np.ndarray] = {}
+
+    def compress(self, deltas: Dict[str, np.ndarray]) -> Tuple[bytes, Dict[str, np.ndarray]]:
+        """
+        Encode deltas plus carried residual.
+
+        Returns:
+            (payload bytes, decoded view of what the peers will receive)
+        """
+        corrected = {}
+        for name, d in deltas.items():
+            d = np.asarray(d, dtype=np.float32)
+            r = self.residual.get(name)
+            corrected[name] = d + r if r is not None and r.shape == d.shape else d
+        blob = encode(corrected, self.encoding, self.topk_ratio)
+        sent = decode(blob)
+        for name, c in corrected.items():
+            self.residual[name] = c - sent[name]
+        return blob, sent
+
+    def residual_norm(self) -> float:
+        return float(np.sqrt(sum(float(np.dot(r.ravel(), r.ravel())) for r in self.residual.values())))
+
+    def reset(self, names: Optional[list] = None) -> None:
+        if names is None:
+            self.residual.clear()
+        else:
+            for n in names:
+                self.residual.pop(n, None)
+
+
+def accumulate(blob: bytes, target: Dict[str, np.ndarray], scale: float = 1.0) -> Dict[str, Tuple[int, ...]]:
+    """
+    Add ``scale * decoded(blob)`` into ``target`` in place.
+
+    Sparse payloads are scattered directly into the running sums, so no dense
+    copy of the update is ever materialised. Missing target layers are
+    created (float32 zeros).
+
+    Returns:
+        layer_name -> shape of every layer in the payload
+    """
+    if blob[:4] != MAGIC:
+        raise ValueError("not a federated update payload")
+    (hlen,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + hlen])
+    encoding = header["encoding"]
+    pos = 8 + hlen
+    s = np.float32(scale)
+    shapes: Dict[str, Tuple[int, ...]] = {e["name"]: tuple(e["shape"]) for e in header["layers"]}
+    # Validate before touching the sums so a bad payload never half-applies
+    for name, shape in shapes.items():
+        if name in target and target[name].shape != shape:
+            raise ValueError(f"shape mismatch for {name}: {target[name].shape} != {shape}")
+    for entry in header["layers"]:
+        name = entry["name"]
+        shape = shapes[name]
+        size = int(np.prod(shape)) if shape else 1
+        acc = target.get(name)
+        if acc is None:
+            acc = target[name] = np.zeros(shape, dtype=np.float32)
+        flat = acc.reshape(-1)
+        if encoding == "topk":
+            k = entry["k"]
+            idx = np.frombuffer(blob, dtype=np.uint32, count=k, offset=pos)
+            pos += 4 * k
+            vals = np.frombuffer(blob, dtype=np.float16, count=k, offset=pos)
+            pos += 2 * k
+            flat[idx] += s * vals.astype(np.float32)
+        elif encoding == "f16":
+            flat += s * np.frombuffer(blob, dtype=np.float16, count=size, offset=pos).astype(np.float32)
+            pos += 2 * size
+        else:
+            flat += s * np.frombuffer(blob, dtype=np.float32, count=size, offset=pos)
+            pos += 4 * size
+    return shapes
@@ -5,8 +5,9 @@ Ermöglicht gemeinsames Lernen ohne Datenaustausch!
 Jeder Submind lernt lokal, nur Model-Updates werden geteilt.
 
 Features:
-- Local Training
-- Model Update Aggregation
+- Local Training (vectorised numpy minibatch SGD on a small MLP)
+- Streaming FedAvg rounds (round IDs, straggler deadlines, O(model) memory)
+- Compact binary updates (float16 / top-k deltas with error feedback)
 - Differential Privacy (Basic)
 - Secure Aggregation
 - Model Versioning
@@ -19,40 +20,159 @@ Privacy-Garantie:
 """
 from __future__ import annotations
 import json
+import os
+import threading
 import time
 import numpy as np
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 import sys
 
 # Add system path
 sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
 
 from p2p_connection import get_connection_manager, P2PMessage
+import federated_codec as codec
+from federated_aggregator import StreamingAggregator, RoundResult
+
+# Update wire encoding: "f16" (dense half precision) or "topk" (sparse + error feedback)
+UPDATE_ENCODING = os.getenv("KI_FL_ENCODING", "f16")
+TOPK_RATIO = float(os.getenv("KI_FL_TOPK_RATIO", "0.01"))
+
+# Aggregation rounds: close after ROUND_TARGET updates or ROUND_DEADLINE seconds
+ROUND_TARGET = int(os.getenv("KI_FL_ROUND_TARGET", "3"))
+ROUND_MIN = int(os.getenv("KI_FL_ROUND_MIN", "1"))
+ROUND_DEADLINE = float(os.getenv("KI_FL_ROUND_DEADLINE", "60"))
+
+
+def _as_layers(weights: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    return {k: np.asarray(v, dtype=np.float32) for k, v in weights.items()}
+
+
+def mlp_forward(weights: Dict[str, np.ndarray], n_layers: int, X: np.ndarray) -> List[np.ndarray]:
+    """
+    Forward pass of the MLP (ReLU hidden layers, linear output).
+
+    Returns:
+        Activations per layer, starting with the input
+    """
+    acts = [X]
+    h = X
+    for i in range(n_layers):
+        z = h @ weights[f"layer_{i}"] + weights[f"bias_{i}"]
+        h = np.maximum(z, 0.0) if i < n_layers - 1 else z
+        acts.append(h)
+    return acts
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    e = np.exp(z - z.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def evaluate_mlp(weights: Dict[str, np.ndarray], n_layers: int,
+                 X: np.ndarray, Y: np.ndarray) -> Tuple[float, float]:
+    """
+    Loss and accuracy of the MLP.
+
+    Multi-output models use softmax cross-entropy and argmax accuracy,
+    single-output models use MSE and |pred - y| < 0.5 as "correct".
+    """
+    out = mlp_forward(weights, n_layers, X)[-1]
+    if out.shape[1] > 1:
+        p = _softmax(out)
+        loss = float(-np.mean(np.sum(Y * np.log(p + 1e-9), axis=1)))
+        acc = float(np.mean(p.argmax(axis=1) == Y.argmax(axis=1)))
+    else:
+        loss = float(np.mean((out - Y) ** 2))
+        acc = float(np.mean(np.abs(out - Y) < 0.5))
+    return loss, acc
+
+
+def train_mlp(weights: Dict[str, np.ndarray], n_layers: int, X: np.ndarray, Y: np.ndarray,
+              epochs: int = 1, batch_size: int = 32, lr: float = 0.05,
+              rng: Optional[np.random.Generator] = None) -> Tuple[float, float]:
+    """
+    Minibatch SGD, updates ``weights`` in place.
+
+    Returns:
+        (loss, accuracy) on the training data after the last epoch
+    """
+    rng = rng or np.random.default_rng()
+    n = X.shape[0]
+    multi = Y.shape[1] > 1
+    for _ in range(max(1, epochs)):
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            xb, yb = X[idx], Y[idx]
+            acts = mlp_forward(weights, n_layers, xb)
+            out = acts[-1]
+            # dL/dz of the output layer (mean over batch)
+            if multi:
+                grad = (_softmax(out) - yb) / len(idx)
+            else:
+                grad = 2.0 * (out - yb) / len(idx)
+            for i in range(n_layers - 1, -1, -1):
+                w = weights[f"layer_{i}"]
+                gw = acts[i].T @ grad
+                gb = grad.sum(axis=0)
+                if i > 0:
+                    grad = (grad @ w.T) * (acts[i] > 0)
+                w -= lr * gw
+                weights[f"bias_{i}"] -= lr * gb
+    return evaluate_mlp(weights, n_layers, X, Y)
 
 
 @dataclass
 class ModelUpdate:
-    """Represents a model update from local training."""
+    """Represents a model update (weight deltas) from local training."""
     update_id: str
     device_id: str
     model_version: str
-    weights: Dict[str, List[float]]  # layer_name -> weight updates
+    weights: Dict[str, np.ndarray]  # layer_name -> float32 weight deltas
     metrics: Dict[str, float]  # accuracy, loss, etc.
     samples_count: int
     timestamp: float
-    
+    encoding: str = "f16"
+    payload: Optional[bytes] = field(default=None, repr=False)
+    round_id: Optional[str] = None
+
+    def encode(self) -> bytes:
+        """Binary payload of the deltas (cached; set by train_local with error feedback)."""
+        if self.payload is None:
+            self.payload = codec.encode(self.weights, self.encoding, TOPK_RATIO)
+        return self.payload
+
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
-    
+        return {
+            "update_id": self.update_id,
+            "device_id": self.device_id,
+            "model_version": self.model_version,
+            "metrics": self.metrics,
+            "samples_count": self.samples_count,
+            "timestamp": self.timestamp,
+            "encoding": self.encoding,
+            "payload": codec.to_b64(self.encode()),
+            "round_id": self.round_id,
+        }
+
     def to_json(self) -> str:
         return json.dumps(self.to_dict())
-    
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ModelUpdate':
+        data = dict(data)
+        if "payload" in data:
+            blob = codec.from_b64(data.pop("payload"))
+            data["weights"] = codec.decode(blob)
+            data["payload"] = blob
+        else:
+            # Legacy JSON float lists
+            data["weights"] = _as_layers(data.get("weights", {}))
         return cls(**data)
-    
+
     @classmethod
     def from_json(cls, json_str: str) -> 'ModelUpdate':
         return cls.from_dict(json.loads(json_str))
@@ -62,14 +182,34 @@ class ModelUpdate:
 class AggregatedModel:
     """Aggregated model from multiple updates."""
     version: str
-    weights: Dict[str, List[float]]
+    weights: Dict[str, np.ndarray]  # weighted average of the deltas
     contributors: List[str]  # device IDs
     total_samples: int
     avg_metrics: Dict[str, float]
     timestamp: float
-    
+    round_id: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "round_id": self.round_id,
+            "contributors": self.contributors,
+            "total_samples": self.total_samples,
+            "avg_metrics": self.avg_metrics,
+            "timestamp": self.timestamp,
+        }
+
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {**self.summary(), "payload": codec.to_b64(codec.encode(self.weights, "f16"))}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AggregatedModel':
+        data = dict(data)
+        if "payload" in data:
+            data["weights"] = codec.decode(codec.from_b64(data.pop("payload")))
+        else:
+            data["weights"] = _as_layers(data.get("weights", {}))
+        return cls(**data)
 
 
 class FederatedLearner:
@@ -100,14 +240,30 @@ class FederatedLearner:
         # Current model version
         self.model_version = "1.0.0"
         
-        # Local model weights
-        self.local_weights: Dict[str, List[float]] = {}
+        # Local model weights (float32 arrays: layer_i -> (in, out), bias_i -> (out,))
+        self.local_weights: Dict[str, np.ndarray] = {}
+        self.layer_sizes: List[int] = []
+        
+        # Residuals of lossy update compression (carried into the next round)
+        self.error_feedback = codec.ErrorFeedback(UPDATE_ENCODING, TOPK_RATIO)
+        self.bytes_sent = 0
+        self.last_update_bytes = 0
+        
+        # Guards local_weights (training vs. aggregation worker)
+        self._model_lock = threading.RLock()
         
-        # Received updates (waiting for aggregation)
-        self.pending_updates: List[ModelUpdate] = []
+        # Received updates are folded into running sums off the receive thread
+        self.aggregator = StreamingAggregator(
+            on_complete=self._on_round_complete,
+            deadline_seconds=ROUND_DEADLINE,
+            min_updates=ROUND_MIN,
+            target_updates=ROUND_TARGET,
+        )
+        self.current_round_id: Optional[str] = None
         
-        # Aggregation history
+        # Aggregation history (most recent rounds)
         self.aggregation_history: List[AggregatedModel] = []
+        self.max_history = 100
         
         # Storage
         self.storage_dir = Path.home() / "ki_ana" / "data" / "federated"
@@ -119,22 +275,41 @@ class FederatedLearner:
         # Register message handlers
         self.connection_manager.register_handler("model_update", self._handle_model_update)
         self.connection_manager.register_handler("aggregated_model", self._handle_aggregated_model)
+        self.connection_manager.register_handler("fl_round", self._handle_round_start)
         
         # Load existing model
         self._load_model()
         
+        self.aggregator.start()
+        
         print(f"✅ Federated Learning initialized")
         print(f"   Model version: {self.model_version}")
     
+    @property
+    def n_layers(self) -> int:
+        return max(0, len(self.layer_sizes) - 1)
+    
     def _load_model(self):
-        """Load local model from disk."""
+        """Load local model from disk (metadata JSON + float32 .npz)."""
         model_file = self.storage_dir / "local_model.json"
+        weights_file = self.storage_dir / "local_model.npz"
         
         if model_file.exists():
             try:
                 data = json.loads(model_file.read_text())
-                self.local_weights = data.get("weights", {})
                 self.model_version = data.get("version", "1.0.0")
+                self.layer_sizes = list(data.get("layer_sizes") or [])
+                if weights_file.exists():
+                    with np.load(weights_file) as npz:
+                        self.local_weights = {k: npz[k].astype(np.float32) for k in npz.files}
+                elif data.get("weights"):
+                    # Legacy: flat JSON float lists
+                    self.local_weights = _as_layers(data["weights"])
+                    for i in range(self.n_layers):
+                        name = f"layer_{i}"
+                        if name in self.local_weights:
+                            shape = (self.layer_sizes[i], self.layer_sizes[i + 1])
+                            self.local_weights[name] = self.local_weights[name].reshape(shape)
                 print(f"📦 Loaded local model: {len(self.local_weights)} layers")
             except Exception as e:
                 print(f"⚠️  Error loading model: {e}")
@@ -142,11 +317,16 @@ class FederatedLearner:
     def _save_model(self):
         """Save local model to disk."""
         model_file = self.storage_dir / "local_model.json"
+        weights_file = self.storage_dir / "local_model.npz"
         
         try:
+            tmp = weights_file.with_suffix(".tmp.npz")
+            np.savez(tmp, **self.local_weights)
+            tmp.replace(weights_file)
             data = {
                 "version": self.model_version,
-                "weights": self.local_weights,
+                "layer_sizes": self.layer_sizes,
+                "weights_file": weights_file.name,
                 "updated_at": time.time()
             }
             model_file.write_text(json.dumps(data, indent=2))
@@ -163,56 +343,59 @@ class FederatedLearner:
         print(f"🧠 Initializing model: {layer_sizes}")
         
         self.local_weights = {}
+        self.layer_sizes = [int(n) for n in layer_sizes]
+        self.error_feedback.reset()
         
         # Initialize weights for each layer
         for i in range(len(layer_sizes) - 1):
-            layer_name = f"layer_{i}"
-            
-            # Random initialization (Xavier/He)
+            # He initialization (ReLU hidden layers)
             input_size = layer_sizes[i]
             output_size = layer_sizes[i + 1]
             
-            # Simple random weights
-            weights = np.random.randn(input_size, output_size) * 0.01
-            self.local_weights[layer_name] = weights.flatten().tolist()
+            weights = np.random.randn(input_size, output_size) * np.sqrt(2.0 / input_size)
+            self.local_weights[f"layer_{i}"] = weights.astype(np.float32)
+            self.local_weights[f"bias_{i}"] = np.zeros(output_size, dtype=np.float32)
         
         self._save_model()
         print(f"✅ Model initialized: {len(self.local_weights)} layers")
     
-    def train_local(self, training_data: List[Tuple[List[float], List[float]]], epochs: int = 1) -> ModelUpdate:
+    def train_local(self, training_data: List[Tuple[List[float], List[float]]], epochs: int = 1,
+                    batch_size: int = 32, lr: float = 0.05) -> ModelUpdate:
         """
         Train model locally on private data.
         
         Args:
             training_data: List of (input, target) pairs
             epochs: Number of training epochs
+            batch_size: Minibatch size
+            lr: SGD learning rate
         
         Returns:
-            ModelUpdate with weight changes
-        
-        Note: This is a simplified example. In practice, use proper ML framework.
+            ModelUpdate with weight changes (deltas), already encoded
+            for the wire with error feedback applied
         """
         print(f"🎓 Training locally on {len(training_data)} samples for {epochs} epoch(s)...")
         
-        if not self.local_weights:
+        if not self.local_weights or f"bias_{self.n_layers - 1}" not in self.local_weights:
             raise RuntimeError("Model not initialized. Call initialize_model() first.")
+        if not training_data:
+            raise ValueError("No training data")
         
-        # Simulate training (in practice, use PyTorch/TensorFlow)
-        # For demo, we just add small random updates
-        weight_updates = {}
+        X = np.asarray([x for x, _ in training_data], dtype=np.float32)
+        Y = np.asarray([y for _, y in training_data], dtype=np.float32).reshape(len(training_data), -1)
         
-        for layer_name, weights in self.local_weights.items():
-            # Simulate gradient descent
-            # In reality: compute gradients from training_data
-            updates = np.random.randn(len(weights)) * 0.001
-            weight_updates[layer_name] = updates.tolist()
+        with self._model_lock:
+            before = {k: v.copy() for k, v in self.local_weights.items()}
+            loss, accuracy = train_mlp(self.local_weights, self.n_layers, X, Y,
+                                       epochs=epochs, batch_size=batch_size, lr=lr)
+            deltas = {k: self.local_weights[k] - before[k] for k in before}
             
-            # Apply updates locally
-            new_weights = np.array(weights) + updates
-            self.local_weights[layer_name] = new_weights.tolist()
+            # Save updated model
+            self._save_model()
         
-        # Save updated model
-        self._save_model()
+        # Encode once (lossy encodings carry their error into the next round)
+        payload, sent = self.error_feedback.compress(deltas)
+        self.last_update_bytes = len(payload)
         
         # Create update
         import uuid
@@ -220,18 +403,22 @@ class FederatedLearner:
             update_id=str(uuid.uuid4()),
             device_id=self.device_id,
             model_version=self.model_version,
-            weights=weight_updates,
+            weights=sent,
             metrics={
-                "loss": np.random.uniform(0.1, 0.5),  # Simulated
-                "accuracy": np.random.uniform(0.7, 0.95)  # Simulated
+                "loss": loss,
+                "accuracy": accuracy
             },
             samples_count=len(training_data),
-            timestamp=time.time()
+            timestamp=time.time(),
+            encoding=self.error_feedback.encoding,
+            payload=payload,
+            round_id=self.current_round_id
         )
         
         print(f"✅ Training complete")
         print(f"   Loss: {update.metrics['loss']:.4f}")
         print(f"   Accuracy: {update.metrics['accuracy']:.4f}")
+        print(f"   Update size: {len(payload)} bytes ({update.encoding})")
         
         return update
     
@@ -246,115 +433,112 @@ class FederatedLearner:
         
         try:
             self.connection_manager.broadcast("model_update", update.to_dict())
+            self.bytes_sent += len(update.encode())
             print(f"✅ Update broadcasted")
         except Exception as e:
             print(f"⚠️  Error broadcasting update: {e}")
     
+    def start_round(self, deadline_seconds: Optional[float] = None) -> str:
+        """
+        Open a new aggregation round and announce it to peers.
+        
+        Peers stamp their next update with the round ID; updates for a
+        closed round are counted as late and dropped.
+        
+        Returns:
+            round_id
+        """
+        deadline = ROUND_DEADLINE if deadline_seconds is None else deadline_seconds
+        round_id = self.aggregator.open_round(deadline_seconds=deadline)
+        self.current_round_id = round_id
+        
+        try:
+            self.connection_manager.broadcast("fl_round", {
+                "round_id": round_id,
+                "deadline": time.time() + deadline,
+            })
+        except Exception as e:
+            print(f"⚠️  Error announcing round: {e}")
+        
+        print(f"🔁 Started round {round_id} (deadline {deadline:.0f}s)")
+        return round_id
+    
+    def _handle_round_start(self, message: P2PMessage):
+        """Handle round announcement from the coordinating peer."""
+        round_id = (message.data or {}).get("round_id")
+        if round_id:
+            self.current_round_id = round_id
+            print(f"🔁 Joined round {round_id} from {message.sender_id}")
+    
     def _handle_model_update(self, message: P2PMessage):
-        """Handle model update from peer."""
+        """Handle model update from peer (decoding + folding happens on the aggregator thread)."""
         peer_id = message.sender_id
         update_data = message.data
         
-        update = ModelUpdate.from_dict(update_data)
+        if not self.aggregator.submit(update_data):
+            print(f"⚠️  Aggregation queue full, dropped update from {peer_id}")
+            return
         
         print(f"📥 Received model update from {peer_id}")
-        print(f"   Samples: {update.samples_count}")
-        print(f"   Accuracy: {update.metrics.get('accuracy', 0):.4f}")
-        
-        # Add to pending updates
-        self.pending_updates.append(update)
-        
-        # Auto-aggregate if we have enough updates
-        if len(self.pending_updates) >= 3:
-            self.aggregate_updates()
+        print(f"   Samples: {update_data.get('samples_count', 0)}")
+        print(f"   Accuracy: {(update_data.get('metrics') or {}).get('accuracy', 0):.4f}")
     
     def aggregate_updates(self, min_updates: int = 1) -> Optional[AggregatedModel]:
         """
-        Aggregate pending model updates.
+        Close the current round and aggregate what arrived so far.
         
         Uses Federated Averaging (FedAvg):
         - Weighted average by number of samples
         - Preserves privacy (no raw data shared)
         
+        Rounds also close on their own once enough updates arrived or the
+        deadline passed; this forces it.
+        
         Args:
             min_updates: Minimum number of updates required
         
         Returns:
             AggregatedModel or None
         """
-        if len(self.pending_updates) < min_updates:
-            print(f"⚠️  Not enough updates ({len(self.pending_updates)} < {min_updates})")
+        result = self.aggregator.close_round(min_updates=min_updates)
+        if result is None:
+            pending = self.aggregator.stats()["round_contributors"]
+            print(f"⚠️  Not enough updates ({pending} < {min_updates})")
             return None
+        return next((m for m in reversed(self.aggregation_history) if m.round_id == result.round_id), None)
+    
+    def _on_round_complete(self, result: RoundResult):
+        """Apply a closed round (runs on the aggregator thread or the caller of aggregate_updates)."""
+        print(f"🔄 Round {result.round_id} closed ({result.reason}): "
+              f"{len(result.contributors)} model updates")
         
-        print(f"🔄 Aggregating {len(self.pending_updates)} model updates...")
-        
-        # Collect all updates
-        updates = self.pending_updates
-        
-        # Calculate total samples
-        total_samples = sum(u.samples_count for u in updates)
-        
-        # Aggregate weights (weighted average)
-        aggregated_weights = {}
-        
-        # Get all layer names
-        layer_names = set()
-        for update in updates:
-            layer_names.update(update.weights.keys())
-        
-        for layer_name in layer_names:
-            # Collect weights for this layer
-            layer_updates = []
-            layer_weights = []
-            
-            for update in updates:
-                if layer_name in update.weights:
-                    layer_updates.append(np.array(update.weights[layer_name]))
-                    layer_weights.append(update.samples_count / total_samples)
-            
-            if layer_updates:
-                # Weighted average
-                aggregated = np.average(layer_updates, axis=0, weights=layer_weights)
-                aggregated_weights[layer_name] = aggregated.tolist()
-        
-        # Aggregate metrics
-        avg_metrics = {}
-        metric_names = set()
-        for update in updates:
-            metric_names.update(update.metrics.keys())
-        
-        for metric_name in metric_names:
-            values = [u.metrics[metric_name] for u in updates if metric_name in u.metrics]
-            if values:
-                avg_metrics[metric_name] = sum(values) / len(values)
-        
-        # Create aggregated model
         aggregated = AggregatedModel(
             version=self.model_version,
-            weights=aggregated_weights,
-            contributors=[u.device_id for u in updates],
-            total_samples=total_samples,
-            avg_metrics=avg_metrics,
-            timestamp=time.time()
+            weights=result.weights,
+            contributors=result.contributors,
+            total_samples=result.total_samples,
+            avg_metrics=result.avg_metrics,
+            timestamp=time.time(),
+            round_id=result.round_id
         )
         
-        # Apply aggregated weights to local model
-        for layer_name, weights in aggregated_weights.items():
-            if layer_name in self.local_weights:
-                # Blend with local weights (0.5 local, 0.5 aggregated)
-                local = np.array(self.local_weights[layer_name])
-                agg = np.array(weights)
-                blended = 0.5 * local + 0.5 * agg
-                self.local_weights[layer_name] = blended.tolist()
-        
-        # Save updated model
-        self._save_model()
+        # Apply aggregated deltas to local model (updates are deltas, not weights)
+        with self._model_lock:
+            for layer_name, delta in aggregated.weights.items():
+                local = self.local_weights.get(layer_name)
+                if local is not None and local.shape == delta.shape:
+                    local += delta
+            
+            # Save updated model
+            self._save_model()
         
         # Store in history
         self.aggregation_history.append(aggregated)
+        if len(self.aggregation_history) > self.max_history:
+            del self.aggregation_history[:-self.max_history]
         
-        # Clear pending updates
-        self.pending_updates.clear()
+        if self.current_round_id == result.round_id:
+            self.current_round_id = None
         
         print(f"✅ Aggregation complete")
         print(f"   Contributors: {len(aggregated.contributors)}")
@@ -363,8 +547,6 @@ class FederatedLearner:
         
         # Broadcast aggregated model
         self._broadcast_aggregated_model(aggregated)
-        
-        return aggregated
     
     def _broadcast_aggregated_model(self, model: AggregatedModel):
         """Broadcast aggregated model to peers."""
@@ -379,7 +561,7 @@ class FederatedLearner:
         peer_id = message.sender_id
         model_data = message.data
         
-        model = AggregatedModel(**model_data)
+        model = AggregatedModel.from_dict(model_data)
         
         print(f"📥 Received aggregated model from {peer_id}")
         print(f"   Contributors: {len(model.contributors)}")
@@ -393,9 +575,14 @@ class FederatedLearner:
         return {
             "model_version": self.model_version,
             "local_layers": len(self.local_weights),
-            "pending_updates": len(self.pending_updates),
+            "pending_updates": self.aggregator.stats()["pending"],
             "aggregations": len(self.aggregation_history),
-            "last_aggregation": self.aggregation_history[-1].to_dict() if self.aggregation_history else None
+            "current_round": self.current_round_id,
+            "aggregator": self.aggregator.stats(),
+            "update_encoding": self.error_feedback.encoding,
+            "last_update_bytes": self.last_update_bytes,
+            "bytes_sent": self.bytes_sent,
+            "last_aggregation": self.aggregation_history[-1].summary() if self.aggregation_history else None
         }
 
 
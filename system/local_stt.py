@@ -14,13 +14,25 @@ Models:
 from __future__ import annotations
 import time
 import os
+import queue
+import sys
 import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from dataclasses import dataclass
 import whisper
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from audio_stream import SAMPLE_RATE, SpeechSegment, VADSegmenter, iter_pcm  # noqa: E402
+
+# Hard cap on Whisper instances per model, whatever KI_STT_WORKERS says
+MAX_WORKERS = 8
+
 
 @dataclass
 class TranscriptionResult:
@@ -98,6 +110,13 @@ class LocalSTTService:
         
         self._initialized = True
         self.models: Dict[str, whisper.Whisper] = {}
+        # Model instances are checked out per decode (model_instance());
+        # Whisper's decoder installs kv-cache hooks on the model, so one
+        # decode per instance at a time. Extra instances for parallel
+        # segment decoding are bounded by max_workers().
+        self._replicas: Dict[str, "queue.Queue[whisper.Whisper]"] = {}
+        self._replica_count: Dict[str, int] = {}
+        self._replica_lock = threading.Lock()
         self.cache_dir = Path.home() / "ki_ana" / "models" / "whisper"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
@@ -145,29 +164,26 @@ class LocalSTTService:
             TranscriptionResult with text and metadata
         """
         model_key = model or self.default_model
-        model_obj = self._load_model(model_key)
+        self._load_model(model_key)
         
         print(f"🎤 Transcribing: {audio_path}")
         start = time.time()
         
+        # Decode once; the duration comes from the same samples
+        audio = whisper.load_audio(audio_path)
+        duration = len(audio) / float(SAMPLE_RATE)
+        
         # Transcribe
-        result = model_obj.transcribe(
-            audio_path,
-            language=language,
-            task=task,
-            fp16=False  # Use FP32 for better compatibility
-        )
+        with self.model_instance(model_key) as model_obj:
+            result = model_obj.transcribe(
+                audio,
+                language=language,
+                task=task,
+                fp16=False  # Use FP32 for better compatibility
+            )
         
         processing_time = time.time() - start
         
-        # Get audio duration
-        try:
-            import librosa
-            duration = librosa.get_duration(path=audio_path)
-        except:
-            # Fallback: estimate from result
-            duration = result.get("segments", [{}])[-1].get("end", 0) if result.get("segments") else 0
-        
         return TranscriptionResult(
             text=result["text"].strip(),
             language=result.get("language", language or "unknown"),
@@ -216,6 +232,134 @@ class LocalSTTService:
             except:
                 pass
     
+    @staticmethod
+    def max_workers() -> int:
+        """Instances per model: KI_STT_WORKERS (default 1), at most MAX_WORKERS."""
+        try:
+            n = int(os.getenv("KI_STT_WORKERS", "1"))
+        except ValueError:
+            n = 1
+        return max(1, min(n, MAX_WORKERS))
+
+    def _acquire_replica(self, model_key: str, workers: int) -> whisper.Whisper:
+        """Check out a model instance (the warm one first, more up to `workers`)."""
+        workers = max(1, min(int(workers), self.max_workers()))
+        with self._replica_lock:
+            pool = self._replicas.get(model_key)
+            if pool is None:
+                pool = self._replicas[model_key] = queue.Queue()
+                pool.put(self._load_model(model_key))
+                self._replica_count[model_key] = 1
+            grow = pool.empty() and self._replica_count[model_key] < workers
+            if grow:
+                self._replica_count[model_key] += 1
+        if grow:
+            print(f"📥 Loading extra Whisper instance: {model_key}")
+            return whisper.load_model(model_key, download_root=str(self.cache_dir))
+        return pool.get()
+
+    def _release_replica(self, model_key: str, model_obj: whisper.Whisper) -> None:
+        self._replicas[model_key].put(model_obj)
+
+    @contextmanager
+    def model_instance(self, model_key: str, workers: int = 1) -> Iterator[whisper.Whisper]:
+        """Exclusive use of one instance of `model_key` for a transcribe() call."""
+        model_obj = self._acquire_replica(model_key, workers)
+        try:
+            yield model_obj
+        finally:
+            self._release_replica(model_key, model_obj)
+
+    def transcribe_stream(
+        self,
+        audio_path: str,
+        model: str = None,
+        language: str = None,
+        task: str = "transcribe",
+        workers: int = None,
+        **vad_kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Transcribe a recording incrementally.
+        
+        Audio is decoded block by block and split at pauses (energy VAD);
+        segments are transcribed by up to `workers` warm model instances
+        (default and upper bound: KI_STT_WORKERS) while decoding continues. Partial results
+        are yielded in order as soon as they are ready, so the first text
+        arrives after the first pause instead of after the whole file.
+        
+        Yields:
+            {"index", "start", "end", "text", "language", "segments", "elapsed"}
+        """
+        model_key = model or self.default_model
+        limit = self.max_workers()
+        workers = max(1, min(int(workers or limit), limit))
+        self._load_model(model_key)
+        detected: Dict[str, str] = {}
+        t0 = time.time()
+
+        def run(seg: SpeechSegment) -> Dict[str, Any]:
+            with self.model_instance(model_key, workers) as model_obj:
+                res = model_obj.transcribe(
+                    seg.audio,
+                    language=language or detected.get("language"),
+                    task=task,
+                    fp16=False,
+                    condition_on_previous_text=False,
+                )
+            lang = res.get("language", language or "unknown")
+            # Later segments skip language detection once it is known
+            detected.setdefault("language", lang)
+            segments = [
+                {**s, "start": seg.start + float(s.get("start", 0.0)), "end": seg.start + float(s.get("end", 0.0))}
+                for s in res.get("segments", [])
+            ]
+            return {
+                "index": seg.index,
+                "start": seg.start,
+                "end": seg.end,
+                "text": (res.get("text") or "").strip(),
+                "language": lang,
+                "segments": segments,
+                "elapsed": time.time() - t0,
+            }
+
+        vad = VADSegmenter(**vad_kwargs)
+        pending: deque = deque()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt") as pool:
+            def ready(block: bool) -> Iterator[Dict[str, Any]]:
+                # Keep at most 2 segments per worker in flight (bounded memory)
+                while pending and (block or pending[0].done() or len(pending) > 2 * workers):
+                    yield pending.popleft().result()
+
+            for chunk in iter_pcm(audio_path):
+                for seg in vad.feed(chunk):
+                    pending.append(pool.submit(run, seg))
+                yield from ready(False)
+            for seg in vad.flush():
+                pending.append(pool.submit(run, seg))
+            yield from ready(True)
+
+    def transcribe_file_streaming(
+        self,
+        audio_path: str,
+        model: str = None,
+        language: str = None,
+        task: str = "transcribe",
+        workers: int = None,
+    ) -> TranscriptionResult:
+        """transcribe_stream() collected into a TranscriptionResult."""
+        start = time.time()
+        parts = list(self.transcribe_stream(audio_path, model=model, language=language, task=task, workers=workers))
+        return TranscriptionResult(
+            text=" ".join(p["text"] for p in parts if p["text"]).strip(),
+            language=parts[0]["language"] if parts else (language or "unknown"),
+            segments=[s for p in parts for s in p["segments"]],
+            model=model or self.default_model,
+            duration=parts[-1]["end"] if parts else 0.0,
+            processing_time=time.time() - start,
+        )
+
     def get_model_info(self, model: str = None) -> Dict[str, Any]:
         """Get information about a model."""
         model_key = model or self.default_model
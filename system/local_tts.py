@@ -10,12 +10,16 @@ https://huggingface.co/rhasspy/piper-voices
 from __future__ import annotations
 import time
 import os
-import wave
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from dataclasses import dataclass
 import tempfile
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from tts_stream import PcmChunk, PhraseCache, render_pcm, split_sentences, stream_pcm, wav_bytes  # noqa: E402
+
 try:
     from piper import PiperVoice
     PIPER_AVAILABLE = True
@@ -105,6 +109,14 @@ class LocalTTSService:
         # Default voice
         self.default_voice = os.getenv("PIPER_VOICE", "de_DE-thorsten-low")
         
+        # Synthesized phrases, shared across voices (size-bounded, LRU)
+        self.cache = PhraseCache(
+            Path.home() / "ki_ana" / "cache" / "tts",
+            max_bytes=int(float(os.getenv("KI_TTS_CACHE_MB", "64")) * 1024 * 1024),
+        )
+        # One ONNX session per voice: serialize synthesis on it
+        self._voice_locks: Dict[str, threading.Lock] = {}
+        
         print(f"✅ Local TTS Service initialized (default voice: {self.default_voice})")
     
     def _download_voice(self, voice_key: str) -> Path:
@@ -179,17 +191,13 @@ class LocalTTSService:
         print(f"🔊 Synthesizing: '{text[:50]}...'")
         start = time.time()
         
-        # Synthesize
-        with wave.open(output_path, 'wb') as wav_file:
-            voice_obj.synthesize(text, wav_file)
+        # Synthesize (duration comes from the rendered frames, no re-read)
+        pcm, rate = self._render(voice_key, voice_obj, text)
+        with open(output_path, 'wb') as f:
+            f.write(wav_bytes(pcm, rate))
         
         processing_time = time.time() - start
-        
-        # Get audio duration
-        with wave.open(output_path, 'rb') as wav_file:
-            frames = wav_file.getnframes()
-            rate = wav_file.getframerate()
-            duration = frames / float(rate)
+        duration = len(pcm) / 2.0 / float(rate)
         
         return SynthesisResult(
             audio_path=output_path,
@@ -215,18 +223,49 @@ class LocalTTSService:
         Returns:
             Audio data as bytes (WAV format)
         """
-        result = self.synthesize(text, voice=voice)
-        
+        chunks = list(self.synthesize_stream(text, voice=voice))
+        rate = chunks[0].sample_rate if chunks else self._sample_rate(voice or self.default_voice)
+        return wav_bytes(b"".join(c.pcm for c in chunks), rate)
+    
+    def _render(self, voice_key: str, voice_obj: PiperVoice, text: str):
+        lock = self._voice_locks.setdefault(voice_key, threading.Lock())
+        with lock:
+            return render_pcm(voice_obj, text)
+    
+    def _sample_rate(self, voice_key: str) -> int:
         try:
-            with open(result.audio_path, 'rb') as f:
-                audio_data = f.read()
-            return audio_data
-        finally:
-            # Cleanup temp file
-            try:
-                os.unlink(result.audio_path)
-            except:
-                pass
+            return int(self._load_voice(voice_key).config.sample_rate)
+        except Exception:
+            return 22050
+    
+    def synthesize_stream(
+        self,
+        text: str,
+        voice: str = None,
+        prefetch: int = 2,
+        use_cache: bool = True
+    ) -> Iterator[PcmChunk]:
+        """
+        Synthesize sentence by sentence and yield PCM as soon as it is ready.
+        
+        Sentences are rendered up to `prefetch` ahead of the consumer;
+        repeated phrases come from the phrase cache (KI_TTS_CACHE_MB).
+        
+        Yields:
+            PcmChunk (16-bit mono PCM, sample_rate, text, cached)
+        """
+        if not PIPER_AVAILABLE:
+            raise RuntimeError("Piper TTS not available")
+        
+        voice_key = voice or self.default_voice
+        voice_obj = self._load_voice(voice_key)
+        yield from stream_pcm(
+            split_sentences(text),
+            lambda sentence: self._render(voice_key, voice_obj, sentence),
+            voice=voice_key,
+            cache=self.cache if use_cache else None,
+            prefetch=prefetch,
+        )
     
     def get_voice_info(self, voice: str = None) -> Dict[str, Any]:
         """Get information about a voice."""
@@ -6,16 +6,29 @@ Media worker: processes jobs
   - media.ocr       {path:'/uploads/file', store:true}
   - media.whisper   {path:'/uploads/file', lang:'de', store:true}
 
-Writes thumbnails into /uploads as PNG (thumb_<stem>_<w>x<h>.png).
-OCR/Whisper results are stored as memory blocks (tags: ocr|stt,media).
+Writes thumbnails into /uploads as WebP/JPEG (thumb_<stem>_<w>x<h>.<ext>,
+see thumbnails.py); KI_THUMB_SIZES adds sizes rendered from the same decode.
+OCR/Whisper results are stored as memory blocks (tags: ocr|stt,media);
+memory_store serializes the index updates of concurrent workers with a
+file lock under indexes/.
+
+The supervisor (main) keeps long-lived worker processes per job type, each
+leasing only its own type and holding its model (Whisper) for its lifetime.
+Pool size via KI_MEDIA_WORKERS:
+  "4"                          → 4 processes per type
+  "thumbnail=4,ocr=2,whisper=1" → per type (default: cores, cores, 1)
+  "0"                          → no pool, one in-process loop for all types
 """
 import os, time, json, mimetypes
+import multiprocessing as mp
 from pathlib import Path
 from typing import Any, Dict
 
+from ..netapi import db as _db
 from ..netapi.db import SessionLocal
-from ..netapi.models import Job
+from ..netapi.modules.jobs.leasing import LeasedJob, complete_job, fail_job, lease_jobs
 from ..netapi import memory_store as _mem
+from . import thumbnails as _thumbs
 import urllib.request as _ur
 import urllib.error as _ue
 try:
@@ -27,44 +40,30 @@ except Exception:  # pragma: no cover
 
 KI_ROOT = Path(os.getenv("KI_ROOT", str(Path.home() / "ki_ana"))).resolve()
 UPLOADS = KI_ROOT / "uploads"
+JOB_TYPES = ["media.thumbnail", "media.ocr", "media.whisper"]
+BATCH = max(1, int(os.getenv("KI_WORKER_BATCH", "1")))
 
 
 def _now() -> int: return int(time.time())
 
 
-def _lease_one(db) -> Job | None:
-    now = _now()
-    j = (
-        db.query(Job)
-        .filter(Job.type.in_(["media.thumbnail","media.ocr","media.whisper"]), ((Job.status == "queued") | (Job.lease_until < now)))
-        .order_by(Job.priority.desc(), Job.id.asc())
-        .first()
-    )
-    if not j:
-        return None
-    j.status = "leased"; j.lease_until = now + 60; j.updated_at = now
-    db.add(j); db.commit(); db.refresh(j)
-    return j
-
-
-def _done(db, j: Job):
-    j.status = "done"; j.lease_until = 0; j.updated_at = _now(); j.error = ""
-    db.add(j); db.commit()
-
-
-def _fail(db, j: Job, msg: str):
-    j.attempts = int(j.attempts or 0) + 1
-    j.error = (msg or "")[:2000]
-    now = _now()
-    if j.attempts >= 5:
-        j.status = "failed"; j.lease_until = 0
-    else:
-        j.status = "queued"; j.lease_until = now + min(3600, 5 * (2 ** min(7, j.attempts)))
-    j.updated_at = now
-    db.add(j); db.commit()
+def _lease_batch(db, job_types: list[str] = JOB_TYPES) -> list[LeasedJob]:
+    return lease_jobs(db, job_types, n=BATCH, lease_seconds=60 * BATCH)
+
+
+def _done(db, j: LeasedJob):
+    if not complete_job(db, j.id, j.lease_token):
+        print(f"[media_worker] lease of #{j.id} expired; result dropped")
+
+
+def _fail(db, j: LeasedJob, msg: str):
+    attempts = int(j.attempts or 0) + 1
+    if fail_job(db, j.id, msg, lease_token=j.lease_token, max_attempts=5,
+                next_delay=min(3600, 5 * (2 ** min(7, attempts)))) is None:
+        print(f"[media_worker] lease of #{j.id} expired; failure not recorded")
 
 
-def _load_payload(j: Job) -> Dict[str, Any]:
+def _load_payload(j: LeasedJob) -> Dict[str, Any]:
     try:
         return json.loads(j.payload or "{}")
     except Exception:
@@ -78,43 +77,36 @@ def _abs_from_rel(rel: str) -> Path:
     return (KI_ROOT / p.lstrip("/")).resolve()
 
 
+def _thumb_sizes(w: int, h: int) -> list[tuple[int, int]]:
+    return [(w, h)] + [s for s in _thumbs.parse_sizes(os.getenv("KI_THUMB_SIZES", "")) if s != (w, h)]
+
+
 def _thumbnail(path: Path, w: int = 256, h: int = 256) -> Path:
-    out = UPLOADS / f"thumb_{path.stem}_{w}x{h}.png"
-    # Idempotency: skip if thumbnail exists and is newer than source
-    try:
-        if out.exists() and out.stat().st_mtime >= path.stat().st_mtime:
-            return out
-    except Exception:
-        pass
-    buf = None
-    try:
-        import cv2  # type: ignore
-        import numpy as np  # type: ignore
-        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
-        if ctype.startswith("video/"):
-            cap = cv2.VideoCapture(str(path))
-            ok, frame = cap.read(); cap.release()
-            img = frame if ok and frame is not None else None
-        else:
-            img = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
-        if img is not None:
-            ih, iw = img.shape[:2]
-            scale = min(w / max(1, iw), h / max(1, ih))
-            nw, nh = max(1, int(iw * scale)), max(1, int(ih * scale))
-            resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA)
-            ok, enc = cv2.imencode('.png', resized)
-            if ok:
-                buf = enc.tobytes()
-    except Exception:
-        buf = None
-    if buf is None:
-        from PIL import Image  # type: ignore
-        with Image.open(path) as im:
-            im.thumbnail((w, h))
-            import io
-            bio = io.BytesIO(); im.save(bio, format='PNG'); buf = bio.getvalue()
-    out.write_bytes(buf)
-    return out
+    # One decode for all sizes; fresh outputs are skipped (idempotent)
+    return _thumbs.render(path, _thumb_sizes(w, h), UPLOADS)[(w, h)]
+
+
+def _prerender_thumbnails(jobs: list[LeasedJob]) -> None:
+    """Render the thumbnails of a leased batch together (KI_THUMB_PROCS processes).
+
+    Best effort: _exec() then finds fresh outputs, and re-renders (reporting
+    the error) whatever failed here.
+    """
+    groups: Dict[tuple[int, int], list[Path]] = {}
+    for j in jobs:
+        if j.type != "media.thumbnail":
+            continue
+        p = _load_payload(j)
+        src = _abs_from_rel(str(p.get("path") or ""))
+        if p.get("path") and src.exists():
+            groups.setdefault((int(p.get("w") or 256), int(p.get("h") or 256)), []).append(src)
+    for (w, h), sources in groups.items():
+        if len(sources) < 2:
+            continue
+        try:
+            _thumbs.render_batch(sources, _thumb_sizes(w, h), UPLOADS, processes=int(os.getenv("KI_THUMB_PROCS", "1")))
+        except Exception as e:
+            print(f"[media_worker] batch thumbnails failed: {e}")
 
 
 def _emit_knowledge(kind: str, path: Path, *, text: str | None, job_id: int | None) -> None:
@@ -142,16 +134,8 @@ def _ocr_to_memory(path: Path) -> tuple[str | None, str]:
     text = ""
     # Idempotency: skip if an OCR block for this URL already exists
     try:
-        from ..netapi.memory_store import META_PATH as _MS_META  # type: ignore
-        import json as _json
-        if _MS_META.exists():
-            meta = _json.loads(_MS_META.read_text(encoding='utf-8'))
-            url = f"/uploads/{path.name}"
-            for _bid, info in meta.items():
-                if str(info.get('url') or '') == url:
-                    tags = info.get('tags') or []
-                    if 'ocr' in tags:
-                        return None
+        if _mem.find_blocks_by_url(f"/uploads/{path.name}", tag="ocr"):
+            return None, ""
     except Exception:
         pass
     try:
@@ -174,39 +158,43 @@ def _ocr_to_memory(path: Path) -> tuple[str | None, str]:
         return None, text
 
 
-def _whisper_to_memory(path: Path, lang: str | None = None) -> tuple[str | None, str]:
-    try:
+# Per-process model cache: a worker loads its Whisper model once, not per job
+_WHISPER_MODELS: Dict[str, Any] = {}
+
+
+def _whisper_model():
+    name = os.getenv("KI_WHISPER_MODEL", "base")
+    model = _WHISPER_MODELS.get(name)
+    if model is None:
         import whisper  # type: ignore
-    except Exception:
-        return None
+        model = _WHISPER_MODELS[name] = whisper.load_model(name)
+    return model
+
+
+def _whisper_to_memory(path: Path, lang: str | None = None) -> tuple[str | None, str]:
     # Idempotency: skip if a STT block for this URL already exists
     try:
-        from ..netapi.memory_store import META_PATH as _MS_META  # type: ignore
-        import json as _json
-        if _MS_META.exists():
-            meta = _json.loads(_MS_META.read_text(encoding='utf-8'))
-            url = f"/uploads/{path.name}"
-            for _bid, info in meta.items():
-                if str(info.get('url') or '') == url:
-                    tags = info.get('tags') or []
-                    if 'stt' in tags:
-                        return None
+        if _mem.find_blocks_by_url(f"/uploads/{path.name}", tag="stt"):
+            return None, ""
     except Exception:
         pass
     try:
-        name = os.getenv("KI_WHISPER_MODEL", "base")
-        model = whisper.load_model(name)
+        model = _whisper_model()
+    except Exception:
+        return None, ""
+    text = ""
+    try:
         res = model.transcribe(str(path), language=lang)
         text = (res.get("text") or "").strip()
         if not text:
-            return None
+            return None, ""
         bid = _mem.add_block(title=f"STT: {path.name}", content=text, tags=["stt","media"], url=f"/uploads/{path.name}")
         return bid, text
     except Exception:
         return None, text
 
 
-def _exec(j: Job) -> None:
+def _exec(j: LeasedJob) -> None:
     p = _load_payload(j)
     rel = str(p.get("path") or "")
     if not rel:
@@ -250,20 +238,20 @@ def _exec(j: Job) -> None:
         raise RuntimeError(f"unknown job type {j.type}")
 
 
-def _write_heartbeat(last: dict | None = None) -> None:
+def _write_heartbeat(last: dict | None = None, *, name: str = "media", job_types: list[str] = JOB_TYPES) -> None:
     try:
         logdir = KI_ROOT / "logs"
         logdir.mkdir(parents=True, exist_ok=True)
         hb = {
-            "name": "media",
+            "name": name,
             "ts": _now(),
             "pid": os.getpid(),
             "host": os.uname().nodename if hasattr(os, 'uname') else None,
-            "job_types": ["media.thumbnail","media.ocr","media.whisper"],
+            "job_types": job_types,
         }
         if last:
             hb.update(last)
-        (logdir / "worker_heartbeat_media.json").write_text(json.dumps(hb, ensure_ascii=False), encoding='utf-8')
+        (logdir / f"worker_heartbeat_{name}.json").write_text(json.dumps(hb, ensure_ascii=False), encoding='utf-8')
         # Also POST to local API (non-fatal if offline)
         try:
             import urllib.request as _ur
@@ -283,44 +271,122 @@ def _write_heartbeat(last: dict | None = None) -> None:
         pass
 
 
-def main():
-    print("[media_worker] starting …")
+def _run(job_types: list[str], name: str = "media") -> None:
+    """Lease-and-execute loop for the given job types (one process)."""
     idle = float(os.getenv("KI_WORKER_IDLE_SLEEP", "2"))
     last_hb = 0
+    hb = lambda last=None: _write_heartbeat(last, name=name, job_types=job_types)
     while True:
         try:
             with SessionLocal() as db:
                 now = _now()
                 if now - last_hb >= 10:
-                    _write_heartbeat(None); last_hb = now
-                j = _lease_one(db)
-                if not j:
+                    hb(); last_hb = now
+                jobs = _lease_batch(db, job_types)
+                if not jobs:
                     time.sleep(idle)
                     # periodic heartbeat even if idle
                     now = _now()
                     if now - last_hb >= 10:
-                        _write_heartbeat(None); last_hb = now
+                        hb(); last_hb = now
                     continue
-                try:
-                    _exec(j)
-                    _done(db, j)
-                    print(f"[media_worker] done #{j.id} {j.type}")
-                    _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "done"}); last_hb = _now()
-                except Exception as e:
-                    _fail(db, j, f"{type(e).__name__}: {e}")
-                    print(f"[media_worker] failed #{j.id}: {e}")
+                _prerender_thumbnails(jobs)
+                for j in jobs:
                     try:
-                        write_audit("media_job_failed", actor_id=0, target_type="job", target_id=int(j.id or 0), meta={"type": j.type, "error": f"{type(e).__name__}: {e}"})
-                    except Exception:
-                        pass
-                    _write_heartbeat({"last_job_id": j.id, "last_type": j.type, "last_status": "failed"}); last_hb = _now()
+                        _exec(j)
+                        _done(db, j)
+                        print(f"[{name}] done #{j.id} {j.type}")
+                        hb({"last_job_id": j.id, "last_type": j.type, "last_status": "done"}); last_hb = _now()
+                    except Exception as e:
+                        _fail(db, j, f"{type(e).__name__}: {e}")
+                        print(f"[{name}] failed #{j.id}: {e}")
+                        try:
+                            write_audit("media_job_failed", actor_id=0, target_type="job", target_id=int(j.id or 0), meta={"type": j.type, "error": f"{type(e).__name__}: {e}"})
+                        except Exception:
+                            pass
+                        hb({"last_job_id": j.id, "last_type": j.type, "last_status": "failed"}); last_hb = _now()
         except KeyboardInterrupt:
-            print("[media_worker] exiting")
+            print(f"[{name}] exiting")
             break
         except Exception as e:
-            print("[media_worker] outer error:", e)
+            print(f"[{name}] outer error:", e)
             time.sleep(3)
 
 
+def _pool_sizes() -> Dict[str, int]:
+    """Processes per job type from KI_MEDIA_WORKERS (see module docstring)."""
+    cores = os.cpu_count() or 1
+    sizes = {"media.thumbnail": cores, "media.ocr": cores, "media.whisper": 1}
+    raw = os.getenv("KI_MEDIA_WORKERS", "").strip()
+    if not raw:
+        return sizes
+    try:
+        if "=" not in raw:
+            return {t: max(0, int(raw)) for t in JOB_TYPES}
+        for part in raw.split(","):
+            key, _, val = part.partition("=")
+            key = key.strip()
+            key = key if key.startswith("media.") else f"media.{key}"
+            if key in sizes:
+                sizes[key] = max(0, int(val))
+    except ValueError:
+        print(f"[media_worker] invalid KI_MEDIA_WORKERS={raw!r}; using defaults")
+    return sizes
+
+
+def _worker_main(job_type: str, slot: int) -> None:
+    # Forked from the supervisor: never reuse its pooled DB connections
+    try:
+        _db.engine.dispose(close=False)
+    except Exception:
+        pass
+    name = f"media-{job_type.split('.', 1)[-1]}-{slot}"
+    if job_type == "media.whisper":
+        # Warm up before leasing so the first job does not pay the model load
+        try:
+            _whisper_model()
+        except Exception as e:
+            print(f"[{name}] whisper unavailable: {e}")
+    _run([job_type], name)
+
+
+def main():
+    sizes = _pool_sizes()
+    if sum(sizes.values()) <= 0:
+        print("[media_worker] starting (single process) …")
+        _run(JOB_TYPES)
+        return
+    print("[media_worker] starting pool:", ", ".join(f"{t}×{n}" for t, n in sizes.items()))
+    procs: Dict[tuple, mp.Process] = {}
+    last_hb = 0
+    try:
+        while True:
+            for job_type, n in sizes.items():
+                for slot in range(n):
+                    p = procs.get((job_type, slot))
+                    if p is not None and p.is_alive():
+                        continue
+                    if p is not None:
+                        print(f"[media_worker] {job_type}#{slot} exited ({p.exitcode}); restarting")
+                    p = mp.Process(target=_worker_main, args=(job_type, slot), daemon=True)
+                    p.start()
+                    procs[(job_type, slot)] = p
+            now = _now()
+            if now - last_hb >= 10:
+                alive: Dict[str, int] = {}
+                for (job_type, _slot), p in procs.items():
+                    alive[job_type] = alive.get(job_type, 0) + int(p.is_alive())
+                _write_heartbeat({"workers": alive}); last_hb = now
+            time.sleep(2)
+    except KeyboardInterrupt:
+        print("[media_worker] exiting")
+    finally:
+        for p in procs.values():
+            if p.is_alive():
+                p.terminate()
+        for p in procs.values():
+            p.join(timeout=5)
+
+
 if __name__ == "__main__":
     main()
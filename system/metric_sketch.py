@@ -0,0 +1,154 @@
+"""
+Metric Sketch für KI_ana
+
+Mergeable, fixed-memory quantile sketch (DDSketch-style log buckets).
+
+Features:
+- Relative-accuracy quantiles (default 1%) for p50/p95/p99
+- O(1) insert, memory bounded by max_bins
+- Mergeable (per peer / per window / per tag set)
+- JSON round-trip for snapshots
+"""
+from __future__ import annotations
+import math
+from typing import Dict, Iterable, Optional
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram with relative error ``alpha``.
+
+    Values are mapped to bucket ``ceil(log_gamma(|v|))``; each bucket is
+    reported at its midpoint, so any quantile is within ``alpha`` of the true
+    value (relative). When more than ``max_bins`` buckets exist the lowest
+    buckets are collapsed, which only affects the smallest values.
+    """
+
+    MIN_INDEXABLE = 1e-9
+
+    def __init__(self, alpha: float = 0.01, max_bins: int = 2048):
+        self.alpha = float(alpha)
+        self.max_bins = int(max_bins)
+        self._gamma = (1.0 + self.alpha) / (1.0 - self.alpha)
+        self._log_gamma = math.log(self._gamma)
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # -- core -------------------------------------------------------------
+    def _index(self, v: float) -> int:
+        return int(math.ceil(math.log(v) / self._log_gamma))
+
+    def _value(self, idx: int) -> float:
+        return 2.0 * (self._gamma ** idx) / (self._gamma + 1.0)
+
+    def _collapse(self, store: Dict[int, int]) -> None:
+        if len(store) <= self.max_bins:
+            return
+        keys = sorted(store)
+        extra = len(keys) - self.max_bins
+        target = keys[extra]
+        moved = sum(store.pop(k) for k in keys[:extra])
+        store[target] = store.get(target, 0) + moved
+
+    def add(self, value: float, weight: int = 1) -> None:
+        v = float(value)
+        if math.isnan(v):
+            return
+        if v > self.MIN_INDEXABLE:
+            idx = self._index(v)
+            self.pos[idx] = self.pos.get(idx, 0) + weight
+            if len(self.pos) > self.max_bins:
+                self._collapse(self.pos)
+        elif v < -self.MIN_INDEXABLE:
+            idx = self._index(-v)
+            self.neg[idx] = self.neg.get(idx, 0) + weight
+            if len(self.neg) > self.max_bins:
+                self._collapse(self.neg)
+        else:
+            self.zero += weight
+        self.count += weight
+        self.sum += v * weight
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.count == 0:
+            return self
+        if abs(other.alpha - self.alpha) > 1e-12:
+            raise ValueError("cannot merge sketches with different alpha")
+        for k, c in other.pos.items():
+            self.pos[k] = self.pos.get(k, 0) + c
+        for k, c in other.neg.items():
+            self.neg[k] = self.neg.get(k, 0) + c
+        self._collapse(self.pos)
+        self._collapse(self.neg)
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        q = min(1.0, max(0.0, float(q)))
+        rank = q * (self.count - 1)
+        seen = 0
+        for idx in sorted(self.neg, reverse=True):
+            seen += self.neg[idx]
+            if seen > rank:
+                return max(self.min, -self._value(idx))
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for idx in sorted(self.pos):
+            seen += self.pos[idx]
+            if seen > rank:
+                return min(self.max, self._value(idx))
+        return self.max
+
+    # -- reporting --------------------------------------------------------
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        if self.count == 0:
+            return {"count": 0, "avg": 0, "min": 0, "max": 0}
+        out: Dict[str, float] = {
+            "count": self.count,
+            "avg": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in quantiles:
+            out[f"p{int(round(q * 100))}"] = self.quantile(q)
+        return out
+
+    def to_dict(self) -> Dict:
+        return {
+            "alpha": self.alpha,
+            "max_bins": self.max_bins,
+            "pos": {str(k): v for k, v in self.pos.items()},
+            "neg": {str(k): v for k, v in self.neg.items()},
+            "zero": self.zero,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sk = cls(alpha=data.get("alpha", 0.01), max_bins=data.get("max_bins", 2048))
+        sk.pos = {int(k): int(v) for k, v in (data.get("pos") or {}).items()}
+        sk.neg = {int(k): int(v) for k, v in (data.get("neg") or {}).items()}
+        sk.zero = int(data.get("zero", 0))
+        sk.count = int(data.get("count", 0))
+        sk.sum = float(data.get("sum", 0.0))
+        if sk.count:
+            sk.min = float(data["min"])
+            sk.max = float(data["max"])
+        return sk
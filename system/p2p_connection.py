@@ -8,7 +8,7 @@ Features:
 - WebRTC Data Channels
 - NAT Traversal (STUN)
 - Automatic connection management
-- Message passing
+- Message passing (coalesced binary frames, see p2p_framing)
 - Connection state tracking
 """
 from __future__ import annotations
@@ -31,6 +31,8 @@ except ImportError:
     AIORTC_AVAILABLE = False
     print("⚠️  aiortc not available. Install with: pip install aiortc")
 
+from p2p_framing import FramedChannel
+
 
 @dataclass
 class P2PMessage:
@@ -52,6 +54,29 @@ class P2PMessage:
         return cls(**data)
 
 
+class _DataChannelTransport:
+    """Adapts an RTCDataChannel to the FramedChannel transport interface."""
+    
+    LOW_WATER = 256 * 1024
+    
+    def __init__(self, channel: "RTCDataChannel"):
+        self.channel = channel
+        self.on_drain: Optional[Callable[[], None]] = None
+        channel.bufferedAmountLowThreshold = self.LOW_WATER
+        
+        @channel.on("bufferedamountlow")
+        def on_low():
+            if self.on_drain:
+                self.on_drain()
+    
+    @property
+    def buffered_amount(self) -> int:
+        return self.channel.bufferedAmount
+    
+    def send(self, frame):
+        self.channel.send(frame)
+
+
 class P2PConnection:
     """
     Represents a P2P connection to another device.
@@ -65,6 +90,7 @@ class P2PConnection:
         self.connected = False
         self.on_message: Optional[Callable[[P2PMessage], None]] = None
         self.on_state_change: Optional[Callable[[str], None]] = None
+        self.framer: Optional[FramedChannel] = None
     
     async def create_offer(self) -> Dict[str, Any]:
         """Create WebRTC offer."""
@@ -129,9 +155,12 @@ class P2PConnection:
         if not self.channel:
             return
         
+        self.framer = FramedChannel(_DataChannelTransport(self.channel), self._deliver)
+        
         @self.channel.on("open")
         def on_open():
             self.connected = True
+            self.framer.start(self.device_id)
             print(f"✅ P2P connection established with {self.peer_id}")
             if self.on_state_change:
                 self.on_state_change("connected")
@@ -146,21 +175,34 @@ class P2PConnection:
         @self.channel.on("message")
         def on_message(message):
             try:
-                msg = P2PMessage.from_json(message)
-                if self.on_message:
-                    self.on_message(msg)
+                self.framer.receive(message)
             except Exception as e:
                 print(f"⚠️  Error parsing message: {e}")
+        
+        if self.channel.readyState == "open":
+            # Answering side: the channel arrives already open
+            on_open()
+    
+    def _deliver(self, data: Dict[str, Any]):
+        try:
+            msg = P2PMessage(**data)
+        except TypeError as e:
+            print(f"⚠️  Error parsing message: {e}")
+            return
+        if self.on_message:
+            self.on_message(msg)
     
     def send(self, message: P2PMessage):
-        """Send message over P2P connection."""
+        """Send message over P2P connection (coalesced with other small messages)."""
         if not self.connected or not self.channel:
             raise RuntimeError("Not connected")
         
-        self.channel.send(message.to_json())
+        self.framer.send(message.to_dict())
     
     async def close(self):
         """Close connection."""
+        if self.framer:
+            self.framer.flush()
         if self.channel:
             self.channel.close()
         if self.pc:
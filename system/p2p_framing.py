@@ -0,0 +1,542 @@
+"""
+P2P Framing für KI_ana
+
+Framing layer for P2P data channels.
+
+Features:
+- Coalescing: small messages sent within a short window share one frame
+- Compact binary encoding (MessagePack wire format; uses the msgpack
+  package when installed, a built-in packer otherwise)
+- Optional zlib compression for larger frames
+- Chunking of large frames with bufferedAmount-based flow control
+- Negotiated per channel: peers exchange a hello and fall back to JSON
+  (one legacy P2PMessage JSON string per frame until the hello arrives)
+
+Wire format (binary):
+    b"KB" | flags | msgpack([[type, data, sender_id, timestamp], ...])
+    b"KC" | flags | uint32 stream | uint32 index | uint32 total | bytes
+flags: bit0 = zlib compressed body
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+FRAME_MAGIC = b"KB"
+CHUNK_MAGIC = b"KC"
+FLAG_ZLIB = 0x01
+HELLO_TYPE = "__frame_hello__"
+FRAMING_VERSION = 1
+
+_CHUNK_HEADER = struct.Struct(">2sBIII")
+
+Frame = Union[str, bytes]
+
+
+# ----------------------------------------------------------------------
+# MessagePack subset (nil, bool, int, float, str, bin, array, map)
+# ----------------------------------------------------------------------
+def _pack_str(obj: str, out: List[bytes]):
+    raw = obj.encode("utf-8")
+    n = len(raw)
+    if n < 32:
+        out.append(_FIXSTR[n])
+    elif n < 0x100:
+        out.append(struct.pack(">BB", 0xD9, n))
+    elif n < 0x10000:
+        out.append(struct.pack(">BH", 0xDA, n))
+    else:
+        out.append(struct.pack(">BI", 0xDB, n))
+    out.append(raw)
+
+
+def _pack_int(obj: int, out: List[bytes]):
+    if 0 <= obj < 0x80:
+        out.append(_POSFIX[obj])
+    elif -32 <= obj < 0:
+        out.append(struct.pack("b", obj))
+    elif 0 <= obj <= 0xFFFFFFFF:
+        out.append(struct.pack(">BI", 0xCE, obj))
+    elif 0 <= obj <= 0xFFFFFFFFFFFFFFFF:
+        out.append(struct.pack(">BQ", 0xCF, obj))
+    elif -0x80000000 <= obj < 0:
+        out.append(struct.pack(">Bi", 0xD2, obj))
+    elif -0x8000000000000000 <= obj < 0:
+        out.append(struct.pack(">Bq", 0xD3, obj))
+    else:
+        raise OverflowError("integer out of msgpack range")
+
+
+_FIXSTR = [bytes((0xA0 | n,)) for n in range(32)]
+_POSFIX = [bytes((n,)) for n in range(0x80)]
+
+
+def _pack(obj: Any, out: List[bytes]):
+    t = type(obj)  # exact-type fast paths first; bool is not int here
+    if t is str:
+        _pack_str(obj, out)
+    elif t is dict:
+        n = len(obj)
+        if n < 16:
+            out.append(bytes((0x80 | n,)))
+        elif n < 0x10000:
+            out.append(struct.pack(">BH", 0xDE, n))
+        else:
+            out.append(struct.pack(">BI", 0xDF, n))
+        for k, v in obj.items():
+            if type(k) is str:
+                _pack_str(k, out)
+            else:
+                _pack(k, out)
+            _pack(v, out)
+    elif t is int:
+        _pack_int(obj, out)
+    elif t is float:
+        out.append(struct.pack(">Bd", 0xCB, obj))
+    elif t is list or t is tuple:
+        n = len(obj)
+        if n < 16:
+            out.append(bytes((0x90 | n,)))
+        elif n < 0x10000:
+            out.append(struct.pack(">BH", 0xDC, n))
+        else:
+            out.append(struct.pack(">BI", 0xDD, n))
+        for item in obj:
+            _pack(item, out)
+    elif obj is None:
+        out.append(b"\xc0")
+    elif obj is True:
+        out.append(b"\xc3")
+    elif obj is False:
+        out.append(b"\xc2")
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        raw = bytes(obj)
+        n = len(raw)
+        if n < 0x100:
+            out.append(struct.pack(">BB", 0xC4, n))
+        elif n < 0x10000:
+            out.append(struct.pack(">BH", 0xC5, n))
+        else:
+            out.append(struct.pack(">BI", 0xC6, n))
+        out.append(raw)
+    elif isinstance(obj, str):
+        _pack_str(str(obj), out)
+    elif isinstance(obj, int):
+        _pack_int(int(obj), out)
+    elif isinstance(obj, float):
+        out.append(struct.pack(">Bd", 0xCB, float(obj)))
+    elif isinstance(obj, dict):
+        _pack(dict(obj), out)
+    elif isinstance(obj, (list, tuple)):
+        _pack(list(obj), out)
+    else:
+        raise TypeError(f"cannot pack {type(obj).__name__}")
+
+
+def _unpack(buf: bytes, pos: int) -> Tuple[Any, int]:
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b <= 0xBF:
+        n = b & 0x1F
+        return buf[pos:pos + n].decode("utf-8"), pos + n
+    if 0x90 <= b <= 0x9F:
+        return _unpack_array(buf, pos, b & 0x0F)
+    if 0x80 <= b <= 0x8F:
+        return _unpack_map(buf, pos, b & 0x0F)
+    if b == 0xC0:
+        return None, pos
+    if b == 0xC2:
+        return False, pos
+    if b == 0xC3:
+        return True, pos
+    if b == 0xCB:
+        return struct.unpack_from(">d", buf, pos)[0], pos + 8
+    if b == 0xCA:
+        return struct.unpack_from(">f", buf, pos)[0], pos + 4
+    fixed = {
+        0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+        0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+    }
+    if b in fixed:
+        fmt = fixed[b]
+        return struct.unpack_from(fmt, buf, pos)[0], pos + struct.calcsize(fmt)
+    if b in (0xD9, 0xDA, 0xDB, 0xC4, 0xC5, 0xC6):
+        fmt = {0xD9: ">B", 0xDA: ">H", 0xDB: ">I", 0xC4: ">B", 0xC5: ">H", 0xC6: ">I"}[b]
+        (n,) = struct.unpack_from(fmt, buf, pos)
+        pos += struct.calcsize(fmt)
+        raw = buf[pos:pos + n]
+        return (raw.decode("utf-8") if b in (0xD9, 0xDA, 0xDB) else bytes(raw)), pos + n
+    if b in (0xDC, 0xDD):
+        fmt = ">H" if b == 0xDC else ">I"
+        (n,) = struct.unpack_from(fmt, buf, pos)
+        return _unpack_array(buf, pos + struct.calcsize(fmt), n)
+    if b in (0xDE, 0xDF):
+        fmt = ">H" if b == 0xDE else ">I"
+        (n,) = struct.unpack_from(fmt, buf, pos)
+        return _unpack_map(buf, pos + struct.calcsize(fmt), n)
+    raise ValueError(f"unsupported msgpack type byte 0x{b:02x}")
+
+
+def _unpack_array(buf: bytes, pos: int, n: int) -> Tuple[List[Any], int]:
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(buf, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(buf: bytes, pos: int, n: int) -> Tuple[Dict[Any, Any], int]:
+    out = {}
+    for _ in range(n):
+        k, pos = _unpack(buf, pos)
+        v, pos = _unpack(buf, pos)
+        out[k] = v
+    return out, pos
+
+
+def packb(obj: Any) -> bytes:
+    """Serialise to MessagePack bytes."""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(obj, use_bin_type=True)
+    out: List[bytes] = []
+    _pack(obj, out)
+    return b"".join(out)
+
+
+def unpackb(data: bytes) -> Any:
+    """Deserialise MessagePack bytes."""
+    if MSGPACK_AVAILABLE:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    obj, pos = _unpack(data, 0)
+    if pos != len(data):
+        raise ValueError("trailing bytes after msgpack object")
+    return obj
+
+
+# ----------------------------------------------------------------------
+# Frames
+# ----------------------------------------------------------------------
+def encode_frame(messages: List[Dict[str, Any]], encoding: str = "bin",
+                 compress_min: int = 1024) -> Frame:
+    """
+    Encode message dicts (P2PMessage.to_dict()) into one frame.
+
+    "bin" gives bytes (compressed when the body is at least compress_min
+    bytes and zlib makes it smaller; compress_min <= 0 disables), "json"
+    gives {"batch": [...]} text.
+    """
+    if encoding == "json":
+        return json.dumps({"batch": messages})
+    body = packb([[m["type"], m["data"], m["sender_id"], m["timestamp"]] for m in messages])
+    flags = 0
+    if 0 < compress_min <= len(body):
+        packed = zlib.compress(body, 1)
+        if len(packed) < len(body):
+            body, flags = packed, FLAG_ZLIB
+    return FRAME_MAGIC + bytes((flags,)) + body
+
+
+def decode_frame(frame: Frame) -> List[Dict[str, Any]]:
+    """Message dicts from a frame (binary batch, JSON batch or legacy JSON message)."""
+    if isinstance(frame, str):
+        data = json.loads(frame)
+        return data["batch"] if "batch" in data else [data]
+    frame = bytes(frame)
+    if frame[:2] != FRAME_MAGIC:
+        raise ValueError("not a P2P frame")
+    body = frame[3:]
+    if frame[2] & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return [
+        {"type": t, "data": d, "sender_id": s, "timestamp": ts}
+        for t, d, s, ts in unpackb(body)
+    ]
+
+
+def split_chunks(frame: bytes, chunk_size: int, stream_id: int) -> List[bytes]:
+    """Split a binary frame into KC chunks of at most chunk_size payload bytes."""
+    total = max(1, -(-len(frame) // chunk_size))
+    return [
+        _CHUNK_HEADER.pack(CHUNK_MAGIC, 0, stream_id, i, total) + frame[i * chunk_size:(i + 1) * chunk_size]
+        for i in range(total)
+    ]
+
+
+class Reassembler:
+    """Collects KC chunks back into frames (bounded streams, chunks, size and age)."""
+
+    def __init__(self, max_streams: int = 64, max_bytes: int = 64 * 1024 * 1024, timeout: float = 30.0,
+                 max_chunks: int = 65536):
+        self.max_streams = max_streams
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_chunks = max_chunks
+        self._streams: Dict[int, Tuple[float, int, Dict[int, bytes], int]] = {}
+        self.dropped = 0
+
+    def add(self, chunk: bytes) -> Optional[bytes]:
+        _, _, stream, index, total = _CHUNK_HEADER.unpack_from(chunk)
+        payload = chunk[_CHUNK_HEADER.size:]
+        now = time.monotonic()
+
+        # Malformed header: the stream can never complete, drop it
+        if not 0 < total <= self.max_chunks or index >= total or (
+                stream in self._streams and self._streams[stream][1] != total):
+            self._streams.pop(stream, None)
+            self.dropped += 1
+            return None
+        if stream not in self._streams:
+            self._expire(now)
+            if len(self._streams) >= self.max_streams:
+                oldest = min(self._streams, key=lambda s: self._streams[s][0])
+                del self._streams[oldest]
+                self.dropped += 1
+            self._streams[stream] = (now, total, {}, 0)
+        started, total, parts, size = self._streams[stream]
+        if index not in parts:
+            parts[index] = payload
+            size += len(payload)
+        if size > self.max_bytes:
+            del self._streams[stream]
+            self.dropped += 1
+            return None
+        if len(parts) < total:
+            self._streams[stream] = (started, total, parts, size)
+            return None
+        del self._streams[stream]
+        return b"".join(parts[i] for i in range(total))
+
+    def _expire(self, now: float):
+        for stream in [s for s, v in self._streams.items() if now - v[0] > self.timeout]:
+            del self._streams[stream]
+            self.dropped += 1
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+# ----------------------------------------------------------------------
+# Channel
+# ----------------------------------------------------------------------
+class FramedChannel:
+    """
+    Coalescing, negotiated framing on top of a message transport.
+
+    The transport needs ``send(str | bytes)``; ``buffered_amount`` (int) and
+    an ``on_drain`` callback attribute are used for flow control when
+    present (RTCDataChannel: bufferedAmount / "bufferedamountlow").
+    """
+
+    def __init__(self, transport: Any, on_message: Callable[[Dict[str, Any]], None], *,
+                 window: Optional[float] = None, max_frame: int = 16 * 1024,
+                 chunk_size: int = 16 * 1024, high_water: int = 1024 * 1024,
+                 encoding: Optional[str] = None, compress_min: Optional[int] = None):
+        self.transport = transport
+        self.on_message = on_message
+        self.window = window if window is not None else float(os.getenv("KI_P2P_FRAME_WINDOW_MS", "5")) / 1000
+        self.max_frame = max_frame
+        self.chunk_size = chunk_size
+        self.high_water = high_water
+        self.preferred = encoding or os.getenv("KI_P2P_ENCODING", "bin")
+        self.compress_min = compress_min if compress_min is not None else int(os.getenv("KI_P2P_ZLIB_MIN", "1024"))
+
+        # None until the peer's hello arrives: legacy one-JSON-message-per-frame
+        self.encoding: Optional[str] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_bytes = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._outbox: Deque[Frame] = deque()
+        self._drain_handle: Optional[asyncio.TimerHandle] = None
+        self._stream_ids = 0
+        self._reassembler = Reassembler()
+
+        self.stats = {
+            "messages_sent": 0, "frames_sent": 0, "bytes_sent": 0, "chunks_sent": 0,
+            "messages_received": 0, "frames_received": 0, "flow_stalls": 0,
+        }
+        if hasattr(transport, "on_drain"):
+            transport.on_drain = self._pump
+
+    # -- negotiation ------------------------------------------------------
+    def hello(self) -> Dict[str, Any]:
+        encodings = ["bin", "json"] if self.preferred == "bin" else ["json"]
+        return {"version": FRAMING_VERSION, "encodings": encodings, "zlib": True}
+
+    def start(self, sender_id: str = ""):
+        """Announce framing support (call when the channel opens)."""
+        self._write(json.dumps({"type": HELLO_TYPE, "data": self.hello(),
+                                "sender_id": sender_id, "timestamp": time.time()}))
+
+    def _on_hello(self, info: Dict[str, Any]):
+        theirs = info.get("encodings") or []
+        self.encoding = "bin" if "bin" in theirs and self.preferred == "bin" else "json"
+
+    # -- sending ----------------------------------------------------------
+    def send(self, message: Dict[str, Any]):
+        """Queue one message dict; it is flushed with others within ``window``."""
+        self._pending.append(message)
+        self._pending_bytes += _estimate_size(message.get("data"))
+        if self._pending_bytes >= self.max_frame or self.window <= 0:
+            self.flush()
+            return
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()  # no loop to defer on (sync caller)
+                return
+            self._flush_handle = loop.call_later(self.window, self.flush)
+
+    def flush(self):
+        """Encode and send everything queued so far."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        messages, self._pending, self._pending_bytes = self._pending, [], 0
+        if not messages:
+            return
+        self.stats["messages_sent"] += len(messages)
+
+        if self.encoding is None:
+            for m in messages:
+                self._write(json.dumps(m))
+            return
+        if self.encoding == "json":
+            self._write(encode_frame(messages, "json"))
+            return
+
+        frame = encode_frame(messages, "bin", self.compress_min)
+        if len(frame) <= self.chunk_size:
+            self._write(frame)
+            return
+        self._stream_ids = (self._stream_ids + 1) & 0xFFFFFFFF
+        chunks = split_chunks(frame, self.chunk_size, self._stream_ids)
+        self.stats["chunks_sent"] += len(chunks)
+        for chunk in chunks:
+            self._write(chunk)
+
+    def _write(self, frame: Frame):
+        self._outbox.append(frame)
+        self._pump()
+
+    def _buffered(self) -> int:
+        return int(getattr(self.transport, "buffered_amount", 0) or 0)
+
+    def _pump(self):
+        outbox = self._outbox
+        while outbox:
+            if self._buffered() >= self.high_water:
+                self.stats["flow_stalls"] += 1
+                self._wait_for_drain()
+                return
+            frame = outbox.popleft()
+            self.transport.send(frame)
+            self.stats["frames_sent"] += 1
+            self.stats["bytes_sent"] += len(frame)
+
+    def _wait_for_drain(self):
+        # Transports with a drain callback wake us up; poll otherwise
+        if hasattr(self.transport, "on_drain") or self._drain_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        def retry():
+            self._drain_handle = None
+            self._pump()
+
+        self._drain_handle = loop.call_later(0.01, retry)
+
+    @property
+    def backlog(self) -> int:
+        """Frames waiting for the transport buffer to drain."""
+        return len(self._outbox)
+
+    # -- receiving --------------------------------------------------------
+    def receive(self, frame: Frame):
+        """Feed one transport message; decoded message dicts go to on_message."""
+        if isinstance(frame, (bytes, bytearray, memoryview)) and bytes(frame[:2]) == CHUNK_MAGIC:
+            frame = self._reassembler.add(bytes(frame))
+            if frame is None:
+                return
+        self.stats["frames_received"] += 1
+        for message in decode_frame(frame):
+            if message.get("type") == HELLO_TYPE:
+                self._on_hello(message.get("data") or {})
+                continue
+            self.stats["messages_received"] += 1
+            self.on_message(message)
+
+
+def _estimate_size(data: Any) -> int:
+    """Cheap size estimate used only to decide when a batch is full."""
+    if isinstance(data, (str, bytes)):
+        return len(data) + 16
+    if isinstance(data, dict):
+        return 16 + sum(len(str(k)) + _estimate_size(v) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return 16 + sum(_estimate_size(v) for v in data)
+    return 16
+
+
+# ----------------------------------------------------------------------
+# In-process loopback transport (tests / benchmarks)
+# ----------------------------------------------------------------------
+class LoopbackTransport:
+    """
+    One end of an in-process channel pair.
+
+    Frames are delivered on the event loop after ``latency`` seconds;
+    ``buffered_amount`` counts bytes not yet delivered and ``on_drain`` fires
+    once it falls to ``low_water``.
+    """
+
+    def __init__(self, latency: float = 0.0, low_water: int = 256 * 1024):
+        self.latency = latency
+        self.low_water = low_water
+        self.peer: Optional[LoopbackTransport] = None
+        self.on_frame: Optional[Callable[[Frame], None]] = None
+        self.on_drain: Optional[Callable[[], None]] = None
+        self.buffered_amount = 0
+        self.sends = 0
+
+    @classmethod
+    def pair(cls, **kw: Any) -> Tuple["LoopbackTransport", "LoopbackTransport"]:
+        a, b = cls(**kw), cls(**kw)
+        a.peer, b.peer = b, a
+        return a, b
+
+    def send(self, frame: Frame):
+        size = len(frame)
+        self.sends += 1
+        self.buffered_amount += size
+        loop = asyncio.get_running_loop()
+        if self.latency > 0:
+            loop.call_later(self.latency, self._deliver, frame, size)
+        else:
+            loop.call_soon(self._deliver, frame, size)
+
+    def _deliver(self, frame: Frame, size: int):
+        was_high = self.buffered_amount > self.low_water
+        self.buffered_amount -= size
+        if self.peer is not None and self.peer.on_frame is not None:
+            self.peer.on_frame(frame)
+        if was_high and self.buffered_amount <= self.low_water and self.on_drain:
+            self.on_drain()
@@ -3,10 +3,11 @@ P2P-Messaging System mit E2E-Verschlüsselung
 
 Features:
 - End-to-End Encryption (NaCl/libsodium)
-- Message Queue (Offline + Online)
+- Message Queue (Offline + Online, per-recipient index)
 - Delivery Confirmation (ACK)
-- Idempotenz (Duplicate Detection)
-- Persistent Storage
+- Idempotenz (Duplicate Detection, bounded time window)
+- Persistent Storage (append-only log, group commit)
+- Retry with exponential backoff
 - Message Routing
 
 Sicherheit:
@@ -16,11 +17,19 @@ Sicherheit:
 ✅ Forward Secrecy möglich
 """
 from __future__ import annotations
+import atexit
+import heapq
+import itertools
 import json
+import os
+import random
+import threading
 import time
 import uuid
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import sys
@@ -86,96 +95,339 @@ class PlainMessage:
         return cls(text=data["text"], metadata=data.get("metadata", {}))
 
 
+class DeliveredWindow:
+    """
+    Bounded idempotency set of processed message IDs.
+    
+    Keeps IDs seen within ``window_seconds`` (at most ``max_entries``), oldest
+    first, so duplicate detection does not grow with the message history.
+    """
+    
+    def __init__(self, window_seconds: float = 7 * 86400, max_entries: int = 200000):
+        self.window_seconds = float(window_seconds)
+        self.max_entries = int(max_entries)
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+    
+    def add(self, message_id: str, ts: Optional[float] = None):
+        self._seen[message_id] = time.time() if ts is None else ts
+        self._seen.move_to_end(message_id)
+        self.prune()
+    
+    def __setitem__(self, message_id: str, message: Any):
+        # Compatibility with the former Dict[str, EncryptedMessage]
+        self.add(message_id)
+    
+    def prune(self, now: Optional[float] = None):
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        seen = self._seen
+        while seen and (len(seen) > self.max_entries or next(iter(seen.values())) < cutoff):
+            seen.popitem(last=False)
+    
+    def items(self):
+        return self._seen.items()
+    
+    def __contains__(self, message_id: object) -> bool:
+        return message_id in self._seen
+    
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
 class MessageQueue:
-    """Persistent message queue for offline/online messages."""
+    """
+    Persistent message queue for offline/online messages.
+    
+    Every change is one JSON line appended to ``queue.log``; lines are
+    group-committed (one write + fsync per ``commit_batch`` records or
+    ``commit_interval`` seconds) and the log is compacted into a snapshot
+    once it is mostly dead records. Pending messages are indexed per
+    recipient, and failed sends are retried with exponential backoff.
+    """
+    
+    _open: "weakref.WeakValueDictionary[str, MessageQueue]" = weakref.WeakValueDictionary()
     
-    def __init__(self, queue_dir: Path):
+    def __init__(self, queue_dir: Path, *, commit_interval: float = 0.05, commit_batch: int = 256,
+                 retry_base: float = 2.0, retry_max: float = 3600.0, max_attempts: int = 10,
+                 dedup_window: float = 7 * 86400, dedup_max: int = 200000, fsync: bool = True):
         self.queue_dir = queue_dir
         self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.log_file = self.queue_dir / "queue.log"
+        
+        self.commit_interval = commit_interval
+        self.commit_batch = max(1, commit_batch)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+        self._lock = threading.RLock()
         
         # In-memory queue
         self.pending: Dict[str, EncryptedMessage] = {}
-        self.delivered: Dict[str, EncryptedMessage] = {}
-        
-        # Load from disk
+        self.delivered = DeliveredWindow(dedup_window, dedup_max)
+        self._by_recipient: Dict[str, Dict[str, EncryptedMessage]] = {}
+        
+        # Retry schedule: heap of (next_retry, seq, message_id); stale entries are skipped
+        self._attempts: Dict[str, int] = {}
+        self._next_retry: Dict[str, float] = {}
+        self._retry_heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        
+        # Group commit
+        self._buffer: List[str] = []
+        self._timer: Optional[threading.Timer] = None
+        self._log_records = 0
+        self.commits = 0
+        
+        # Load from disk (committing any other open queue on the same directory first)
+        key = str(self.queue_dir.resolve())
+        sibling = MessageQueue._open.get(key)
+        if sibling is not None:
+            sibling.flush()
+        MessageQueue._open[key] = self
         self._load_queue()
     
+    # -- state changes (shared by live calls and log replay) ---------------
+    def _apply(self, rec: Dict[str, Any]):
+        op = rec.get("op")
+        if op == "add":
+            msg = EncryptedMessage.from_dict(rec["msg"])
+            self.pending[msg.message_id] = msg
+            self._by_recipient.setdefault(msg.recipient_id, {})[msg.message_id] = msg
+            self._schedule(msg.message_id, 0, msg.timestamp)
+        elif op in ("sent", "failed"):
+            msg = self.pending.get(rec["id"])
+            if msg is not None:
+                msg.status = MessageStatus.SENT.value if op == "sent" else MessageStatus.FAILED.value
+                self._schedule(msg.message_id, rec["attempts"], rec["next_retry"])
+        elif op == "delivered":
+            msg = self.pending.pop(rec["id"], None)
+            if msg is not None:
+                msg.status = MessageStatus.DELIVERED.value
+                msg.ack_received = True
+                recipient = self._by_recipient.get(msg.recipient_id)
+                if recipient is not None:
+                    recipient.pop(msg.message_id, None)
+                    if not recipient:
+                        del self._by_recipient[msg.recipient_id]
+                self._attempts.pop(msg.message_id, None)
+                self._next_retry.pop(msg.message_id, None)
+            self.delivered.add(rec["id"], rec["ts"])
+        elif op == "seen":
+            self.delivered.add(rec["id"], rec["ts"])
+    
+    def _schedule(self, message_id: str, attempts: int, next_retry: Optional[float]):
+        self._attempts[message_id] = attempts
+        if next_retry is None:
+            self._next_retry.pop(message_id, None)  # gave up; stays pending as failed
+            return
+        self._next_retry[message_id] = next_retry
+        heapq.heappush(self._retry_heap, (next_retry, next(self._seq), message_id))
+    
+    def _record(self, rec: Dict[str, Any]):
+        with self._lock:
+            self._apply(rec)
+            self._buffer.append(json.dumps(rec))
+            if len(self._buffer) >= self.commit_batch:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.commit_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    # -- persistence --------------------------------------------------------
     def _load_queue(self):
-        """Load queue from disk."""
+        """Load queue from disk (replaying the log, or migrating legacy JSON)."""
+        if self.log_file.exists():
+            try:
+                with open(self.log_file, "r") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            self._apply(json.loads(line))
+                        except Exception:
+                            continue  # torn tail after a crash
+                        self._log_records += 1
+            except Exception as e:
+                print(f"⚠️  Error loading message log: {e}")
+        else:
+            self._migrate_legacy()
+        
+        self.delivered.prune()
+        if self.pending:
+            print(f"📦 Loaded {len(self.pending)} pending messages")
+        if self._needs_compaction():
+            self.compact()
+    
+    def _migrate_legacy(self):
+        """Convert pending.json / delivered.json into the log (once)."""
         pending_file = self.queue_dir / "pending.json"
         delivered_file = self.queue_dir / "delivered.json"
         
-        if pending_file.exists():
+        migrated = False
+        for path, op in ((pending_file, "add"), (delivered_file, "seen")):
+            if not path.exists():
+                continue
             try:
-                data = json.loads(pending_file.read_text())
-                self.pending = {
-                    msg_id: EncryptedMessage.from_dict(msg_data)
-                    for msg_id, msg_data in data.items()
-                }
-                print(f"📦 Loaded {len(self.pending)} pending messages")
+                data = json.loads(path.read_text())
+                for msg_id, msg_data in data.items():
+                    if op == "add":
+                        self._apply({"op": "add", "msg": msg_data})
+                    else:
+                        self._apply({"op": "seen", "id": msg_id, "ts": float(msg_data.get("timestamp", time.time()))})
+                path.rename(path.with_suffix(".json.migrated"))
+                migrated = True
             except Exception as e:
-                print(f"⚠️  Error loading pending queue: {e}")
-        
-        if delivered_file.exists():
+                print(f"⚠️  Error loading legacy queue {path.name}: {e}")
+        if migrated:
+            self.compact()
+    
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        for msg_id, ts in self.delivered.items():
+            records.append({"op": "seen", "id": msg_id, "ts": ts})
+        now = time.time()
+        for msg in self.pending.values():
+            records.append({"op": "add", "msg": msg.to_dict()})
+            attempts = self._attempts.get(msg.message_id, 0)
+            if attempts:
+                # Handed out by due_for_retry but not re-attempted yet -> due now
+                next_retry = self._next_retry.get(msg.message_id, now if attempts < self.max_attempts else None)
+                op = "sent" if msg.status == MessageStatus.SENT.value else "failed"
+                records.append({"op": op, "id": msg.message_id, "attempts": attempts, "next_retry": next_retry})
+        return records
+    
+    def _needs_compaction(self) -> bool:
+        # A snapshot holds ~2 records per pending message and 1 per dedup id
+        live = 2 * len(self.pending) + len(self.delivered)
+        return self._log_records > 1000 and self._log_records > 2 * live
+    
+    def compact(self):
+        """Rewrite the log as a snapshot of the live state."""
+        with self._lock:
+            self._flush_locked()
+            records = self._snapshot()
+            tmp = self.log_file.with_suffix(".log.tmp")
             try:
-                data = json.loads(delivered_file.read_text())
-                self.delivered = {
-                    msg_id: EncryptedMessage.from_dict(msg_data)
-                    for msg_id, msg_data in data.items()
-                }
+                with open(tmp, "w") as f:
+                    f.write("".join(json.dumps(r) + "\n" for r in records))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                tmp.replace(self.log_file)
+                self._log_records = len(records)
             except Exception as e:
-                print(f"⚠️  Error loading delivered queue: {e}")
+                print(f"⚠️  Error compacting message log: {e}")
     
-    def _save_queue(self):
-        """Save queue to disk."""
-        pending_file = self.queue_dir / "pending.json"
-        delivered_file = self.queue_dir / "delivered.json"
-        
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer or not self.queue_dir.exists():
+            return
+        data = "".join(line + "\n" for line in self._buffer)
+        count = len(self._buffer)
+        self._buffer = []
         try:
-            pending_data = {
-                msg_id: msg.to_dict()
-                for msg_id, msg in self.pending.items()
-            }
-            pending_file.write_text(json.dumps(pending_data, indent=2))
-            
-            delivered_data = {
-                msg_id: msg.to_dict()
-                for msg_id, msg in self.delivered.items()
-            }
-            delivered_file.write_text(json.dumps(delivered_data, indent=2))
+            with open(self.log_file, "a") as f:
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._log_records += count
+            self.commits += 1
         except Exception as e:
             print(f"⚠️  Error saving queue: {e}")
+        if self._needs_compaction():
+            self.compact()
     
+    def flush(self):
+        """Commit buffered log records now."""
+        with self._lock:
+            self._flush_locked()
+    
+    def _save_queue(self):
+        """Save queue to disk (kept for callers of the old API)."""
+        self.flush()
+    
+    # -- public API ---------------------------------------------------------
     def add(self, message: EncryptedMessage):
         """Add message to pending queue."""
-        self.pending[message.message_id] = message
-        self._save_queue()
+        self._record({"op": "add", "msg": message.to_dict()})
+    
+    def backoff(self, attempts: int) -> float:
+        """Delay before retry number ``attempts`` (exponential, capped, jittered)."""
+        delay = min(self.retry_max, self.retry_base * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.0)
+    
+    def _attempt(self, message_id: str, op: str):
+        with self._lock:
+            if message_id not in self.pending:
+                return
+            attempts = self._attempts.get(message_id, 0) + 1
+            next_retry = time.time() + self.backoff(attempts) if attempts < self.max_attempts else None
+            self._record({"op": op, "id": message_id, "attempts": attempts, "next_retry": next_retry})
+    
+    def mark_sent(self, message_id: str):
+        """Record a send attempt; retried after backoff unless ACKed."""
+        self._attempt(message_id, "sent")
     
     def mark_delivered(self, message_id: str):
         """Mark message as delivered."""
-        if message_id in self.pending:
-            msg = self.pending.pop(message_id)
-            msg.status = MessageStatus.DELIVERED.value
-            msg.ack_received = True
-            self.delivered[message_id] = msg
-            self._save_queue()
+        with self._lock:
+            if message_id in self.pending:
+                self._record({"op": "delivered", "id": message_id, "ts": time.time()})
     
     def mark_failed(self, message_id: str):
-        """Mark message as failed."""
-        if message_id in self.pending:
-            self.pending[message_id].status = MessageStatus.FAILED.value
-            self._save_queue()
+        """Mark message as failed (retried after backoff, up to max_attempts)."""
+        self._attempt(message_id, "failed")
+    
+    def record_received(self, message_id: str):
+        """Remember an incoming message for duplicate detection."""
+        self._record({"op": "seen", "id": message_id, "ts": time.time()})
     
     def get_pending(self, recipient_id: str = None) -> List[EncryptedMessage]:
         """Get pending messages, optionally filtered by recipient."""
-        messages = list(self.pending.values())
-        if recipient_id:
-            messages = [m for m in messages if m.recipient_id == recipient_id]
-        return messages
+        with self._lock:
+            if recipient_id:
+                return list(self._by_recipient.get(recipient_id, {}).values())
+            return list(self.pending.values())
+    
+    def due_for_retry(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[EncryptedMessage]:
+        """Pending messages whose backoff has elapsed (oldest schedule first)."""
+        now = time.time() if now is None else now
+        due: List[EncryptedMessage] = []
+        with self._lock:
+            heap = self._retry_heap
+            while heap and heap[0][0] <= now and (limit is None or len(due) < limit):
+                next_retry, _, msg_id = heapq.heappop(heap)
+                if self._next_retry.get(msg_id) != next_retry:
+                    continue  # superseded or finished
+                del self._next_retry[msg_id]
+                due.append(self.pending[msg_id])
+        return due
     
     def is_duplicate(self, message_id: str) -> bool:
         """Check if message was already processed (idempotency)."""
         return message_id in self.pending or message_id in self.delivered
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": len(self.pending),
+                "recipients": len(self._by_recipient),
+                "scheduled_retries": len(self._next_retry),
+                "dedup_ids": len(self.delivered),
+                "log_records": self._log_records + len(self._buffer),
+                "commits": self.commits,
+            }
+
+
+@atexit.register
+def _flush_open_queues():
+    for q in list(MessageQueue._open.values()):
+        q.flush()
 
 
 class P2PMessaging:
@@ -346,12 +598,12 @@ class P2PMessaging:
                 "encrypted_message",
                 message.to_dict()
             )
-            message.status = MessageStatus.SENT.value
-            self.queue._save_queue()
+            self.queue.mark_sent(message.message_id)
             print(f"📤 Message sent: {message.message_id[:8]}...")
         except Exception as e:
             print(f"⚠️  Failed to send message: {e}")
-            # Message stays in queue for retry
+            # Message stays in queue, retried after backoff
+            self.queue.mark_failed(message.message_id)
     
     def _handle_encrypted_message(self, p2p_message: P2PMessage):
         """Handle incoming encrypted message."""
@@ -373,9 +625,8 @@ class P2PMessaging:
         try:
             plain_msg = self._decrypt_message(encrypted_msg)
             
-            # Store in delivered queue
-            self.queue.delivered[encrypted_msg.message_id] = encrypted_msg
-            self.queue._save_queue()
+            # Remember for duplicate detection
+            self.queue.record_received(encrypted_msg.message_id)
             
             # Send ACK
             self._send_ack(sender_id, encrypted_msg.message_id)
@@ -430,8 +681,8 @@ class P2PMessaging:
         self.queue.mark_delivered(message_id)
     
     def retry_pending_messages(self):
-        """Retry sending pending messages."""
-        pending = self.queue.get_pending()
+        """Retry sending pending messages whose backoff has elapsed."""
+        pending = self.queue.due_for_retry()
         
         if not pending:
             return
@@ -446,6 +697,7 @@ class P2PMessaging:
         return {
             "pending_messages": len(self.queue.pending),
             "delivered_messages": len(self.queue.delivered),
+            "scheduled_retries": self.queue.stats()["scheduled_retries"],
             "peer_keys_cached": len(self.peer_keys)
         }
 
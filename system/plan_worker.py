@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 """
-Planner Worker: sequentially processes PlanSteps via Planner API.
-- Leases next step via POST /api/plan/lease-step
-- Executes (placeholder) and reports result via POST /api/plan/complete-step
+Planner Worker: processes PlanSteps via Planner API.
+- Leases batches via POST /api/plan/lease-step {max, wait} (long-poll: the
+  request returns as soon as a step is due, no fixed polling interval)
+- Runs up to WORKER_CONCURRENCY steps at once on an asyncio loop
+- Reports via POST /api/plan/complete-step; failed steps are retried by the
+  server as delayed steps (payload max_retries / retry_backoff_sec)
 - Auth: ADMIN_API_TOKEN if set
 """
-import os, time, json, traceback, threading
+import os, time, json, traceback, asyncio
+from concurrent.futures import ThreadPoolExecutor
 from urllib import request as _ur
 import urllib.parse as _up
 
 API_BASE = os.getenv("PLANNER_API_BASE", "http://127.0.0.1:8000")
 SLEEP_SEC = float(os.getenv("PLANNER_POLL_INTERVAL", "2"))
+LONG_POLL_SEC = float(os.getenv("PLANNER_LONG_POLL", "25"))
 KI_ROOT = os.getenv("KI_ROOT", os.path.expanduser("~/ki_ana"))
 HB_PATH = os.path.join(KI_ROOT, "runtime", "plan_worker_heartbeat")
 
@@ -296,64 +301,89 @@ def _within_low_priority_window() -> bool:
         return True
 
 
-def _worker_loop(slot: int):
-    while True:
+def _heartbeat() -> None:
+    try:
+        os.makedirs(os.path.dirname(HB_PATH), exist_ok=True)
+        with open(HB_PATH, "w") as f:
+            f.write(str(int(time.time())))
+    except Exception:
+        pass
+
+
+def _run_step(step: dict, plan_id) -> dict:
+    """Execute one leased step (blocking, runs in the executor) and report it."""
+    payload = step.get("payload") or {}
+    # Deadline / priority handling (soft)
+    deadline = int(payload.get("deadline_ts") or step.get("deadline_ts") or 0)
+    prio = (payload.get("priority") or step.get("priority") or "normal").lower()
+    final = False
+    if deadline and int(time.time()) > deadline:
+        ok, res, final = False, f"missed deadline: {deadline}", True
+    else:
+        ok, res = _do_step(step)
+        if ok and prio == "low" and not _within_low_priority_window():
+            # annotate result to show it was executed outside preferred window
+            res = (res or "") + " | note: low-priority executed outside preferred window"
+    return _req("/api/plan/complete-step", {
+        "step_id": int(step.get("id") or 0),
+        "plan_id": int(plan_id or step.get("plan_id") or 0),
+        "ok": bool(ok),
+        "result": res if ok else None,
+        "error": None if ok else (res or "failed"),
+        "final": final,
+    })
+
+
+async def _worker_main(concurrency: int) -> None:
+    loop = asyncio.get_running_loop()
+    # Steps are blocking (urllib, sleep): one executor thread per slot
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 1, thread_name_prefix="plan-step"))
+    slots = asyncio.Semaphore(concurrency)
+    inflight: set = set()
+
+    async def run(step: dict, plan_id) -> None:
         try:
-            # Heartbeat from slot 0 only (best-effort)
-            if slot == 0:
-                try:
-                    os.makedirs(os.path.dirname(HB_PATH), exist_ok=True)
-                    with open(HB_PATH, "w") as f:
-                        f.write(str(int(time.time())))
-                except Exception:
-                    pass
-            leased = _req("/api/plan/lease-step", {})
-            if not leased or leased.get("ok") is not True:
-                time.sleep(SLEEP_SEC)
-                continue
-            step = leased.get("step")
-            plan_id = leased.get("plan_id")
-            if not step:
-                time.sleep(SLEEP_SEC)
-                continue
+            await loop.run_in_executor(None, _run_step, step, plan_id)
+        except Exception:
+            print(f"[plan_worker] step #{step.get('id')} error:\n" + traceback.format_exc())
+        finally:
+            slots.release()
 
-            # Deadline / priority handling (soft)
-            payload = step.get("payload") or {}
-            deadline = int(payload.get("deadline_ts") or step.get("deadline_ts") or 0)
-            prio = (payload.get("priority") or step.get("priority") or "normal").lower()
-            if deadline and int(time.time()) > deadline:
-                ok, res = False, f"missed deadline: {deadline}"
-            else:
-                # Retry policy
-                max_retries = int(payload.get("max_retries") or step.get("max_retries") or 0)
-                backoff = int(payload.get("retry_backoff_sec") or step.get("retry_backoff_sec") or 2)
-                attempts = 0
-                ok = False
-                res = ""
-                while True:
-                    attempts += 1
-                    ok, res = _do_step(step)
-                    if ok:
-                        if prio == "low" and not _within_low_priority_window():
-                            # annotate result to show it was executed outside preferred window
-                            res = (res or "") + " | note: low-priority executed outside preferred window"
-                        break
-                    if attempts > max_retries:
-                        break
-                    # exponential backoff
-                    wait = min(60, backoff * (2 ** (attempts - 1)))
-                    time.sleep(wait)
-            _req("/api/plan/complete-step", {
-                "step_id": int(step.get("id") or 0),
-                "plan_id": int(plan_id or 0),
-                "ok": bool(ok),
-                "result": res if ok else None,
-                "error": None if ok else (res or f"failed after retries"),
-            })
+    while True:
+        try:
+            # Wait for a free slot, then lease as many steps as slots are free
+            await slots.acquire()
+            free = 1
+            while free < concurrency and not slots.locked():
+                await slots.acquire()
+                free += 1
+            _heartbeat()
+            try:
+                leased = await loop.run_in_executor(
+                    None, lambda: _req("/api/plan/lease-step", {"max": free, "wait": LONG_POLL_SEC}, timeout=LONG_POLL_SEC + 10)
+                )
+            except Exception:
+                for _ in range(free):
+                    slots.release()
+                raise
+            steps = []
+            if leased and leased.get("ok") is True:
+                steps = leased.get("steps")
+                if steps is None:  # server without batch leasing
+                    steps = [dict(leased["step"], plan_id=leased.get("plan_id"))] if leased.get("step") else []
+            for step in steps[:free]:
+                t = asyncio.create_task(run(step, step.get("plan_id")))
+                inflight.add(t)
+                t.add_done_callback(inflight.discard)
+            for _ in range(free - min(free, len(steps))):
+                slots.release()
+            if not steps and (not leased or "steps" not in leased):
+                # Old server (no long-poll) or error response: keep the legacy pace
+                await asyncio.sleep(SLEEP_SEC)
         except Exception:
             # Log locally and backoff
-            print(f"[plan_worker:{slot}] error:\n" + traceback.format_exc())
-            time.sleep(max(SLEEP_SEC, 3.0))
+            print("[plan_worker] error:\n" + traceback.format_exc())
+            await asyncio.sleep(max(SLEEP_SEC, 3.0))
 
 
 def main() -> int:
@@ -361,14 +391,10 @@ def main() -> int:
         conc = max(1, int(os.getenv("WORKER_CONCURRENCY", "1")))
     except Exception:
         conc = 1
-    threads = []
-    for i in range(conc):
-        t = threading.Thread(target=_worker_loop, args=(i,), daemon=True)
-        t.start()
-        threads.append(t)
-    # Join forever
-    for t in threads:
-        t.join()
+    try:
+        asyncio.run(_worker_main(conc))
+    except KeyboardInterrupt:
+        pass
     return 0
 
 if __name__ == "__main__":
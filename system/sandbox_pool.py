@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Warm Sandbox Pool for Skill Tests & Execution
+
+Instead of starting a fresh interpreter per test, the pool keeps a few
+long-lived sandbox workers ("zygotes") that have already imported the
+runner. Each worker runs with the sandbox environment and memory limits,
+receives jobs over its stdin/stdout pipe (length-prefixed JSON) and forks a
+fresh child per job:
+
+- the child gets the same limits as before: 2 CPU-seconds, 256 MB address
+  space, no core dumps, a wall-clock timeout (SIGALRM) and KIANA_SANDBOX=1
+- nothing survives between jobs (every job starts from the warm image);
+  the child runs in its own process group, killed when the job ends, and
+  holds no fds besides stdio and its own output/result pipes
+- the worker itself is recycled after KI_SANDBOX_MAX_RUNS jobs or after a
+  job breached a limit
+
+Per-invocation overhead is one fork (~1-2 ms) instead of interpreter startup
+plus imports. Batches run in parallel across KI_SANDBOX_WORKERS workers.
+
+Job kinds:
+  {"kind": "skill", "path": "<skill dir>", "context": {...}}   → run(context)
+  {"kind": "code", "code": "...", "func": "name", "examples": [{"input", "output"}]}
+"""
+from __future__ import annotations
+import atexit
+import json
+import os
+import queue
+import resource
+import select
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+CPU_SECONDS = 2
+MEMORY_BYTES = 256 * 1024 * 1024
+OUTPUT_LIMIT = 64 * 1024
+
+
+# -- framing ------------------------------------------------------------------
+def _send(fd: int, obj: Dict[str, Any]) -> None:
+    data = json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+    view = memoryview(struct.pack(">I", len(data)) + data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
+
+
+def _read_exact(fd: int, n: int, deadline: Optional[float] = None) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([fd], [], [], left)[0]:
+                raise TimeoutError("sandbox worker did not answer")
+        chunk = os.read(fd, n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(fd: int, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    head = _read_exact(fd, 4, deadline)
+    if head is None:
+        return None
+    body = _read_exact(fd, struct.unpack(">I", head)[0], deadline)
+    return None if body is None else json.loads(body.decode("utf-8"))
+
+
+# -- worker side --------------------------------------------------------------
+def _limit_worker() -> None:
+    """preexec_fn for workers: memory + core limits (CPU is limited per job)."""
+    resource.setrlimit(resource.RLIMIT_AS, (MEMORY_BYTES, MEMORY_BYTES))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _run_skill(req: Dict[str, Any]) -> Dict[str, Any]:
+    import importlib.util
+    skill_dir = Path(req["path"])
+    entry = "skill.py"
+    manifest = skill_dir / "manifest.json"
+    if manifest.exists():
+        entry = json.loads(manifest.read_text(encoding="utf-8")).get("entry") or entry
+    os.chdir(skill_dir)
+    spec = importlib.util.spec_from_file_location("skill", str(skill_dir / entry))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)  # type: ignore
+    result = mod.run(req.get("context") or {}) if hasattr(mod, "run") else None
+    return {"ok": True, "result": result}
+
+
+def _run_code(req: Dict[str, Any]) -> Dict[str, Any]:
+    namespace: Dict[str, Any] = {"__builtins__": __builtins__, "__name__": "skill"}
+    exec(req["code"], namespace)
+    func = namespace.get(req["func"])
+    if not callable(func):
+        return {"ok": False, "error": f"Function '{req['func']}' not found in generated code"}
+    results = []
+    breach = None
+    for example in req.get("examples") or []:
+        try:
+            input_val = eval(example["input"])
+            expected = eval(example["output"])
+            result = func(input_val)
+            results.append({"input": example["input"], "expected": example["output"],
+                            "actual": str(result), "passed": result == expected})
+        except MemoryError:
+            breach = "memory"
+            results.append({"input": example.get("input"), "error": "MemoryError", "passed": False})
+        except Exception as e:
+            results.append({"input": example.get("input"), "error": str(e), "passed": False})
+    out = {"ok": all(r["passed"] for r in results), "results": results}
+    if breach:
+        out["breach"] = breach
+    return out
+
+
+def _child(req: Dict[str, Any], out_w: int, res_w: int) -> None:
+    """Runs in the forked child; never returns."""
+    code = 0
+    try:
+        os.dup2(out_w, 1)
+        os.dup2(out_w, 2)
+        cpu = int(req.get("cpu_seconds") or CPU_SECONDS)
+        # Soft limit raises SIGXCPU (reported as a CPU breach); hard limit kills a job ignoring it
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        signal.alarm(max(1, int(float(req.get("timeout") or 5))))
+        kind = req.get("kind")
+        if kind == "skill":
+            payload = _run_skill(req)
+        elif kind == "code":
+            payload = _run_code(req)
+        else:
+            payload = {"ok": False, "error": f"unknown kind: {kind}"}
+    except MemoryError:
+        payload = {"ok": False, "error": "MemoryError", "breach": "memory"}
+    except BaseException as e:
+        import traceback
+        traceback.print_exc()
+        payload = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        view = memoryview(data)
+        while view:
+            view = view[os.write(res_w, view):]
+    except BaseException:
+        code = 1
+    os._exit(code)
+
+
+def _close_inherited_fds(*keep: int) -> None:
+    """In the job child: close every fd but stdio and `keep`.
+
+    The worker's protocol pipes are inherited across fork; job code holding
+    them could forge result frames or read the next request.
+    """
+    try:
+        max_fd = os.sysconf("SC_OPEN_MAX")
+    except (ValueError, OSError):
+        max_fd = 1024
+    lo = 3
+    for fd in sorted(set(keep)):
+        os.closerange(lo, fd)
+        lo = fd + 1
+    os.closerange(lo, max(lo, max_fd))
+
+
+def _kill_group(pid: int) -> None:
+    """SIGKILL the job's process group (the child and whatever it spawned)."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _execute(req: Dict[str, Any]) -> Dict[str, Any]:
+    """Fork a child for one job and collect its output, result and exit status."""
+    timeout = float(req.get("timeout") or 5)
+    out_r, out_w = os.pipe()
+    res_r, res_w = os.pipe()
+    t0 = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.setpgid(0, 0)
+        except OSError:
+            pass
+        _close_inherited_fds(out_w, res_w)
+        _child(req, out_w, res_w)
+    try:
+        os.setpgid(pid, pid)  # also from the parent, so killpg never races the child
+    except OSError:
+        pass
+    os.close(out_w)
+    os.close(res_w)
+
+    output, result = bytearray(), bytearray()
+    open_fds = {out_r: output, res_r: result}
+    deadline = t0 + timeout + 1.0
+    killed = False
+    while open_fds:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            _kill_group(pid)
+            killed = True
+            break
+        for fd in select.select(list(open_fds), [], [], left)[0]:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                os.close(fd)
+                del open_fds[fd]
+                continue
+            buf = open_fds[fd]
+            buf += chunk
+            if fd == out_r and len(buf) > OUTPUT_LIMIT:
+                del buf[: len(buf) - OUTPUT_LIMIT]
+    for fd in open_fds:
+        os.close(fd)
+    _, status = os.waitpid(pid, 0)
+    _kill_group(pid)  # anything the job left running in the background
+
+    res: Dict[str, Any]
+    try:
+        res = json.loads(result.decode("utf-8")) if result else {"ok": False}
+    except Exception:
+        res = {"ok": False, "error": "unreadable result"}
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        res["ok"] = False
+        res["signal"] = sig
+        if killed or sig == signal.SIGALRM:
+            res["error"], res["breach"] = "Timeout", "timeout"
+        elif sig == signal.SIGXCPU:
+            res["error"], res["breach"] = "CPU limit exceeded", "cpu"
+        else:
+            res["error"] = res.get("error") or f"killed by signal {sig}"
+            res["breach"] = res.get("breach") or "signal"
+    res["output"] = output.decode("utf-8", errors="replace")
+    res["duration_ms"] = round((time.monotonic() - t0) * 1000.0, 2)
+    return res
+
+
+def _worker_main() -> int:
+    # Keep the protocol channel private: job output must not reach it
+    proto_in, proto_out = os.dup(0), os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.environ["KIANA_SANDBOX"] = "1"
+    # Warm imports, shared by every forked job
+    try:
+        import skill_runner  # noqa: F401
+    except Exception:
+        pass
+    import importlib.util, traceback, collections, datetime, math, re  # noqa: F401,E401
+    _send(proto_out, {"ready": True, "pid": os.getpid()})
+    while True:
+        req = _recv(proto_in)
+        if req is None:
+            return 0
+        try:
+            res = _execute(req)
+        except Exception as e:
+            res = {"ok": False, "error": f"sandbox error: {e}", "breach": "worker"}
+        _send(proto_out, res)
+
+
+def _once_main() -> int:
+    """`--once`: run the JSON job read from stdin, write its result to stdout."""
+    req = json.loads(sys.stdin.buffer.read().decode("utf-8"))
+    proto_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.environ["KIANA_SANDBOX"] = "1"
+    try:
+        res = _execute(req)
+    except Exception as e:
+        res = {"ok": False, "error": f"sandbox error: {e}", "breach": "worker"}
+    os.write(proto_out, json.dumps(res, ensure_ascii=False, default=str).encode("utf-8"))
+    return 0
+
+
+def run_isolated(req: Dict[str, Any], python: Optional[str] = None) -> Dict[str, Any]:
+    """One job in a fresh sandbox interpreter instead of a pooled worker.
+
+    Same child as a pooled job (fork via _execute, job limits, process group),
+    only without the warm image; used when the pool is off (KI_SANDBOX_POOL=0).
+    """
+    env = os.environ.copy()
+    env["KIANA_SANDBOX"] = "1"
+    timeout = float(req.get("timeout") or 5)
+    try:
+        proc = subprocess.run(
+            [python or sys.executable, str(Path(__file__).resolve()), "--once"],
+            input=json.dumps(req).encode("utf-8"), capture_output=True,
+            cwd=tempfile.gettempdir(), env=env, preexec_fn=_limit_worker, timeout=timeout + 30,
+        )
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "error": "Timeout", "breach": "timeout"}
+    try:
+        return json.loads(proc.stdout.decode("utf-8"))
+    except Exception:
+        err = proc.stderr.decode("utf-8", errors="replace")[-500:]
+        return {"ok": False, "error": f"sandbox error: {err or proc.returncode}", "breach": "worker"}
+
+
+# -- pool side ----------------------------------------------------------------
+class _Worker:
+    def __init__(self, python: str):
+        env = os.environ.copy()
+        env["KIANA_SANDBOX"] = "1"
+        self.proc = subprocess.Popen(
+            [python, "-u", str(Path(__file__).resolve()), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(), env=env, preexec_fn=_limit_worker, bufsize=0,
+        )
+        self.runs = 0
+        self.broken = False
+        hello = _recv(self.proc.stdout.fileno(), time.monotonic() + 30)
+        if not hello or not hello.get("ready"):
+            self.close()
+            raise RuntimeError("sandbox worker failed to start")
+
+    def call(self, req: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self.runs += 1
+        try:
+            _send(self.proc.stdin.fileno(), req)
+            res = _recv(self.proc.stdout.fileno(), time.monotonic() + timeout + 5.0)
+        except (OSError, TimeoutError, ValueError) as e:
+            self.broken = True
+            return {"ok": False, "error": f"sandbox worker lost: {e}", "breach": "worker"}
+        if res is None:
+            self.broken = True
+            return {"ok": False, "error": "sandbox worker exited", "breach": "worker"}
+        return res
+
+    def close(self) -> None:
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1)
+        except Exception:
+            self.proc.kill()
+            try:
+                self.proc.wait(timeout=1)
+            except Exception:
+                pass
+
+
+class SandboxPool:
+    """
+    Pre-started sandbox workers.
+
+    Singleton via get_sandbox_pool(); workers are recycled after `max_runs`
+    jobs or after a limit breach (replacements start in the background).
+    """
+
+    def __init__(self, size: Optional[int] = None, max_runs: Optional[int] = None,
+                 timeout: float = 5.0, python: Optional[str] = None):
+        self.size = max(1, int(size or os.getenv("KI_SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1)))))
+        self.max_runs = max(1, int(max_runs or os.getenv("KI_SANDBOX_MAX_RUNS", "200")))
+        self.timeout = timeout
+        self.python = python or sys.executable
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"runs": 0, "recycled": 0, "breaches": 0, "spawned": 0}
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        print(f"✅ Sandbox pool ready ({self.size} workers)")
+
+    def _spawn(self) -> Optional[_Worker]:
+        try:
+            w = _Worker(self.python)
+        except Exception as e:
+            print(f"⚠️  Sandbox worker start failed: {e}")
+            return None
+        with self._lock:
+            self.stats["spawned"] += 1
+        return w
+
+    def _replace(self, worker: Optional[_Worker]) -> None:
+        if worker is not None:
+            worker.close()
+
+        def start():
+            w = self._spawn()
+            if self._closed and w is not None:
+                w.close()
+                return
+            self._idle.put(w)
+        threading.Thread(target=start, name="sandbox-spawn", daemon=True).start()
+
+    def run(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one job on an idle worker (blocks while all are busy)."""
+        if self._closed:
+            raise RuntimeError("sandbox pool closed")
+        timeout = float(req.get("timeout") or self.timeout)
+        req = {**req, "timeout": timeout}
+        worker = self._idle.get()
+        if worker is None:
+            # a previous start failed: try again now
+            worker = self._spawn()
+            if worker is None:
+                self._idle.put(None)
+                return {"ok": False, "error": "sandbox unavailable"}
+        res = worker.call(req, timeout)
+        breach = bool(res.get("breach"))
+        with self._lock:
+            self.stats["runs"] += 1
+            self.stats["breaches"] += int(breach)
+        if worker.broken or breach or worker.runs >= self.max_runs:
+            with self._lock:
+                self.stats["recycled"] += 1
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        return res
+
+    def map(self, reqs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run a batch in parallel across the workers; results keep input order."""
+        if len(reqs) <= 1:
+            return [self.run(r) for r in reqs]
+        with ThreadPoolExecutor(max_workers=min(self.size, len(reqs)), thread_name_prefix="sandbox") as ex:
+            return list(ex.map(self.run, reqs))
+
+    def run_skill(self, skill_dir: str, context: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.run({"kind": "skill", "path": str(skill_dir), "context": context or {}, "timeout": timeout})
+
+    def test_code(self, code: str, func: str, examples: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.run({"kind": "code", "code": code, "func": func, "examples": examples, "timeout": timeout})
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                w = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if w is not None:
+                w.close()
+
+
+# Singleton instance
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Get the singleton sandbox pool (started on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = SandboxPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        raise SystemExit(_worker_main())
+    if "--once" in sys.argv:
+        raise SystemExit(_once_main())
+
+    print("🧪 Sandbox Pool Test\n")
+    pool = SandboxPool(size=2)
+    code = "def double(x):\n    return x * 2\n"
+    t0 = time.perf_counter()
+    job = {"kind": "code", "code": code, "func": "double", "examples": [{"input": "21", "output": "42"}]}
+    res = pool.map([job] * 20)
+    dt = (time.perf_counter() - t0) * 1000.0
+    print(f"✅ {sum(r['ok'] for r in res)}/{len(res)} ok in {dt:.0f}ms ({dt / len(res):.1f}ms/job)")
+    pool.close()
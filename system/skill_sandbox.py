@@ -1,36 +1,37 @@
 #!/usr/bin/env python3
-import argparse, json, subprocess, sys, os, resource
+import argparse, json, sys, os
 from pathlib import Path
 from datetime import datetime
 
 BASE    = Path.home() / "ki_ana"
 SKILLS  = BASE / "skills"
 PROP    = SKILLS / "proposals"
-RUNNER  = BASE / "system" / "skill_runner.py"
-
-def limit_resources():
-    # 2 CPU-Sekunden, 256 MB RAM, kein Core-Dump
-    resource.setrlimit(resource.RLIMIT_CPU, (2,2))
-    resource.setrlimit(resource.RLIMIT_AS,  (256*1024*1024, 256*1024*1024))
-    resource.setrlimit(resource.RLIMIT_CORE,(0,0))
 
 def sandbox_run(skill_id: str) -> tuple[bool, str]:
-    env = os.environ.copy()
-    env["KIANA_SANDBOX"] = "1"
+    # Warmer Pool (system/sandbox_pool.py): 2 CPU-Sekunden, 256 MB RAM, kein Core-Dump,
+    # ein fork statt Interpreter-Start
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    job = {"kind": "skill", "path": str(SKILLS / "staging" / skill_id), "timeout": 5}
+    if os.getenv("KI_SANDBOX_POOL", "1") != "0":
+        try:
+            from sandbox_pool import get_sandbox_pool
+            return _result(get_sandbox_pool().run(job))
+        except Exception as e:
+            print(f"⚠️  Sandbox-Pool nicht verfügbar, starte Einzelprozess: {e}")
+    return _sandbox_run_process(job)
+
+def _sandbox_run_process(job: dict) -> tuple[bool, str]:
+    # Eigener Interpreter, aber derselbe Job-Child wie im Pool (run(context), Limits)
     try:
-        # setrlimit nur in child über preexec_fn
-        p = subprocess.run(
-            ["python3", str(RUNNER), skill_id],
-            capture_output=True, text=True, timeout=5, env=env, preexec_fn=limit_resources
-        )
-        ok = (p.returncode == 0)
-        out = (p.stdout or "") + (p.stderr or "")
-        return ok, out[-2000:]
-    except subprocess.TimeoutExpired:
-        return False, "Timeout"
+        from sandbox_pool import run_isolated
+        return _result(run_isolated(job))
     except Exception as e:
         return False, f"Error: {e}"
 
+def _result(res: dict) -> tuple[bool, str]:
+    out = (res.get("output") or "") + (res.get("error") or "")
+    return bool(res.get("ok")), out[-2000:]
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--id", required=True)
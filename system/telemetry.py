@@ -5,20 +5,27 @@ Features:
 - Opt-in only (disabled by default)
 - Anonymous metrics only
 - No personal data
-- Local aggregation
+- Local aggregation (streaming quantile sketches, p50/p95/p99)
 - User control
 """
 from __future__ import annotations
+import os
 import time
 import json
+import threading
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass, asdict
 import sys
 
 # Add system path
 sys.path.insert(0, str(Path.home() / "ki_ana" / "system"))
 
+from metric_sketch import QuantileSketch
+
+# (metric_name, sorted tag items)
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
 
 @dataclass
 class TelemetryMetric:
@@ -58,14 +65,26 @@ class TelemetryService:
         # Check opt-in status
         self.enabled = self._check_opt_in()
         
-        # Metrics storage
-        self.metrics: List[TelemetryMetric] = []
-        
         # Local storage
         self.telemetry_dir = Path.home() / "ki_ana" / "data" / "telemetry"
         self.telemetry_dir.mkdir(parents=True, exist_ok=True)
+        self.windows_dir = self.telemetry_dir / "windows"
+        self.windows_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.metrics_file = self.telemetry_dir / "metrics.jsonl"  # legacy raw events
+        self.snapshot_file = self.telemetry_dir / "sketches.json"
         
-        self.metrics_file = self.telemetry_dir / "metrics.jsonl"
+        # Streaming aggregation: one sketch per metric name + tag set,
+        # cumulative (total) and for the current rotation window.
+        self.flush_interval = float(os.getenv("KI_TELEMETRY_FLUSH_SEC", "30"))
+        self.rotate_interval = float(os.getenv("KI_TELEMETRY_ROTATE_SEC", "3600"))
+        self.keep_windows = int(os.getenv("KI_TELEMETRY_KEEP_WINDOWS", "168"))
+        self._lock = threading.Lock()
+        self._total: Dict[SeriesKey, QuantileSketch] = {}
+        self._window: Dict[SeriesKey, QuantileSketch] = {}
+        self._window_start = time.time()
+        self._last_flush = time.time()
+        self._load_snapshot()
         
         if self.enabled:
             print(f"✅ Telemetry enabled (opt-in)")
@@ -107,66 +126,150 @@ class TelemetryService:
         if not self.enabled:
             return
         
-        metric = TelemetryMetric(
-            metric_name=metric_name,
-            value=value,
-            timestamp=time.time(),
-            tags=tags or {}
-        )
-        
-        self.metrics.append(metric)
-        
-        # Save to file
-        self._save_metric(metric)
+        now = time.time()
+        key: SeriesKey = (metric_name, tuple(sorted((str(k), str(v)) for k, v in (tags or {}).items())))
+        with self._lock:
+            for store in (self._total, self._window):
+                sk = store.get(key)
+                if sk is None:
+                    sk = store[key] = QuantileSketch()
+                sk.add(float(value))
+        self._maybe_flush(now)
+    
+    # -- persistence --------------------------------------------------------
+    @staticmethod
+    def _dump(store: Dict[SeriesKey, QuantileSketch]) -> List[Dict]:
+        return [{"name": k[0], "tags": dict(k[1]), "sketch": sk.to_dict()} for k, sk in store.items()]
     
-    def _save_metric(self, metric: TelemetryMetric):
-        """Save metric to local file."""
+    @staticmethod
+    def _undump(rows: List[Dict]) -> Dict[SeriesKey, QuantileSketch]:
+        out: Dict[SeriesKey, QuantileSketch] = {}
+        for row in rows or []:
+            key = (row["name"], tuple(sorted((row.get("tags") or {}).items())))
+            out[key] = QuantileSketch.from_dict(row["sketch"])
+        return out
+    
+    @staticmethod
+    def _write_atomic(path: Path, data: Dict):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(path)
+    
+    def _load_snapshot(self):
+        """Restore sketches; folds a legacy raw metrics.jsonl once."""
         try:
-            with open(self.metrics_file, 'a') as f:
-                f.write(json.dumps(metric.to_dict()) + '\n')
+            if self.snapshot_file.exists():
+                data = json.loads(self.snapshot_file.read_text())
+                self._total = self._undump(data.get("total", []))
+                self._window = self._undump(data.get("window", []))
+                self._window_start = float(data.get("window_start", time.time()))
         except Exception as e:
-            print(f"⚠️  Error saving metric: {e}")
+            print(f"⚠️  Error loading telemetry snapshot: {e}")
+        if self.metrics_file.exists():
+            try:
+                with open(self.metrics_file, 'r') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        m = json.loads(line)
+                        key = (m['metric_name'], tuple(sorted((m.get('tags') or {}).items())))
+                        self._total.setdefault(key, QuantileSketch()).add(float(m['value']))
+                self.metrics_file.rename(self.metrics_file.with_suffix(".jsonl.migrated"))
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Error migrating metrics: {e}")
+    
+    def _maybe_flush(self, now: float):
+        if now - self._window_start >= self.rotate_interval:
+            self.rotate(now)
+        elif now - self._last_flush >= self.flush_interval:
+            self.flush(now)
     
-    def get_aggregated_metrics(self) -> Dict:
+    def flush(self, now: Optional[float] = None):
+        """Write the current sketches snapshot (atomic)."""
+        now = now or time.time()
+        with self._lock:
+            data = {
+                "updated": now,
+                "window_start": self._window_start,
+                "total": self._dump(self._total),
+                "window": self._dump(self._window),
+            }
+            self._last_flush = now
+        try:
+            self._write_atomic(self.snapshot_file, data)
+        except Exception as e:
+            print(f"⚠️  Error saving telemetry snapshot: {e}")
+    
+    def rotate(self, now: Optional[float] = None):
+        """Close the current window into windows/<start>.json and start a new one."""
+        now = now or time.time()
+        with self._lock:
+            closed, start = self._window, self._window_start
+            self._window, self._window_start = {}, now
+        if closed:
+            try:
+                self._write_atomic(self.windows_dir / f"{int(start)}.json",
+                                   {"start": start, "end": now, "series": self._dump(closed)})
+            except Exception as e:
+                print(f"⚠️  Error saving telemetry window: {e}")
+        old = sorted(self.windows_dir.glob("*.json"), key=lambda p: int(p.stem) if p.stem.isdigit() else 0)
+        for p in old[:-self.keep_windows] if self.keep_windows > 0 else old:
+            try:
+                p.unlink()
+            except Exception:
+                pass
+        self.flush(now)
+    
+    # -- reporting ----------------------------------------------------------
+    def _series(self, window_seconds: Optional[float]) -> Dict[SeriesKey, QuantileSketch]:
+        with self._lock:
+            if window_seconds is None:
+                return {k: QuantileSketch().merge(v) for k, v in self._total.items()}
+            merged = {k: QuantileSketch().merge(v) for k, v in self._window.items()}
+        cutoff = time.time() - float(window_seconds)
+        for p in self.windows_dir.glob("*.json"):
+            try:
+                data = json.loads(p.read_text())
+                if float(data.get("end", 0)) < cutoff:
+                    continue
+                for k, sk in self._undump(data.get("series", [])).items():
+                    merged.setdefault(k, QuantileSketch()).merge(sk)
+            except Exception:
+                continue
+        return merged
+    
+    def get_aggregated_metrics(self, window_seconds: Optional[float] = None) -> Dict:
         """
         Get aggregated anonymous metrics.
         
-        Returns only aggregated data, no individual events.
+        Returns only aggregated data, no individual events. Cost is
+        O(metric series), independent of how many events were recorded.
+        
+        Args:
+            window_seconds: Only include recent rotation windows (None = all time)
         """
         if not self.enabled:
             return {"enabled": False}
         
-        # Load all metrics
-        metrics_by_name = {}
+        series = self._series(window_seconds)
+        by_name: Dict[str, QuantileSketch] = {}
+        by_tags: Dict[str, List[Dict]] = {}
+        for (name, tags), sk in series.items():
+            by_name.setdefault(name, QuantileSketch()).merge(sk)
+            if tags:
+                by_tags.setdefault(name, []).append({"tags": dict(tags), **sk.summary()})
         
-        try:
-            if self.metrics_file.exists():
-                with open(self.metrics_file, 'r') as f:
-                    for line in f:
-                        metric_data = json.loads(line.strip())
-                        name = metric_data['metric_name']
-                        
-                        if name not in metrics_by_name:
-                            metrics_by_name[name] = []
-                        
-                        metrics_by_name[name].append(metric_data['value'])
-        except Exception as e:
-            print(f"⚠️  Error loading metrics: {e}")
-        
-        # Aggregate
         aggregated = {}
-        for name, values in metrics_by_name.items():
-            aggregated[name] = {
-                "count": len(values),
-                "avg": sum(values) / len(values) if values else 0,
-                "min": min(values) if values else 0,
-                "max": max(values) if values else 0
-            }
+        for name, sk in by_name.items():
+            aggregated[name] = sk.summary()
+            if name in by_tags:
+                aggregated[name]["by_tags"] = by_tags[name]
         
         return {
             "enabled": True,
             "metrics": aggregated,
-            "total_events": sum(len(v) for v in metrics_by_name.values())
+            "total_events": sum(sk.count for sk in by_name.values())
         }
     
     def get_privacy_report(self) -> Dict:
@@ -0,0 +1,268 @@
+"""
+Thumbnail Pipeline
+
+One decode per source, every requested size from it:
+- JPEG stills are decoded at reduced size (PIL draft / cv2 IMREAD_REDUCED_*),
+  i.e. the DCT scaling skips most of the work for phone-sized photos
+- videos open one VideoCapture per file, not per size
+- output is WebP when the codec is available, JPEG otherwise (PNG only for
+  images with transparency and no WebP); quality via KI_THUMB_QUALITY
+- render_batch() spreads many sources over a process pool
+
+Outputs are named thumb_<stem>_<w>x<h>.<ext> and skipped while newer than
+the source.
+"""
+from __future__ import annotations
+import mimetypes
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+Size = Tuple[int, int]
+EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+
+
+@dataclass
+class ThumbResult:
+    """Outputs for one source (size -> path); error is set if rendering failed."""
+    source: str
+    outputs: Dict[Size, str] = field(default_factory=dict)
+    skipped: int = 0
+    error: Optional[str] = None
+
+
+def parse_sizes(raw: str) -> List[Size]:
+    """"256x256,64x64" -> [(256, 256), (64, 64)] (invalid entries are ignored)."""
+    out: List[Size] = []
+    for part in (raw or "").split(","):
+        try:
+            w, h = part.lower().strip().split("x")
+            if int(w) > 0 and int(h) > 0:
+                out.append((int(w), int(h)))
+        except ValueError:
+            continue
+    return out
+
+
+def image_size(path: Path) -> Optional[Size]:
+    """Read (width, height) from a JPEG/PNG header without decoding pixels."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(26)
+            if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:2] != b"\xff\xd8":
+                return None
+            f.seek(2)
+            while True:
+                b = f.read(1)
+                while b and b != b"\xff":
+                    b = f.read(1)
+                while b == b"\xff":
+                    b = f.read(1)
+                if not b:
+                    return None
+                marker = b[0]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    continue  # markers without a length
+                seg_len = struct.unpack(">H", f.read(2))[0]
+                # SOF0..SOF15 except DHT (C4), JPG (C8), DAC (CC)
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack(">xHH", f.read(5))
+                    return w, h
+                f.seek(seg_len - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def fit(src: Size, box: Size) -> Size:
+    """Largest size with src's aspect ratio inside box (never upscales)."""
+    iw, ih = max(1, src[0]), max(1, src[1])
+    scale = min(box[0] / iw, box[1] / ih, 1.0)
+    return max(1, int(iw * scale)), max(1, int(ih * scale))
+
+
+def reduce_factor(src: Size, sizes: Sequence[Size]) -> int:
+    """Largest JPEG DCT scale (1, 2, 4, 8) that still covers every requested size."""
+    # EXIF rotation may swap the axes: cover the longest requested side both ways
+    need = max(max(s) for s in sizes)
+    factor = 1
+    for k in (2, 4, 8):
+        if min(src) // k >= need:
+            factor = k
+    return factor
+
+
+def _webp_supported() -> bool:
+    try:
+        from PIL import features  # type: ignore
+        return bool(features.check("webp"))
+    except Exception:
+        pass
+    try:
+        import cv2  # type: ignore
+        return bool(cv2.haveImageWriter("x.webp"))
+    except Exception:
+        return False
+
+
+def choose_format(has_alpha: bool = False) -> str:
+    """Output format from KI_THUMB_FORMAT (auto|webp|jpeg|png)."""
+    fmt = os.getenv("KI_THUMB_FORMAT", "auto").strip().lower()
+    if fmt in ("jpg", "jpeg"):
+        return "jpeg"
+    if fmt in EXTENSIONS:
+        return fmt
+    if _webp_supported():
+        return "webp"
+    return "png" if has_alpha else "jpeg"
+
+
+def thumb_path(out_dir: Path, source: Path, size: Size, fmt: str) -> Path:
+    return Path(out_dir) / f"thumb_{source.stem}_{size[0]}x{size[1]}{EXTENSIONS[fmt]}"
+
+
+def _fresh(out: Path, source: Path) -> bool:
+    try:
+        return out.exists() and out.stat().st_mtime >= source.stat().st_mtime
+    except OSError:
+        return False
+
+
+def _quality() -> int:
+    try:
+        return max(1, min(100, int(os.getenv("KI_THUMB_QUALITY", "80"))))
+    except ValueError:
+        return 80
+
+
+def _existing(source: Path, sizes: Sequence[Size], out_dir: Path) -> Dict[Size, Path]:
+    """Sizes whose thumbnail (in any output format) is already up to date."""
+    done: Dict[Size, Path] = {}
+    for size in sizes:
+        for fmt in EXTENSIONS:
+            p = thumb_path(out_dir, source, size, fmt)
+            if _fresh(p, source):
+                done[size] = p
+                break
+    return done
+
+
+def _render_pil(source: Path, sizes: Sequence[Size], out_dir: Path) -> Dict[Size, Path]:
+    from PIL import Image, ImageOps  # type: ignore
+
+    with Image.open(source) as im:
+        if im.format == "JPEG":
+            need = max(max(s) for s in sizes)
+            im.draft("RGB", (need, need))  # decode at 1/2, 1/4 or 1/8 scale
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        fmt = choose_format(has_alpha)
+        base = im.convert("RGBA" if has_alpha and fmt != "jpeg" else "RGB")
+
+    out: Dict[Size, Path] = {}
+    quality = _quality()
+    for size in sorted(sizes, key=lambda s: s[0] * s[1], reverse=True):
+        thumb = base.resize(fit(base.size, size), Image.LANCZOS) if fit(base.size, size) != base.size else base
+        dest = thumb_path(out_dir, source, size, fmt)
+        opts = {"quality": quality} if fmt in ("webp", "jpeg") else {"optimize": True}
+        tmp = dest.with_name(dest.name + ".tmp")
+        thumb.save(tmp, format=fmt.upper(), **opts)
+        os.replace(tmp, dest)
+        out[size] = dest
+    return out
+
+
+def _render_cv2(source: Path, sizes: Sequence[Size], out_dir: Path) -> Dict[Size, Path]:
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+
+    ctype = mimetypes.guess_type(source.name)[0] or "application/octet-stream"
+    if ctype.startswith("video/"):
+        cap = cv2.VideoCapture(str(source))
+        try:
+            ok, img = cap.read()
+        finally:
+            cap.release()
+        if not ok or img is None:
+            raise RuntimeError("could not read a video frame")
+    else:
+        flags = cv2.IMREAD_COLOR
+        dims = image_size(source)
+        if dims:
+            k = reduce_factor(dims, sizes)
+            flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                     4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}[k]
+        img = cv2.imdecode(np.fromfile(str(source), dtype=np.uint8), flags)
+        if img is None:
+            raise RuntimeError("could not decode image")
+
+    fmt = choose_format(False)
+    quality = _quality()
+    params = {"webp": [cv2.IMWRITE_WEBP_QUALITY, quality], "jpeg": [cv2.IMWRITE_JPEG_QUALITY, quality], "png": []}[fmt]
+    out: Dict[Size, Path] = {}
+    ih, iw = img.shape[:2]
+    for size in sizes:
+        nw, nh = fit((iw, ih), size)
+        thumb = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA) if (nw, nh) != (iw, ih) else img
+        ok, enc = cv2.imencode(EXTENSIONS[fmt], thumb, params)
+        if not ok:
+            raise RuntimeError(f"could not encode {fmt}")
+        dest = thumb_path(out_dir, source, size, fmt)
+        tmp = dest.with_name(dest.name + ".tmp")
+        tmp.write_bytes(enc.tobytes())
+        os.replace(tmp, dest)
+        out[size] = dest
+    return out
+
+
+def render(source: Path, sizes: Iterable[Size], out_dir: Path) -> Dict[Size, Path]:
+    """Write every size for `source` from a single decode; returns size -> path."""
+    source = Path(source)
+    sizes = list(dict.fromkeys(tuple(s) for s in sizes)) or [(256, 256)]
+    done = _existing(source, sizes, out_dir)
+    todo = [s for s in sizes if s not in done]
+    if not todo:
+        return done
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    ctype = mimetypes.guess_type(source.name)[0] or "application/octet-stream"
+    if not ctype.startswith("video/"):
+        try:
+            return {**done, **_render_pil(source, todo, out_dir)}
+        except ImportError:
+            pass
+    return {**done, **_render_cv2(source, todo, out_dir)}
+
+
+def _render_one(args: Tuple[str, List[Size], str]) -> ThumbResult:
+    source, sizes, out_dir = args
+    res = ThumbResult(source=source)
+    try:
+        before = len(_existing(Path(source), sizes, Path(out_dir)))
+        outputs = render(Path(source), sizes, Path(out_dir))
+        res.outputs = {s: str(p) for s, p in outputs.items()}
+        res.skipped = before
+    except Exception as e:
+        res.error = f"{type(e).__name__}: {e}"
+    return res
+
+
+def render_batch(
+    sources: Sequence[Path],
+    sizes: Sequence[Size],
+    out_dir: Path,
+    processes: Optional[int] = None,
+) -> List[ThumbResult]:
+    """Render many sources (in a process pool when processes > 1); results keep input order."""
+    jobs = [(str(s), [tuple(x) for x in sizes], str(out_dir)) for s in sources]
+    if processes is None:
+        processes = int(os.getenv("KI_THUMB_PROCS", str(os.cpu_count() or 1)))
+    processes = max(1, min(processes, len(jobs)))
+    if processes == 1:
+        return [_render_one(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (processes * 4))))
@@ -0,0 +1,228 @@
+"""
+Sentence-Level TTS Streaming & Phrase Cache
+
+Building blocks for local_tts.synthesize_stream:
+- split_sentences(): cut an answer into speakable sentences (long ones at
+                     commas/spaces, so the first chunk is short)
+- render_pcm():      run a Piper voice into memory (16-bit PCM, no temp files)
+- PhraseCache:       content-addressed PCM cache per voice, bounded in bytes
+                     (least recently used phrases are evicted first)
+- stream_pcm():      render sentences ahead of the consumer in a worker
+                     thread and yield them in order
+
+Time-to-first-audio becomes the synthesis time of the first sentence
+instead of the whole answer.
+"""
+from __future__ import annotations
+import hashlib
+import io
+import os
+import re
+import threading
+import wave
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…;:])[\"'»“”)\]]*\s+|\n+")
+_SOFT_BREAK = re.compile(r"(?<=[,–—])\s+")
+
+
+@dataclass
+class PcmChunk:
+    """Synthesized audio for one sentence (16-bit mono PCM)."""
+    index: int
+    text: str
+    pcm: bytes
+    sample_rate: int
+    cached: bool = False
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / 2.0 / float(self.sample_rate) if self.sample_rate else 0.0
+
+
+def split_sentences(text: str, max_chars: int = 200) -> List[str]:
+    """Split text into sentences; sentences over max_chars are cut at commas, then spaces."""
+    out: List[str] = []
+    for sentence in _SENTENCE_END.split(text or ""):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            out.append(sentence)
+            continue
+        buf = ""
+        for piece in _SOFT_BREAK.split(sentence):
+            for word in (piece.split(" ") if len(piece) > max_chars else [piece]):
+                cand = f"{buf} {word}".strip()
+                if buf and len(cand) > max_chars:
+                    out.append(buf)
+                    buf = word
+                else:
+                    buf = cand
+        if buf:
+            out.append(buf)
+    return out
+
+
+def render_pcm(voice_obj, text: str) -> Tuple[bytes, int]:
+    """Synthesize `text` with a Piper voice into memory; returns (pcm16, sample_rate)."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        voice_obj.synthesize(text, wav_file)
+    buf.seek(0)
+    with wave.open(buf, "rb") as wav_file:
+        return wav_file.readframes(wav_file.getnframes()), wav_file.getframerate()
+
+
+def wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap 16-bit mono PCM in a WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buf.getvalue()
+
+
+class PhraseCache:
+    """
+    Content-addressed cache of synthesized phrases.
+
+    Key = sha256(voice, normalized text); entries live under
+    <directory>/<voice>/<key>.wav so they survive restarts. The total size is
+    bounded by `max_bytes`; the least recently used entries go first.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024, max_chars: int = 300):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.max_chars = max_chars          # only cache phrase-sized texts
+        self._lru: "OrderedDict[Path, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    @staticmethod
+    def key(voice: str, text: str) -> str:
+        norm = " ".join((text or "").split()).lower()
+        return hashlib.sha256(f"{voice}\x00{norm}".encode("utf-8")).hexdigest()
+
+    def _path(self, voice: str, text: str) -> Path:
+        return self.directory / voice / f"{self.key(voice, text)}.wav"
+
+    def _scan(self) -> None:
+        # Rebuild the LRU order from disk (oldest access first)
+        try:
+            files = sorted(self.directory.glob("*/*.wav"), key=lambda p: p.stat().st_mtime)
+        except OSError:
+            files = []
+        for p in files:
+            try:
+                size = p.stat().st_size
+            except OSError:
+                continue
+            self._lru[p] = size
+            self._bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._lru:
+            p, size = self._lru.popitem(last=False)
+            self._bytes -= size
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def get(self, voice: str, text: str) -> Optional[Tuple[bytes, int]]:
+        p = self._path(voice, text)
+        with self._lock:
+            if p not in self._lru:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(p)
+        try:
+            with wave.open(str(p), "rb") as wav_file:
+                out = wav_file.readframes(wav_file.getnframes()), wav_file.getframerate()
+            os.utime(p)
+        except (OSError, EOFError, wave.Error):
+            with self._lock:
+                self._bytes -= self._lru.pop(p, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return out
+
+    def put(self, voice: str, text: str, pcm: bytes, sample_rate: int) -> None:
+        if len(text) > self.max_chars or not pcm:
+            return
+        data = wav_bytes(pcm, sample_rate)
+        if len(data) > self.max_bytes:
+            return
+        p = self._path(voice, text)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)
+        with self._lock:
+            self._bytes += len(data) - self._lru.pop(p, 0)
+            self._lru[p] = len(data)
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._lru), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def stream_pcm(
+    sentences: List[str],
+    render: Callable[[str], Tuple[bytes, int]],
+    voice: str = "",
+    cache: Optional[PhraseCache] = None,
+    prefetch: int = 2,
+) -> Iterator[PcmChunk]:
+    """
+    Yield one PcmChunk per sentence, in order.
+
+    A single worker thread renders up to `prefetch` sentences ahead of the
+    consumer (one voice = one ONNX session, so synthesis itself stays
+    sequential); cached phrases skip synthesis entirely.
+    """
+    def job(i: int, sentence: str) -> PcmChunk:
+        hit = cache.get(voice, sentence) if cache is not None else None
+        if hit is not None:
+            return PcmChunk(i, sentence, hit[0], hit[1], cached=True)
+        pcm, rate = render(sentence)
+        if cache is not None:
+            cache.put(voice, sentence, pcm, rate)
+        return PcmChunk(i, sentence, pcm, rate)
+
+    pending: deque = deque()
+    todo = iter(enumerate(sentences))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts") as pool:
+        def refill() -> None:
+            while len(pending) < max(1, prefetch) + 1:
+                nxt = next(todo, None)
+                if nxt is None:
+                    return
+                pending.append(pool.submit(job, *nxt))
+
+        refill()
+        try:
+            while pending:
+                chunk = pending.popleft().result()
+                refill()
+                yield chunk
+        finally:
+            for f in pending:
+                f.cancel()
@@ -0,0 +1,100 @@
+"""
+Tests for the chat answer cache (netapi/modules/chat/answer_cache.py).
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from netapi.modules.chat.answer_cache import AnswerCache, is_current_question, normalize_question
+
+
+def _cache(gen=None, **kw):
+    state = gen if gen is not None else {"g": "1"}
+    return AnswerCache(generation_fn=lambda ids: state["g"], **kw), state
+
+
+def test_exact_hit_after_normalisation():
+    cache, _ = _cache()
+    cache.put("Was ist ein Zebra?", "Ein Pferdeverwandter.", persona="friendly", lang="de-DE", pipeline="llm")
+    hit = cache.get("  was ist ein ZEBRA ", persona="friendly", lang="de-DE")
+    assert hit == ("Ein Pferdeverwandter.", "llm", "exact")
+    assert normalize_question("Was ist ein Zebra?") == "was ist ein zebra"
+
+
+def test_near_identical_phrasing_hits():
+    cache, _ = _cache(similarity=0.9)
+    cache.put("Was ist ein Zebra?", "Antwort", persona="friendly", lang="de-DE")
+    hit = cache.get("Erkläre mir bitte ein Zebra", persona="friendly", lang="de-DE")
+    assert hit is not None and hit[2] == "near"
+    assert cache.get("Was ist ein Pferd?", persona="friendly", lang="de-DE") is None
+
+
+def test_persona_and_lang_are_part_of_key():
+    cache, _ = _cache()
+    cache.put("Was ist Jupiter?", "Ein Planet.", persona="friendly", lang="de-DE")
+    assert cache.get("Was ist Jupiter?", persona="creative", lang="de-DE") is None
+    assert cache.get("Was ist Jupiter?", persona="friendly", lang="en-US") is None
+
+
+def test_source_generation_change_invalidates():
+    cache, state = _cache()
+    cache.put("Was ist Jupiter?", "Ein Planet.", persona="friendly", lang="de-DE")
+    state["g"] = "2"
+    assert cache.get("Was ist Jupiter?", persona="friendly", lang="de-DE") is None
+    assert len(cache) == 0
+
+
+def test_current_questions_use_short_ttl():
+    cache, _ = _cache(ttl=3600, ttl_current=0.05)
+    cache.put("Wie ist der aktuelle Stand?", "x", persona="p", lang="de", current=True)
+    cache.put("Was ist Jupiter?", "y", persona="p", lang="de")
+    time.sleep(0.1)
+    assert cache.get("Wie ist der aktuelle Stand?", persona="p", lang="de") is None
+    assert cache.get("Was ist Jupiter?", persona="p", lang="de") is not None
+    assert is_current_question("Was gibt es heute an Nachrichten?")
+
+
+def test_lru_bound():
+    cache, _ = _cache(max_entries=3)
+    for i in range(5):
+        cache.put(f"Frage Nummer {i} zu Thema{i}", str(i), persona="p", lang="de")
+    assert len(cache) == 3
+    assert cache.get("Frage Nummer 0 zu Thema0", persona="p", lang="de") is None
+
+
+def test_entries_are_bound_to_their_source_blocks():
+    gens = {"a": "1", "b": "1", "c": "1"}
+    cache = AnswerCache(generation_fn=lambda ids: "|".join(f"{i}:{gens[i]}" for i in ids))
+    cache.put("Was ist Jupiter?", "Ein Planet.", persona="p", lang="de", sources=["a", "b"])
+    gens["c"] = "2"  # unrelated block rewritten
+    assert cache.get("Was ist Jupiter?", persona="p", lang="de") is not None
+    assert cache.get("Erkläre mir bitte Jupiter", persona="p", lang="de") is not None
+    gens["b"] = "2"
+    assert cache.get("Erkläre mir bitte Jupiter", persona="p", lang="de") is None
+    assert len(cache) == 0
+
+
+def test_state_based_answers_are_not_cached(monkeypatch):
+    from netapi.modules.chat import router as chat
+
+    cache = AnswerCache(generation_fn=lambda ids: "1")
+    monkeypatch.setattr(chat._answer_cache, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(chat._answer_cache, "enabled", lambda: True)
+    prompts = []
+
+    async def fake_reason(msg, **kw):
+        prompts.append(kw["retrieval_snippet"])
+        return {"final_answer": "Antwort für " + kw["retrieval_snippet"][:8]}
+
+    monkeypatch.setattr(chat, "reason_about", fake_reason)
+    body = SimpleNamespace(persona="friendly", lang="de-DE", style="balanced", bullets=5)
+    state = SimpleNamespace(mood="traurig", recent_topics=["Scheidung"])
+
+    asyncio.run(chat._answer_knowledge_uncached("Was ist Jupiter?", body, state, None, "", "llm", ("m",)))
+    assert "Scheidung" in prompts[-1]
+    assert len(cache) == 0
+
+    asyncio.run(chat._answer_knowledge_uncached(
+        "Was ist Jupiter?", body, state, None, "- Jupiter (Score 0.90): Gasplanet", "web+llm", ("m",), ["blk1"]))
+    assert len(cache) == 1
+    assert cache._entries[next(iter(cache._entries))].sources == ("blk1",)
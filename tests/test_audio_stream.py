@@ -0,0 +1,151 @@
+"""
+Tests for incremental decoding and VAD segmentation (system/audio_stream.py).
+"""
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from audio_stream import (  # noqa: E402
+    SAMPLE_RATE, VADSegmenter, _Resampler, iter_pcm, pcm16_to_float, segment_file,
+)
+
+
+def _tone(seconds, sr=SAMPLE_RATE, amp=0.3):
+    t = np.arange(int(seconds * sr)) / sr
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds, sr=SAMPLE_RATE, amp=0.001, seed=0):
+    rng = np.random.default_rng(seed)
+    return (amp * rng.standard_normal(int(seconds * sr))).astype(np.float32)
+
+
+def _write_wav(path, samples, sr=SAMPLE_RATE, channels=1):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(pcm.tobytes())
+
+
+def test_segments_split_at_pauses(tmp_path):
+    audio = np.concatenate([_silence(1.0), _tone(1.5), _silence(1.0, seed=1), _tone(2.0), _silence(0.8, seed=2)])
+    path = tmp_path / "speech.wav"
+    _write_wav(path, audio)
+
+    segs = list(segment_file(str(path)))
+    assert [s.index for s in segs] == [0, 1]
+    # Boundaries within padding (0.2 s) + one frame of the true speech
+    assert abs(segs[0].start - 1.0) <= 0.25 and abs(segs[0].end - 2.5) <= 0.25
+    assert abs(segs[1].start - 3.5) <= 0.25 and abs(segs[1].end - 5.5) <= 0.25
+    for s in segs:
+        assert len(s.audio) == round(s.duration * SAMPLE_RATE)
+
+
+def test_short_clicks_are_ignored():
+    vad = VADSegmenter()
+    audio = np.concatenate([_silence(1.0), _tone(0.06), _silence(1.0, seed=3)])
+    assert vad.feed(audio) + vad.flush() == []
+
+
+def test_long_speech_is_cut_at_max_segment():
+    vad = VADSegmenter(max_segment=5.0)
+    audio = np.concatenate([_silence(0.6), _tone(12.0)])
+    segs = vad.feed(audio) + vad.flush()
+    assert len(segs) >= 3
+    assert all(s.duration <= 5.0 + 1e-6 for s in segs)
+    # Cuts are contiguous: no audio dropped between pieces
+    for a, b in zip(segs, segs[1:]):
+        assert abs(a.end - b.start) < 1e-6
+
+
+def test_feed_is_independent_of_chunking():
+    audio = np.concatenate([_silence(0.7), _tone(1.0), _silence(0.9, seed=4), _tone(0.8), _silence(0.7, seed=5)])
+    whole = VADSegmenter()
+    ref = whole.feed(audio) + whole.flush()
+    chunked = VADSegmenter()
+    got = []
+    for i in range(0, len(audio), 777):
+        got += chunked.feed(audio[i:i + 777])
+    got += chunked.flush()
+    assert [(s.start, s.end) for s in got] == [(s.start, s.end) for s in ref]
+
+
+def test_wav_is_decoded_incrementally_and_resampled(tmp_path):
+    path = tmp_path / "stereo_8k.wav"
+    _write_wav(path, _tone(3.0, sr=8000), sr=8000, channels=2)
+    blocks = list(iter_pcm(str(path), block_seconds=0.5))
+    assert len(blocks) >= 6
+    assert max(len(b) for b in blocks) <= SAMPLE_RATE  # ~0.5 s per block at 16 kHz
+    total = sum(len(b) for b in blocks)
+    assert abs(total - 3 * SAMPLE_RATE) <= 2
+
+
+def test_resampler_keeps_phase_across_blocks():
+    x = _tone(1.0, sr=22050)
+    whole = _Resampler(22050)(x)
+    r = _Resampler(22050)
+    parts = np.concatenate([r(x[i:i + 1000]) for i in range(0, len(x), 1000)])
+    n = min(len(whole), len(parts))
+    assert abs(len(whole) - len(parts)) <= 1
+    assert np.allclose(whole[:n], parts[:n], atol=1e-5)
+
+
+def test_pcm16_to_float_ignores_odd_trailing_byte():
+    raw = np.array([0, 16384, -32768], dtype="<i2").tobytes() + b"\x01"
+    assert np.allclose(pcm16_to_float(raw), [0.0, 0.5, -1.0])
+
+
+def test_realtime_keeps_reading_while_a_segment_decodes(monkeypatch):
+    import asyncio
+    import threading
+    import types
+    from contextlib import contextmanager
+
+    from netapi.multimodal.audio_processor import AudioProcessor
+
+    fed = threading.Event()
+
+    class Model:
+        def transcribe(self, audio, **kw):
+            # Blocks until the whole stream was read: an inline decode never gets here
+            assert fed.wait(5), "reader stalled behind the decode"
+            return {"text": f"seg{round(len(audio) / SAMPLE_RATE)}", "language": "de"}
+
+    class Service:
+        default_model = "tiny"
+
+        def max_workers(self):
+            return 1
+
+        def _load_model(self, key):
+            return Model()
+
+        @contextmanager
+        def model_instance(self, key, workers=1):
+            yield Model()
+
+    monkeypatch.setitem(sys.modules, "local_stt", types.SimpleNamespace(get_stt_service=Service))
+    audio = np.concatenate([_silence(0.7), _tone(1.0), _silence(1.0, seed=6), _tone(2.0), _silence(1.0, seed=7)])
+
+    async def stream():
+        for i in range(0, len(audio), 1600):
+            yield audio[i:i + 1600]
+            await asyncio.sleep(0)
+        fed.set()
+
+    got = []
+    proc = AudioProcessor()
+    proc.stt_available = True
+    res = asyncio.run(proc.transcribe_realtime(stream(), got.append))
+    assert res["success"], res
+    assert [p["index"] for p in got] == [0, 1]
+    assert res["text"] == " ".join(p["text"] for p in got)
@@ -0,0 +1,78 @@
+"""
+Tests für den Audit Store (system/audit_store.py)
+"""
+import json
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from audit_store import AuditStore
+
+
+def _entry(i, ts, event_type="block_created", actor="dev-a", target="blk-1", result="success"):
+    return {
+        "entry_id": f"audit_{i}", "timestamp": ts, "event_type": event_type,
+        "actor_id": actor, "target_id": target, "action": "x", "details": {}, "result": result,
+    }
+
+
+def _fill(store):
+    # 3 segments of 100s each, 10 entries per segment
+    for i in range(30):
+        et = "block_validated" if i % 3 == 0 else "block_created"
+        store.append(_entry(i, 1000 + i * 10, event_type=et, actor=f"dev-{i % 2}",
+                            target=f"blk-{i % 5}", result="failure" if i % 6 == 0 else "success"))
+
+
+def test_segments_and_indexed_query(tmp_path):
+    store = AuditStore(tmp_path, segment_seconds=100, hot_entries=5)
+    _fill(store)
+    assert len(store.segment_starts()) == 3
+    assert len(store) == 30
+    assert len(store.hot()) == 5
+
+    got, _ = store.query(event_type="block_validated", actor_id="dev-0", limit=None)
+    ids = [e["entry_id"] for e in got]
+    assert ids == [f"audit_{i}" for i in range(29, -1, -1) if i % 3 == 0 and i % 2 == 0]
+
+    got, _ = store.query(target_id="blk-3", start_time=1100, end_time=1250, limit=None)
+    assert [e["entry_id"] for e in got] == ["audit_23", "audit_18", "audit_13"]
+
+
+def test_cursor_pagination_covers_everything_once(tmp_path):
+    store = AuditStore(tmp_path, segment_seconds=100, hot_entries=0)
+    _fill(store)
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.query(limit=7, cursor=cursor)
+        seen.extend(e["entry_id"] for e in page)
+        if not cursor:
+            break
+    assert seen == [f"audit_{i}" for i in range(29, -1, -1)]
+
+
+def test_aggregate_matches_full_scan(tmp_path):
+    store = AuditStore(tmp_path, segment_seconds=100)
+    _fill(store)
+    agg = store.aggregate(start_time=1050, end_time=1240)
+    scanned = [e for e in store.iter_entries() if 1050 <= e["timestamp"] <= 1240]
+    assert agg["count"] == len(scanned)
+    assert agg["results"].get("failure", 0) == sum(1 for e in scanned if e["result"] == "failure")
+    assert agg["validations"]["total"] == sum(1 for e in scanned if e["event_type"] == "block_validated")
+    assert store.aggregate()["count"] == 30
+
+
+def test_reopen_and_legacy_migration(tmp_path):
+    legacy = tmp_path / "audit_trail.jsonl"
+    legacy.write_text("".join(json.dumps(_entry(i, 1000 + i * 60)) + "\n" for i in range(5)))
+    store = AuditStore(tmp_path, segment_seconds=100)
+    assert len(store) == 5
+    assert not legacy.exists()
+    store.append(_entry(99, 2000))
+
+    reopened = AuditStore(tmp_path, segment_seconds=100)
+    assert len(reopened) == 6
+    page, _ = reopened.query(limit=2)
+    assert [e["entry_id"] for e in page] == ["audit_99", "audit_4"]
@@ -0,0 +1,134 @@
+"""
+Tests for the blocking I/O pool and event loop lag monitor (netapi.core.blocking_io).
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from netapi.core import blocking_io
+from netapi.core.blocking_io import LoopLagMonitor, run_blocking
+
+
+@pytest.fixture(autouse=True)
+def _limits():
+    blocking_io.configure(limits={"t_slow": 2, "t_other": 2})
+    yield
+    blocking_io._stats.pop("t_slow", None)
+    blocking_io._stats.pop("t_other", None)
+
+
+def test_result_and_errors():
+    def boom():
+        raise ValueError("nope")
+
+    async def run():
+        assert await run_blocking(lambda a, b=0: a + b, 1, b=2, category="t_other") == 3
+        with pytest.raises(ValueError):
+            await run_blocking(boom, category="t_other")
+
+    asyncio.run(run())
+    st = blocking_io.stats()["categories"]["t_other"]
+    assert st["completed"] == 2 and st["errors"] == 1 and st["limit"] == 2
+
+
+def test_category_limit_and_queue_depth():
+    active = {"slow": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active["slow"] += 1
+            active["max"] = max(active["max"], active["slow"])
+        time.sleep(0.1)
+        with lock:
+            active["slow"] -= 1
+
+    async def run():
+        t0 = time.perf_counter()
+        slow_calls = [asyncio.create_task(run_blocking(slow, category="t_slow")) for _ in range(6)]
+        await asyncio.sleep(0.02)
+        # Another category is not stuck behind the saturated one
+        await run_blocking(lambda: None, category="t_other")
+        other_ms = (time.perf_counter() - t0) * 1000
+        await asyncio.gather(*slow_calls)
+        return other_ms
+
+    other_ms = asyncio.run(run())
+    st = blocking_io.stats()["categories"]["t_slow"]
+    assert active["max"] == 2
+    assert st["max_waiting"] >= 4 and st["waiting"] == 0 and st["running"] == 0
+    assert st["avg_wait_ms"] > 0
+    assert other_ms < 100
+
+
+def test_loop_keeps_running_during_blocking_call():
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        await run_blocking(time.sleep, 0.3, category="t_other")
+        t.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+
+
+def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    blocking_io.configure(limits={"t_slow": 1})
+    done = threading.Event()
+
+    def work():
+        time.sleep(0.2)
+        done.set()
+
+    async def run():
+        first = asyncio.create_task(run_blocking(work, category="t_slow"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await run_blocking(lambda: None, category="t_slow")
+        return done.is_set()
+
+    assert asyncio.run(run()) is True
+
+
+def test_loop_lag_monitor_reports_stall_with_stack():
+    def blocking_helper():
+        time.sleep(0.3)
+
+    async def run():
+        mon = LoopLagMonitor(interval=0.02, threshold_ms=80)
+        mon.start()
+        await asyncio.sleep(0.1)
+        blocking_helper()  # on the loop, on purpose
+        await asyncio.sleep(0.1)
+        await mon.stop()
+        return mon.stats()
+
+    st = asyncio.run(run())
+    assert st["samples"] >= 4
+    assert st["stalls"] >= 1 and st["max_lag_ms"] >= 200
+    stall = st["recent_stalls"][0]
+    assert any("blocking_helper" in line for line in stall["stack"])
+
+
+def test_concurrent_conv_state_updates_are_not_lost(tmp_path, monkeypatch):
+    from netapi.modules.chat import router as chat
+
+    monkeypatch.setattr(chat, "_CONV_STATE_PATH", tmp_path / "conv_state.json")
+
+    async def run():
+        await asyncio.gather(*[
+            run_blocking(chat.persist_last_topic, f"conv{i}", f"topic{i}", category="file") for i in range(20)
+        ])
+        return await run_blocking(chat._load_conv_state, category="file")
+
+    state = asyncio.run(run())
+    assert {k: v["last_topic"] for k, v in state.items()} == {f"conv{i}": f"topic{i}" for i in range(20)}
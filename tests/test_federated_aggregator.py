@@ -0,0 +1,93 @@
+"""
+Tests für den Streaming FedAvg Aggregator (system/federated_aggregator.py)
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+import federated_codec as codec
+from federated_aggregator import StreamingAggregator
+
+
+def _update(device, delta, n, round_id=None, encoding="f32"):
+    return {
+        "device_id": device,
+        "samples_count": n,
+        "metrics": {"loss": float(n)},
+        "payload": codec.to_b64(codec.encode(delta, encoding)),
+        "round_id": round_id,
+    }
+
+
+def test_running_sums_match_weighted_average():
+    rng = np.random.default_rng(0)
+    deltas = [{"layer_0": rng.standard_normal((6, 3)).astype(np.float32)} for _ in range(5)]
+    counts = [10, 1, 5, 20, 3]
+    agg = StreamingAggregator(target_updates=100)
+    for i, (d, n) in enumerate(zip(deltas, counts)):
+        agg.submit(_update(f"dev-{i}", d, n))
+    agg.submit(_update("dev-0", deltas[0], 99))  # duplicate device in the same round
+
+    res = agg.close_round()
+    expected = np.average([d["layer_0"] for d in deltas], axis=0, weights=counts)
+    assert np.allclose(res.weights["layer_0"], expected, atol=1e-5)
+    assert res.total_samples == sum(counts)
+    assert res.avg_metrics["loss"] == sum(counts) / len(counts)
+    assert agg.counters["duplicate"] == 1
+
+
+def test_sparse_updates_fold_without_dense_copy():
+    rng = np.random.default_rng(1)
+    a = {"w": rng.standard_normal(1000).astype(np.float32)}
+    b = {"w": rng.standard_normal(1000).astype(np.float32)}
+    agg = StreamingAggregator(target_updates=100)
+    agg.submit(_update("a", a, 1, encoding="topk"))
+    agg.submit(_update("b", b, 3, encoding="topk"))
+    res = agg.close_round()
+    dense = (codec.decode(codec.encode(a, "topk"))["w"] + 3 * codec.decode(codec.encode(b, "topk"))["w"]) / 4
+    assert np.allclose(res.weights["w"], dense, atol=1e-6)
+
+
+def test_worker_closes_rounds_by_target_and_deadline():
+    done = []
+    agg = StreamingAggregator(on_complete=done.append, deadline_seconds=0.2, target_updates=3)
+    agg.start()
+    try:
+        d = {"w": np.ones(4, dtype=np.float32)}
+        rid = agg.open_round()
+        for i in range(3):
+            agg.submit(_update(f"p{i}", d, 1, round_id=rid))
+        _wait(lambda: len(done) == 1)
+        assert done[0].reason == "target" and done[0].round_id == rid
+
+        # straggler for the closed round is dropped, not folded
+        agg.submit(_update("late", d, 1, round_id=rid))
+        rid2 = agg.open_round(deadline_seconds=0.2)
+        agg.submit(_update("p0", d, 2, round_id=rid2))
+        _wait(lambda: len(done) == 2)
+        assert done[1].reason == "deadline" and done[1].contributors == ["p0"]
+        assert agg.counters["late"] == 1
+    finally:
+        agg.stop()
+
+
+def test_queue_overflow_never_blocks():
+    agg = StreamingAggregator(queue_size=2)
+    d = {"w": np.zeros(2, dtype=np.float32)}
+    assert agg.submit(_update("a", d, 1)) and agg.submit(_update("b", d, 1))
+    assert agg.submit(_update("c", d, 1)) is False
+    assert agg.counters["overflow"] == 1
+
+
+def _wait(cond, timeout=3.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return
+        time.sleep(0.01)
+    raise AssertionError("timed out")
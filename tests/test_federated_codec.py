@@ -0,0 +1,105 @@
+"""
+Tests für Federated Learning Training + Update-Codec
+(system/federated_learning.py, system/federated_codec.py)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+import federated_codec as codec
+
+
+def _layers(rng):
+    return {
+        "layer_0": rng.standard_normal((20, 8)).astype(np.float32),
+        "bias_0": rng.standard_normal(8).astype(np.float32),
+    }
+
+
+def test_f16_and_topk_roundtrip():
+    rng = np.random.default_rng(0)
+    layers = _layers(rng)
+    dense = codec.decode(codec.encode(layers, "f16"))
+    assert dense["layer_0"].shape == (20, 8) and dense["layer_0"].dtype == np.float32
+    assert np.allclose(dense["layer_0"], layers["layer_0"], atol=1e-2)
+
+    blob = codec.encode(layers, "topk", topk_ratio=0.1)
+    assert codec.encoding_of(blob) == "topk"
+    sparse = codec.decode(blob)
+    kept = np.flatnonzero(sparse["layer_0"])
+    assert len(kept) == 16
+    # the kept entries are the largest magnitudes
+    assert np.abs(layers["layer_0"]).ravel()[kept].min() >= np.sort(np.abs(layers["layer_0"]).ravel())[-16]
+    assert len(blob) < len(codec.encode(layers, "f16")) / 2
+
+
+def test_error_feedback_carries_dropped_mass():
+    rng = np.random.default_rng(1)
+    delta = _layers(rng)
+    ef = codec.ErrorFeedback("topk", topk_ratio=0.05)
+    total_sent = {k: np.zeros_like(v) for k, v in delta.items()}
+    for _ in range(40):
+        _, sent = ef.compress(delta)
+        for k in sent:
+            total_sent[k] += sent[k]
+    # sent + residual always equals everything that was fed in
+    for k, v in delta.items():
+        assert np.allclose(total_sent[k] + ef.residual[k], 40 * v, atol=1e-2)
+
+
+class _Peers:
+    """Connection manager without WebRTC (aiortc is optional)."""
+
+    def __init__(self):
+        self.sent = []
+
+    def register_handler(self, message_type, handler):
+        pass
+
+    def broadcast(self, message_type, data):
+        self.sent.append((message_type, data))
+
+
+def test_train_local_learns_and_ships_binary(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    import submind_manager
+    import federated_learning as fl
+    monkeypatch.setattr(submind_manager.SubmindManager, "_instance", None)
+    monkeypatch.setattr(fl, "get_connection_manager", _Peers)
+    monkeypatch.setattr(fl.FederatedLearner, "_instance", None)
+
+    learner = fl.FederatedLearner()
+    learner.initialize_model([4, 16, 2])
+    rng = np.random.default_rng(2)
+    X = rng.standard_normal((200, 4))
+    data = [(x.tolist(), [1.0, 0.0] if x[0] + x[1] > 0 else [0.0, 1.0]) for x in X]
+
+    first = learner.train_local(data, epochs=1)
+    for _ in range(10):
+        last = learner.train_local(data, epochs=1)
+    assert last.metrics["loss"] < first.metrics["loss"]
+    assert last.metrics["accuracy"] > 0.85
+    assert learner.local_weights["layer_0"].dtype == np.float32
+
+    wire = last.to_dict()
+    assert "weights" not in wire and isinstance(wire["payload"], str)
+    back = fl.ModelUpdate.from_dict(wire)
+    assert np.allclose(back.weights["layer_0"], last.weights["layer_0"])
+
+    # aggregation applies the sample-weighted mean of the deltas
+    before = learner.local_weights["bias_1"].copy()
+    learner.aggregator.stop()
+    learner.aggregator.submit(wire)
+    learner.aggregator.submit({**wire, "device_id": "peer-2"})
+    agg = learner.aggregate_updates()
+    assert agg.contributors == [learner.device_id, "peer-2"]
+    assert np.allclose(learner.local_weights["bias_1"], before + back.weights["bias_1"], atol=1e-6)
+
+    monkeypatch.setattr(fl.FederatedLearner, "_instance", None)
+    reloaded = fl.FederatedLearner()
+    assert reloaded.layer_sizes == [4, 16, 2]
+    assert np.array_equal(reloaded.local_weights["layer_0"], learner.local_weights["layer_0"])
@@ -0,0 +1,158 @@
+"""
+Tests for the pooled async Ollama client in netapi.core.llm_local.
+
+Runs against a small in-process fake Ollama server (HTTP/1.1, chunked NDJSON).
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from netapi.core import llm_local
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    peers: set = set()
+    inflight = 0
+    max_inflight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):  # silence
+        pass
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        type(self).peers.add(self.client_address)
+        self._json({"models": [{"name": "fake"}]})
+
+    def do_POST(self):
+        cls = type(self)
+        cls.peers.add(self.client_address)
+        n = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(n) or b"{}")
+        text = payload["messages"][-1]["content"]
+        if not payload.get("stream"):
+            self._json({"message": {"role": "assistant", "content": f"echo:{text}"}, "done": True})
+            return
+        with cls.lock:
+            cls.inflight += 1
+            cls.max_inflight = max(cls.max_inflight, cls.inflight)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            count = 50 if text == "long" else 3
+            for i in range(count):
+                line = json.dumps({"message": {"content": f"t{i} "}, "done": False}) + "\n"
+                data = line.encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+                time.sleep(0.02)
+            done = (json.dumps({"done": True}) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(done), done))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            with cls.lock:
+                cls.inflight -= 1
+
+
+@pytest.fixture()
+def fake_ollama(monkeypatch):
+    _FakeOllama.peers = set()
+    _FakeOllama.inflight = 0
+    _FakeOllama.max_inflight = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+    srv.daemon_threads = True
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    monkeypatch.setattr(llm_local, "OLLAMA_HOST", f"http://127.0.0.1:{srv.server_address[1]}")
+    yield _FakeOllama
+    asyncio.run(llm_local.aclose())
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_achat_once_reuses_connection(fake_ollama):
+    async def run():
+        outs = [await llm_local.achat_once(f"q{i}") for i in range(5)]
+        await llm_local.aclose()
+        return outs
+
+    outs = asyncio.run(run())
+    assert outs == [f"echo:q{i}" for i in range(5)]
+    assert len(fake_ollama.peers) == 1
+
+
+def test_achat_stream_yields_chunks(fake_ollama):
+    async def run():
+        assert await llm_local.aavailable()
+        parts = [c async for c in llm_local.achat_stream("hi")]
+        await llm_local.aclose()
+        return parts
+
+    assert asyncio.run(run()) == ["t0 ", "t1 ", "t2 "]
+
+
+def test_inflight_is_bounded(fake_ollama, monkeypatch):
+    monkeypatch.setattr(llm_local, "MAX_INFLIGHT", 2)
+
+    async def one():
+        return "".join([c async for c in llm_local.achat_stream("hi")])
+
+    async def run():
+        res = await asyncio.gather(*[one() for _ in range(6)])
+        await llm_local.aclose()
+        return res
+
+    assert asyncio.run(run()) == ["t0 t1 t2 "] * 6
+    assert fake_ollama.max_inflight <= 2
+
+
+def test_stream_closed_by_consumer_releases_slot(fake_ollama, monkeypatch):
+    monkeypatch.setattr(llm_local, "MAX_INFLIGHT", 1)
+
+    async def run():
+        parts = []
+        agen = llm_local.achat_stream("long")
+        async for c in agen:
+            parts.append(c)
+            if len(parts) == 2:
+                break  # client went away
+        await agen.aclose()
+        # Slot must be free again: a follow-up request completes promptly
+        nxt = await asyncio.wait_for(llm_local.achat_once("again"), timeout=2.0)
+        await llm_local.aclose()
+        return parts, nxt
+
+    parts, nxt = asyncio.run(run())
+    assert parts == ["t0 ", "t1 "]
+    assert nxt == "echo:again"
+
+
+def test_client_of_previous_loop_is_closed(fake_ollama):
+    async def first():
+        await llm_local.achat_once("one")
+        return llm_local._ACLIENT
+
+    async def second():
+        await llm_local.achat_once("two")
+        await asyncio.sleep(0.05)  # let the stale client close
+        await llm_local.aclose()
+
+    old = asyncio.run(first())
+    asyncio.run(second())
+    assert old.is_closed
@@ -0,0 +1,72 @@
+"""
+Tests for the sequence counters and cursor reads on logging_bridge.RingBuffer.
+"""
+import asyncio
+import logging
+
+from netapi.logging_bridge import RingBuffer, AsyncLogHandler, LogBroadcaster, RING
+from netapi.modules.timeflow.engine import TimeFlow
+
+
+def test_seq_and_level_counters_are_monotonic():
+    ring = RingBuffer(maxlen=3)
+    for i in range(5):
+        ring.append_nowait(f"l{i}", "ERROR" if i == 4 else "INFO")
+    assert ring.seq == 5
+    assert ring.level_counts() == {"INFO": 4, "ERROR": 1}
+    assert asyncio.run(ring.snapshot(10)) == ["l2", "l3", "l4"]
+    assert asyncio.run(ring.snapshot(2)) == ["l3", "l4"]
+
+
+def test_since_returns_delta_and_reports_dropped():
+    ring = RingBuffer(maxlen=4)
+    for i in range(3):
+        ring.append_nowait(f"a{i}")
+    lines, nxt, dropped = ring.since(1)
+    assert (lines, nxt, dropped) == (["a1", "a2"], 3, 0)
+    assert ring.since(nxt) == ([], 3, 0)
+
+    for i in range(6):
+        ring.append_nowait(f"b{i}")
+    lines, nxt, dropped = ring.since(3)
+    assert lines == ["b2", "b3", "b4", "b5"]
+    assert (nxt, dropped) == (9, 2)
+
+    # limit keeps the cursor on the oldest unread line
+    lines, nxt, _ = ring.since(5, limit=2)
+    assert lines == ["b2", "b3"] and nxt == 7
+    assert ring.since(nxt, limit=5) == (["b4", "b5"], 9, 0)
+    assert ring.since(5, limit=0) == ([], 5, 0)
+
+
+def test_follow_restarts_a_cursor_from_before_a_restart():
+    RING.append_nowait("after restart")
+
+    async def first():
+        agen = LogBroadcaster().follow(RING.seq + 1000, poll_sec=0.01)
+        try:
+            return await asyncio.wait_for(agen.__anext__(), timeout=2)
+        finally:
+            await agen.aclose()
+
+    seq, line = asyncio.run(first())
+    # Replays from the oldest buffered line
+    assert seq == RING.seq - len(RING._buf) + 1 and line == RING._buf[0]
+
+
+def test_handler_counts_levels():
+    before = RING.level_counts().get("WARNING", 0)
+    h = AsyncLogHandler(asyncio.Queue())
+    rec = logging.LogRecord("t", logging.WARNING, __file__, 1, "boom", None, None)
+    h.emit(rec)
+    assert RING.level_counts().get("WARNING", 0) == before + 1
+
+
+def test_timeflow_event_rate_does_not_saturate():
+    tf = TimeFlow(interval_sec=1.0, log_window=20)
+    for i in range(RING._buf.maxlen + 50):
+        RING.append_nowait(f"x{i}", "DEBUG")
+    asyncio.run(tf._tick_once())
+    assert tf.state.events_last_window >= RING._buf.maxlen + 50
+    asyncio.run(tf._tick_once())
+    assert tf.state.events_last_window < 50
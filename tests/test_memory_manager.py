@@ -0,0 +1,100 @@
+"""
+Tests for the write-behind MemoryManager (os/core/memory/memory_manager.py).
+"""
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from core.memory.memory_manager import MemoryManager  # noqa: E402
+
+
+@pytest.fixture
+def manager(tmp_path):
+    m = MemoryManager(str(tmp_path / "memory.db"))
+    yield m
+    m.close()
+
+
+def test_writes_are_batched_and_readable(manager):
+    async def main():
+        ids = await asyncio.gather(*(manager.store_conversation(f"q{i}", f"a{i}") for i in range(200)))
+        recent = await manager.get_recent_conversations(limit=5)
+        found = await manager.search_conversations("a17", limit=20)
+        return ids, recent, found
+
+    ids, recent, found = asyncio.run(main())
+    assert sorted(ids) == list(range(1, 201))
+    assert len(recent) == 5
+    assert sorted(c["ai_response"] for c in found) == ["a17"] + [f"a17{i}" for i in range(10)]
+
+    stats = manager.get_stats()
+    assert stats["conversations"] == 200
+    assert stats["commits"] < 200
+
+
+def test_preferences_and_patterns(manager):
+    async def main():
+        await manager.set_preference("theme", "dark")
+        await manager.set_preference("theme", "light")
+        for _ in range(3):
+            await manager.learn_pattern("command", {"name": "update"})
+        await manager.learn_pattern("command", {"name": "backup"})
+        return (await manager.get_preference("theme"),
+                await manager.get_preference("missing", 42),
+                await manager.get_patterns("command", min_frequency=2))
+
+    theme, missing, patterns = asyncio.run(main())
+    assert theme == "light" and missing == 42
+    assert patterns == [{"type": "command", "data": {"name": "update"}, "frequency": 3,
+                         "last_seen": patterns[0]["last_seen"]}]
+
+
+def test_wal_indexes_and_ids_survive_restart(tmp_path):
+    path = str(tmp_path / "memory.db")
+    first = MemoryManager(path)
+    asyncio.run(first.store_conversation("hello", "hi"))
+    first.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_conversations_timestamp", "idx_patterns_type_data"} <= indexes
+    conn.close()
+
+    second = MemoryManager(path)
+    assert asyncio.run(second.store_conversation("again", "hi")) == 2
+    assert second.get_stats()["conversations"] == 2
+    second.close()
+
+
+def test_managers_sharing_a_file_get_distinct_ids(tmp_path):
+    path = str(tmp_path / "memory.db")
+    first, second = MemoryManager(path), MemoryManager(path)
+
+    async def main():
+        return await asyncio.gather(*(m.store_conversation(f"q{i}", "a")
+                                      for i in range(50) for m in (first, second)))
+
+    ids = asyncio.run(main())
+    assert -1 not in ids and sorted(ids) == list(range(1, 101))
+    assert first.get_stats()["conversations"] == 100
+    first.close()
+    second.close()
+
+
+def test_failing_write_does_not_drop_the_batch(manager):
+    async def main():
+        await manager.store_conversation("ok", "fine")
+        bad = await manager._submit(lambda conn: conn.execute("INSERT INTO missing_table VALUES (1)"))
+        await manager.store_conversation("ok2", "fine")
+        await manager.flush()
+        return bad
+
+    bad = asyncio.run(main())
+    assert isinstance(bad.exception(), sqlite3.OperationalError)
+    assert manager.get_stats()["conversations"] == 2
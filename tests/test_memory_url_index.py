@@ -0,0 +1,106 @@
+"""
+Tests for the URL -> block index in netapi/memory_store.py.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from netapi import memory_store as ms  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    idx = tmp_path / "indexes"
+    paths = {
+        "MEM_DIR": tmp_path / "memory" / "long_term" / "blocks",
+        "SHORT_DIR": tmp_path / "memory" / "short_term" / "blocks",
+        "IDX_DIR": idx,
+        "INV_PATH": tmp_path / "memory" / "index" / "inverted.json",
+        "TOPIC_IDX_PATH": tmp_path / "memory" / "index" / "topics.json",
+        "VEC_PATH": idx / "vector" / "index.json",
+        "META_PATH": idx / "vector" / "meta.json",
+        "URL_IDX_PATH": idx / "vector" / "urls.json",
+        "RATINGS_PATH": idx / "ratings.json",
+    }
+    for name, value in paths.items():
+        monkeypatch.setattr(ms, name, value)
+    monkeypatch.setattr(ms, "_URL_CACHE", {"key": None, "urls": {}})
+    return ms
+
+
+def test_add_block_maintains_url_index(store):
+    a = store.add_block("OCR: a.png", "text a", tags=["ocr", "media"], url="/uploads/a.png")
+    b = store.add_block("STT: a.png", "text b", tags=["stt", "media"], url="/uploads/a.png")
+    store.add_block("no url", "text c", tags=["ocr"])
+
+    assert store.find_blocks_by_url("/uploads/a.png") == [a, b]
+    assert store.find_blocks_by_url("/uploads/a.png", tag="stt") == [b]
+    assert store.find_blocks_by_url("/uploads/missing.png") == []
+    assert store.find_blocks_by_url("") == []
+
+
+def test_index_is_rebuilt_when_meta_changes_elsewhere(store):
+    store.add_block("OCR: a.png", "text a", tags=["ocr"], url="/uploads/a.png")
+    store.find_blocks_by_url("/uploads/a.png")
+
+    # An older store (or another writer) that only knows about meta.json
+    meta = json.loads(store.META_PATH.read_text())
+    meta["legacy1"] = {"title": "x", "tags": ["stt"], "ts": 0, "url": "/uploads/b.wav"}
+    store.META_PATH.write_text(json.dumps(meta))
+    assert store.find_blocks_by_url("/uploads/b.wav", tag="stt") == ["legacy1"]
+
+    store.URL_IDX_PATH.unlink()
+    assert store.find_blocks_by_url("/uploads/b.wav") == ["legacy1"]
+    assert store.URL_IDX_PATH.exists()
+
+
+def _add_many(prefix, n):
+    for i in range(n):
+        ms.add_block(f"{prefix} {i}", f"content {prefix} word{i}", tags=[prefix], url=f"/uploads/{prefix}{i}")
+
+
+@pytest.mark.skipif(not hasattr(__import__("os"), "fork"), reason="needs fork")
+def test_concurrent_writers_do_not_lose_index_entries(store):
+    import multiprocessing as mp
+
+    ctx = mp.get_context("fork")  # children inherit the patched paths
+    procs = [ctx.Process(target=_add_many, args=(f"w{k}", 8)) for k in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    meta = json.loads(store.META_PATH.read_text())
+    assert len(meta) == 32
+    inv = json.loads(store.INV_PATH.read_text())
+    assert set(inv["content"]) == set(meta)
+    assert set(json.loads(store.VEC_PATH.read_text())) == set(meta)
+    assert len(store._url_index()) == 32
+    assert not list(store.META_PATH.parent.glob("*.tmp"))
+
+
+def test_rebuild_does_not_stamp_a_newer_meta(store, monkeypatch):
+    store.add_block("OCR: a.png", "text a", tags=["ocr"], url="/uploads/a.png")
+    store.URL_IDX_PATH.unlink()
+    read_json = store._read_json
+    held = []
+
+    def racing_read(p):
+        data = read_json(p)
+        if p == store.META_PATH and not held:
+            held.append(store._INDEX_DEPTH)
+            # A writer outside the lock rewrites meta.json mid-rebuild
+            newer = dict(data, late={"title": "x", "tags": [], "ts": 0, "url": "/uploads/late.png"})
+            store.META_PATH.write_text(json.dumps(newer))
+        return data
+
+    monkeypatch.setattr(store, "_read_json", racing_read)
+    assert store.find_blocks_by_url("/uploads/late.png") == []
+    assert held == [1]  # rebuilt under _index_lock()
+    # The rebuilt index carries the older mtime, so the next reader rebuilds it
+    assert store.find_blocks_by_url("/uploads/late.png") == ["late"]
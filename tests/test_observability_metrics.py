@@ -0,0 +1,92 @@
+"""
+Tests for latency histograms in netapi/modules/observability/metrics.py.
+"""
+import asyncio
+import re
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from netapi.modules.observability import metrics  # noqa: E402
+
+
+def _series(text, name):
+    out = {}
+    for line in text.splitlines():
+        if line.startswith(name):
+            key, _, value = line.rpartition(" ")
+            out[key] = float(value)
+    return out
+
+
+def test_histogram_buckets_count_and_sum_from_many_threads():
+    route = "/test/hist/threads"
+
+    def worker():
+        for i in range(500):
+            metrics.record_http_request(route=route, method="get", status=200, duration_seconds=0.02 if i % 10 else 3.0)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = metrics.render_prometheus_text()
+    labels = f'route="{route}",method="GET"'
+    buckets = _series(text, f"ki_ana_http_request_duration_seconds_bucket{{{labels}")
+    assert buckets[f'ki_ana_http_request_duration_seconds_bucket{{{labels},le="0.025"}}'] == 3600
+    assert buckets[f'ki_ana_http_request_duration_seconds_bucket{{{labels},le="2.5"}}'] == 3600
+    assert buckets[f'ki_ana_http_request_duration_seconds_bucket{{{labels},le="5.0"}}'] == 4000
+    assert buckets[f'ki_ana_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 4000
+    values = list(buckets.values())
+    assert values == sorted(values)  # cumulative
+    assert _series(text, f"ki_ana_http_request_duration_seconds_count{{{labels}}}") == {
+        f"ki_ana_http_request_duration_seconds_count{{{labels}}}": 4000}
+    total = _series(text, f"ki_ana_http_request_duration_seconds_sum{{{labels}}}")
+    assert abs(sum(total.values()) - (3600 * 0.02 + 400 * 3.0)) < 1e-6
+    assert text.count("# TYPE ki_ana_http_request_duration_seconds histogram") == 1
+
+
+def test_route_specific_buckets_and_percentiles():
+    route = "/test/hist/chat"
+    metrics.configure_buckets([0.5, 1, 2, 4, 8], route=route, method="POST")
+    for i in range(100):
+        metrics.record_http_request(route=route, method="POST", status=200, duration_seconds=0.3 if i < 90 else 6.0)
+
+    text = metrics.render_prometheus_text()
+    les = re.findall(rf'route="{route}",method="POST",le="([^"]+)"', text)
+    assert les == ["0.5", "1.0", "2.0", "4.0", "8.0", "+Inf"]
+
+    snap = metrics.latency_snapshot()["http"][f"POST {route}"]
+    assert snap["count"] == 100
+    assert snap["p50_ms"] <= 500 and 4000 <= snap["p99_ms"] <= 8000
+
+
+def test_chat_stage_timers():
+    @metrics.timed_stage("retrieval")
+    def recall(q):
+        return [q]
+
+    @metrics.timed_stream("llm_first_token", "llm_total")
+    async def stream():
+        await asyncio.sleep(0.01)
+        yield "a"
+        await asyncio.sleep(0.05)
+        yield "b"
+
+    async def consume():
+        return [c async for c in stream()]
+
+    before = metrics.latency_snapshot()["chat_stages"]
+    assert recall("x") == ["x"]
+    assert asyncio.run(consume()) == ["a", "b"]
+    with metrics.stage_timer("postprocess"):
+        pass
+
+    after = metrics.latency_snapshot()["chat_stages"]
+    for stage in ("retrieval", "llm_first_token", "llm_total", "postprocess"):
+        assert after[stage]["count"] == before.get(stage, {}).get("count", 0) + 1
+    assert 'ki_ana_chat_stage_duration_seconds_bucket{stage="llm_total",le="+Inf"}' in metrics.render_prometheus_text()
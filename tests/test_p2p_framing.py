@@ -0,0 +1,150 @@
+"""
+Tests for P2P data channel framing (system/p2p_framing.py).
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from p2p_framing import (  # noqa: E402
+    _CHUNK_HEADER, CHUNK_MAGIC, FramedChannel, LoopbackTransport, Reassembler, _pack, _unpack,
+    decode_frame, encode_frame, packb, split_chunks, unpackb,
+)
+
+
+def _msg(i, data=None):
+    return {"type": "block_push", "data": data if data is not None else {"n": i},
+            "sender_id": "dev-a", "timestamp": 1700000000.5 + i}
+
+
+def _pair(**kw):
+    ta, tb = LoopbackTransport.pair()
+    got_a, got_b = [], []
+    a = FramedChannel(ta, got_a.append, **kw)
+    b = FramedChannel(tb, got_b.append, **kw)
+    ta.on_frame, tb.on_frame = a.receive, b.receive
+    return a, b, ta, got_b
+
+
+def test_msgpack_roundtrip_and_wire_format():
+    obj = {"s": "héllo" * 20, "i": [0, 127, 128, -1, -33, 2 ** 40, -2 ** 40], "f": 1.5,
+           "b": b"\x00\x01", "n": None, "t": True, "nested": [{"k": list(range(20))}]}
+    out = []
+    _pack(obj, out)
+    assert _unpack(b"".join(out), 0)[0] == obj
+    assert unpackb(packb(obj)) == obj
+    assert out[0] == b"\x87"  # fixmap with 7 entries
+    single = []
+    _pack({"a": 1}, single)
+    assert b"".join(single) == b"\x81\xa1a\x01"
+
+
+def test_frames_roundtrip_with_zlib():
+    msgs = [_msg(i, {"text": "same words " * 50}) for i in range(5)]
+    frame = encode_frame(msgs, "bin", compress_min=256)
+    assert frame[:2] == b"KB" and frame[2] & 1
+    assert len(frame) < len(json.dumps(msgs)) / 5
+    assert decode_frame(frame) == msgs
+    assert decode_frame(encode_frame(msgs, "json")) == msgs
+    assert decode_frame(json.dumps(msgs[0])) == [msgs[0]]  # legacy single-message frame
+
+
+def test_negotiation_and_coalescing():
+    async def main():
+        a, b, ta, got_b = _pair(window=0.005)
+        a.send(_msg(0))  # before any hello: legacy JSON frame
+        a.start("dev-a")
+        b.start("dev-b")
+        await asyncio.sleep(0.01)
+        assert a.encoding == b.encoding == "bin"
+
+        sends_before = ta.sends
+        for i in range(1, 201):
+            a.send(_msg(i))
+        await asyncio.sleep(0.02)
+        return got_b, ta.sends - sends_before
+
+    got, frames = asyncio.run(main())
+    assert [m["data"]["n"] for m in got] == list(range(201))
+    assert frames <= 3
+
+
+def test_json_fallback_for_json_only_and_legacy_peers():
+    async def main():
+        a, b, ta, got_b = _pair(window=0.005)
+        b.preferred = "json"
+        a.start("dev-a")
+        b.start("dev-b")
+        await asyncio.sleep(0.01)
+        for i in range(10):
+            a.send(_msg(i))
+        await asyncio.sleep(0.02)
+
+        # A legacy peer never sends a hello: stay on one JSON message per frame
+        tl, tr = LoopbackTransport.pair()
+        legacy_frames = []
+        tr.on_frame = legacy_frames.append
+        c = FramedChannel(tl, lambda m: None, window=0.005)
+        for i in range(3):
+            c.send(_msg(i))
+        await asyncio.sleep(0.02)
+        return a.encoding, got_b, legacy_frames
+
+    encoding, got, legacy = asyncio.run(main())
+    assert encoding == "json" and len(got) == 10
+    assert [json.loads(f)["data"]["n"] for f in legacy] == [0, 1, 2]
+
+
+def test_large_payload_chunking_with_flow_control():
+    async def main():
+        a, b, ta, got_b = _pair(window=0.001, chunk_size=4096, high_water=16 * 1024, compress_min=0)
+        ta.low_water = 4096
+        a.start("dev-a")
+        b.start("dev-b")
+        await asyncio.sleep(0.01)
+        big = bytes(range(256)) * 1000  # 256 KB, incompressible enough
+        a.send(_msg(1, {"blob": big}))
+        a.flush()
+        peak_backlog = a.backlog
+        for _ in range(200):
+            if got_b:
+                break
+            await asyncio.sleep(0.005)
+        return a, got_b, big, peak_backlog
+
+    a, got, big, peak_backlog = asyncio.run(main())
+    assert got and got[0]["data"]["blob"] == big
+    assert a.stats["chunks_sent"] >= 60
+    assert a.stats["flow_stalls"] > 0 and peak_backlog > 0
+
+
+def _chunk(stream, index, total, payload=b"x"):
+    return _CHUNK_HEADER.pack(CHUNK_MAGIC, 0, stream, index, total) + payload
+
+
+def test_reassembler_rejects_out_of_range_and_huge_totals():
+    r = Reassembler(max_chunks=1000)
+    # index >= total would let len(parts) reach total with a part missing
+    assert r.add(_chunk(1, 0, 2)) is None
+    assert r.add(_chunk(1, 5, 2)) is None
+    assert r.dropped == 1 and len(r) == 0
+    assert r.add(_chunk(2, 0, 0)) is None
+    assert r.add(_chunk(3, 0, 10 ** 9)) is None
+    assert r.dropped == 3 and len(r) == 0
+
+    chunks = split_chunks(b"abcdefgh", 3, stream_id=4)
+    assert [r.add(c) for c in chunks] == [None, None, b"abcdefgh"]
+
+
+def test_reassembler_drops_stream_when_total_changes():
+    r = Reassembler()
+    assert r.add(_chunk(7, 0, 3, b"a")) is None
+    assert r.add(_chunk(7, 1, 2, b"b")) is None
+    assert r.dropped == 1 and len(r) == 0
+    # Later chunks of the broken stream cannot complete a frame
+    assert r.add(_chunk(7, 2, 3, b"c")) is None
+    assert r.add(_chunk(7, 1, 3, b"b")) is None
+    assert len(r) == 1
@@ -0,0 +1,97 @@
+"""
+Tests for the log-structured P2P MessageQueue (system/p2p_messaging.py).
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from p2p_messaging import DeliveredWindow, EncryptedMessage, MessageQueue, MessageStatus  # noqa: E402
+
+
+def _msg(i, recipient="device-b", ts=None):
+    return EncryptedMessage(
+        message_id=f"m{i}", sender_id="device-a", recipient_id=recipient,
+        encrypted_content="x", nonce="n", timestamp=ts or time.time(),
+        status=MessageStatus.PENDING.value,
+    )
+
+
+def test_group_commit_and_replay(tmp_path):
+    q = MessageQueue(tmp_path, commit_batch=100, commit_interval=60, fsync=False)
+    for i in range(250):
+        q.add(_msg(i, recipient=f"dev{i % 5}"))
+    assert q.commits == 2  # two full batches, 50 records still buffered
+    q.mark_delivered("m0")
+    q.mark_sent("m1")
+    q.flush()
+
+    lines = (tmp_path / "queue.log").read_text().splitlines()
+    assert len(lines) == 252 and json.loads(lines[-1])["op"] == "sent"
+
+    q2 = MessageQueue(tmp_path, fsync=False)
+    assert len(q2.pending) == 249
+    assert q2.is_duplicate("m0") and q2.is_duplicate("m5") and not q2.is_duplicate("m999")
+    assert q2.pending["m1"].status == MessageStatus.SENT.value
+    assert [m.message_id for m in q2.get_pending("dev1")][:3] == ["m1", "m6", "m11"]
+    assert len(q2.get_pending("dev0")) == 49
+
+
+def test_retry_backoff_schedule(tmp_path):
+    q = MessageQueue(tmp_path, retry_base=10, retry_max=40, max_attempts=4, fsync=False)
+    now = time.time()
+    q.add(_msg(1, ts=now))
+    assert [m.message_id for m in q.due_for_retry(now)] == ["m1"]
+    assert q.due_for_retry(now) == []
+
+    delays = []
+    for _ in range(4):
+        q.mark_failed("m1")
+        delays.append(q._next_retry.get("m1"))
+    # 10, 20, 40 (capped) seconds, jittered down by at most 20%; the 4th attempt gives up
+    for nxt, base in zip(delays[:3], (10, 20, 40)):
+        assert 0.8 * base - 1 <= nxt - now <= base + 1
+    assert delays[3] is None
+    assert q.due_for_retry(now + 10000) == []
+    assert q.pending["m1"].status == MessageStatus.FAILED.value
+
+    q.mark_delivered("m1")
+    assert not q.pending and q.is_duplicate("m1")
+
+
+def test_delivered_window_is_bounded():
+    window = DeliveredWindow(window_seconds=100, max_entries=3)
+    now = time.time()
+    window.add("old", now - 500)
+    window.add("a", now)
+    assert "old" not in window
+    for key in ("b", "c", "d"):
+        window.add(key, now)
+    assert len(window) == 3 and "a" not in window and "d" in window
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    (tmp_path / "pending.json").write_text(json.dumps({"m1": _msg(1).to_dict()}, indent=2))
+    (tmp_path / "delivered.json").write_text(json.dumps({"m0": _msg(0).to_dict()}, indent=2))
+
+    q = MessageQueue(tmp_path, fsync=False)
+    assert list(q.pending) == ["m1"] and q.is_duplicate("m0")
+    assert (tmp_path / "pending.json.migrated").exists()
+    assert len(MessageQueue(tmp_path, fsync=False).pending) == 1
+
+
+def test_log_compaction(tmp_path):
+    q = MessageQueue(tmp_path, commit_batch=500, fsync=False)
+    for i in range(6000):
+        q.add(_msg(i))
+        q.mark_sent(f"m{i}")
+        q.mark_delivered(f"m{i}")
+    q.add(_msg(9999))
+    q.flush()
+
+    assert q.stats()["log_records"] < 6000 * 3
+    q2 = MessageQueue(tmp_path, fsync=False)
+    assert list(q2.pending) == ["m9999"] and len(q2.delivered) == 6000
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("ADMIN_API_TOKEN", "test-admin-token")
+from netapi.app import app  # noqa: E402
+
+client = TestClient(app)
+AUTH = {"Authorization": f"Bearer {os.environ['ADMIN_API_TOKEN']}"}
+
+
+def create_plan(steps: list[Dict[str, Any]]) -> int:
+    r = client.post("/api/plan", json={"title": f"L {time.time()}", "steps": steps}, headers=AUTH)
+    assert r.status_code == 200, r.text
+    return int(r.json()["plan"]["id"])
+
+
+def lease(**body):
+    r = client.post("/api/plan/lease-step", json=body, headers=AUTH)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def complete(step, ok=True, **extra):
+    r = client.post("/api/plan/complete-step", json={
+        "plan_id": int(step["plan_id"]), "step_id": int(step["id"]), "ok": ok,
+        "result": "ok" if ok else None, "error": None if ok else "boom", **extra,
+    }, headers=AUTH)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def get_plan(pid: int):
+    return client.get(f"/api/plan/{pid}", headers=AUTH).json()["plan"]
+
+
+def test_batch_lease_in_order_without_duplicates():
+    pids = [create_plan([{"type": "task", "payload": {"p": k, "i": i}} for i in range(2)]) for k in range(3)]
+    j = lease(max=5)
+    # One step per plan: a plan's next step waits for the previous one
+    assert [(s["payload"]["p"], s["payload"]["i"]) for s in j["steps"]] == [(0, 0), (1, 0), (2, 0)]
+    assert j["step"]["id"] == j["steps"][0]["id"] and j["plan_id"] == pids[0]
+    assert all(s["attempts"] == 1 for s in j["steps"])
+    assert lease(max=10)["steps"] == []
+    for s in j["steps"]:
+        complete(s)
+    rest = lease(max=10)["steps"]
+    assert [(s["payload"]["p"], s["payload"]["i"]) for s in rest] == [(0, 1), (1, 1), (2, 1)]
+    for s in rest:
+        complete(s)
+    assert lease()["step"] is None
+    assert [get_plan(pid)["status"] for pid in pids] == ["done"] * 3
+
+
+def test_failed_step_is_rescheduled_as_delayed_step():
+    pid = create_plan([{"type": "task", "payload": {"max_retries": 1, "retry_backoff_sec": 1}}])
+    [step] = lease(max=5)["steps"]
+    r = complete(step, ok=False)
+    assert r["status"] == "queued" and r["retry_at"] >= int(time.time())
+    assert get_plan(pid)["status"] == "running"
+
+    # Not due yet; a long-poll returns once the backoff has elapsed
+    assert lease()["step"] is None
+    t0 = time.monotonic()
+    again = lease(wait=5)["step"]
+    assert again and again["id"] == step["id"] and again["attempts"] == 2
+    assert time.monotonic() - t0 < 4
+
+    # Second failure exhausts max_retries
+    assert complete(again, ok=False).get("status") is None
+    assert get_plan(pid)["status"] == "failed"
+
+
+def test_retry_keeps_step_order():
+    pid = create_plan([
+        {"type": "task", "payload": {"i": 0, "max_retries": 1, "retry_backoff_sec": 1}},
+        {"type": "task", "payload": {"i": 1}},
+    ])
+    first = lease(max=5)["steps"]
+    assert [s["payload"]["i"] for s in first] == [0]
+    complete(first[0], ok=False)
+    # Step 1 must not overtake the delayed retry of step 0
+    assert lease(max=5)["steps"] == []
+    again = lease(max=5, wait=5)["steps"]
+    assert [(s["payload"]["i"], s["attempts"]) for s in again] == [(0, 2)]
+    assert lease(max=5)["steps"] == []
+    complete(again[0])
+    [second] = lease(max=5)["steps"]
+    assert second["payload"]["i"] == 1
+    complete(second)
+    assert lease()["step"] is None
+    assert get_plan(pid)["status"] == "done"
+
+
+def test_step_of_dead_worker_is_requeued_after_lease_expiry():
+    from netapi.db import SessionLocal
+    from netapi.models import PlanStep
+
+    pid = create_plan([{"type": "task", "payload": {"i": i}} for i in range(2)])
+    [step] = lease(max=5)["steps"]
+    assert step["payload"]["i"] == 0
+    # Worker dies mid-step: nothing completes it, the plan must not stall
+    assert lease(max=5)["steps"] == []
+    with SessionLocal() as db:
+        db.query(PlanStep).filter(PlanStep.id == int(step["id"])).update({PlanStep.started_at: int(time.time()) - 3600})
+        db.commit()
+    [again] = lease(max=5)["steps"]
+    assert again["id"] == step["id"] and again["attempts"] == 2
+    complete(again)
+    [second] = lease(max=5)["steps"]
+    assert second["payload"]["i"] == 1
+    complete(second)
+    assert lease()["step"] is None
+    assert get_plan(pid)["status"] == "done"
+
+
+def test_final_failure_skips_retry():
+    pid = create_plan([{"type": "task", "payload": {"max_retries": 3}}])
+    step = lease()["step"]
+    complete(step, ok=False, final=True)
+    assert get_plan(pid)["status"] == "failed"
+
+
+def test_long_poll_wakes_on_new_plan():
+    result = {}
+
+    def waiter():
+        t0 = time.monotonic()
+        result["lease"] = lease(max=2, wait=10)
+        result["elapsed"] = time.monotonic() - t0
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    time.sleep(0.5)
+    pid = create_plan([{"type": "task", "payload": {}}])
+    t.join(15)
+    assert result["lease"]["plan_id"] == pid
+    assert result["elapsed"] < 5
+
+
+def test_long_poll_times_out_empty():
+    t0 = time.monotonic()
+    j = lease(wait=0.5)
+    assert j["ok"] is True and j["steps"] == [] and j["step"] is None
+    assert 0.4 <= time.monotonic() - t0 < 3
@@ -0,0 +1,76 @@
+"""
+Tests for request-scoped profiling (netapi/modules/observability/profiling.py).
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from netapi.modules.observability import profiling  # noqa: E402
+
+
+@profiling.traced()
+def retrieve(q):
+    time.sleep(0.01)
+    return q
+
+
+@profiling.traced()
+async def llm(q):
+    await asyncio.to_thread(retrieve, q)
+    await asyncio.sleep(0.02)
+    return q.upper()
+
+
+@profiling.profiled("chat_once")
+async def endpoint(body: dict, request=None):
+    with profiling.span("prepare"):
+        retrieve(body["q"])
+    return await llm(body["q"])
+
+
+def _request(headers):
+    return SimpleNamespace(headers=headers, url=SimpleNamespace(path="/api/chat"), method="POST", state=SimpleNamespace())
+
+
+def test_disabled_requests_record_nothing(tmp_path):
+    profiling.configure(directory=tmp_path, sample_rate=0.0)
+    assert asyncio.run(endpoint({"q": "hi"}, request=_request({}))) == "HI"
+    assert profiling.load_traces() == []
+
+
+def test_header_opt_in_records_span_tree(tmp_path):
+    profiling.configure(directory=tmp_path, sample_rate=0.0)
+    req = _request({"x-ki-profile": "1"})
+    asyncio.run(endpoint({"q": "hi"}, request=req))
+
+    [trace] = profiling.slowest(5)
+    assert trace["trace_id"] == req.state.profile_trace_id
+    assert trace["meta"] == {"path": "/api/chat", "method": "POST"}
+    root = trace["root"]
+    assert [c["name"] for c in root["children"]] == ["prepare", "llm"]
+    prepare, llm_span = root["children"]
+    assert [c["name"] for c in prepare["children"]] == ["retrieve"]
+    # the to_thread call keeps its parent through the copied context
+    assert [c["name"] for c in llm_span["children"]] == ["retrieve"]
+    assert llm_span["wall_ms"] >= 30 and root["wall_ms"] >= llm_span["wall_ms"]
+    assert prepare["cpu_ms"] < prepare["wall_ms"]  # sleeping is not CPU time
+
+    folded = profiling.folded_stacks([trace]).splitlines()
+    paths = {line.rsplit(" ", 1)[0] for line in folded}
+    assert {"chat_once;prepare;retrieve", "chat_once;llm;retrieve", "chat_once;llm"} <= paths
+
+
+def test_sampling_and_rotation(tmp_path):
+    profiling.configure(directory=tmp_path, sample_rate=1.0, max_bytes=2000, keep=2)
+    try:
+        for i in range(30):
+            asyncio.run(endpoint({"q": f"q{i}"}, request=_request({})))
+    finally:
+        profiling.configure(sample_rate=0.0, max_bytes=5 * 1024 * 1024, keep=3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all(p.stat().st_size <= 2000 for p in tmp_path.iterdir())
+    assert 0 < len(profiling.load_traces()) < 30
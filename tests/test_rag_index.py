@@ -0,0 +1,100 @@
+"""
+Tests for the chunked hybrid RAG index (os/core/nlp/rag_system.py, vector_index.py).
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from core.nlp.rag_system import RAGSystem  # noqa: E402
+from core.nlp.vector_index import HashingEmbedder, VectorIndex, chunk_text  # noqa: E402
+
+
+def _rag(path):
+    return RAGSystem(str(path), embedder=HashingEmbedder(dim=128), chunk_size=200, chunk_overlap=40)
+
+
+def test_chunk_text_overlaps_and_covers_everything():
+    text = " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(60))
+    chunks = chunk_text(text, max_chars=200, overlap=40)
+    assert len(chunks) > 5
+    assert all(len(c) <= 200 for c in chunks)
+    assert "Sentence number 0" in chunks[0] and "Sentence number 59" in chunks[-1]
+    assert chunk_text("short", max_chars=200) == ["short"]
+
+
+def test_hybrid_search_returns_the_relevant_chunk(tmp_path):
+    rag = _rag(tmp_path)
+    filler = " ".join("General notes about the desktop and its settings." for _ in range(20))
+    rag.add_documents([
+        (filler + " To fix the printer spooler restart the cups service.", {"title": "printer"}),
+        ("Bluetooth pairing needs the adapter to be powered on first.", {"title": "bt"}),
+        (filler, {"title": "filler"}),
+    ])
+
+    hits = rag.search_chunks("printer spooler cups", limit=2)
+    assert hits[0]["document"].metadata["title"] == "printer"
+    assert "cups" in hits[0]["text"] and len(hits[0]["text"]) <= 200
+    assert rag.search("bluetooth adapter", limit=1)[0].metadata["title"] == "bt"
+    assert rag.search("bluetooth adapter", limit=1, mode="keyword")[0].metadata["title"] == "bt"
+
+    prompt = asyncio.run(rag.augment_prompt("restart cups printer", max_context_docs=1))
+    assert "cups" in prompt and filler not in prompt
+
+
+def test_batch_ingest_persists_and_reloads(tmp_path):
+    rag = _rag(tmp_path)
+    ids = rag.add_documents((f"Document {i} about kernel module {i}.", {"n": i}) for i in range(50))
+    assert len(ids) == 50 and len(rag.index) == 50
+
+    lines = (tmp_path / "documents.jsonl").read_text().splitlines()
+    assert len(lines) == 50
+
+    reloaded = _rag(tmp_path)
+    assert len(reloaded.documents) == 50 and len(reloaded.index) == 50
+    assert reloaded.search("kernel module 17", limit=1, mode="keyword")[0].metadata["n"] == 17
+
+
+def test_legacy_documents_json_is_migrated(tmp_path):
+    legacy = [{"content": "Firewall rules live in nftables.", "metadata": {"id": "doc_0", "title": "fw"}}]
+    (tmp_path / "documents.json").write_text(json.dumps(legacy))
+
+    rag = _rag(tmp_path)
+    assert rag.search("nftables firewall", limit=1)[0].metadata["title"] == "fw"
+    assert (tmp_path / "documents.jsonl").exists()
+    assert not (tmp_path / "documents.json").exists()
+    assert rag.get_stats()["total_chunks"] == 1
+
+
+def test_ivf_vector_search_matches_exact_on_clustered_data(tmp_path):
+    class _Fixed:
+        name = "fixed"
+        dim = 16
+
+        def __init__(self, table):
+            self.table = table
+
+        def embed_batch(self, texts):
+            return np.stack([self.table[t] for t in texts])
+
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(8, 16))
+    table = {}
+    for i in range(400):
+        v = centers[i % 8] + 0.05 * rng.normal(size=16)
+        table[f"row{i}"] = (v / np.linalg.norm(v)).astype(np.float32)
+    table["query"] = table["row3"]
+
+    index = VectorIndex(tmp_path / "index", _Fixed(table))
+    index.IVF_MIN_ROWS = 100
+    index.IVF_PROBE = 4
+    index.add([(f"d{i}", f"row{i}") for i in range(400)])
+
+    hits = index.vector_search("query", 10)
+    assert index._centroids is not None
+    assert hits[0][0] == 3
+    assert all(row % 8 == 3 for row, _ in hits)
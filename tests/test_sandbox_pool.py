@@ -0,0 +1,135 @@
+"""
+Tests for the warm sandbox pool (system/sandbox_pool.py).
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from sandbox_pool import SandboxPool  # noqa: E402
+
+DOUBLE = "def double(x):\n    return x * 2\n"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    p = SandboxPool(size=2, max_runs=50)
+    yield p
+    p.close()
+
+
+def test_code_examples(pool):
+    ok = pool.test_code(DOUBLE, "double", [{"input": "21", "output": "42"}, {"input": "'a'", "output": "'aa'"}])
+    assert ok["ok"] is True
+    assert [r["passed"] for r in ok["results"]] == [True, True]
+
+    bad = pool.test_code(DOUBLE, "double", [{"input": "1", "output": "3"}])
+    assert bad["ok"] is False and bad["results"][0]["actual"] == "2"
+
+    missing = pool.test_code(DOUBLE, "triple", [])
+    assert missing["ok"] is False and "not found" in missing["error"]
+
+
+def test_jobs_do_not_share_state(pool):
+    code = "import builtins\ndef f(x):\n    seen = getattr(builtins, '_leak', 0)\n    builtins._leak = 1\n    return seen\n"
+    results = [pool.test_code(code, "f", [{"input": "0", "output": "0"}]) for _ in range(4)]
+    assert all(r["ok"] for r in results)
+
+
+def test_timeout_and_cpu_limit_recycle_worker(pool):
+    before = pool.stats["recycled"]
+    spin = "def f(x):\n    while True:\n        pass\n"
+    t0 = time.monotonic()
+    res = pool.test_code(spin, "f", [{"input": "0", "output": "0"}], timeout=1)
+    assert res["ok"] is False and res["breach"] in ("timeout", "cpu")
+    assert time.monotonic() - t0 < 5
+    assert pool.stats["recycled"] == before + 1
+    # Pool keeps working with the replacement
+    assert pool.test_code(DOUBLE, "double", [{"input": "2", "output": "4"}])["ok"]
+
+
+def test_memory_limit(pool):
+    hog = "def f(x):\n    return len(bytearray(512 * 1024 * 1024))\n"
+    res = pool.test_code(hog, "f", [{"input": "0", "output": "0"}])
+    assert res["ok"] is False
+    assert res["breach"] == "memory" and res["results"][0]["error"] == "MemoryError"
+
+
+def test_skill_dir_and_output(pool, tmp_path):
+    (tmp_path / "manifest.json").write_text(json.dumps({"entry": "main.py"}))
+    (tmp_path / "main.py").write_text("def run(context):\n    print('hello from skill')\n    return {'n': context['n'] + 1}\n")
+    res = pool.run_skill(str(tmp_path), context={"n": 1})
+    assert res["ok"] is True and res["result"] == {"n": 2}
+    assert "hello from skill" in res["output"]
+
+    (tmp_path / "main.py").write_text("raise RuntimeError('boom')\n")
+    res = pool.run_skill(str(tmp_path))
+    assert res["ok"] is False and "boom" in res["error"] and "Traceback" in res["output"]
+
+
+def test_batch_runs_in_parallel_and_keeps_order(pool):
+    reqs = [{"kind": "code", "code": DOUBLE, "func": "double", "examples": [{"input": str(i), "output": str(2 * i)}]}
+            for i in range(10)]
+    res = pool.map(reqs)
+    assert [r["results"][0]["actual"] for r in res] == [str(2 * i) for i in range(10)]
+    assert all(r["duration_ms"] < 1000 for r in res)
+
+
+def test_job_cannot_forge_protocol_frames(pool):
+    # Write a well-formed "passed" frame to every fd the job might have inherited
+    forge = (
+        "import json, os, struct\n"
+        "def f(x):\n"
+        "    body = json.dumps({'ok': True, 'forged': True}).encode()\n"
+        "    for fd in range(3, 256):\n"
+        "        try:\n"
+        "            os.write(fd, struct.pack('>I', len(body)) + body)\n"
+        "        except OSError:\n"
+        "            pass\n"
+        "    return 0\n"
+    )
+    res = pool.test_code(forge, "f", [{"input": "0", "output": "1"}])
+    assert "forged" not in res and res["ok"] is False
+    assert pool.test_code(DOUBLE, "double", [{"input": "3", "output": "6"}])["ok"]
+
+
+def test_background_process_is_killed_with_job(pool, tmp_path):
+    marker = tmp_path / "survivor"
+    code = (
+        "import os, time\n"
+        "def f(x):\n"
+        "    if os.fork() == 0:\n"
+        "        os.closerange(0, 256)\n"
+        "        time.sleep(1.5)\n"
+        f"        open({str(marker)!r}, 'w').close()\n"
+        "        os._exit(0)\n"
+        "    return x\n"
+    )
+    res = pool.test_code(code, "f", [{"input": "0", "output": "0"}], timeout=3)
+    assert res["ok"] is True
+    time.sleep(2)
+    assert not marker.exists()
+
+
+def test_skill_runs_in_one_process_without_pool(tmp_path, monkeypatch):
+    import skill_sandbox
+
+    monkeypatch.setenv("KI_SANDBOX_POOL", "0")
+    monkeypatch.setattr(skill_sandbox, "SKILLS", tmp_path)
+    stage = tmp_path / "staging"
+    (stage / "echo").mkdir(parents=True)
+    (stage / "echo" / "skill.py").write_text("def run(context):\n    print('hello without pool')\n")
+    (stage / "spin").mkdir()
+    (stage / "spin" / "skill.py").write_text("def run(context):\n    while True:\n        pass\n")
+
+    ok, out = skill_sandbox.sandbox_run("echo")
+    assert ok is True and "hello without pool" in out
+    t0 = time.monotonic()
+    ok, out = skill_sandbox.sandbox_run("spin")
+    assert ok is False and ("Timeout" in out or "CPU limit" in out)
+    assert time.monotonic() - t0 < 10
@@ -0,0 +1,130 @@
+"""
+Lazy router mounting (netapi/lazy_routers.py) and the API cold-start budget
+(netapi/startup_profile.py). Override the budget with KI_STARTUP_BUDGET_MS.
+"""
+import os
+import sys
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from netapi import startup_profile
+from netapi.lazy_routers import LazyRouter, include, preload_for_openapi
+from netapi.startup_profile import parse_importtime, profile_import, summarize
+
+LAZY_MODULE = """
+from fastapi import APIRouter
+router = APIRouter(prefix="/lazy")
+
+@router.get("")
+def root():
+    return {"where": "lazy-root"}
+
+@router.get("/item/{i}")
+def item(i: int):
+    return {"where": "lazy", "i": i}
+"""
+
+
+@pytest.fixture
+def lazy_module(tmp_path, monkeypatch):
+    (tmp_path / "_lazy_demo_router.py").write_text(LAZY_MODULE)
+    (tmp_path / "_lazy_broken_router.py").write_text("raise ImportError('optional dep missing')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "_lazy_demo_router"
+    sys.modules.pop("_lazy_demo_router", None)
+    sys.modules.pop("_lazy_broken_router", None)
+
+
+def test_parse_and_summarize_importtime():
+    text = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     soupsieve\n"
+        "import time:       400 |        500 |   bs4\n"
+        "import time:        50 |         50 |   netapi.modules.chat.folders\n"
+        "import time:       200 |        750 | netapi.app\n"
+        "some unrelated stderr line\n"
+    )
+    recs = parse_importtime(text)
+    assert [(r.module, r.depth) for r in recs] == [
+        ("soupsieve", 2), ("bs4", 1), ("netapi.modules.chat.folders", 1), ("netapi.app", 0)]
+    s = summarize(recs, top=2)
+    assert s["total_ms"] == 0.8 and s["modules"] == 4
+    assert [x["module"] for x in s["slowest"]] == ["netapi.app", "bs4"]
+    assert s["packages"][0] == {"package": "bs4", "self_ms": 0.4}
+    assert s["heavy"] == []
+
+
+def test_lazy_router_mounts_on_first_request(lazy_module):
+    app = FastAPI()
+    lr = LazyRouter("demo", lazy_module, "/lazy")
+    include(app, lr)
+    idx = app.router.routes.index(lr)
+
+    @app.get("/lazy/item/{i}/late")
+    def late(i: int):
+        return {"where": "late"}
+
+    @app.get("/other")
+    def other():
+        return {"where": "other"}
+
+    client = TestClient(app)
+    assert client.get("/other").json() == {"where": "other"}
+    assert lazy_module not in sys.modules
+
+    assert client.get("/lazy/item/3").json() == {"where": "lazy", "i": 3}
+    assert client.get("/lazy").json() == {"where": "lazy-root"}
+    assert client.get("/lazy/item/3/late").json() == {"where": "late"}
+    assert lr.state == "loaded" and lr not in app.router.routes
+    # Spliced at the placeholder's position, i.e. before later routes
+    assert getattr(app.router.routes[idx], "path", None) != "/lazy/item/{i}/late"
+    assert any(getattr(r, "path", None) == "/lazy/item/{i}/late" for r in app.router.routes[idx + 1:])
+    assert "/lazy/item/{i}" in client.get("/openapi.json").json()["paths"]
+
+
+def test_lazy_router_import_failure_is_a_404(lazy_module):
+    app = FastAPI()
+    lr = LazyRouter("broken", "_lazy_broken_router", "/broken")
+    include(app, lr)
+    client = TestClient(app)
+    assert client.get("/broken/x").status_code == 404
+    assert lr.state == "failed" and "optional dep missing" in lr.error
+    assert client.get("/broken/x").status_code == 404
+
+
+def test_openapi_loads_lazy_routers_first(lazy_module):
+    app = FastAPI()
+    lr = LazyRouter("demo", lazy_module, "/lazy")
+    include(app, lr)
+    preload_for_openapi(app)
+    assert lazy_module not in sys.modules
+    assert "/lazy/item/{i}" in TestClient(app).get("/openapi.json").json()["paths"]
+    assert lr.state == "loaded"
+    assert app.url_path_for("item", i=1) == "/lazy/item/1"
+
+
+def test_profile_child_skips_startup_side_effects(monkeypatch):
+    seen = {}
+
+    def fake_run(cmd, env=None, **kw):
+        seen.update(env)
+        return startup_profile.subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(startup_profile.subprocess, "run", fake_run)
+    monkeypatch.setenv("KIANA_CRAWLER_AUTORUN", "1")
+    assert profile_import("netapi.app")["ok"]
+    assert seen["KI_IMPORT_PROFILE"] == "1"
+    assert seen["KIANA_CRAWLER_AUTORUN"] == "0" and seen["KI_ENABLE_AUTONOMY"] == "0"
+
+
+def test_app_cold_start_budget():
+    budget = float(os.getenv("KI_STARTUP_BUDGET_MS", "6000"))
+    res = profile_import("netapi.app")
+    assert res["ok"], res.get("error")
+    assert res["heavy"] == []
+    # Deferred behind first use
+    for mod in ("bs4", "netapi.modules.subminds.router", "netapi.modules.os.router", "netapi.modules.viewer.router"):
+        assert mod not in res["imported"]
+    assert res["wall_ms"] < budget, f"cold start took {res['wall_ms']} ms (budget {budget} ms)"
@@ -0,0 +1,112 @@
+"""
+Tests for the load-aware SubMind task scheduler (netapi/distributed/scheduler.py).
+"""
+import asyncio
+
+import pytest
+
+from netapi.distributed.submind_network import (
+    SubMindNetwork, SubMind, SubMindRole, SubMindStatus, DistributedTask,
+)
+
+
+class _Net(SubMindNetwork):
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.peak = 0
+        self.order = []
+        self.gate = None
+
+    async def _execute_on_submind(self, submind, task):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.order.append((submind.id, task.id))
+        try:
+            if self.gate is not None and task.payload.get("gated"):
+                await self.gate.wait()
+            else:
+                await asyncio.sleep(task.payload.get("sleep", 0.01))
+            return {"ok": task.id}
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def net(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return _Net()
+
+
+def _task(i, role=SubMindRole.TECHNICAL, **payload):
+    prio = payload.pop("priority", 0)
+    return DistributedTask(id=f"t{i}", type="x", description="x", payload=payload,
+                           required_role=role, priority=prio)
+
+
+def _add(net, sm_id, slots=1, status=SubMindStatus.ONLINE):
+    sm = SubMind(id=sm_id, name=sm_id, role=SubMindRole.TECHNICAL, status=status, max_concurrency=slots)
+    net.register_submind(sm)
+    return sm
+
+
+def test_slots_queue_instead_of_failing(net):
+    async def main():
+        _add(net, "tech_a", slots=3)
+        res = await asyncio.gather(*(net.execute_task(_task(i)) for i in range(10)))
+        missing = await net.execute_task(_task(99, role=SubMindRole.CREATIVE))
+        return res, missing
+
+    res, missing = asyncio.run(main())
+    assert all(r["success"] for r in res)
+    assert net.peak == 3
+    assert not missing["success"] and "No available sub-mind" in missing["error"]
+    assert net.subminds["tech_a"].total_tasks == 10
+    assert net.subminds["tech_a"].ewma_latency > 0
+
+
+def test_priority_order_on_a_single_slot(net):
+    async def main():
+        _add(net, "tech_a", slots=1)
+        futs = [net.submit_task(_task(i, priority=(5 if i == 7 else 0))) for i in range(8)]
+        await asyncio.gather(*futs)
+
+    asyncio.run(main())
+    started = [tid for _, tid in net.order]
+    # the high-priority task overtakes everything beyond the small local backlog
+    assert started.index("t7") <= net.scheduler.local_depth
+
+
+def test_idle_sibling_steals_queued_work(net):
+    async def main():
+        net.gate = asyncio.Event()
+        net.scheduler.local_depth = 4
+        _add(net, "tech_a", slots=1)
+        b = _add(net, "tech_b", slots=1, status=SubMindStatus.OFFLINE)
+        futs = [net.submit_task(_task(0, gated=True))]
+        futs += [net.submit_task(_task(i)) for i in range(1, 3)]
+        await asyncio.sleep(0.02)
+        assert len(net.scheduler.local_queues["tech_a"]) == 2
+
+        b.status = SubMindStatus.ONLINE
+        net.scheduler._wake_one("tech_b")
+        await asyncio.gather(*futs[1:])
+        net.gate.set()
+        return await asyncio.gather(*futs)
+
+    res = asyncio.run(main())
+    assert [r["submind_id"] for r in res] == ["tech_a", "tech_b", "tech_b"]
+    assert net.scheduler.counters["stolen"] == 2
+
+
+def test_state_writes_are_batched(net):
+    async def main():
+        _add(net, "tech_a", slots=4)
+        before = net.state_writes
+        await asyncio.gather(*(net.execute_task(_task(i, sleep=0)) for i in range(50)))
+        during = net.state_writes - before
+        net.flush_state()
+        return during
+
+    assert asyncio.run(main()) == 0
+    assert net.network_file.exists()
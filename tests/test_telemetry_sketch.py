@@ -0,0 +1,73 @@
+"""
+Tests für Streaming-Telemetry (system/metric_sketch.py, system/telemetry.py)
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from metric_sketch import QuantileSketch
+
+
+def _exact(values, q):
+    s = sorted(values)
+    return s[int(q * (len(s) - 1))]
+
+
+def test_sketch_quantiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1.2) for _ in range(20000)]
+    sk = QuantileSketch(alpha=0.01)
+    for v in values:
+        sk.add(v)
+    for q in (0.5, 0.95, 0.99):
+        exact = _exact(values, q)
+        assert abs(sk.quantile(q) - exact) / exact <= 0.02
+    assert sk.count == len(values)
+    assert sk.min == min(values) and sk.max == max(values)
+
+
+def test_sketch_merge_and_roundtrip():
+    a, b, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i in range(1, 1001):
+        (a if i % 2 else b).add(i)
+        both.add(i)
+    a.merge(b)
+    assert a.count == both.count and a.pos == both.pos
+    restored = QuantileSketch.from_dict(json.loads(json.dumps(a.to_dict())))
+    assert restored.quantile(0.95) == a.quantile(0.95)
+    z = QuantileSketch()
+    for v in (-5, 0, 5):
+        z.add(v)
+    assert z.quantile(0.0) == -5 and z.quantile(0.5) == 0.0
+
+
+def test_telemetry_service_streaming_aggregation(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / "ki_ana").mkdir()
+    (tmp_path / "ki_ana" / ".telemetry_opt_in").write_text("{}")
+    import telemetry
+    monkeypatch.setattr(telemetry.TelemetryService, "_instance", None)
+    svc = telemetry.TelemetryService()
+    assert svc.enabled
+
+    for i in range(1, 101):
+        svc.record_metric("latency", float(i), {"operation": "search" if i % 2 else "embed"})
+    svc.rotate()
+    svc.record_metric("latency", 1000.0, {"operation": "search"})
+
+    agg = svc.get_aggregated_metrics()
+    lat = agg["metrics"]["latency"]
+    assert agg["total_events"] == 101
+    assert lat["max"] == 1000.0 and abs(lat["p50"] - 51) <= 1.5
+    assert {row["tags"]["operation"] for row in lat["by_tags"]} == {"search", "embed"}
+    assert list(svc.windows_dir.glob("*.json"))
+
+    svc.flush()
+    monkeypatch.setattr(telemetry.TelemetryService, "_instance", None)
+    again = telemetry.TelemetryService()
+    assert again.get_aggregated_metrics()["total_events"] == 101
+    assert again.get_aggregated_metrics(window_seconds=3600)["total_events"] == 101
@@ -0,0 +1,89 @@
+"""
+Tests for the thumbnail pipeline (system/thumbnails.py).
+"""
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+import thumbnails  # noqa: E402
+from thumbnails import choose_format, fit, image_size, parse_sizes, reduce_factor, render, render_batch, thumb_path  # noqa: E402
+
+
+def _jpeg_header(w, h):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, h, w, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xda"
+
+
+def test_parse_sizes():
+    assert parse_sizes("256x256, 64X48,bad,0x5") == [(256, 256), (64, 48)]
+    assert parse_sizes("") == []
+
+
+def test_image_size_from_headers(tmp_path):
+    jpg = tmp_path / "a.jpg"
+    jpg.write_bytes(_jpeg_header(4032, 3024))
+    png = tmp_path / "b.png"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x02\x00\x00\x00")
+    other = tmp_path / "c.gif"
+    other.write_bytes(b"GIF89a....")
+    assert image_size(jpg) == (4032, 3024)
+    assert image_size(png) == (640, 480)
+    assert image_size(other) is None
+
+
+def test_fit_and_reduce_factor():
+    assert fit((4000, 3000), (256, 256)) == (256, 192)
+    assert fit((100, 50), (256, 256)) == (100, 50)  # never upscales
+    assert reduce_factor((4032, 3024), [(256, 256)]) == 8
+    assert reduce_factor((4032, 3024), [(256, 256), (1024, 1024)]) == 2
+    assert reduce_factor((800, 600), [(512, 512)]) == 1
+
+
+def test_choose_format_env(monkeypatch):
+    monkeypatch.setenv("KI_THUMB_FORMAT", "jpg")
+    assert choose_format() == "jpeg"
+    monkeypatch.setenv("KI_THUMB_FORMAT", "png")
+    assert choose_format(True) == "png"
+    monkeypatch.setenv("KI_THUMB_FORMAT", "auto")
+    monkeypatch.setattr(thumbnails, "_webp_supported", lambda: False)
+    assert choose_format() == "jpeg" and choose_format(True) == "png"
+
+
+def test_fresh_outputs_are_not_rerendered(tmp_path):
+    src = tmp_path / "photo.jpg"
+    src.write_bytes(_jpeg_header(4000, 3000))
+    old = time.time() - 60
+    os.utime(src, (old, old))
+    existing = {s: thumb_path(tmp_path, src, s, "webp") for s in [(256, 256), (64, 64)]}
+    for p in existing.values():
+        p.write_bytes(b"thumb")
+    assert render(src, [(256, 256), (64, 64)], tmp_path) == existing
+
+    [res] = render_batch([src], [(256, 256), (64, 64)], tmp_path, processes=1)
+    assert res.error is None and res.skipped == 2
+
+
+def test_batch_reports_errors_per_source(tmp_path):
+    bad = tmp_path / "broken.jpg"
+    bad.write_bytes(b"not an image")
+    [res] = render_batch([bad], [(64, 64)], tmp_path / "out", processes=1)
+    assert res.error and not res.outputs
+
+
+def test_render_multiple_sizes_from_one_decode(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    src = tmp_path / "big.jpg"
+    Image.effect_noise((4000, 3000), 64).convert("RGB").save(src, format="JPEG", quality=90)
+    out = render(src, [(256, 256), (64, 64)], tmp_path / "thumbs")
+    with Image.open(out[(256, 256)]) as a, Image.open(out[(64, 64)]) as b:
+        assert a.size == (256, 192)
+        assert b.size == (64, 48)
+    assert out[(256, 256)].suffix in (".webp", ".jpg")
@@ -0,0 +1,141 @@
+"""
+Tests for sentence-level TTS streaming and the phrase cache (system/tts_stream.py).
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO_ROOT / "system"))
+
+from tts_stream import PhraseCache, render_pcm, split_sentences, stream_pcm, wav_bytes  # noqa: E402
+
+
+class FakeVoice:
+    """Mimics PiperVoice.synthesize(text, wav_file): 100 samples per character."""
+
+    def synthesize(self, text, wav_file):
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(22050)
+        wav_file.writeframes(b"\x01\x00" * (100 * len(text)))
+
+
+def test_split_sentences():
+    text = "Hallo Welt! Wie geht es dir?  Gut.\nNeue Zeile: ja"
+    assert split_sentences(text) == ["Hallo Welt!", "Wie geht es dir?", "Gut.", "Neue Zeile:", "ja"]
+    assert split_sentences("") == []
+
+
+def test_split_long_sentence_respects_max_chars():
+    text = "eins, zwei, drei " * 30 + "."
+    parts = split_sentences(text, max_chars=60)
+    assert len(parts) > 1
+    assert all(len(p) <= 60 for p in parts)
+    assert " ".join(parts).split() == text.split()
+
+
+def test_render_pcm_in_memory():
+    pcm, rate = render_pcm(FakeVoice(), "abc")
+    assert rate == 22050
+    assert len(pcm) == 2 * 300
+
+
+def test_phrase_cache_roundtrip_and_eviction(tmp_path):
+    entry = len(wav_bytes(b"\x00\x00" * 1000, 16000))
+    cache = PhraseCache(tmp_path, max_bytes=2 * entry)
+    cache.put("v1", "Hallo", b"\x00\x00" * 1000, 16000)
+    assert cache.get("v1", "  hallo ") == (b"\x00\x00" * 1000, 16000)
+    assert cache.get("v2", "Hallo") is None  # per voice
+
+    cache.put("v1", "Zwei", b"\x00\x00" * 1000, 16000)
+    cache.get("v1", "Hallo")                  # Hallo is now most recent
+    cache.put("v1", "Drei", b"\x00\x00" * 1000, 16000)
+    assert cache.get("v1", "Zwei") is None
+    assert cache.get("v1", "Hallo") is not None
+    assert cache.stats()["bytes"] <= 2 * entry
+
+    # Survives a restart
+    again = PhraseCache(tmp_path, max_bytes=2 * entry)
+    assert again.get("v1", "Drei") is not None
+
+
+def test_stream_pcm_order_and_cache(tmp_path):
+    cache = PhraseCache(tmp_path)
+    calls = []
+
+    def render(sentence):
+        calls.append(sentence)
+        return render_pcm(FakeVoice(), sentence)
+
+    sentences = ["Eins.", "Zwei.", "Drei.", "Eins."]
+    first = list(stream_pcm(sentences, render, voice="v", cache=cache))
+    assert [c.text for c in first] == sentences
+    assert [c.index for c in first] == [0, 1, 2, 3]
+    assert first[0].duration == 500 / 22050
+
+    second = list(stream_pcm(sentences, render, voice="v", cache=cache))
+    assert all(c.cached for c in second)
+    assert [c.pcm for c in second] == [c.pcm for c in first]
+    # "Eins." rendered at most twice (both submitted before the first finished)
+    assert calls.count("Zwei.") == 1 and calls.count("Eins.") <= 2
+
+
+def test_stream_pcm_first_chunk_before_rest_is_rendered():
+    done = []
+    gate = threading.Event()
+
+    def render(sentence):
+        if sentence != "a":
+            gate.wait(2)
+        done.append(sentence)
+        return b"\x00\x00", 16000
+
+    stream = stream_pcm(["a", "b", "c", "d", "e"], render, prefetch=1)
+    t0 = time.perf_counter()
+    first = next(stream)
+    assert first.text == "a" and time.perf_counter() - t0 < 1.0
+    gate.set()
+    assert [c.text for c in stream] == ["b", "c", "d", "e"]
+
+
+def _stream_client(monkeypatch, service):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from netapi.modules.voice import local_router
+
+    monkeypatch.setattr(local_router, "TTS_AVAILABLE", True)
+    monkeypatch.setattr(local_router, "get_tts_service", lambda: service, raising=False)
+    app = FastAPI()
+    app.include_router(local_router.router)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class FakeStreamService:
+    default_voice = "de"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def _sample_rate(self, voice):
+        return 22050
+
+    def synthesize_stream(self, text, voice=None):
+        if self.fail:
+            raise RuntimeError("voice model missing")
+        for word in text.split():
+            yield type("Chunk", (), {"pcm": word.encode()})()
+
+
+def test_stream_endpoint_reports_synthesis_errors_as_500(monkeypatch):
+    client = _stream_client(monkeypatch, FakeStreamService(fail=True))
+    r = client.post("/api/voice/local/tts/synthesize/stream", json={"text": "Hallo Welt."})
+    assert r.status_code == 500 and "voice model missing" in r.json()["detail"]
+
+
+def test_stream_endpoint_streams_all_chunks(monkeypatch):
+    client = _stream_client(monkeypatch, FakeStreamService())
+    r = client.post("/api/voice/local/tts/synthesize/stream", json={"text": "eins zwei drei"})
+    assert r.status_code == 200 and r.content == b"einszweidrei"
+    assert r.headers["x-sample-rate"] == "22050"
@@ -0,0 +1,156 @@
+"""
+Tests for image preprocessing and caching in netapi/multimodal/vision_processor.py
+(against a fake Ollama endpoint).
+"""
+import asyncio
+import base64
+import io
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from netapi.multimodal.vision_processor import VisionProcessor  # noqa: E402
+
+
+class FakeVisionServer:
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if body["prompt"].startswith("This image shows one of these"):
+            return httpx.Response(200, json={"response": "Definitely a cat."})
+        return httpx.Response(200, json={"response": f" answer {len(self.requests)} "})
+
+
+@pytest.fixture
+def vision():
+    server = FakeVisionServer()
+    vp = VisionProcessor("http://127.0.0.1:9", transport=httpx.MockTransport(server))
+    vp.available = True
+    vp.server = server
+    return vp
+
+
+def test_same_image_and_prompt_is_answered_from_cache(vision, tmp_path):
+    img = tmp_path / "photo.jpg"
+    img.write_bytes(b"\xff\xd8fake-jpeg-bytes" * 100)
+
+    async def run():
+        a = await vision.answer_question(str(img), "What is this?")
+        b = await vision.answer_question(str(img), "What is this?")
+        c = await vision.answer_question(str(img), "How many?")
+        await vision.aclose()
+        return a, b, c
+
+    a, b, c = asyncio.run(run())
+    assert a["success"] and a["answer"] == "answer 1" and a["cached"] is False
+    assert b["answer"] == "answer 1" and b["cached"] is True
+    assert c["answer"] == "answer 2"
+    assert len(vision.server.requests) == 2
+    assert vision.server.requests[0]["images"] == [base64.b64encode(img.read_bytes()).decode()]
+    # Second question reused the encoded payload
+    assert vision.get_statistics()["payload_cache"]["hits"] >= 1
+
+
+def test_cache_is_content_addressed(vision, tmp_path):
+    data = b"\x89PNG-fake" * 50
+    (tmp_path / "a.png").write_bytes(data)
+    (tmp_path / "b.png").write_bytes(data)
+
+    async def run():
+        await vision.describe_image(str(tmp_path / "a.png"))
+        r = await vision.describe_image(str(tmp_path / "b.png"))
+        r2 = await vision.describe_image(data, detail_level="brief")
+        await vision.aclose()
+        return r, r2
+
+    r, r2 = asyncio.run(run())
+    assert r["cached"] is True
+    assert r2["cached"] is False
+    assert len(vision.server.requests) == 2
+
+
+def test_classify_uses_pooled_client(vision, tmp_path):
+    img = tmp_path / "cat.jpg"
+    img.write_bytes(b"cat" * 10)
+
+    async def run():
+        r = await vision.classify_image(str(img), ["dog", "cat"])
+        await vision.aclose()
+        return r
+
+    r = asyncio.run(run())
+    assert r["category"] == "cat" and r["confidence"] == "high"
+
+
+def test_large_image_is_downscaled(vision, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.effect_noise((3000, 2000), 64).convert("RGB").save(buf, format="JPEG", quality=95)
+    img = tmp_path / "big.jpg"
+    img.write_bytes(buf.getvalue())
+
+    async def run():
+        await vision.describe_image(str(img))
+        await vision.aclose()
+
+    asyncio.run(run())
+    sent = base64.b64decode(vision.server.requests[0]["images"][0])
+    small = Image.open(io.BytesIO(sent))
+    assert max(small.size) == vision.max_side
+    assert len(sent) < len(buf.getvalue())
+
+
+def test_client_of_previous_loop_is_closed(vision, tmp_path):
+    img = tmp_path / "a.png"
+    img.write_bytes(b"a" * 10)
+
+    async def first():
+        await vision.describe_image(str(img))
+        return vision._client_obj
+
+    async def second():
+        await vision.answer_question(str(img), "Welche Farbe?")
+        await asyncio.sleep(0)  # let the retired client close
+        client = vision._client_obj
+        await vision.aclose()
+        return client
+
+    old = asyncio.run(first())
+    new = asyncio.run(second())
+    assert new is not old and old.is_closed
+
+
+def test_prepare_image_from_threads(vision, tmp_path):
+    import threading
+
+    paths = []
+    for i in range(8):
+        p = tmp_path / f"img{i}.png"
+        p.write_bytes(bytes([i]) * 100)
+        paths.append(str(p))
+    errors = []
+
+    def work():
+        try:
+            for _ in range(50):
+                for p in paths:
+                    vision._prepare_image(p)
+        except Exception as e:  # pragma: no cover - failure path
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    st = vision._payloads.stats()
+    assert st["entries"] == 8 and st["hits"] + st["misses"] == 4 * 50 * 8
@@ -0,0 +1,85 @@
+"""
+Tests for the indexed WorkflowEngine triggers (os/core/automation/workflow_engine.py).
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from core.automation.workflow_engine import WorkflowEngine, next_fire_time, parse_trigger  # noqa: E402
+
+
+class _Engine(WorkflowEngine):
+    def __init__(self, metrics=None):
+        super().__init__()
+        self.fixed = metrics or {}
+        self.samples = 0
+        self.ran = []
+
+    def sample_metrics(self, force=False):
+        self.samples += 1
+        return self.fixed
+
+    async def run_workflow(self, workflow):
+        self.ran.append(workflow.name)
+
+
+def test_parse_trigger():
+    assert parse_trigger("time:daily:14:30") == ("time", ("daily", 14, 30))
+    assert parse_trigger("event:startup") == ("event", "startup")
+    assert parse_trigger("if:cpu>80") == ("if", ("cpu", 80.0))
+    assert parse_trigger("if:gpu>80") == (None, None)
+    assert parse_trigger("time:daily:xx") == (None, None)
+
+
+def test_next_fire_time_windows():
+    spec = ("daily", 14, 30)
+    assert next_fire_time(spec, datetime(2024, 1, 1, 14, 30, 40)) == datetime(2024, 1, 1, 14, 30)
+    assert next_fire_time(spec, datetime(2024, 1, 1, 14, 31)) == datetime(2024, 1, 2, 14, 30)
+    assert next_fire_time(("hourly",), datetime(2024, 1, 1, 9, 15)) == datetime(2024, 1, 1, 10, 0)
+
+
+def test_events_and_conditions_use_indexes():
+    engine = _Engine({"cpu": 50.0, "memory": 10.0})
+    for i in range(1000):
+        engine.add_workflow(f"ev{i}", f"event:e{i}", [])
+    engine.add_workflow("cpu40", "if:cpu>40", [])
+    engine.add_workflow("cpu60", "if:cpu>60", [])
+    engine.add_workflow("mem5", "if:memory>5", [])
+
+    asyncio.run(engine.monitor({"event": "e7"}))
+    assert engine.ran == ["ev7", "cpu40", "mem5"]
+    assert engine.samples == 1
+
+    engine.workflows[7].enabled = False
+    engine.remove_workflow("cpu40")
+    engine.ran.clear()
+    asyncio.run(engine.monitor({"event": "e7"}))
+    assert engine.ran == ["mem5"]
+
+
+def test_time_trigger_fires_once_even_when_polled_late():
+    engine = _Engine()
+    engine.add_workflow("hourly", "time:hourly", [])
+    slot = engine._time_heap[0][0]
+
+    asyncio.run(engine.monitor({}, now=slot - 1))
+    assert engine.ran == []
+
+    late = slot + 600  # poller missed the whole minute
+    asyncio.run(engine.monitor({}, now=late))
+    asyncio.run(engine.monitor({}, now=late + 1))
+    assert engine.ran == ["hourly"]
+    assert engine._time_heap[0][0] == slot + 3600
+
+
+def test_cpu_condition_does_not_block():
+    engine = WorkflowEngine()
+    engine.add_workflow("cpu", "if:cpu>101", [])
+    t0 = time.perf_counter()
+    for _ in range(20):
+        asyncio.run(engine.monitor({}))
+    assert time.perf_counter() - t0 < 0.5
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Federated Learning Benchmark
+Measures bytes-per-round and aggregation time for simulated peers
+(JSON float lists vs. float16 vs. top-k deltas with error feedback)
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "system"))
+
+from federated_codec import ErrorFeedback, encode, decode  # noqa: E402
+from federated_learning import train_mlp, evaluate_mlp  # noqa: E402
+
+
+def init_weights(layer_sizes: List[int], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    weights = {}
+    for i in range(len(layer_sizes) - 1):
+        w = rng.standard_normal((layer_sizes[i], layer_sizes[i + 1])) * np.sqrt(2.0 / layer_sizes[i])
+        weights[f"layer_{i}"] = w.astype(np.float32)
+        weights[f"bias_{i}"] = np.zeros(layer_sizes[i + 1], dtype=np.float32)
+    return weights
+
+
+def make_peer_data(layer_sizes: List[int], samples: int, teacher: np.ndarray, rng: np.random.Generator):
+    X = rng.standard_normal((samples, layer_sizes[0])).astype(np.float32)
+    labels = (X @ teacher).argmax(axis=1)
+    Y = np.eye(layer_sizes[-1], dtype=np.float32)[labels]
+    return X, Y
+
+
+def local_deltas(global_w, n_layers, peers, epochs, rng):
+    deltas = []
+    for X, Y in peers:
+        w = {k: v.copy() for k, v in global_w.items()}
+        train_mlp(w, n_layers, X, Y, epochs=epochs, batch_size=32, rng=rng)
+        deltas.append({k: w[k] - global_w[k] for k in w})
+    return deltas
+
+
+def run_round(encoding: str, deltas, samples: List[int], feedback: List[ErrorFeedback],
+              topk_ratio: float) -> Dict[str, Any]:
+    """Encode every peer update, then decode + FedAvg them as the receiver would."""
+    if encoding == "json":
+        blobs = [json.dumps({k: v.ravel().tolist() for k, v in d.items()}).encode() for d in deltas]
+    else:
+        blobs = [feedback[i].compress(d)[0] if encoding == "topk" else encode(d, encoding)
+                 for i, d in enumerate(deltas)]
+
+    shapes = {k: v.shape for k, v in deltas[0].items()}
+    t0 = time.perf_counter()
+    acc = {k: np.zeros(s, dtype=np.float32) for k, s in shapes.items()}
+    for blob, n in zip(blobs, samples):
+        if encoding == "json":
+            layers = {k: np.array(v, dtype=np.float32).reshape(shapes[k]) for k, v in json.loads(blob).items()}
+        else:
+            layers = decode(blob)
+        for k, v in layers.items():
+            acc[k] += np.float32(n) * v
+    total = float(sum(samples))
+    avg = {k: v / total for k, v in acc.items()}
+    agg_ms = (time.perf_counter() - t0) * 1000
+
+    return {"bytes": sum(len(b) for b in blobs), "agg_ms": agg_ms, "avg": avg}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana Federated Learning Benchmark")
+    parser.add_argument("--peers", default="10,50,200", help="Comma-separated peer counts")
+    parser.add_argument("--layers", default="64,128,10", help="MLP layer sizes")
+    parser.add_argument("--samples", type=int, default=128, help="Samples per peer")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per configuration")
+    parser.add_argument("--epochs", type=int, default=2, help="Local epochs per round")
+    parser.add_argument("--topk", type=float, default=0.01, help="Top-k ratio")
+    parser.add_argument("--encodings", default="json,f16,topk")
+    args = parser.parse_args()
+
+    layer_sizes = [int(x) for x in args.layers.split(",")]
+    n_layers = len(layer_sizes) - 1
+    encodings = args.encodings.split(",")
+    rng = np.random.default_rng(0)
+    teacher = rng.standard_normal((layer_sizes[0], layer_sizes[-1])).astype(np.float32)
+    n_params = sum(int(np.prod(v.shape)) for v in init_weights(layer_sizes, rng).values())
+
+    print(f"🧠 Model {layer_sizes} ({n_params} parameters), {args.samples} samples/peer\n")
+    print(f"{'peers':>6} {'encoding':>8} {'KB/round':>10} {'B/param/peer':>13} {'agg ms':>8} {'loss':>7} {'acc':>6}")
+
+    for n_peers in [int(x) for x in args.peers.split(",")]:
+        peers = [make_peer_data(layer_sizes, args.samples, teacher, rng) for _ in range(n_peers)]
+        X_eval = np.concatenate([p[0] for p in peers[:10]])
+        Y_eval = np.concatenate([p[1] for p in peers[:10]])
+        samples = [args.samples] * n_peers
+        base = init_weights(layer_sizes, np.random.default_rng(1))
+
+        for encoding in encodings:
+            global_w = {k: v.copy() for k, v in base.items()}
+            feedback = [ErrorFeedback("topk", args.topk) for _ in range(n_peers)]
+            bytes_total, agg_total = 0, 0.0
+            for _ in range(args.rounds):
+                deltas = local_deltas(global_w, n_layers, peers, args.epochs, rng)
+                res = run_round(encoding, deltas, samples, feedback, args.topk)
+                bytes_total += res["bytes"]
+                agg_total += res["agg_ms"]
+                for k, v in res["avg"].items():
+                    global_w[k] += v
+            loss, acc = evaluate_mlp(global_w, n_layers, X_eval, Y_eval)
+            per_round = bytes_total / args.rounds
+            print(f"{n_peers:>6} {encoding:>8} {per_round / 1024:>10.1f} "
+                  f"{per_round / n_peers / n_params:>13.2f} {agg_total / args.rounds:>8.1f} "
+                  f"{loss:>7.3f} {acc:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Job Lease Contention Benchmark
+N worker processes drain a shared SQLite jobs table (large history of done
+jobs plus a queued backlog): legacy SELECT-then-UPDATE leasing vs the atomic
+batch lease (netapi/modules/jobs/leasing.py). Reports throughput and how many
+jobs were leased more than once.
+"""
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from netapi.models import Job  # noqa: E402
+from netapi.modules.jobs import leasing  # noqa: E402
+
+JOB_TYPE = "media.thumbnail"
+
+
+def _session(url: str):
+    engine = create_engine(url, connect_args={"timeout": 60})
+    return sessionmaker(bind=engine, future=True)
+
+
+def setup(url: str, queued: int, history: int, legacy: bool) -> None:
+    engine = create_engine(url)
+    Job.__table__.create(engine)
+    if legacy:
+        # The table as it was before: only the single-column indexes
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS idx_jobs_lease"))
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+        rows = [{"type": JOB_TYPE, "status": "done", "p": 0} for _ in range(history)]
+        rows += [{"type": JOB_TYPE, "status": "queued", "p": i % 3} for i in range(queued)]
+        conn.execute(text(
+            "INSERT INTO jobs (type, payload, status, attempts, lease_until, priority, error, created_at, updated_at) "
+            "VALUES (:type, '{}', :status, 0, 0, :p, '', 0, 0)"), rows)
+    engine.dispose()
+
+
+def legacy_worker(url: str, out) -> None:
+    Session = _session(url)
+    leased = []
+    with Session() as db:
+        while True:
+            now = int(time.time())
+            # Old query shape, with the eligibility bug fixed so the run terminates
+            j = (
+                db.query(Job)
+                .filter(Job.type == JOB_TYPE, ((Job.status == "queued") | ((Job.status == "leased") & (Job.lease_until < now))))
+                .order_by(Job.priority.desc(), Job.id.asc())
+                .first()
+            )
+            if not j:
+                break
+            j.status = "leased"; j.lease_until = now + 60; j.updated_at = now
+            db.add(j); db.commit(); db.refresh(j)
+            leased.append(j.id)
+            j.status = "done"; j.lease_until = 0
+            db.add(j); db.commit()
+    out.put(leased)
+
+
+def batch_worker(url: str, out, batch: int) -> None:
+    Session = _session(url)
+    leased = []
+    with Session() as db:
+        while True:
+            jobs = leasing.lease_jobs(db, [JOB_TYPE], n=batch)
+            if not jobs:
+                break
+            for j in jobs:
+                leased.append(j.id)
+                leasing.complete_job(db, j.id, j.lease_token)
+    out.put(leased)
+
+
+def run(mode: str, workers: int, queued: int, history: int, batch: int) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix="kiana_jobs_"))
+    url = f"sqlite:///{tmp / 'jobs.db'}"
+    setup(url, queued, history, legacy=(mode == "legacy"))
+    out = mp.Queue()
+    args = (url, out) if mode == "legacy" else (url, out, batch)
+    procs = [mp.Process(target=legacy_worker if mode == "legacy" else batch_worker, args=args) for _ in range(workers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    counts = Counter(i for r in results for i in r)
+    dupes = sum(c - 1 for c in counts.values() if c > 1)
+    label = mode if mode == "legacy" else f"batch n={batch}"
+    print(f"   {label:<12} {len(counts):>7} jobs {elapsed:>7.2f}s {len(counts) / elapsed:>9,.0f} jobs/s"
+          f"   double-leased: {dupes}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana Job Lease Contention Benchmark")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queued", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=50000, help="done jobs already in the table")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    print(f"🧵 {args.workers} processes, {args.queued:,} queued jobs, {args.history:,} done jobs in the table")
+    run("legacy", args.workers, args.queued, args.history, 1)
+    for b in args.batch:
+        run("batch", args.workers, args.queued, args.history, b)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Memory Manager Benchmark
+Sustained conversation ingestion of the OS-side MemoryManager versus the
+previous connect/insert/commit/close per call, plus event loop stalls
+"""
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from loguru import logger  # noqa: E402
+from core.memory.memory_manager import MemoryManager  # noqa: E402
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))]
+
+
+def legacy_store(db_path: str, user_input: str, ai_response: str, context, metadata) -> int:
+    """What store_conversation used to do on every call"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO conversations (timestamp, user_input, ai_response, context, metadata)
+        VALUES (?, ?, ?, ?, ?)
+    """, (datetime.now().isoformat(), user_input, ai_response, json.dumps(context), json.dumps(metadata)))
+    conv_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return conv_id
+
+
+async def _lag_probe(stop: asyncio.Event, lags: List[float], interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - t0 - interval) * 1000)
+
+
+async def run(label: str, store, count: int, concurrency: int, flush=None):
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(stop, lags))
+    ids = iter(range(count))
+
+    async def producer():
+        for i in ids:
+            await store(f"user message {i} " + "x" * 200, f"assistant reply {i} " + "y" * 600,
+                        {"command_type": "general"}, {"success": True})
+            await asyncio.sleep(0)  # a real chat handler awaits elsewhere between stores
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(producer() for _ in range(concurrency)))
+    if flush:
+        await flush()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await probe
+    print(f"{label:<14} {count / elapsed:>10.0f} {elapsed:>9.2f} {_pct(lags, 0.5):>9.2f} {max(lags or [0]):>9.2f}")
+
+
+async def main_async(args):
+    tmp = Path(tempfile.mkdtemp(prefix="kiana_mem_"))
+    print(f"{'variant':<14} {'convs/s':>10} {'total s':>9} {'lag p50':>9} {'lag max':>9}")
+
+    legacy_db = str(tmp / "legacy.db")
+    MemoryManager(legacy_db).close()  # schema only
+
+    async def legacy(*a):
+        return legacy_store(legacy_db, *a)
+
+    await run("legacy", legacy, min(args.count, args.legacy_count), args.concurrency)
+
+    manager = MemoryManager(str(tmp / "memory.db"), batch_size=args.batch)
+    await run("write-behind", manager.store_conversation, args.count, args.concurrency, manager.flush)
+
+    t0 = time.perf_counter()
+    for i in range(200):
+        await manager.get_recent_conversations(limit=10)
+    recent_ms = (time.perf_counter() - t0) / 200 * 1000
+    stats = manager.get_stats()
+    print(f"\n📊 {stats['conversations']} rows in {stats['commits']} commits, "
+          f"get_recent_conversations {recent_ms:.2f} ms")
+    manager.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana Memory Manager Benchmark")
+    parser.add_argument("--count", type=int, default=50000, help="Conversations to store")
+    parser.add_argument("--legacy-count", type=int, default=5000, help="Cap for the slow legacy run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent producers")
+    parser.add_argument("--batch", type=int, default=256, help="Writes per transaction")
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
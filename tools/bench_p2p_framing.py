@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+P2P Framing Benchmark
+Frames, bytes and end-to-end throughput over an in-process loopback channel
+for block pushes and model updates: legacy JSON-per-message vs coalesced
+JSON vs coalesced binary (with / without zlib)
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "system"))
+
+from p2p_framing import FramedChannel, LoopbackTransport  # noqa: E402
+
+
+def block_push(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {"type": "block_push", "sender_id": "device-a", "timestamp": time.time(), "data": {
+        "id": f"blk_{i:08d}", "hash": "%064x" % rng.getrandbits(256), "prev_hash": "%064x" % rng.getrandbits(256),
+        "timestamp": time.time(), "topic": rng.choice(["kernel", "network", "audio"]),
+        "content": " ".join(rng.choice(["update", "driver", "memory", "fix", "cache"]) for _ in range(40)),
+        "tags": ["sync", "auto"], "device_id": "device-a", "version": 3,
+    }}
+
+
+def model_update(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {"type": "model_update", "sender_id": "device-a", "timestamp": time.time(), "data": {
+        "update_id": f"upd_{i}", "round_id": "r1", "num_samples": 128, "encoding": "topk",
+        "payload": "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+/") for _ in range(2400)),
+    }}
+
+
+async def run(mode: str, messages: List[Dict[str, Any]], window: float) -> Dict[str, float]:
+    ta, tb = LoopbackTransport.pair()
+    received: List[Dict[str, Any]] = []
+    opts = {"window": window}
+    if mode == "json":
+        opts["encoding"] = "json"
+    if mode == "bin":
+        opts["compress_min"] = 0
+    a = FramedChannel(ta, lambda m: None, **opts)
+    b = FramedChannel(tb, received.append, **opts)
+    ta.on_frame, tb.on_frame = a.receive, b.receive
+    if mode != "legacy":
+        a.start("device-a")
+        b.start("device-b")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    before = dict(a.stats)
+    t0 = time.perf_counter()
+    for m in messages:
+        a.send(m)
+    a.flush()
+    while len(received) < len(messages):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - t0
+    return {
+        "frames": a.stats["frames_sent"] - before["frames_sent"],
+        "bytes": a.stats["bytes_sent"] - before["bytes_sent"],
+        "rate": len(messages) / elapsed,
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana P2P Framing Benchmark")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    workloads = {
+        "block_push": [block_push(rng, i) for i in range(args.messages)],
+        "model_update": [model_update(rng, i) for i in range(args.messages // 5)],
+    }
+    for name, msgs in workloads.items():
+        raw = sum(len(json.dumps(m)) for m in msgs)
+        print(f"\n📦 {name}: {len(msgs)} messages, {raw / len(msgs):.0f} B JSON each")
+        print(f"   {'mode':<10} {'frames':>8} {'KB':>9} {'msg/s':>9}")
+        for mode in ("legacy", "json", "bin", "bin+zlib"):
+            r = asyncio.run(run(mode, msgs, args.window_ms / 1000))
+            print(f"   {mode:<10} {r['frames']:>8} {r['bytes'] / 1024:>9.0f} {r['rate']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+P2P Message Queue Benchmark
+Queue / send / ACK throughput of the log-structured MessageQueue with 100k
+queued messages, against the previous rewrite-both-JSON-files-per-change
+"""
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "system"))
+
+from p2p_messaging import EncryptedMessage, MessageQueue, MessageStatus  # noqa: E402
+
+
+def _msg(i: int, recipients: int) -> EncryptedMessage:
+    return EncryptedMessage(
+        message_id=f"msg-{i:08d}", sender_id="device-a", recipient_id=f"device-{i % recipients}",
+        encrypted_content="A" * 160, nonce="N" * 32, timestamp=time.time(),
+        status=MessageStatus.PENDING.value,
+    )
+
+
+def legacy_ops(queue_dir: Path, count: int) -> float:
+    """Old behaviour: every add rewrites pending.json and delivered.json (indent=2)."""
+    pending = {}
+    t0 = time.perf_counter()
+    for i in range(count):
+        m = _msg(i, 50)
+        pending[m.message_id] = m
+        (queue_dir / "pending.json").write_text(json.dumps({k: v.to_dict() for k, v in pending.items()}, indent=2))
+        (queue_dir / "delivered.json").write_text(json.dumps({}, indent=2))
+    return time.perf_counter() - t0
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana P2P Message Queue Benchmark")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument("--legacy", type=int, default=2000, help="Messages for the legacy comparison")
+    parser.add_argument("--no-fsync", action="store_true")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="kiana_mq_"))
+    n = args.messages
+
+    legacy_dir = tmp / "legacy"
+    legacy_dir.mkdir()
+    legacy = legacy_ops(legacy_dir, args.legacy)
+    print(f"📄 legacy JSON rewrite: {args.legacy / legacy:,.0f} adds/s for {args.legacy} messages "
+          f"(cost grows with queue size)")
+
+    q = MessageQueue(tmp / "log", fsync=not args.no_fsync)
+    msgs = [_msg(i, args.recipients) for i in range(n)]
+
+    t0 = time.perf_counter()
+    for m in msgs:
+        q.add(m)
+    q.flush()
+    t_add = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        q.get_pending(f"device-{_ % args.recipients}")
+    t_lookup = (time.perf_counter() - t0) / 1000
+
+    t0 = time.perf_counter()
+    for m in msgs:
+        q.mark_sent(m.message_id)
+    q.flush()
+    t_sent = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for m in msgs:
+        q.mark_delivered(m.message_id)
+    q.flush()
+    t_ack = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reloaded = MessageQueue(tmp / "log-reload", fsync=False)
+    reloaded.log_file.write_bytes(q.log_file.read_bytes())
+    reloaded = MessageQueue(tmp / "log-reload", fsync=False)
+    t_load = time.perf_counter() - t0
+
+    stats = q.stats()
+    print(f"\n📦 {n:,} messages, {args.recipients} recipients, fsync={'off' if args.no_fsync else 'on'}")
+    print(f"   add        {n / t_add:>10,.0f} msg/s")
+    print(f"   mark_sent  {n / t_sent:>10,.0f} msg/s")
+    print(f"   ACK        {n / t_ack:>10,.0f} msg/s")
+    print(f"   get_pending(recipient) with {n // args.recipients:,} queued each: {t_lookup * 1000:.2f} ms")
+    print(f"   {stats['commits']} group commits, log {stats['log_records']:,} records after compaction, "
+          f"{stats['dedup_ids']:,} dedup ids")
+    print(f"   reload: {t_load:.2f}s ({len(reloaded.delivered):,} ids)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+RAG Benchmark
+Batch ingestion time and augment_prompt latency of the OS-side RAGSystem
+as the knowledge base grows
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from loguru import logger  # noqa: E402
+from core.nlp.rag_system import RAGSystem  # noqa: E402
+
+WORDS = ("system driver kernel memory network update backup security printer audio video "
+         "battery display keyboard mouse wifi bluetooth disk partition process service log "
+         "performance cache thread user account permission install package repository "
+         "firewall port socket latency throughput sensor fan temperature power").split()
+
+
+def make_doc(rng: random.Random, i: int) -> str:
+    sentences = []
+    for _ in range(rng.randint(3, 12)):
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + ".")
+    return f"Document {i}. " + " ".join(sentences)
+
+
+def _pct(values: List[float], q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))]
+
+
+async def measure(rag: RAGSystem, rng: random.Random, queries: int) -> List[float]:
+    times = []
+    for _ in range(queries):
+        q = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        t0 = time.perf_counter()
+        await rag.augment_prompt(q)
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana RAG Benchmark")
+    parser.add_argument("--sizes", default="1000,10000,30000", help="Knowledge base sizes (documents)")
+    parser.add_argument("--batch", type=int, default=1000, help="Documents per add_documents() call")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    logger.remove()
+    rng = random.Random(0)
+    rag = RAGSystem(tempfile.mkdtemp(prefix="kiana_rag_"))
+    print(f"🧭 Embedder: {rag.index.embedder.name}\n")
+    print(f"{'docs':>7} {'chunks':>7} {'ingest s':>9} {'docs/s':>8} {'p50 ms':>7} {'p95 ms':>7}")
+
+    for size in [int(x) for x in args.sizes.split(",")]:
+        before = len(rag.documents)
+        todo = size - before
+        t0 = time.perf_counter()
+        while todo > 0:
+            n = min(args.batch, todo)
+            start = len(rag.documents)
+            rag.add_documents((make_doc(rng, start + j), {"title": f"doc {start + j}"}) for j in range(n))
+            todo -= n
+        ingest = time.perf_counter() - t0
+        added = len(rag.documents) - before
+        lat = asyncio.run(measure(rag, rng, args.queries))
+        print(f"{len(rag.documents):>7} {len(rag.index):>7} {ingest:>9.2f} "
+              f"{(added / ingest) if ingest else 0:>8.0f} {_pct(lat, 0.5):>7.2f} {_pct(lat, 0.95):>7.2f}")
+
+    t0 = time.perf_counter()
+    RAGSystem(str(rag.kb_path))
+    print(f"\n📦 Reload from disk: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
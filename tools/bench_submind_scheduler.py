@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+SubMind Scheduler Benchmark
+Dispatches thousands of simulated tasks across dozens of local sub-minds
+with mixed speeds, slot counts and priorities
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))]
+
+
+async def run(args) -> None:
+    from netapi.distributed.submind_network import (
+        SubMindNetwork, SubMind, SubMindRole, SubMindStatus, DistributedTask,
+    )
+
+    rng = random.Random(args.seed)
+    speed: Dict[str, float] = {}
+
+    class SimNetwork(SubMindNetwork):
+        async def _execute_on_submind(self, submind, task):
+            await asyncio.sleep(task.payload["work"] * speed.get(submind.id, 1.0))
+            return {"ok": True}
+
+    network = SimNetwork()
+    roles = [SubMindRole.RESEARCHER, SubMindRole.ANALYZER, SubMindRole.TECHNICAL, SubMindRole.MEMORY]
+    for i in range(args.subminds):
+        role = roles[i % len(roles)]
+        sm_id = f"{role.value}_sim_{i}"
+        speed[sm_id] = rng.choice([0.5, 1.0, 1.0, 2.0, 4.0])  # some slow nodes
+        network.register_submind(SubMind(
+            id=sm_id, name=sm_id, role=role, status=SubMindStatus.ONLINE,
+            max_concurrency=rng.choice([1, 2, 4]),
+        ))
+    sim = [sm for sm in network.subminds.values() if sm.id in speed]
+    slots = sum(sm.max_concurrency for sm in sim)
+    capacity = sum(sm.max_concurrency / speed[sm.id] for sm in sim)
+
+    tasks = []
+    for i in range(args.tasks):
+        tasks.append(DistributedTask(
+            id=f"bench_{i}", type="sim", description="sim",
+            payload={"work": rng.uniform(0.5, 1.5) * args.work_ms / 1000},
+            required_role=rng.choice(roles),
+            priority=rng.choice([0, 0, 0, 5]),
+        ))
+    total_work = sum(t.payload["work"] for t in tasks)
+
+    print(f"⚙️  {len(sim)} sub-minds ({slots} slots), {len(tasks)} tasks, "
+          f"~{args.work_ms}ms each, ideal makespan ≈ {total_work / capacity:.2f}s")
+
+    writes_before = network.state_writes
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(network.submit_task(t) for t in tasks))
+    elapsed = time.perf_counter() - t0
+    network.flush_state()
+
+    ok = [r for r in results if r.get("success")]
+    waits = {p: [r["queue_wait"] for r, t in zip(results, tasks) if r.get("success") and t.priority == p]
+             for p in (0, 5)}
+    stats = network.scheduler.stats()
+    print(f"\n✅ {len(ok)}/{len(tasks)} succeeded in {elapsed:.2f}s ({len(ok) / elapsed:.0f} tasks/s)")
+    for p, w in waits.items():
+        print(f"   priority {p}: queue wait p50={_pct(w, 0.5) * 1000:.0f}ms p95={_pct(w, 0.95) * 1000:.0f}ms")
+    print(f"   placed locally={stats['placed_local']} via role queue={stats['queued_role']} "
+          f"stolen={stats['stolen']}")
+    print(f"   state writes: {network.state_writes - writes_before} for {len(tasks)} tasks")
+
+    by_speed: Dict[float, List[int]] = {}
+    for sm in sim:
+        by_speed.setdefault(speed[sm.id], []).append(sm.total_tasks / sm.max_concurrency)
+    for sp in sorted(by_speed):
+        vals = by_speed[sp]
+        print(f"   slowdown x{sp}: {sum(vals) / len(vals):.1f} tasks per slot")
+    network.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana SubMind Scheduler Benchmark")
+    parser.add_argument("--subminds", type=int, default=40)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--work-ms", type=float, default=10.0, help="Mean simulated task time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Keep the benchmark's network state out of the real home directory
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="kiana_sched_")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Benchmark
+Gallery-style batch over a folder of large images: legacy per-size full
+decode + PNG vs the thumbnail pipeline (draft decode, all sizes from one
+decode, WebP/JPEG) with 1 and N processes.
+
+Needs Pillow (or OpenCV) — with --generate N it creates N synthetic
+12 MP JPEGs to run against.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "system"))
+
+from thumbnails import parse_sizes, render_batch  # noqa: E402
+
+
+def generate(folder: Path, n: int, size=(4032, 3024)) -> None:
+    from PIL import Image  # type: ignore
+    base = Image.effect_noise(size, 48).convert("RGB")
+    for i in range(n):
+        base.rotate(i % 4 * 90, expand=False).save(folder / f"photo_{i:04d}.jpg", format="JPEG", quality=90)
+
+
+def legacy(sources, sizes, out_dir: Path) -> None:
+    """The previous _thumbnail: a full-resolution decode and a PNG per size."""
+    for src in sources:
+        for w, h in sizes:
+            try:
+                import cv2  # type: ignore
+                import numpy as np  # type: ignore
+                img = cv2.imdecode(np.fromfile(str(src), dtype=np.uint8), cv2.IMREAD_COLOR)
+                ih, iw = img.shape[:2]
+                scale = min(w / max(1, iw), h / max(1, ih))
+                resized = cv2.resize(img, (max(1, int(iw * scale)), max(1, int(ih * scale))), interpolation=cv2.INTER_AREA)
+                buf = cv2.imencode(".png", resized)[1].tobytes()
+            except ImportError:
+                from PIL import Image  # type: ignore
+                with Image.open(src) as im:
+                    im.load()  # what the old code paid for: full-resolution pixels
+                    im = im.copy()
+                    im.thumbnail((w, h))
+                    bio = io.BytesIO()
+                    im.save(bio, format="PNG")
+                    buf = bio.getvalue()
+            (out_dir / f"thumb_{src.stem}_{w}x{h}.png").write_bytes(buf)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana Thumbnail Benchmark")
+    parser.add_argument("--dir", type=str, default="", help="Folder with sample images")
+    parser.add_argument("--generate", type=int, default=24, help="Synthetic photos if --dir is not given")
+    parser.add_argument("--sizes", type=str, default="256x256,64x64")
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    sizes = parse_sizes(args.sizes)
+    tmp = Path(tempfile.mkdtemp(prefix="thumb_bench_"))
+    try:
+        if args.dir:
+            folder = Path(args.dir)
+        else:
+            folder = tmp / "src"
+            folder.mkdir()
+            print(f"🖼️  Generating {args.generate} synthetic 12 MP JPEGs...")
+            generate(folder, args.generate)
+        sources = sorted(p for p in folder.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"))
+        mb = sum(p.stat().st_size for p in sources) / 1e6
+        print(f"📂 {len(sources)} images ({mb:.0f} MB), sizes {sizes}\n")
+        print(f"   {'mode':<18} {'seconds':>8} {'img/s':>8} {'out KB':>8}")
+
+        def report(label, fn, out):
+            out.mkdir(parents=True)
+            t0 = time.perf_counter()
+            fn(out)
+            dt = time.perf_counter() - t0
+            kb = sum(p.stat().st_size for p in out.iterdir()) / 1024
+            print(f"   {label:<18} {dt:>8.2f} {len(sources) / dt:>8.1f} {kb:>8.0f}")
+
+        report("legacy", lambda out: legacy(sources, sizes, out), tmp / "legacy")
+        report("pipeline x1", lambda out: render_batch(sources, sizes, out, processes=1), tmp / "p1")
+        if args.procs > 1:
+            report(f"pipeline x{args.procs}", lambda out: render_batch(sources, sizes, out, processes=args.procs), tmp / "pn")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+TTS Streaming Benchmark
+Time-to-first-audio for a ~1,000 character answer: full synthesis vs
+sentence streaming vs streaming with a warm phrase cache.
+
+Uses the local Piper voice when installed; otherwise (or with --simulate)
+a synthetic renderer whose cost is proportional to the text length.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "system"))
+
+from tts_stream import PhraseCache, split_sentences, stream_pcm  # noqa: E402
+
+ANSWER = (
+    "Gute Frage! Ein Kernel ist der zentrale Teil eines Betriebssystems. "
+    "Er verwaltet den Speicher, die Prozesse und die Geräte, und er sorgt dafür, dass Programme "
+    "sich die Hardware teilen können, ohne sich gegenseitig zu stören. "
+    "Wenn du ein Programm startest, legt der Kernel einen neuen Prozess an. "
+    "Dieser Prozess bekommt eigenen Speicher, und der Scheduler entscheidet, wann er laufen darf. "
+    "Treiber sind Module, die dem Kernel beibringen, mit bestimmten Geräten zu sprechen, "
+    "zum Beispiel mit der Netzwerkkarte oder der Soundkarte. "
+    "Bei Linux kannst du viele Treiber zur Laufzeit laden und entladen. "
+    "Das macht das System flexibel, birgt aber auch Risiken, weil ein fehlerhafter Treiber "
+    "das ganze System zum Absturz bringen kann. "
+    "Möchtest du mehr über Prozesse, Speicher oder Treiber wissen? "
+    "Ich kann dir gern ein Beispiel zeigen."
+)
+
+
+def simulated_renderer(ms_per_char: float, sample_rate: int = 22050):
+    def render(text: str):
+        time.sleep(ms_per_char * len(text) / 1000.0)
+        return b"\x00\x00" * int(0.06 * sample_rate * len(text)), sample_rate
+    return render
+
+
+def piper_renderer():
+    from local_tts import PIPER_AVAILABLE, get_tts_service
+    if not PIPER_AVAILABLE:
+        return None, None
+    service = get_tts_service()
+    try:
+        voice_obj = service._load_voice(service.default_voice)
+    except Exception as e:
+        print(f"⚠️  Piper voice unavailable: {e}")
+        return None, None
+    return (lambda text: service._render(service.default_voice, voice_obj, text)), service.default_voice
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana TTS Streaming Benchmark")
+    parser.add_argument("--chars", type=int, default=1000)
+    parser.add_argument("--simulate", action="store_true", help="Synthetic renderer instead of Piper")
+    parser.add_argument("--ms-per-char", type=float, default=2.0, help="Synthetic synthesis cost")
+    args = parser.parse_args()
+
+    text = (ANSWER * (args.chars // len(ANSWER) + 1))[: args.chars]
+    text = text[: text.rfind(" ")] + "."
+
+    render, voice = (None, None) if args.simulate else piper_renderer()
+    engine = "piper"
+    if render is None:
+        render, voice, engine = simulated_renderer(args.ms_per_char), "sim", f"simulated ({args.ms_per_char} ms/char)"
+
+    sentences = split_sentences(text)
+    print(f"🔊 {len(text)} chars, {len(sentences)} sentences, engine: {engine}\n")
+    print(f"   {'mode':<16} {'first audio':>12} {'total':>9}")
+
+    t0 = time.perf_counter()
+    render(text)
+    full = time.perf_counter() - t0
+    print(f"   {'full text':<16} {full * 1000:>10.0f}ms {full * 1000:>7.0f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PhraseCache(Path(tmp))
+        for label in ("stream (cold)", "stream (cached)"):
+            t0 = time.perf_counter()
+            first = None
+            for _ in stream_pcm(sentences, render, voice=voice, cache=cache):
+                if first is None:
+                    first = time.perf_counter() - t0
+            total = time.perf_counter() - t0
+            print(f"   {label:<16} {first * 1000:>10.0f}ms {total * 1000:>7.0f}ms")
+        print(f"\n📦 Cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
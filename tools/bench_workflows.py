@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Workflow Engine Benchmark
+Cost of one monitor() tick as the number of registered workflows grows
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "os"))
+
+from loguru import logger  # noqa: E402
+from core.automation.workflow_engine import WorkflowEngine  # noqa: E402
+
+
+class _CountingEngine(WorkflowEngine):
+    """Counts instead of running actions; a quiet fixed snapshot keeps the
+    benchmark's own CPU load from firing every cpu trigger."""
+    fired = 0
+
+    def sample_metrics(self, force=False):
+        return {"cpu": 20.0, "memory": 40.0}
+
+    async def run_workflow(self, workflow):
+        self.fired += 1
+
+
+async def tick_cost(count: int, ticks: int) -> Tuple[float, float]:
+    engine = _CountingEngine()
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            engine.add_workflow(f"w{i}", f"event:e{i % 500}", [])
+        elif kind == 1:
+            engine.add_workflow(f"w{i}", f"time:daily:{i % 24}:{i % 60}", [])
+        elif kind == 2:
+            engine.add_workflow(f"w{i}", f"if:cpu>{90 + i % 10}", [])
+        else:
+            engine.add_workflow(f"w{i}", f"if:memory>{95 + i % 5}", [])
+
+    t0 = time.perf_counter()
+    for t in range(ticks):
+        await engine.monitor({"event": f"e{t % 500}"})
+    return (time.perf_counter() - t0) / ticks * 1000, engine.fired / ticks
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI_ana Workflow Engine Benchmark")
+    parser.add_argument("--sizes", default="10,1000,10000,100000")
+    parser.add_argument("--ticks", type=int, default=1000)
+    args = parser.parse_args()
+
+    logger.remove()
+    print(f"{'workflows':>10} {'ms/tick':>9} {'fired/tick':>11}")
+    for size in [int(x) for x in args.sizes.split(",")]:
+        ms, fired = asyncio.run(tick_cost(size, args.ticks))
+        print(f"{size:>10} {ms:>9.3f} {fired:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
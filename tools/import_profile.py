@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+API Import-Time Profile / Cold-Start Budget
+Imports netapi.app in fresh interpreters under `python -X importtime` and
+prints the cold-start wall time (interpreter start to app object), summed
+import self time, the slowest modules, self time per package and any heavy
+optional dependency loaded at startup. With --budget-ms the script exits
+non-zero when the median cold start exceeds the budget.
+--compare-eager also profiles with KI_LAZY_ROUTERS=0.
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from netapi.startup_profile import profile_import  # noqa: E402
+
+
+def run(target: str, runs: int, top: int, env=None) -> dict:
+    results = [profile_import(target, top=top, env=env) for _ in range(runs)]
+    last = results[-1]
+    last["runs_ms"] = [r["wall_ms"] for r in results]
+    last["median_ms"] = statistics.median(last["runs_ms"])
+    last["median_import_ms"] = statistics.median(r["total_ms"] for r in results)
+    return last
+
+
+def show(label: str, res: dict, top: int) -> None:
+    print(f"\n📦 {label}: cold start median {res['median_ms']:.0f} ms over {len(res['runs_ms'])} runs "
+          f"(import self time {res['median_import_ms']:.0f} ms, {res['modules']} modules)")
+    if not res["ok"]:
+        print(f"❌ import failed:\n{res.get('error', '')}")
+    print("   slowest (cumulative):")
+    for r in res["slowest"][:top]:
+        print(f"   {r['cumulative_ms']:8.1f} ms  {r['module']}")
+    print("   by package (self):")
+    for p in res["packages"][:top]:
+        print(f"   {p['self_ms']:8.1f} ms  {p['package']}")
+    print(f"   heavy deps at startup: {', '.join(res['heavy']) or 'none'}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", default="netapi.app")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--budget-ms", type=float, default=None)
+    ap.add_argument("--compare-eager", action="store_true")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    lazy = run(args.target, args.runs, args.top)
+    eager = run(args.target, args.runs, args.top, env={"KI_LAZY_ROUTERS": "0"}) if args.compare_eager else None
+
+    if args.json:
+        for r in (lazy, eager):
+            if r:
+                r.pop("imported", None)
+        print(json.dumps({"lazy": lazy, "eager": eager}, indent=2))
+    else:
+        show("lazy routers", lazy, args.top)
+        if eager:
+            show("eager routers (KI_LAZY_ROUTERS=0)", eager, args.top)
+            print(f"\n⚡ lazy mounting saves {eager['median_ms'] - lazy['median_ms']:.0f} ms of cold start")
+
+    if args.budget_ms is not None:
+        if lazy["median_ms"] > args.budget_ms:
+            print(f"❌ cold start {lazy['median_ms']:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+            return 1
+        print(f"✅ cold start {lazy['median_ms']:.0f} ms within budget {args.budget_ms:.0f} ms")
+    return 0 if lazy["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())